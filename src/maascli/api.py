@@ -34,9 +34,19 @@ from maascli.utils import (
 )
 
 
-def http_request(url, method, body=None, headers=None, insecure=False):
-    """Issue an http request."""
-    http = httplib2.Http(disable_ssl_certificate_validation=insecure)
+def http_request(
+    url, method, body=None, headers=None, insecure=False, client=None
+):
+    """Issue an http request.
+
+    :param client: Optionally, an `httplib2.Http` to issue the request with.
+        Its connections are kept alive between requests. A new one is used
+        for every request otherwise.
+    """
+    if client is None:
+        http = httplib2.Http(disable_ssl_certificate_validation=insecure)
+    else:
+        http = client
     try:
         # XXX mpontillo 2015-12-15: Should force input to be in bytes here.
         # This calls into httplib2, which is going to call a parser which
@@ -110,7 +120,8 @@ class Action(Command):
             default=False,
         )
 
-    def __call__(self, options):
+    def prepare_request(self, options):
+        """Return the URI, body, and signed headers for a request."""
         # TODO: this is el-cheapo URI Template
         # <http://tools.ietf.org/html/rfc6570> support; use uritemplate-py
         # <https://github.com/uri-templates/uritemplate-py> here?
@@ -129,6 +140,11 @@ class Action(Command):
         if self.credentials is not None:
             self.sign(uri, headers, self.credentials)
 
+        return uri, body, headers
+
+    def __call__(self, options):
+        uri, body, headers = self.prepare_request(options)
+
         # Use httplib2 instead of urllib2 (or MAASDispatcher, which is based
         # on urllib2) so that we get full control over HTTP method. TODO:
         # create custom MAASDispatcher to use httplib2 so that MAASClient can
@@ -378,43 +394,64 @@ def get_action_class_bases(handler, action):
     return (Action,)
 
 
-def register_actions(profile, handler, parser):
-    """Register a handler's actions."""
-    for action in handler["actions"]:
-        help_title, help_body = parse_docstring(action["doc"])
-        action_name = safe_name(action["name"])
-        action_bases = get_action_class_bases(handler, action)
-        action_ns = {"action": action, "handler": handler, "profile": profile}
-        action_class = type(action_name, action_bases, action_ns)
-        action_parser = parser.subparsers.add_parser(
-            action_name,
-            help=help_title,
-            description=help_title,
-            epilog=help_body,
-            add_help=False,
-        )
-        action_parser.add_argument(
-            "--help",
-            "-h",
-            action=ActionHelp,
-            nargs=0,
-            help="Show this help message and exit.",
-        )
-        action_parser.set_defaults(execute=action_class(action_parser))
+def register_action(profile, handler, action, parser):
+    """Register one of a handler's actions."""
+    help_title, help_body = parse_docstring(action["doc"])
+    action_name = safe_name(action["name"])
+    action_bases = get_action_class_bases(handler, action)
+    action_ns = {"action": action, "handler": handler, "profile": profile}
+    action_class = type(action_name, action_bases, action_ns)
+    action_parser = parser.subparsers.add_parser(
+        action_name,
+        help=help_title,
+        description=help_title,
+        epilog=help_body,
+        add_help=False,
+    )
+    action_parser.add_argument(
+        "--help",
+        "-h",
+        action=ActionHelp,
+        nargs=0,
+        help="Show this help message and exit.",
+    )
+    action_parser.set_defaults(execute=action_class(action_parser))
+
 
+def register_actions(profile, handler, parser, only=None):
+    """Register a handler's actions.
 
-def register_handler(profile, handler, parser):
+    :param only: Optionally, the command name of the single action to
+        register. All actions are registered if the handler has no such
+        action, so that argparse can report the valid choices.
+    """
+    actions = handler["actions"]
+    if only is not None:
+        selected = [
+            action for action in actions if safe_name(action["name"]) == only
+        ]
+        if len(selected) != 0:
+            actions = selected
+    for action in actions:
+        register_action(profile, handler, action, parser)
+
+
+def register_handler(profile, handler, parser, only_action=None):
     """Register a resource's handler."""
     help_title, help_body = parse_docstring(handler["doc"])
     handler_name = handler_command_name(handler["name"])
     handler_parser = parser.subparsers.add_parser(
         handler_name, help=help_title, description=help_title, epilog=help_body
     )
-    register_actions(profile, handler, handler_parser)
+    register_actions(profile, handler, handler_parser, only=only_action)
 
 
-def register_resources(profile, parser):
-    """Register a profile's resources."""
+def get_resource_handlers(profile):
+    """Yield the handlers to expose for a profile's resources.
+
+    Each is the description of a resource's handler with the actions of its
+    authenticated and anonymous handlers merged, ordered by resource name.
+    """
     anonymous = profile["credentials"] is None
     description = profile["description"]
     resources = description["resources"]
@@ -450,7 +487,45 @@ def register_resources(profile, parser):
             represent_as["actions"].extend(
                 value[0] for value in actions.values()
             )
-            register_handler(profile, represent_as, parser)
+            yield represent_as
+
+
+def register_resources(profile, parser):
+    """Register a profile's resources."""
+    for handler in get_resource_handlers(profile):
+        register_handler(profile, handler, parser)
+
+
+def register_batch(profile, parser):
+    """Register the command that executes many commands for `profile`."""
+    # Imported here because maascli.batch builds on this module.
+    from maascli.batch import Batch
+
+    help_title, help_body = parse_docstring(Batch)
+    batch_parser = parser.subparsers.add_parser(
+        "batch", help=help_title, description=help_title, epilog=help_body
+    )
+    batch_parser.set_defaults(execute=Batch(batch_parser, profile))
+
+
+def index_profile(config, profile_name):
+    """Build the index of a profile's API description and store it.
+
+    The summary of a profile is the profile without its API description,
+    save for the description's hash which `Action` uses to detect a stale
+    description.
+
+    :return: The profile's summary.
+    """
+    profile = config[profile_name]
+    summary = dict(profile)
+    summary["description"] = {"hash": profile["description"].get("hash")}
+    handlers = {
+        handler_command_name(handler["name"]): handler
+        for handler in get_resource_handlers(profile)
+    }
+    config.set_index(profile_name, summary, handlers)
+    return summary
 
 
 profile_help_paragraphs = [
@@ -472,21 +547,83 @@ profile_help = "\n\n".join(
 )
 
 
-def register_api_commands(parser):
-    """Register all profiles as subcommands on `parser`."""
+def get_command_path(argv):
+    """Return the first few positional words of `argv`.
+
+    These are the profile, handler and action names if `argv` is an API
+    command. Returns `None` if help has been requested, as then the whole
+    parser tree is needed.
+    """
+    words = []
+    for arg in argv[1:]:
+        if arg in ("-h", "--help"):
+            return None
+        elif arg.startswith("-"):
+            continue
+        elif len(words) < 3:
+            words.append(arg)
+    return words
+
+
+def add_profile_parser(profile, parser):
+    """Add the parser for `profile`, without its resources."""
+    return parser.subparsers.add_parser(
+        profile["name"],
+        help="Interact with %(url)s" % profile,
+        description=(
+            "Issue commands to the MAAS region controller at "
+            "%(url)s." % profile
+        ),
+        epilog=profile_help,
+    )
+
+
+def register_command_path(config, parser, path):
+    """Register only the profile, handler and action named in `path`.
+
+    Other profiles get a parser without any resources. Falls back to
+    registering all the resources of the selected profile if `path` doesn't
+    name one of its handlers.
+    """
+    for profile_name in sorted(config):
+        summary = config.get_index(profile_name)
+        if summary is None:
+            summary = index_profile(config, profile_name)
+        profile_parser = add_profile_parser(summary, parser)
+        if len(path) == 0 or path[0] != profile_name:
+            continue
+        handler = None
+        if len(path) > 1:
+            if path[1] == "batch":
+                register_batch(summary, profile_parser)
+                continue
+            handler = config.get_indexed_handler(profile_name, path[1])
+        if handler is None:
+            register_resources(config[profile_name], profile_parser)
+            register_batch(summary, profile_parser)
+        else:
+            only_action = path[2] if len(path) > 2 else None
+            register_handler(summary, handler, profile_parser, only_action)
+
+
+def register_api_commands(parser, argv=None):
+    """Register all profiles as subcommands on `parser`.
+
+    If `argv` is given, only the parsers needed for the command it names are
+    built, from the indexed API descriptions (see `index_profile`); this
+    keeps start-up quick for scripts that run many commands.
+    """
+    path = None if argv is None else get_command_path(argv)
     try:
-        with ProfileConfig.open() as config:
-            for profile_name in config:
-                profile = config[profile_name]
-                profile_parser = parser.subparsers.add_parser(
-                    profile["name"],
-                    help="Interact with %(url)s" % profile,
-                    description=(
-                        "Issue commands to the MAAS region controller at "
-                        "%(url)s." % profile
-                    ),
-                    epilog=profile_help,
-                )
-                register_resources(profile, profile_parser)
+        if path is None:
+            with ProfileConfig.open() as config:
+                for profile_name in config:
+                    profile = config[profile_name]
+                    profile_parser = add_profile_parser(profile, parser)
+                    register_resources(profile, profile_parser)
+                    register_batch(profile, profile_parser)
+        else:
+            with ProfileConfig.open(fill_cache=False) as config:
+                register_command_path(config, parser, path)
     except FileNotFoundError:
         return
@@ -0,0 +1,229 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Execute many API commands from a single `maas` process."""
+
+__all__ = ["Batch"]
+
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+import json
+import shlex
+import sys
+import threading
+
+import httplib2
+
+from maascli import api
+from maascli.command import Command, CommandError
+from maascli.config import ProfileConfig
+from maascli.parser import ArgumentParser
+from maascli.utils import get_response_content_type
+
+
+class CommandParser(ArgumentParser):
+    """Parse a batched command, raising errors instead of exiting."""
+
+    def error(self, message):
+        raise CommandError(message)
+
+
+def parse_line(line, number):
+    """Return the id and words of a batched command.
+
+    :param line: A line of input. It's either a command as it would be
+        given after the profile name on the command line, a JSON list of
+        the words of a command, or a JSON object with an ``args`` list and an
+        optional ``id``.
+    :param number: The line number, used as the id if none is given.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        command = json.loads(line)
+        return command.get("id", number), list(command["args"])
+    elif line.startswith("["):
+        return number, list(json.loads(line))
+    else:
+        return number, shlex.split(line)
+
+
+def make_result(command_id, response, content):
+    """Return the JSON-able result of a batched command."""
+    result = {"id": command_id, "status": response.status}
+    content_type = get_response_content_type(response) or ""
+    if content_type.endswith("/json"):
+        result["content"] = json.loads(content.decode("utf-8"))
+    elif content_type.startswith("text/"):
+        result["content"] = content.decode("utf-8", "replace")
+    else:
+        result["content"] = b64encode(content).decode("ascii")
+        result["encoding"] = "base64"
+    return result
+
+
+class CommandResolver:
+    """Resolve batched commands to signed requests.
+
+    The action parsers for a handler are built the first time one of its
+    commands is seen, from the profile's indexed API description.
+    """
+
+    def __init__(self, config, profile_name):
+        super().__init__()
+        self.config = config
+        self.profile_name = profile_name
+        self.profile = config.get_index(profile_name)
+        if self.profile is None:
+            self.profile = api.index_profile(config, profile_name)
+        self.parsers = {}
+
+    def get_parser(self, handler_name, action_name):
+        key = handler_name, action_name
+        parser = self.parsers.get(key)
+        if parser is None:
+            handler = self.config.get_indexed_handler(
+                self.profile_name, handler_name
+            )
+            if handler is None:
+                raise CommandError("Unknown command: %s" % handler_name)
+            parser = CommandParser(prog=self.profile_name, add_help=False)
+            api.register_handler(
+                self.profile, handler, parser, only_action=action_name
+            )
+            self.parsers[key] = parser
+        return parser
+
+    def resolve(self, words):
+        """Return the method, URI, body and headers for a request.
+
+        :param words: The words of the command, without the profile name.
+        """
+        if len(words) == 0:
+            raise CommandError("No command given.")
+        action_name = words[1] if len(words) > 1 else None
+        parser = self.get_parser(words[0], action_name)
+        options = parser.parse_args(words)
+        action = getattr(options, "execute", None)
+        if action is None:
+            raise CommandError("too few arguments")
+        if type(action).__call__ is not api.Action.__call__:
+            raise CommandError(
+                "%s %s cannot be used in batch mode." % (words[0], action_name)
+            )
+        uri, body, headers = action.prepare_request(options)
+        return action.method, uri, body, headers
+
+
+class Batch(Command):
+    """Execute API commands read from stdin.
+
+    Each line of input is a command as it would be given after the profile
+    name on the command line, e.g. ``machine read abc123``, a JSON list of
+    the words of a command, or a JSON object with an ``args`` list and an
+    optional ``id``. Blank lines and lines starting with ``#`` are ignored.
+
+    Requests are signed with the profile's credentials and issued by a pool
+    of workers, each keeping its connection to the region alive between
+    requests. A JSON object is written to stdout for each command as it
+    completes, holding the command's ``id`` (the line number unless given)
+    and either the response's ``status`` and ``content`` or an ``error``.
+    """
+
+    def __init__(self, parser, profile):
+        super().__init__(parser)
+        self.profile = profile
+        parser.add_argument(
+            "-c",
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of requests to issue concurrently (default: 4).",
+        )
+        parser.add_argument(
+            "-k",
+            "--insecure",
+            action="store_true",
+            help="Disable SSL certificate check",
+            default=False,
+        )
+
+    def __call__(self, options):
+        with ProfileConfig.open(fill_cache=False) as config:
+            resolver = CommandResolver(config, self.profile["name"])
+            failures = self.execute(
+                resolver,
+                sys.stdin,
+                sys.stdout,
+                concurrency=max(1, options.concurrency),
+                insecure=options.insecure,
+            )
+        if failures != 0:
+            raise CommandError(2)
+
+    def execute(self, resolver, lines, output, concurrency, insecure=False):
+        """Execute the commands in `lines`, writing results to `output`.
+
+        Commands are resolved in the calling thread, so `resolver` doesn't
+        need to be thread-safe. At most twice `concurrency` commands are in
+        flight at any time.
+
+        :return: The number of commands that failed.
+        """
+        lock = threading.Lock()
+        local = threading.local()
+        slots = threading.BoundedSemaphore(concurrency * 2)
+        failures = 0
+        hash_checked = False
+
+        def get_client():
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = httplib2.Http(
+                    disable_ssl_certificate_validation=insecure
+                )
+            return client
+
+        def write(result, response=None):
+            nonlocal failures, hash_checked
+            with lock:
+                if "error" in result or result["status"] // 100 != 2:
+                    failures += 1
+                if response is not None and not hash_checked:
+                    hash_checked = True
+                    api.Action.compare_api_hashes(resolver.profile, response)
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+
+        def request(command_id, method, uri, body, headers):
+            try:
+                response, content = api.http_request(
+                    uri,
+                    method,
+                    body=body,
+                    headers=headers,
+                    client=get_client(),
+                )
+                result = make_result(command_id, response, content)
+            except (Exception, CommandError) as error:
+                write({"id": command_id, "error": str(error)})
+            else:
+                write(result, response)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for number, line in enumerate(lines, 1):
+                if line.strip() == "" or line.lstrip().startswith("#"):
+                    continue
+                command_id = number
+                try:
+                    command_id, words = parse_line(line, number)
+                    method, uri, body, headers = resolver.resolve(words)
+                except (Exception, CommandError) as error:
+                    write({"id": command_id, "error": str(error)})
+                    continue
+                slots.acquire()
+                executor.submit(
+                    request, command_id, method, uri, body, headers
+                )
+        return failures
@@ -12,9 +12,17 @@ import sqlite3
 
 
 class ProfileConfig:
-    """Store profile configurations in an sqlite3 database."""
+    """Store profile configurations in an sqlite3 database.
 
-    def __init__(self, database):
+    Alongside each profile an index of its API description is kept: a
+    summary of the profile without the description, and each handler the
+    CLI exposes stored under its command name. This allows a single command
+    to be dispatched without loading every profile's full description. The
+    index is derived data; it's dropped whenever a profile is written and
+    rebuilt on demand (see `maascli.api.index_profile`).
+    """
+
+    def __init__(self, database, fill_cache=True):
         self.database = database
         self.cache = {}
         with self.cursor() as cursor:
@@ -24,7 +32,20 @@ class ProfileConfig:
                 " name TEXT NOT NULL UNIQUE,"
                 " data BLOB)"
             )
-        self.__fill_cache()
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS profile_index "
+                "(name TEXT NOT NULL PRIMARY KEY,"
+                " data BLOB)"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS handler_index "
+                "(profile TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " data BLOB,"
+                " PRIMARY KEY (profile, name))"
+            )
+        if fill_cache:
+            self.__fill_cache()
 
     def cursor(self):
         return closing(self.database.cursor())
@@ -69,16 +90,68 @@ class ProfileConfig:
                 "VALUES (?, ?)",
                 (name, json.dumps(data)),
             )
+            self._delete_index(cursor, name)
         self.cache[name] = data
 
     def __delitem__(self, name):
         with self.cursor() as cursor:
             cursor.execute("DELETE FROM profiles" " WHERE name = ?", (name,))
+            self._delete_index(cursor, name)
         try:
             del self.cache[name]
         except KeyError:
             pass
 
+    def _delete_index(self, cursor, name):
+        cursor.execute("DELETE FROM profile_index WHERE name = ?", (name,))
+        cursor.execute("DELETE FROM handler_index WHERE profile = ?", (name,))
+
+    def get_index(self, name):
+        """Return the indexed summary of profile `name`, or `None`.
+
+        `None` is returned when the profile exists but hasn't been indexed,
+        as well as when there's no such profile.
+        """
+        with self.cursor() as cursor:
+            data = cursor.execute(
+                "SELECT data FROM profile_index WHERE name = ?", (name,)
+            ).fetchone()
+        return None if data is None else json.loads(data[0])
+
+    def get_indexed_handler(self, name, handler_name):
+        """Return the indexed handler `handler_name` of profile `name`.
+
+        Returns `None` if there's no such handler in the index.
+        """
+        with self.cursor() as cursor:
+            data = cursor.execute(
+                "SELECT data FROM handler_index"
+                " WHERE profile = ? AND name = ?",
+                (name, handler_name),
+            ).fetchone()
+        return None if data is None else json.loads(data[0])
+
+    def set_index(self, name, summary, handlers):
+        """Replace the index of profile `name`.
+
+        :param summary: The profile without its API description.
+        :param handlers: A mapping of command names to handler descriptions.
+        """
+        with self.cursor() as cursor:
+            self._delete_index(cursor, name)
+            cursor.execute(
+                "INSERT INTO profile_index (name, data) VALUES (?, ?)",
+                (name, json.dumps(summary)),
+            )
+            cursor.executemany(
+                "INSERT INTO handler_index (profile, name, data) "
+                "VALUES (?, ?, ?)",
+                (
+                    (name, handler_name, json.dumps(handler))
+                    for handler_name, handler in handlers.items()
+                ),
+            )
+
     @classmethod
     def create_database(cls, dbpath):
         # Initialise the database file with restrictive permissions.
@@ -86,11 +159,14 @@ class ProfileConfig:
 
     @classmethod
     @contextmanager
-    def open(cls, dbpath=expanduser("~/.maascli.db"), create=False):
+    def open(
+        cls, dbpath=expanduser("~/.maascli.db"), create=False, fill_cache=True
+    ):
         """Load a profiles database.
 
         Called without arguments this will open (and create, if create=True) a
-        database in the user's home directory.
+        database in the user's home directory. Pass `fill_cache=False` to
+        avoid loading every profile up-front.
 
         **Note** that this returns a context manager which will close the
         database on exit, saving if the exit is clean.
@@ -102,7 +178,7 @@ class ProfileConfig:
             raise FileNotFoundError(dbpath)
         database = sqlite3.connect(dbpath)
         try:
-            yield cls(database)
+            yield cls(database, fill_cache=fill_cache)
         except BaseException:
             raise
         else:
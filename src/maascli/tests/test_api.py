@@ -8,6 +8,7 @@ from base64 import b64encode
 from functools import partial
 import http.client
 import json
+import os.path
 import sys
 from textwrap import dedent
 from unittest.mock import Mock, sentinel
@@ -28,7 +29,7 @@ from maascli.actions.sshkeys_import import SSHKeysImportAction
 from maascli.command import CommandError
 from maascli.config import ProfileConfig
 from maascli.parser import ArgumentParser
-from maascli.testing.config import make_configs
+from maascli.testing.config import make_configs, make_profile
 from maascli.utils import handler_command_name, safe_name
 from maastesting.factory import factory
 from maastesting.fixtures import CaptureStandardIO
@@ -75,6 +76,102 @@ class TestRegisterAPICommands(MAASTestCase):
                 self.assertIsInstance(options.execute, api.Action)
 
 
+class TestRegisterAPICommandsLazily(MAASTestCase):
+    """Tests for `register_api_commands` when given `argv`."""
+
+    def make_profile(self):
+        """Store a fake profile in a real configuration database."""
+        config_file = os.path.join(self.make_dir(), "config")
+        profile = make_profile()
+        with ProfileConfig.open(config_file, create=True) as config:
+            config[profile["name"]] = profile
+        open_config = partial(ProfileConfig.open, config_file)
+        self.patch(ProfileConfig, "open").side_effect = open_config
+        return profile
+
+    def get_command(self, profile, index=0):
+        handler = list(api.get_resource_handlers(profile))[index]
+        handler_name = handler_command_name(handler["name"])
+        action_name = safe_name(handler["actions"][0]["name"])
+        return handler_name, action_name
+
+    def test_get_command_path(self):
+        self.assertEqual(
+            ["admin", "machine", "read"],
+            api.get_command_path(
+                ["maas", "--debug", "admin", "machine", "read", "-d", "abc"]
+            ),
+        )
+
+    def test_get_command_path_returns_None_for_help(self):
+        self.assertIsNone(
+            api.get_command_path(["maas", "admin", "machine", "--help"])
+        )
+        self.assertIsNone(api.get_command_path(["maas", "-h"]))
+
+    def test_registers_only_the_named_handler(self):
+        profile = self.make_profile()
+        handler_name, action_name = self.get_command(profile)
+        other_handler_name, _ = self.get_command(profile, 1)
+        parser = ArgumentParser()
+        api.register_api_commands(
+            parser, ["maas", profile["name"], handler_name, action_name]
+        )
+        profile_parser = parser.subparsers.choices[profile["name"]]
+        self.assertEqual(
+            [handler_name], list(profile_parser.subparsers.choices)
+        )
+        options = parser.parse_args(
+            (profile["name"], handler_name, action_name)
+        )
+        self.assertIsInstance(options.execute, api.Action)
+        self.assertEqual(profile["url"], options.execute.profile["url"])
+
+    def test_indexes_profile(self):
+        profile = self.make_profile()
+        handler_name, action_name = self.get_command(profile)
+        api.register_api_commands(
+            ArgumentParser(),
+            ["maas", profile["name"], handler_name, action_name],
+        )
+        with ProfileConfig.open() as config:
+            summary = config.get_index(profile["name"])
+            handler = config.get_indexed_handler(profile["name"], handler_name)
+        self.assertEqual({"hash": None}, summary["description"])
+        self.assertEqual(profile["credentials"], summary["credentials"])
+        self.assertEqual(handler_name, handler_command_name(handler["name"]))
+
+    def test_registers_whole_profile_for_unknown_handler(self):
+        profile = self.make_profile()
+        parser = ArgumentParser()
+        api.register_api_commands(
+            parser, ["maas", profile["name"], factory.make_name("handler")]
+        )
+        profile_parser = parser.subparsers.choices[profile["name"]]
+        self.assertEqual(
+            {
+                handler_command_name(handler["name"])
+                for handler in api.get_resource_handlers(profile)
+            }
+            | {"batch"},
+            set(profile_parser.subparsers.choices),
+        )
+
+    def test_registers_only_batch(self):
+        profile = self.make_profile()
+        parser = ArgumentParser()
+        api.register_api_commands(parser, ["maas", profile["name"], "batch"])
+        profile_parser = parser.subparsers.choices[profile["name"]]
+        self.assertEqual(["batch"], list(profile_parser.subparsers.choices))
+
+    def test_registers_only_profiles_for_other_commands(self):
+        profile = self.make_profile()
+        parser = ArgumentParser()
+        api.register_api_commands(parser, ["maas", "list"])
+        profile_parser = parser.subparsers.choices[profile["name"]]
+        self.assertIsNone(profile_parser._subparsers)
+
+
 class TestFunctions(MAASTestCase):
     """Test for miscellaneous functions in `maascli.api`."""
 
@@ -0,0 +1,237 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maascli.batch`."""
+
+
+import http.client
+from io import StringIO
+import json
+import sqlite3
+import threading
+
+import httplib2
+
+from maascli import api
+from maascli.batch import (
+    Batch,
+    CommandResolver,
+    make_result,
+    parse_line,
+)
+from maascli.command import CommandError
+from maascli.config import ProfileConfig
+from maascli.parser import ArgumentParser
+from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
+
+
+def make_profile(credentials=("consumer", "token", "secret")):
+    handler = {
+        "name": "MachineHandler",
+        "doc": "Manage a machine.\n\nMore.",
+        "params": ["system_id"],
+        "uri": "http://example.com/MAAS/api/2.0/machines/{system_id}/",
+        "actions": [
+            {
+                "name": "read",
+                "doc": "Read a machine.",
+                "method": "GET",
+                "op": None,
+                "restful": True,
+            },
+            {
+                "name": "power_on",
+                "doc": "Power on.",
+                "method": "POST",
+                "op": "power_on",
+                "restful": False,
+            },
+        ],
+    }
+    return {
+        "name": factory.make_name("profile"),
+        "url": "http://example.com/MAAS/api/2.0/",
+        "credentials": credentials,
+        "description": {
+            "hash": None,
+            "resources": [
+                {"name": "MachineHandler", "auth": handler, "anon": handler}
+            ],
+        },
+    }
+
+
+def make_response(status=http.client.OK, content_type="application/json"):
+    response = httplib2.Response({"status": status})
+    response["content-type"] = content_type
+    return response
+
+
+class TestParseLine(MAASTestCase):
+    def test_parses_words(self):
+        self.assertEqual(
+            (3, ["machine", "read", "abc", "foo=bar baz"]),
+            parse_line("machine read abc 'foo=bar baz'\n", 3),
+        )
+
+    def test_parses_json_list(self):
+        self.assertEqual(
+            (3, ["machine", "read", "abc"]),
+            parse_line('["machine", "read", "abc"]\n', 3),
+        )
+
+    def test_parses_json_object(self):
+        self.assertEqual(
+            ("x", ["machine", "read"]),
+            parse_line('{"id": "x", "args": ["machine", "read"]}', 3),
+        )
+        self.assertEqual(
+            (3, ["machine", "read"]),
+            parse_line('{"args": ["machine", "read"]}', 3),
+        )
+
+
+class TestMakeResult(MAASTestCase):
+    def test_json(self):
+        self.assertEqual(
+            {"id": 1, "status": 200, "content": {"a": 1}},
+            make_result(1, make_response(), b'{"a": 1}'),
+        )
+
+    def test_text(self):
+        self.assertEqual(
+            {"id": 1, "status": 404, "content": "Not found"},
+            make_result(1, make_response(404, "text/plain"), b"Not found"),
+        )
+
+    def test_binary(self):
+        self.assertEqual(
+            {"id": 1, "status": 200, "content": "AAE=", "encoding": "base64"},
+            make_result(
+                1, make_response(content_type="application/x-tar"), b"\0\1"
+            ),
+        )
+
+
+class TestCommandResolver(MAASTestCase):
+    def make_resolver(self, **kwargs):
+        config = ProfileConfig(sqlite3.connect(":memory:"))
+        profile = make_profile(**kwargs)
+        config[profile["name"]] = profile
+        return CommandResolver(config, profile["name"])
+
+    def test_resolves_command(self):
+        resolver = self.make_resolver(credentials=None)
+        self.assertEqual(
+            (
+                "GET",
+                "http://example.com/MAAS/api/2.0/machines/abc/?foo=bar",
+                None,
+                {},
+            ),
+            resolver.resolve(["machine", "read", "abc", "foo=bar"]),
+        )
+
+    def test_signs_requests(self):
+        resolver = self.make_resolver()
+        method, uri, body, headers = resolver.resolve(
+            ["machine", "power-on", "abc"]
+        )
+        self.assertEqual("POST", method)
+        self.assertIn("Authorization", headers)
+        self.assertIn("oauth_consumer_key", headers["Authorization"])
+
+    def test_reuses_parsers(self):
+        resolver = self.make_resolver()
+        resolver.resolve(["machine", "read", "abc"])
+        parser = resolver.parsers["machine", "read"]
+        resolver.resolve(["machine", "read", "def"])
+        self.assertIs(parser, resolver.parsers["machine", "read"])
+
+    def test_rejects_unknown_handler(self):
+        resolver = self.make_resolver()
+        error = self.assertRaises(
+            CommandError, resolver.resolve, ["machinez", "read"]
+        )
+        self.assertEqual("Unknown command: machinez", str(error))
+
+    def test_rejects_bad_arguments(self):
+        resolver = self.make_resolver()
+        self.assertRaises(CommandError, resolver.resolve, ["machine", "read"])
+        self.assertRaises(CommandError, resolver.resolve, ["machine"])
+        self.assertRaises(CommandError, resolver.resolve, [])
+
+
+class TestBatch(MAASTestCase):
+    def make_batch(self):
+        config = ProfileConfig(sqlite3.connect(":memory:"))
+        profile = make_profile()
+        config[profile["name"]] = profile
+        parser = ArgumentParser()
+        batch = Batch(parser, profile)
+        return batch, CommandResolver(config, profile["name"])
+
+    def test_execute(self):
+        batch, resolver = self.make_batch()
+        clients = set()
+
+        def request(client, uri, method, body, headers):
+            clients.add((threading.get_ident(), id(client)))
+            if uri.endswith("/missing/"):
+                return make_response(404, "text/plain"), b"Not found"
+            return make_response(), json.dumps({"uri": uri}).encode()
+
+        self.patch(httplib2.Http, "request", request)
+        lines = [
+            "# A comment.\n",
+            "machine read abc\n",
+            "\n",
+            '{"id": "x", "args": ["machine", "read", "missing"]}\n',
+            "machine jump abc\n",
+        ] + ["machine read m%d\n" % index for index in range(20)]
+        output = StringIO()
+        failures = batch.execute(resolver, lines, output, concurrency=3)
+        results = {
+            result["id"]: result
+            for result in map(json.loads, output.getvalue().splitlines())
+        }
+        self.assertEqual(2, failures)
+        self.assertEqual(23, len(results))
+        self.assertEqual(
+            {
+                "id": 2,
+                "status": 200,
+                "content": {
+                    "uri": "http://example.com/MAAS/api/2.0/machines/abc/"
+                },
+            },
+            results[2],
+        )
+        self.assertEqual(404, results["x"]["status"])
+        self.assertIn("error", results[5])
+        # Each worker thread reuses one client.
+        self.assertEqual(len(clients), len({thread for thread, _ in clients}))
+        self.assertLessEqual(len(clients), 3)
+
+    def test_execute_reports_request_errors(self):
+        batch, resolver = self.make_batch()
+        self.patch(
+            httplib2.Http, "request"
+        ).side_effect = httplib2.ssl.SSLError()
+        output = StringIO()
+        failures = batch.execute(
+            resolver, ["machine read abc\n"], output, concurrency=1
+        )
+        self.assertEqual(1, failures)
+        [result] = map(json.loads, output.getvalue().splitlines())
+        self.assertEqual(1, result["id"])
+        self.assertIn("Certificate verification failed", result["error"])
+
+    def test_registered_on_profiles(self):
+        profile = make_profile()
+        parser = ArgumentParser()
+        api.register_batch(profile, parser)
+        options = parser.parse_args(["batch", "-c", "8"])
+        self.assertIsInstance(options.execute, Batch)
+        self.assertEqual(8, options.concurrency)
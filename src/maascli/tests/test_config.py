@@ -80,6 +80,51 @@ class TestProfileConfig(MAASTestCase):
         del config["alice"]
         self.assertEqual(set(), set(config))
 
+    def test_init_does_not_fill_cache_if_asked(self):
+        database = sqlite3.connect(":memory:")
+        api.ProfileConfig(database)["alice"] = {"abc": 123}
+        config = api.ProfileConfig(database, fill_cache=False)
+        self.assertEqual({}, config.cache)
+        self.assertEqual({"alice"}, set(config))
+
+    def test_index(self):
+        database = sqlite3.connect(":memory:")
+        config = api.ProfileConfig(database)
+        config["alice"] = {"abc": 123}
+        self.assertIsNone(config.get_index("alice"))
+        config.set_index("alice", {"name": "alice"}, {"machine": {"a": 1}})
+        self.assertEqual({"name": "alice"}, config.get_index("alice"))
+        self.assertEqual(
+            {"a": 1}, config.get_indexed_handler("alice", "machine")
+        )
+        self.assertIsNone(config.get_indexed_handler("alice", "machines"))
+
+    def test_set_index_replaces_index(self):
+        database = sqlite3.connect(":memory:")
+        config = api.ProfileConfig(database)
+        config.set_index("alice", {"name": "alice"}, {"machine": {"a": 1}})
+        config.set_index("alice", {"name": "bob"}, {"machines": {"b": 2}})
+        self.assertEqual({"name": "bob"}, config.get_index("alice"))
+        self.assertIsNone(config.get_indexed_handler("alice", "machine"))
+
+    def test_setting_profile_drops_index(self):
+        database = sqlite3.connect(":memory:")
+        config = api.ProfileConfig(database)
+        config["alice"] = {"abc": 123}
+        config.set_index("alice", {"name": "alice"}, {"machine": {"a": 1}})
+        config["alice"] = {"def": 456}
+        self.assertIsNone(config.get_index("alice"))
+        self.assertIsNone(config.get_indexed_handler("alice", "machine"))
+
+    def test_removing_profile_drops_index(self):
+        database = sqlite3.connect(":memory:")
+        config = api.ProfileConfig(database)
+        config["alice"] = {"abc": 123}
+        config.set_index("alice", {"name": "alice"}, {"machine": {"a": 1}})
+        del config["alice"]
+        self.assertIsNone(config.get_index("alice"))
+        self.assertIsNone(config.get_indexed_handler("alice", "machine"))
+
     def test_open_no_file_fail(self):
         config_file = os.path.join(self.make_dir(), "config")
         with TestCase.assertRaises(self, FileNotFoundError):
@@ -10,6 +10,7 @@ __all__ = [
 
 from collections import namedtuple
 import json
+from queue import Empty, Queue
 import re
 
 from django.conf import settings
@@ -19,6 +20,7 @@ from django.http import (
     HttpResponse,
     HttpResponseBadRequest,
     HttpResponseNotFound,
+    StreamingHttpResponse,
 )
 from django.urls import reverse
 from formencode import validators
@@ -50,6 +52,7 @@ from maasserver.enum import (
     BRIDGE_TYPE,
     BRIDGE_TYPE_CHOICES,
     BRIDGE_TYPE_CHOICES_DICT,
+    ENDPOINT,
     NODE_STATUS,
     NODE_STATUS_CHOICES_DICT,
     NODE_TYPE,
@@ -58,6 +61,7 @@ from maasserver.exceptions import (
     MAASAPIBadRequest,
     MAASAPIForbidden,
     MAASAPIValidationError,
+    NodeActionError,
     NodesNotAvailable,
     NodeStateViolation,
     Unauthorized,
@@ -94,6 +98,7 @@ from maasserver.node_constraint_filter_forms import (
     nodes_by_interface,
     nodes_by_storage,
 )
+from maasserver.node_action import ACTIONS_DICT, execute_node_actions
 from maasserver.node_status import NODE_TRANSITIONS
 from maasserver.permissions import NodePermission, PodPermission
 from maasserver.preseed import get_curtin_merged_config
@@ -307,8 +312,14 @@ def get_allocation_options(request) -> AllocationOptions:
 def get_allocated_composed_machine(
     request, data, storage, interfaces, pods, form, input_constraints
 ):
-    """Return composed machine if input constraints are matched."""
+    """Return composed machine if input constraints are matched.
+
+    :return: A `(machine, storage, interfaces, failures)` tuple, where
+        `failures` maps the name of each pod that couldn't compose the
+        machine to the reason why.
+    """
     machine = None
+    failures = {}
     # Gather tags and not_tags.
     tags = None
     not_tags = None
@@ -335,6 +346,7 @@ def get_allocated_composed_machine(
     )
     if compose_form.is_valid():
         machine = compose_form.compose()
+        failures = compose_form.failures
         if machine is not None:
             # Set the storage variable so the constraint_map is
             # set correct for the composed machine.
@@ -348,7 +360,7 @@ def get_allocated_composed_machine(
                 interfaces = result.label_map
             else:
                 interfaces = {}
-    return machine, storage, interfaces
+    return machine, storage, interfaces, failures
 
 
 class MachineHandler(NodeHandler, OwnerDataMixin, PowerMixin):
@@ -1610,6 +1622,56 @@ class MachineHandler(NodeHandler, OwnerDataMixin, PowerMixin):
         return machine
 
 
+# How long to wait for each machine's power command to be sent, when
+# streaming the results of an action on many machines.
+ACTION_POWER_TIMEOUT = 120
+
+
+def stream_action_results(errors, powering, timeout=ACTION_POWER_TIMEOUT):
+    """Stream the results of `execute_node_actions` as a JSON object.
+
+    The results for machines without a power command come first; the others
+    follow as their power commands are sent, once the transaction has
+    committed.
+
+    :return: An iterator of strings, for a `StreamingHttpResponse`.
+    """
+    finished = Queue()
+    for system_id, d in powering.items():
+        d.addCallback(
+            lambda error, system_id: finished.put((system_id, error)),
+            system_id,
+        )
+
+    def gen_results():
+        for system_id, error in errors.items():
+            if system_id not in powering:
+                yield system_id, error
+        waiting = set(powering)
+        while len(waiting) > 0:
+            try:
+                system_id, error = finished.get(timeout=timeout)
+            except Empty:
+                break
+            waiting.discard(system_id)
+            yield system_id, error
+        for system_id in powering:
+            if system_id in waiting:
+                yield system_id, "Timed out sending the power command."
+
+    def gen_json():
+        yield "{"
+        for index, (system_id, error) in enumerate(gen_results()):
+            yield "%s\n%s: %s" % (
+                "," if index > 0 else "",
+                json.dumps(system_id),
+                json.dumps(error),
+            )
+        yield "\n}\n"
+
+    return gen_json()
+
+
 def fix_architecture(data):
     # For backwards compatibilty reasons, requests may be sent with:
     #     architecture with a '/' in it: use normally
@@ -2159,6 +2221,73 @@ class MachinesHandler(NodesHandler, PowersMixin):
             )
         return released_ids
 
+    @operation(idempotent=False)
+    def action(self, request):
+        """@description-title Perform an action on machines
+        @description Perform an action, as found in the UI, on multiple
+        machines. The action not being available for a machine, or failing,
+        does not stop it being performed on the others. The power commands
+        for the machines are sent together to each rack controller.
+
+        @param (string) "action" [required=true] The name of the action, e.g.
+        ``commission``, ``deploy``, ``on``, ``off`` or ``release``.
+
+        @param (string) "machines" [required=true] A list of system_ids of the
+        machines to perform the action on.
+
+        @param (string) "extra" [required=false] A JSON object of parameters
+        for the action, e.g. ``{"distro_series": "focal"}`` for ``deploy``.
+
+        @success (http-status-code) "200" 200
+        @success (json) "success-json" A JSON object mapping the system_id of
+        each machine to null, if the action was performed on it, or to a
+        message saying why not. Results are streamed as the machines' power
+        commands are sent.
+        @success-example "success-json" [exkey=machines-placeholder]
+        placeholder text
+
+        @error (http-status-code) "400" 400
+        @error (content) "not-found" One or more of the given machines is not
+        found, or the action or its parameters are not valid.
+        """
+        action_name = get_mandatory_param(request.POST, "action")
+        if action_name not in ACTIONS_DICT:
+            raise MAASAPIValidationError(
+                {"action": ["%s action does not exist." % action_name]}
+            )
+        extra = get_optional_param(request.POST, "extra", default="{}")
+        try:
+            extra = json.loads(extra)
+        except ValueError:
+            extra = None
+        if not isinstance(extra, dict):
+            raise MAASAPIValidationError({"extra": ["Must be a JSON object."]})
+        system_ids = set(request.POST.getlist("machines"))
+        # Check the existence of these machines first.
+        self._check_system_ids_exist(system_ids)
+        # `execute_node_actions` checks the permission the action requires.
+        machines = self.base_model.objects.get_nodes(
+            request.user, perm=NodePermission.view, ids=system_ids
+        )
+        try:
+            errors, powering = execute_node_actions(
+                machines,
+                request.user,
+                action_name,
+                request=request,
+                endpoint=ENDPOINT.API,
+                extra=extra,
+            )
+        except NodeActionError as error:
+            raise MAASAPIValidationError({"extra": [str(error)]})
+        for system_id in system_ids:
+            if system_id not in errors:
+                errors[system_id] = "Machine does not exist."
+        return StreamingHttpResponse(
+            stream_action_results(errors, powering),
+            content_type="application/json",
+        )
+
     @operation(idempotent=True)
     def list_allocated(self, request):
         """@description-title List allocated
@@ -2441,6 +2570,7 @@ class MachinesHandler(NodesHandler, PowersMixin):
             )
             machines, storage, interfaces = form.filter_nodes(machines)
             machine = get_first(machines)
+            compose_failures = {}
             if machine is None:
                 cores = form.cleaned_data.get("cpu_count")
                 if cores is not None:
@@ -2473,6 +2603,7 @@ class MachinesHandler(NodesHandler, PowersMixin):
                         machine,
                         storage,
                         interfaces,
+                        compose_failures,
                     ) = get_allocated_composed_machine(
                         request,
                         data,
@@ -2495,6 +2626,13 @@ class MachinesHandler(NodesHandler, PowersMixin):
                         '(resolved to "%s")'
                         % (str(input_constraints), constraints)
                     )
+                if len(compose_failures) != 0:
+                    message += " Unable to compose a machine: %s" % (
+                        "; ".join(
+                            "%s: %s" % failure
+                            for failure in sorted(compose_failures.items())
+                        )
+                    )
                 raise NodesNotAvailable(message)
             if not dry_run:
                 machine.acquire(
@@ -456,8 +456,10 @@ class PodsHandler(OperationsHandler):
         @success-example (json) "success-json" [exkey=read-pods]
         placeholder text
         """
-        return Pod.objects.get_pods(request.user, PodPermission.view).order_by(
-            "id"
+        return (
+            Pod.objects.get_pods(request.user, PodPermission.view)
+            .select_related("usage")
+            .order_by("id")
         )
 
     @admin_method
@@ -102,10 +102,11 @@ class NodeResultsHandler(OperationsHandler):
                 # data is combined. Curtin uploads the installation log as
                 # install.log so its stored as a combined result. This ensures
                 # a result is always returned.
-                if script_result.stdout != b"":
-                    data = b64encode(script_result.stdout)
+                stdout = script_result.get_output("stdout")
+                if stdout != b"":
+                    data = b64encode(stdout)
                 else:
-                    data = b64encode(script_result.output)
+                    data = b64encode(script_result.get_output("output"))
                 results.append(
                     {
                         "created": script_result.created,
@@ -119,7 +120,8 @@ class NodeResultsHandler(OperationsHandler):
                         "resource_uri": resource_uri,
                     }
                 )
-                if script_result.stderr != b"":
+                stderr = script_result.get_output("stderr")
+                if stderr != b"":
                     results.append(
                         {
                             "created": script_result.created,
@@ -129,7 +131,7 @@ class NodeResultsHandler(OperationsHandler):
                             "script_result": script_result.exit_status,
                             "result_type": script_set.result_type,
                             "node": {"system_id": script_set.node.system_id},
-                            "data": b64encode(script_result.stderr),
+                            "data": b64encode(stderr),
                             "resource_uri": resource_uri,
                         }
                     )
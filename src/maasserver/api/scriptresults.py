@@ -16,7 +16,7 @@ import time
 from django.core.exceptions import ValidationError
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from formencode.validators import Bool, String, StringBool
+from formencode.validators import Bool, Int, String, StringBool
 from piston3.utils import rc
 
 from maasserver.api.support import admin_method, operation, OperationsHandler
@@ -26,6 +26,7 @@ from maasserver.models import Node
 from maasserver.permissions import NodePermission
 from metadataserver.models import ScriptSet
 from metadataserver.models.script import translate_hardware_type
+from metadataserver.models.scriptresult import OUTPUT_FIELDS
 from metadataserver.models.scriptset import translate_result_type
 
 
@@ -248,9 +249,8 @@ class NodeScriptResultHandler(OperationsHandler):
                 "suppressed": script_result.suppressed,
             }
             if script_set.include_output:
-                result["output"] = b64encode(script_result.output)
-                result["stdout"] = b64encode(script_result.stdout)
-                result["stderr"] = b64encode(script_result.stderr)
+                for name in OUTPUT_FIELDS:
+                    result[name] = b64encode(script_result.get_output(name))
                 result["result"] = b64encode(script_result.result)
             results.append(result)
         return results
@@ -403,6 +403,9 @@ class NodeScriptResultHandler(OperationsHandler):
         @param (string) "filetype" [required=false] Filetype to output, can be
         ``txt`` or ``tar.xz``.
 
+        @param (int) "tail" [required=false] Only return the last ``tail``
+        bytes of each output, e.g. to follow a long running test.
+
         @success (http-status-code) "server-success" 200
         @success (content) "success-text" Plain-text output containing the
         requested results.
@@ -419,6 +422,7 @@ class NodeScriptResultHandler(OperationsHandler):
         filters = get_optional_param(request.GET, "filters", None, String)
         output = get_optional_param(request.GET, "output", "combined", String)
         filetype = get_optional_param(request.GET, "filetype", "txt", String)
+        tail = get_optional_param(request.GET, "tail", None, Int(min=0))
         files = OrderedDict()
         times = {}
         if filters is not None:
@@ -437,19 +441,19 @@ class NodeScriptResultHandler(OperationsHandler):
             mtime = time.mktime(script_result.updated.timetuple())
             if bin_regex.search(script_result.name) is not None:
                 # Binary files only have one output
-                files[script_result.name] = script_result.output
+                files[script_result.name] = script_result.get_output("output")
                 times[script_result.name] = mtime
             elif output == "combined":
                 title = self.__make_file_title(script_result, filetype)
-                files[title] = script_result.output
+                files[title] = script_result.get_output("output", tail)
                 times[title] = mtime
             elif output == "stdout":
                 title = self.__make_file_title(script_result, filetype, "out")
-                files[title] = script_result.stdout
+                files[title] = script_result.get_output("stdout", tail)
                 times[title] = mtime
             elif output == "stderr":
                 title = self.__make_file_title(script_result, filetype, "err")
-                files[title] = script_result.stderr
+                files[title] = script_result.get_output("stderr", tail)
                 times[title] = mtime
             elif output == "result":
                 title = self.__make_file_title(script_result, filetype, "yaml")
@@ -457,13 +461,13 @@ class NodeScriptResultHandler(OperationsHandler):
                 times[title] = mtime
             elif output == "all":
                 title = self.__make_file_title(script_result, filetype)
-                files[title] = script_result.output
+                files[title] = script_result.get_output("output", tail)
                 times[title] = mtime
                 title = self.__make_file_title(script_result, filetype, "out")
-                files[title] = script_result.stdout
+                files[title] = script_result.get_output("stdout", tail)
                 times[title] = mtime
                 title = self.__make_file_title(script_result, filetype, "err")
-                files[title] = script_result.stderr
+                files[title] = script_result.get_output("stderr", tail)
                 times[title] = mtime
                 title = self.__make_file_title(script_result, filetype, "yaml")
                 files[title] = script_result.result
@@ -16,7 +16,7 @@ from abc import ABCMeta, abstractproperty
 from functools import wraps
 
 from django.core.exceptions import PermissionDenied
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from piston3.authentication import NoAuthentication
 from piston3.emitters import Emitter
@@ -32,6 +32,20 @@ from provisioningserver.logger import LegacyLogger
 log = LegacyLogger()
 
 
+class _StreamingResponse(Exception):
+    """Carries a `StreamingHttpResponse` past Piston.
+
+    Piston hands anything that isn't an `HttpResponse` to an emitter, which
+    would try to serialise the response object itself. `OperationsHandler`
+    raises this instead of returning a streaming response, and
+    `OperationsResource` unwraps it.
+    """
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+
 class OperationsResource(Resource):
     """A resource supporting operation dispatch.
 
@@ -54,7 +68,10 @@ class OperationsResource(Resource):
 
     def __call__(self, request, *args, **kwargs):
         upcall = super().__call__
-        response = upcall(request, *args, **kwargs)
+        try:
+            response = upcall(request, *args, **kwargs)
+        except _StreamingResponse as streaming:
+            response = streaming.response
         response["X-MAAS-API-Hash"] = get_api_description_hash()
         return response
 
@@ -305,8 +322,10 @@ class OperationsHandlerMixin:
             raise MAASAPIBadRequest(
                 "Unrecognised signature: method=%s op=%s" % signature
             )
-        else:
-            return function(self, request, *args, **kwargs)
+        result = function(self, request, *args, **kwargs)
+        if isinstance(result, StreamingHttpResponse):
+            raise _StreamingResponse(result)
+        return result
 
     @classmethod
     def decorate(cls, func):
@@ -14,7 +14,7 @@ from django.test import RequestFactory
 from django.urls import reverse
 from testtools.matchers import Contains, Equals, Not
 
-from maasserver import eventloop, middleware
+from maasserver import eventloop
 from maasserver.api import auth
 from maasserver.api import machines as machines_module
 from maasserver.api.machines import AllocationOptions, get_allocation_options
@@ -489,12 +489,6 @@ class TestMachinesAPI(APITestCase.ForUser):
 
     @skip("LP:1840491")
     def test_GET_machines_issues_constant_number_of_queries(self):
-        # Patch middleware so it does not affect query counting.
-        self.patch(
-            middleware.ExternalComponentsMiddleware,
-            "_check_rack_controller_connectivity",
-        )
-
         for _ in range(10):
             node = factory.make_Node_with_Interface_on_Subnet()
             factory.make_VirtualBlockDevice(node=node)
@@ -1597,6 +1591,24 @@ class TestMachinesAPI(APITestCase.ForUser):
         self.assertEqual(http.client.CONFLICT, response.status_code)
         self.assertEqual(expected_response, response.content)
 
+    def test_POST_allocate_failure_shows_why_pods_could_not_compose(self):
+        pod = factory.make_Pod(architectures=["amd64/generic"])
+
+        def compose(form):
+            form.failures = {pod.name: "Not enough cores."}
+            return None
+
+        self.patch(ComposeMachineForPodsForm, "compose", compose)
+        response = self.client.post(
+            reverse("machines_handler"), {"op": "allocate"}
+        )
+        self.assertEqual(http.client.CONFLICT, response.status_code)
+        self.assertEqual(
+            "No machine available. Unable to compose a machine: "
+            "%s: Not enough cores." % pod.name,
+            response.content.decode(settings.DEFAULT_CHARSET),
+        )
+
     def test_POST_allocate_ignores_already_allocated_machine(self):
         factory.make_Node(
             status=NODE_STATUS.ALLOCATED,
@@ -3605,6 +3617,78 @@ class TestMachinesAPI(APITestCase.ForUser):
             http.client.NO_CONTENT, response.status_code, response.content
         )
 
+    def post_action(self, action, machines, **params):
+        response = self.client.post(
+            reverse("machines_handler"),
+            dict(params, op="action", action=action, machines=machines),
+        )
+        if response.streaming:
+            content = b"".join(response.streaming_content)
+        else:
+            content = response.content
+        return response, content.decode(settings.DEFAULT_CHARSET)
+
+    def test_POST_action_performs_action_on_each_machine(self):
+        machines = [
+            factory.make_Node(status=NODE_STATUS.DEPLOYED, owner=self.user)
+            for _ in range(3)
+        ]
+        system_ids = [machine.system_id for machine in machines]
+        response, content = self.post_action("lock", system_ids)
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(
+            {system_id: None for system_id in system_ids}, json.loads(content)
+        )
+        for machine in machines:
+            self.assertTrue(reload_object(machine).locked)
+
+    def test_POST_action_reports_machines_action_is_not_available_for(self):
+        deployed = factory.make_Node(
+            status=NODE_STATUS.DEPLOYED, owner=self.user
+        )
+        ready = factory.make_Node(status=NODE_STATUS.READY, owner=self.user)
+        response, content = self.post_action(
+            "lock", [deployed.system_id, ready.system_id]
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(
+            {
+                deployed.system_id: None,
+                ready.system_id: "lock action is not available for this node.",
+            },
+            json.loads(content),
+        )
+
+    def test_POST_action_rejects_unknown_action(self):
+        machine = factory.make_Node(owner=self.user)
+        response, _ = self.post_action(
+            factory.make_name("action"), [machine.system_id]
+        )
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
+    def test_POST_action_rejects_invalid_extra(self):
+        machine = factory.make_Node(owner=self.user)
+        response, _ = self.post_action("lock", [machine.system_id], extra="[]")
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
+    def test_POST_action_rejects_unknown_extra_parameter(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.DEPLOYED, owner=self.user
+        )
+        response, content = self.post_action(
+            "lock", [machine.system_id], extra=json.dumps({"user": "bob"})
+        )
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+        self.assertIn("lock action does not take parameter(s): user.", content)
+        self.assertFalse(reload_object(machine).locked)
+
+    def test_POST_action_fails_if_machines_do_not_exist(self):
+        response, content = self.post_action(
+            "lock", [factory.make_string() for _ in range(2)]
+        )
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+        self.assertIn("Unknown machine(s): ", content)
+
 
 class TestPowerState(APITransactionTestCase.ForUser):
     def setUp(self):
@@ -25,8 +25,11 @@ from maasserver.utils.orm import reload_object
 from metadataserver.enum import (
     HARDWARE_TYPE,
     HARDWARE_TYPE_CHOICES,
+    RESULT_TYPE,
     RESULT_TYPE_CHOICES,
+    SCRIPT_STATUS,
 )
+from metadataserver.models.scriptresult import OUTPUT_INLINE_MAX_SIZE
 
 
 class TestNodeScriptResultsAPI(APITestCase.ForUser):
@@ -948,6 +951,39 @@ class TestNodeScriptResultAPI(APITestCase.ForUser):
         self.assertThat(response, HasStatusCode(http.client.OK))
         self.assertEquals(script_result.stdout, response.content)
 
+    def test_download_tail(self):
+        script_set = self.make_scriptset()
+        script_result = factory.make_ScriptResult(
+            script_set=script_set, stdout=factory.make_bytes(100)
+        )
+
+        response = self.client.get(
+            self.get_script_result_uri(script_set),
+            {
+                "op": "download",
+                "filter": script_result.id,
+                "output": "stdout",
+                "tail": 10,
+            },
+        )
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertEquals(script_result.stdout[-10:], response.content)
+
+    def test_download_output_stored_in_largefile(self):
+        script_set = self.make_scriptset(result_type=RESULT_TYPE.TESTING)
+        script_result = factory.make_ScriptResult(
+            script_set=script_set, status=SCRIPT_STATUS.RUNNING
+        )
+        stdout = factory.make_bytes(OUTPUT_INLINE_MAX_SIZE + 1)
+        script_result.store_result(0, stdout=stdout)
+
+        response = self.client.get(
+            self.get_script_result_uri(script_set),
+            {"op": "download", "filter": script_result.id, "output": "stdout"},
+        )
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertEquals(stdout, response.content)
+
     def test_download_output_stderr(self):
         script_set = self.make_scriptset()
         script_result = factory.make_ScriptResult(script_set=script_set)
@@ -4,11 +4,14 @@
 """RPC helpers relating to nodes."""
 
 
+from collections import defaultdict
+from contextlib import contextmanager
 from functools import partial
+import threading
 
 from twisted.internet import reactor
-from twisted.internet.defer import DeferredList
-from twisted.protocols.amp import UnhandledCommand
+from twisted.internet.defer import Deferred, DeferredList
+from twisted.protocols.amp import UnhandledCommand, UnknownRemoteError
 
 from maasserver.enum import POWER_STATE
 from maasserver.exceptions import PowerProblem
@@ -17,16 +20,30 @@ from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.rpc.cluster import (
     PowerCycle,
     PowerDriverCheck,
+    PowerNodes,
     PowerOff,
     PowerOn,
     PowerQuery,
 )
 from provisioningserver.rpc.exceptions import PowerActionAlreadyInProgress
-from provisioningserver.utils.twisted import asynchronous, callOut, FOREVER
+from provisioningserver.utils.twisted import (
+    asynchronous,
+    callOut,
+    DeferredValue,
+    FOREVER,
+)
 
 log = LegacyLogger()
 maaslog = get_maas_logger("power")
 
+# The most nodes a batch sends to a rack controller in one `PowerNodes` call,
+# keeping each call well within AMP's limit on the size of a value.
+POWER_BATCH_SIZE = 100
+
+# How long a batch waits, after a node's power command is ready to send, for
+# the other nodes in the batch to find their rack controllers.
+POWER_BATCH_TIMEOUT = 5
+
 
 @asynchronous(timeout=15)
 def power_node(command, client, system_id, hostname, power_info):
@@ -286,3 +303,246 @@ def power_query_all(system_id, hostname, power_info, timeout=60):
     # Cancel the canceller once finished.
     dList.addBoth(callOut, done)
     return dList
+
+
+# The errors `PowerNodes` can return for a node, by name.
+_power_node_errors = {
+    name.decode("ascii"): error for error, name in PowerOn.errors.items()
+}
+
+
+def _get_power_node_error(result):
+    """Return the exception for a node's result from `PowerNodes`.
+
+    `None` is returned if the node's power change was started.
+    """
+    name = result.get("error")
+    if name is None:
+        return None
+    error = _power_node_errors.get(name, UnknownRemoteError)
+    if error is PowerActionAlreadyInProgress:
+        # As reported by `power_node`.
+        return PowerProblem(result["message"])
+    else:
+        return error(result["message"])
+
+
+@asynchronous(timeout=30)
+def power_nodes(client, nodes):
+    """Change the power state of several nodes with one call.
+
+    The power call will be directed to the provided `client`.
+
+    :param client: The `rpc.common.Client` of the rack controller to perform
+        the power actions.
+    :param nodes: A list of `(power_change, system_id, hostname, power_info)`
+        tuples, where `power_change` is one of "on", "off", or "cycle".
+    :return: A :py:class:`twisted.internet.defer.Deferred` that will fire
+        with a dict mapping each node's system_id to `None` if its power
+        change was started, or to the exception raised for it otherwise.
+    """
+    log.debug(
+        "Asking rack controller to change the power state of {count} "
+        "nodes.",
+        count=len(nodes),
+    )
+    d = client(
+        PowerNodes,
+        nodes=[
+            {
+                "system_id": system_id,
+                "hostname": hostname,
+                "power_type": power_info.power_type,
+                "power_change": power_change,
+                "context": power_info.power_parameters,
+            }
+            for power_change, system_id, hostname, power_info in nodes
+        ],
+    )
+    d.addCallback(
+        lambda response: {
+            result["system_id"]: _get_power_node_error(result)
+            for result in response["results"]
+        }
+    )
+    return d
+
+
+# The power change made by each of the power methods a `PowerCommandBatch`
+# can send.
+BATCHED_POWER_CHANGES = {
+    power_on_node: "on",
+    power_off_node: "off",
+    power_cycle: "cycle",
+}
+
+
+class PowerCommandBatch:
+    """Sends the power commands of many nodes together.
+
+    Each node's power command is submitted once a rack controller that can
+    power the node has been found. The commands waiting are sent to each rack
+    controller as one `PowerNodes` call, of up to `size` nodes, when every
+    node expected in the batch has submitted its command or failed, or
+    `timeout` seconds after the first waiting command was submitted,
+    whichever is sooner. Rack controllers that do not understand `PowerNodes`
+    are sent each node's command individually.
+
+    Nodes are expected in the batch from the time their power control is
+    handed over to it (see `hand_over`), which must happen before any of the
+    batch's commands are submitted; i.e. before the transaction in which the
+    nodes are acted on has committed.
+    """
+
+    def __init__(
+        self, clock=reactor, timeout=POWER_BATCH_TIMEOUT, size=POWER_BATCH_SIZE
+    ):
+        super().__init__()
+        self.clock = clock
+        self.timeout = timeout
+        self.size = size
+        # The system_ids of the nodes yet to submit a command or fail.
+        self.expected = set()
+        # The `Deferred` handed over for each node; see `hand_over`.
+        self.nodes = {}
+        # The commands waiting to be sent, by rack controller.
+        self.waiting = defaultdict(list)
+        # The power driver check for each rack controller and power type.
+        self.driver_checks = {}
+        self.call = None
+
+    def accepts(self, power_method):
+        """Can commands made with `power_method` be sent by this batch?"""
+        return power_method in BATCHED_POWER_CHANGES
+
+    def hand_over(self, system_id, hook):
+        """Take over the power control of a node from its post-commit hook.
+
+        The hook finishes as soon as it has run, rather than once the node's
+        power command has been sent, so the hooks of all the nodes in the
+        batch run without waiting for each other.
+
+        :return: A `Deferred` that fires when `hook` does, to which the
+            node's power control should be added.
+        """
+        self.expected.add(system_id)
+        d = self.nodes[system_id] = Deferred()
+        hook.addCallbacks(d.callback, d.errback)
+        return d
+
+    def check_power_driver(self, client, power_type, check):
+        """Check the power driver for `power_type` once per rack controller.
+
+        :param check: A callable, as `Node.confirm_power_driver_operable`,
+            that's called only for the first node of each power type to be
+            powered by `client`'s rack controller.
+        """
+        key = client.ident, power_type
+        if key not in self.driver_checks:
+            dvalue = self.driver_checks[key] = DeferredValue()
+            dvalue.capture(check(client, power_type, client.ident))
+        return self.driver_checks[key].get()
+
+    def batched(self, power_method):
+        """Return a stand-in for `power_method` that submits to this batch."""
+        return partial(self.submit, power_method)
+
+    def submit(self, power_method, client, system_id, hostname, power_info):
+        """Submit a node's power command, to be sent to `client`.
+
+        :return: A `Deferred` that fires with `None` once the rack controller
+            has started the node's power change, or fails with the error
+            raised for the node.
+        """
+        d = Deferred()
+        self.waiting[client.ident].append(
+            (client, power_method, system_id, hostname, power_info, d)
+        )
+        self.expected.discard(system_id)
+        self._maybe_send()
+        return d
+
+    def discard(self, failure, system_id):
+        """Stop expecting a node that failed before submitting a command.
+
+        Use as an errback; `failure` is passed through.
+        """
+        if system_id in self.expected:
+            self.expected.discard(system_id)
+            self._maybe_send()
+        return failure
+
+    def _maybe_send(self):
+        if len(self.expected) == 0:
+            self.send()
+        elif self.call is None and len(self.waiting) > 0:
+            self.call = self.clock.callLater(self.timeout, self.send)
+
+    def send(self):
+        """Send the waiting commands to their rack controllers."""
+        if self.call is not None and self.call.active():
+            self.call.cancel()
+        self.call = None
+        waiting, self.waiting = self.waiting, defaultdict(list)
+        for commands in waiting.values():
+            for start in range(0, len(commands), self.size):
+                self._send(commands[start : start + self.size])
+
+    def _send(self, commands):
+        def cb_results(errors):
+            for _, _, system_id, _, _, d in commands:
+                error = errors.get(system_id)
+                if error is None:
+                    d.callback(None)
+                else:
+                    d.errback(error)
+
+        def eb_failed(failure):
+            if failure.check(UnhandledCommand):
+                # The rack controller hasn't been upgraded to support
+                # PowerNodes, so power each node individually.
+                for command in commands:
+                    client, power_method, *node, d = command
+                    power_method(client, *node).chainDeferred(d)
+            else:
+                for *_, d in commands:
+                    d.errback(failure)
+
+        client = commands[0][0]
+        d = power_nodes(
+            client,
+            [
+                (BATCHED_POWER_CHANGES[power_method], *node)
+                for _, power_method, *node, _ in commands
+            ],
+        )
+        d.addCallbacks(cb_results, eb_failed)
+
+
+class _PowerCommandBatches(threading.local):
+    """The `PowerCommandBatch` in use by each thread, if any."""
+
+    batch = None
+
+
+_batches = _PowerCommandBatches()
+
+
+def get_power_command_batch():
+    """Return the `PowerCommandBatch` in use by this thread, or `None`."""
+    return _batches.batch
+
+
+@contextmanager
+def batch_power_commands():
+    """Batch the power commands of nodes acted on in this context.
+
+    Nodes started or stopped in this thread while in the context have their
+    power commands sent by the `PowerCommandBatch` that it yields, once the
+    transaction has committed.
+    """
+    batch, _batches.batch = _batches.batch, PowerCommandBatch()
+    try:
+        yield _batches.batch
+    finally:
+        _batches.batch = batch
@@ -10,18 +10,30 @@ from unittest.mock import Mock
 from crochet import wait_for
 from testtools import ExpectedException
 from twisted.internet import reactor
-from twisted.internet.defer import fail, inlineCallbacks, succeed
-from twisted.internet.task import deferLater
+from twisted.internet.defer import (
+    CancelledError,
+    Deferred,
+    fail,
+    inlineCallbacks,
+    succeed,
+)
+from twisted.internet.task import Clock, deferLater
+from twisted.protocols.amp import UnhandledCommand
 
 from maasserver.clusterrpc import power as power_module
 from maasserver.clusterrpc.power import (
+    batch_power_commands,
+    get_power_command_batch,
     pick_best_power_state,
+    POWER_BATCH_TIMEOUT,
     power_cycle,
     power_driver_check,
+    power_nodes,
     power_off_node,
     power_on_node,
     power_query,
     power_query_all,
+    PowerCommandBatch,
 )
 from maasserver.enum import POWER_STATE
 from maasserver.exceptions import PowerProblem
@@ -32,15 +44,20 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.twisted import extract_result
 from provisioningserver.rpc.cluster import (
     PowerCycle,
     PowerDriverCheck,
+    PowerNodes,
     PowerOff,
     PowerOn,
     PowerQuery,
 )
-from provisioningserver.rpc.exceptions import PowerActionAlreadyInProgress
+from provisioningserver.rpc.exceptions import (
+    PowerActionAlreadyInProgress,
+    PowerActionFail,
+)
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
 
@@ -253,3 +270,343 @@ class TestPowerQueryAll(MAASTransactionServerTestCase):
         self.assertEqual(POWER_STATE.UNKNOWN, power_state)
         self.assertItemsEqual([], success_racks)
         self.assertItemsEqual([rack_id], failed_racks)
+
+
+class TestPowerNodes(MAASServerTestCase):
+    """Tests for `power_nodes`."""
+
+    def test_powers_nodes(self):
+        nodes = [factory.make_Node() for _ in range(2)]
+        client = Mock()
+        client.return_value = succeed(
+            {
+                "results": [
+                    {"system_id": node.system_id, "error": None}
+                    for node in nodes
+                ]
+            }
+        )
+
+        results = wait_for_reactor(power_nodes)(
+            client,
+            [
+                (
+                    power_change,
+                    node.system_id,
+                    node.hostname,
+                    node.get_effective_power_info(),
+                )
+                for power_change, node in zip(["on", "cycle"], nodes)
+            ],
+        )
+
+        self.assertEqual({node.system_id: None for node in nodes}, results)
+        self.assertThat(
+            client,
+            MockCalledOnceWith(
+                PowerNodes,
+                nodes=[
+                    {
+                        "system_id": node.system_id,
+                        "hostname": node.hostname,
+                        "power_type": node.get_effective_power_info().power_type,
+                        "power_change": power_change,
+                        "context": (
+                            node.get_effective_power_info().power_parameters
+                        ),
+                    }
+                    for power_change, node in zip(["on", "cycle"], nodes)
+                ],
+            ),
+        )
+
+    def test_returns_error_for_each_failed_node(self):
+        node = factory.make_Node()
+        client = Mock()
+        client.return_value = succeed(
+            {
+                "results": [
+                    {
+                        "system_id": node.system_id,
+                        "error": "PowerActionFail",
+                        "message": "Failed.",
+                    }
+                ]
+            }
+        )
+
+        results = wait_for_reactor(power_nodes)(
+            client,
+            [
+                (
+                    "off",
+                    node.system_id,
+                    node.hostname,
+                    node.get_effective_power_info(),
+                )
+            ],
+        )
+
+        error = results[node.system_id]
+        self.assertIsInstance(error, PowerActionFail)
+        self.assertEqual("Failed.", str(error))
+
+    def test_returns_power_problem_for_action_in_progress(self):
+        node = factory.make_Node()
+        client = Mock()
+        client.return_value = succeed(
+            {
+                "results": [
+                    {
+                        "system_id": node.system_id,
+                        "error": "PowerActionAlreadyInProgress",
+                        "message": "In progress.",
+                    }
+                ]
+            }
+        )
+
+        results = wait_for_reactor(power_nodes)(
+            client,
+            [
+                (
+                    "on",
+                    node.system_id,
+                    node.hostname,
+                    node.get_effective_power_info(),
+                )
+            ],
+        )
+
+        self.assertIsInstance(results[node.system_id], PowerProblem)
+
+
+class TestPowerCommandBatch(MAASServerTestCase):
+    """Tests for `PowerCommandBatch`."""
+
+    def make_client(self):
+        client = Mock()
+        client.ident = factory.make_name("rack")
+        client.side_effect = lambda command, nodes: succeed(
+            {
+                "results": [
+                    {"system_id": node["system_id"], "error": None}
+                    for node in nodes
+                ]
+            }
+        )
+        return client
+
+    def make_power_info(self):
+        return Mock(
+            power_type=factory.make_name("power_type"), power_parameters={}
+        )
+
+    def make_batch(self, system_ids, **kwargs):
+        batch = PowerCommandBatch(clock=Clock(), **kwargs)
+        for system_id in system_ids:
+            batch.hand_over(system_id, Deferred())
+        return batch
+
+    def submit(self, batch, client, system_id, power_method=power_on_node):
+        return batch.submit(
+            power_method,
+            client,
+            system_id,
+            factory.make_name("hostname"),
+            self.make_power_info(),
+        )
+
+    @wait_for_reactor
+    def test_sends_once_every_expected_node_has_submitted(self):
+        client = self.make_client()
+        system_ids = [factory.make_name("system_id") for _ in range(3)]
+        batch = self.make_batch(system_ids)
+        ds = [
+            self.submit(batch, client, system_id) for system_id in system_ids
+        ]
+        self.assertEqual(1, client.call_count)
+        self.assertEqual((PowerNodes,), client.call_args[0])
+        self.assertEqual(
+            system_ids,
+            [node["system_id"] for node in client.call_args[1]["nodes"]],
+        )
+        self.assertEqual([None, None, None], [extract_result(d) for d in ds])
+
+    @wait_for_reactor
+    def test_does_not_send_until_every_expected_node_has_submitted(self):
+        client = self.make_client()
+        system_ids = [factory.make_name("system_id") for _ in range(2)]
+        batch = self.make_batch(system_ids)
+        self.submit(batch, client, system_ids[0])
+        self.assertThat(client, MockNotCalled())
+
+    @wait_for_reactor
+    def test_sends_one_call_to_each_rack(self):
+        clients = [self.make_client() for _ in range(2)]
+        system_ids = [factory.make_name("system_id") for _ in range(4)]
+        batch = self.make_batch(system_ids)
+        for index, system_id in enumerate(system_ids):
+            self.submit(batch, clients[index % 2], system_id)
+        for index, client in enumerate(clients):
+            self.assertEqual(1, client.call_count)
+            self.assertEqual(
+                system_ids[index::2],
+                [node["system_id"] for node in client.call_args[1]["nodes"]],
+            )
+
+    @wait_for_reactor
+    def test_sends_power_change_of_each_power_method(self):
+        client = self.make_client()
+        power_methods = [power_on_node, power_off_node, power_cycle]
+        system_ids = [factory.make_name("system_id") for _ in power_methods]
+        batch = self.make_batch(system_ids)
+        for system_id, power_method in zip(system_ids, power_methods):
+            self.submit(batch, client, system_id, power_method)
+        self.assertEqual(
+            ["on", "off", "cycle"],
+            [node["power_change"] for node in client.call_args[1]["nodes"]],
+        )
+
+    @wait_for_reactor
+    def test_sends_after_timeout(self):
+        client = self.make_client()
+        system_ids = [factory.make_name("system_id") for _ in range(2)]
+        batch = self.make_batch(system_ids)
+        d = self.submit(batch, client, system_ids[0])
+        batch.clock.advance(POWER_BATCH_TIMEOUT)
+        self.assertEqual(1, client.call_count)
+        self.assertIsNone(extract_result(d))
+
+    @wait_for_reactor
+    def test_discard_sends_once_no_other_node_is_expected(self):
+        client = self.make_client()
+        system_ids = [factory.make_name("system_id") for _ in range(2)]
+        batch = self.make_batch(system_ids)
+        self.submit(batch, client, system_ids[0])
+        failure = Mock()
+        self.assertIs(failure, batch.discard(failure, system_ids[1]))
+        self.assertEqual(1, client.call_count)
+        self.assertFalse(batch.clock.getDelayedCalls())
+
+    @wait_for_reactor
+    def test_splits_calls_by_size(self):
+        client = self.make_client()
+        system_ids = [factory.make_name("system_id") for _ in range(5)]
+        batch = self.make_batch(system_ids, size=2)
+        for system_id in system_ids:
+            self.submit(batch, client, system_id)
+        self.assertEqual(
+            [2, 2, 1],
+            [len(kwargs["nodes"]) for _, kwargs in client.call_args_list],
+        )
+
+    @wait_for_reactor
+    def test_fails_nodes_with_errors(self):
+        client = self.make_client()
+        system_id = factory.make_name("system_id")
+        client.side_effect = lambda command, nodes: succeed(
+            {
+                "results": [
+                    {
+                        "system_id": system_id,
+                        "error": "PowerActionAlreadyInProgress",
+                        "message": "In progress.",
+                    }
+                ]
+            }
+        )
+        batch = self.make_batch([system_id])
+        d = self.submit(batch, client, system_id)
+        self.assertRaises(PowerProblem, extract_result, d)
+
+    @wait_for_reactor
+    def test_fails_every_node_if_call_fails(self):
+        client = self.make_client()
+        client.side_effect = lambda command, nodes: fail(ZeroDivisionError())
+        system_ids = [factory.make_name("system_id") for _ in range(2)]
+        batch = self.make_batch(system_ids)
+        ds = [
+            self.submit(batch, client, system_id) for system_id in system_ids
+        ]
+        for d in ds:
+            self.assertRaises(ZeroDivisionError, extract_result, d)
+
+    @wait_for_reactor
+    def test_powers_each_node_if_rack_does_not_handle_power_nodes(self):
+        client = self.make_client()
+        client.side_effect = [
+            fail(UnhandledCommand()),
+            succeed({}),
+            succeed({}),
+        ]
+        system_ids = [factory.make_name("system_id") for _ in range(2)]
+        batch = self.make_batch(system_ids)
+        ds = [
+            self.submit(batch, client, system_id) for system_id in system_ids
+        ]
+        self.assertEqual(
+            [PowerNodes, PowerOn, PowerOn],
+            [args[0] for args, _ in client.call_args_list],
+        )
+        self.assertEqual([{}, {}], [extract_result(d) for d in ds])
+
+    def test_hand_over_returns_deferred_that_fires_with_hook(self):
+        batch = PowerCommandBatch(clock=Clock())
+        system_id = factory.make_name("system_id")
+        hook = Deferred()
+        d = batch.hand_over(system_id, hook)
+        self.assertEqual({system_id}, batch.expected)
+        self.assertIs(d, batch.nodes[system_id])
+        result = object()
+        hook.callback(result)
+        self.assertIs(result, extract_result(d))
+        # The hook is finished without waiting for the node's power control.
+        self.assertIsNone(extract_result(hook))
+
+    def test_hand_over_passes_on_hook_failure(self):
+        batch = PowerCommandBatch(clock=Clock())
+        hook = Deferred()
+        d = batch.hand_over(factory.make_name("system_id"), hook)
+        hook.cancel()
+        self.assertRaises(CancelledError, extract_result, d)
+
+    def test_check_power_driver_checks_once_per_rack_and_power_type(self):
+        batch = PowerCommandBatch(clock=Clock())
+        check = Mock(return_value=succeed(None))
+        clients = [self.make_client() for _ in range(2)]
+        for client in clients + clients:
+            batch.check_power_driver(client, "ipmi", check)
+        batch.check_power_driver(clients[0], "virsh", check)
+        self.assertEqual(
+            [
+                (clients[0], "ipmi", clients[0].ident),
+                (clients[1], "ipmi", clients[1].ident),
+                (clients[0], "virsh", clients[0].ident),
+            ],
+            [args for args, _ in check.call_args_list],
+        )
+
+    def test_accepts_only_power_changes(self):
+        batch = PowerCommandBatch(clock=Clock())
+        self.assertTrue(batch.accepts(power_on_node))
+        self.assertTrue(batch.accepts(power_off_node))
+        self.assertTrue(batch.accepts(power_cycle))
+        self.assertFalse(batch.accepts(power_query))
+
+
+class TestBatchPowerCommands(MAASServerTestCase):
+    """Tests for `batch_power_commands`."""
+
+    def test_uses_batch_in_context(self):
+        self.assertIsNone(get_power_command_batch())
+        with batch_power_commands() as batch:
+            self.assertIsInstance(batch, PowerCommandBatch)
+            self.assertIs(batch, get_power_command_batch())
+        self.assertIsNone(get_power_command_batch())
+
+    def test_restores_outer_batch(self):
+        with batch_power_commands() as outer:
+            with batch_power_commands() as inner:
+                self.assertIsNot(outer, inner)
+            self.assertIs(outer, get_power_command_batch())
@@ -4,7 +4,7 @@
 """Configuration for the MAAS region."""
 
 
-from formencode.validators import Int
+from formencode.validators import Int, Number
 
 from provisioningserver.config import (
     Configuration,
@@ -90,6 +90,20 @@ class RegionConfiguration(Configuration, metaclass=RegionConfigurationMeta):
         Int(if_missing=2),
     )
 
+    # DNS options.
+    dns_reload_interval = ConfigurationOption(
+        "dns_reload_interval",
+        "The minimum time (in seconds) between reloads of the DNS server. "
+        "A reload waits until no change has been published for this long.",
+        Number(if_missing=1, accept_python=False, min=0),
+    )
+    dns_reload_max_delay = ConfigurationOption(
+        "dns_reload_max_delay",
+        "The maximum time (in seconds) a published change waits for the DNS "
+        "server to be reloaded while changes keep arriving.",
+        Number(if_missing=5, accept_python=False, min=0),
+    )
+
     # Worker options.
     num_workers = ConfigurationOption(
         "num_workers",
@@ -5,7 +5,7 @@
 
 
 from collections import defaultdict, namedtuple
-from itertools import groupby
+from itertools import chain, groupby
 from operator import itemgetter
 from typing import Iterable, Optional, Union
 
@@ -32,6 +32,7 @@ from maasserver.models import (
     Config,
     DHCPSnippet,
     Domain,
+    Interface,
     RackController,
     Service,
     StaticIPAddress,
@@ -47,6 +48,8 @@ from provisioningserver.rpc.cluster import (
     ConfigureDHCPv4_V2,
     ConfigureDHCPv6,
     ConfigureDHCPv6_V2,
+    UpdateDHCPv4Hosts,
+    UpdateDHCPv6Hosts,
     ValidateDHCPv4Config,
     ValidateDHCPv4Config_V2,
     ValidateDHCPv6Config,
@@ -727,10 +730,12 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
     failover_peers_v4 = []
     shared_networks_v4 = []
     hosts_v4 = []
+    vlan_hosts_v4 = {}
     interfaces_v4 = set()
     failover_peers_v6 = []
     shared_networks_v6 = []
     hosts_v6 = []
+    vlan_hosts_v6 = {}
     interfaces_v6 = set()
 
     # DNS can either go through the rack controller or directly to the
@@ -775,6 +780,7 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
             }
             shared_networks_v4.append(shared_network)
             hosts_v4.extend(hosts)
+            vlan_hosts_v4[vlan.id] = hosts
             if interface is not None:
                 interfaces_v4.add(interface)
                 shared_network["interface"] = interface
@@ -801,6 +807,7 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
             }
             shared_networks_v6.append(shared_network)
             hosts_v6.extend(hosts)
+            vlan_hosts_v6[vlan.id] = hosts
             if interface is not None:
                 interfaces_v6.add(interface)
                 shared_network["interface"] = interface
@@ -821,6 +828,8 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
         interfaces_v6,
         get_omapi_key(),
         global_dhcp_snippets,
+        vlan_hosts_v4,
+        vlan_hosts_v6,
     )
 
 
@@ -837,15 +846,124 @@ DHCPConfigurationForRack = namedtuple(
         "interfaces_v6",
         "omapi_key",
         "global_dhcp_snippets",
+        "vlan_hosts_v4",
+        "vlan_hosts_v6",
     ),
 )
 
 
+@synchronous
+@transactional
+def get_dhcp_hosts(rack_controller, vlan_ids):
+    """Return the host maps on `vlan_ids` for the rack controller.
+
+    These are the hosts that `get_dhcp_configuration` includes for each of
+    those VLANs, computed without the rest of the configuration.
+    """
+    nodes_dhcp_snippets = DHCPSnippet.objects.filter(
+        enabled=True, node__isnull=False
+    )
+    vlan_hosts_v4, vlan_hosts_v6 = {}, {}
+    for vlan in gen_managed_vlans_for(rack_controller):
+        if vlan.id not in vlan_ids:
+            continue
+        subnets_v4, subnets_v6 = split_managed_ipv4_ipv6_subnets(
+            vlan.subnet_set.all()
+        )
+        if len(subnets_v4) > 0:
+            vlan_hosts_v4[vlan.id] = make_hosts_for_subnets(
+                subnets_v4, nodes_dhcp_snippets
+            )
+        if len(subnets_v6) > 0:
+            vlan_hosts_v6[vlan.id] = make_hosts_for_subnets(
+                subnets_v6, nodes_dhcp_snippets
+            )
+    # The addresses of controllers are part of the rest of the configuration
+    # (interfaces, DNS servers, failover peers), so changes to their host
+    # maps cannot be sent alone.
+    controller_macs = {
+        str(mac_address)
+        for mac_address in Interface.objects.filter(
+            node__node_type__in=[
+                NODE_TYPE.RACK_CONTROLLER,
+                NODE_TYPE.REGION_CONTROLLER,
+                NODE_TYPE.REGION_AND_RACK_CONTROLLER,
+            ]
+        ).values_list("mac_address", flat=True)
+    }
+    return DHCPHostsForRack(
+        vlan_hosts_v4, vlan_hosts_v6, controller_macs, get_omapi_key()
+    )
+
+
+DHCPHostsForRack = namedtuple(
+    "DHCPHostsForRack",
+    ("vlan_hosts_v4", "vlan_hosts_v6", "controller_macs", "omapi_key"),
+)
+
+
+# The host maps, by VLAN, that a DHCP server was last configured with, and
+# the version of that configuration.
+DHCPHostMaps = namedtuple("DHCPHostMaps", ("version", "vlan_hosts"))
+
+
+class RackDHCPState:
+    """The DHCP configuration last sent to a rack controller.
+
+    Each time the rack controller's DHCP servers are configured, or their
+    host maps updated, the configuration is given a new version. The rack
+    controller only applies host map updates computed against the version
+    it was last given.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # Maps the IP version of each DHCP server known to be configured to
+        # its `DHCPHostMaps`, or None when it is stopped.
+        self.servers = {}
+
+    def next_version(self):
+        self.version += 1
+        return self.version
+
+
+class DHCPConfigurationChanged(Exception):
+    """More than host maps changed; DHCP must be configured in full."""
+
+
+def get_host_map_changes(old_vlan_hosts, new_vlan_hosts):
+    """Return the hosts to remove, add, and modify to go from
+    `old_vlan_hosts` to `new_vlan_hosts`.
+
+    :param old_vlan_hosts: dict of {<vlan-id>: <list-of-hosts>}.
+    :param new_vlan_hosts: dict of {<vlan-id>: <list-of-hosts>}.
+    """
+
+    def by_mac(vlan_hosts):
+        return {
+            host["mac"]: host
+            for vlan_id in sorted(vlan_hosts)
+            for host in vlan_hosts[vlan_id]
+        }
+
+    old_hosts, new_hosts = by_mac(old_vlan_hosts), by_mac(new_vlan_hosts)
+    remove = [host for mac, host in old_hosts.items() if mac not in new_hosts]
+    add = [host for mac, host in new_hosts.items() if mac not in old_hosts]
+    modify = [
+        host
+        for mac, host in new_hosts.items()
+        if mac in old_hosts and host != old_hosts[mac]
+    ]
+    return remove, add, modify
+
+
 @asynchronous
 @inlineCallbacks
-def configure_dhcp(rack_controller):
+def configure_dhcp(rack_controller, state=None):
     """Write the DHCP configuration files and restart the DHCP servers.
 
+    :param state: The `RackDHCPState` of the rack controller, if its host
+        maps are to be updated by `update_dhcp_hosts` afterwards.
     :raises: :py:class:`~.exceptions.NoConnectionsAvailable` when there
         are no open connections to the specified cluster controller.
     """
@@ -867,6 +985,12 @@ def configure_dhcp(rack_controller):
     interfaces_v4 = [{"name": name} for name in config.interfaces_v4]
     interfaces_v6 = [{"name": name} for name in config.interfaces_v6]
 
+    # Version the configuration so that host map updates can follow it.
+    if state is None:
+        versioned = {}
+    else:
+        versioned = {"version": state.next_version()}
+
     # Configure both IPv4 and IPv6.
     ipv4_exc, ipv6_exc = None, None
     ipv4_status, ipv6_status = SERVICE_STATUS.UNKNOWN, SERVICE_STATUS.UNKNOWN
@@ -882,10 +1006,13 @@ def configure_dhcp(rack_controller):
             hosts=config.hosts_v4,
             global_dhcp_snippets=config.global_dhcp_snippets,
             omapi_key=config.omapi_key,
+            **versioned,
         )
     except Exception as exc:
         ipv4_exc = exc
         ipv4_status = SERVICE_STATUS.DEAD
+        if state is not None:
+            state.servers.pop(4, None)
         log.err(
             None,
             "Error configuring DHCPv4 on rack controller '%s (%s)': %s"
@@ -894,8 +1021,14 @@ def configure_dhcp(rack_controller):
     else:
         if len(config.shared_networks_v4) > 0:
             ipv4_status = SERVICE_STATUS.RUNNING
+            host_maps = DHCPHostMaps(
+                versioned.get("version"), config.vlan_hosts_v4
+            )
         else:
             ipv4_status = SERVICE_STATUS.OFF
+            host_maps = None
+        if state is not None:
+            state.servers[4] = host_maps
         log.msg(
             "Successfully configured DHCPv4 on rack controller '%s (%s)'."
             % (rack_controller.hostname, rack_controller.system_id)
@@ -912,10 +1045,13 @@ def configure_dhcp(rack_controller):
             hosts=config.hosts_v6,
             global_dhcp_snippets=config.global_dhcp_snippets,
             omapi_key=config.omapi_key,
+            **versioned,
         )
     except Exception as exc:
         ipv6_exc = exc
         ipv6_status = SERVICE_STATUS.DEAD
+        if state is not None:
+            state.servers.pop(6, None)
         log.err(
             None,
             "Error configuring DHCPv6 on rack controller '%s (%s)': %s"
@@ -924,8 +1060,14 @@ def configure_dhcp(rack_controller):
     else:
         if len(config.shared_networks_v6) > 0:
             ipv6_status = SERVICE_STATUS.RUNNING
+            host_maps = DHCPHostMaps(
+                versioned.get("version"), config.vlan_hosts_v6
+            )
         else:
             ipv6_status = SERVICE_STATUS.OFF
+            host_maps = None
+        if state is not None:
+            state.servers[6] = host_maps
         log.msg(
             "Successfully configured DHCPv6 on rack controller '%s (%s)'."
             % (rack_controller.hostname, rack_controller.system_id)
@@ -961,6 +1103,120 @@ def configure_dhcp(rack_controller):
         raise ipv6_exc
 
 
+@asynchronous
+@inlineCallbacks
+def update_dhcp_hosts(rack_controller, state, vlan_ids):
+    """Update the host maps on `vlan_ids` of the rack controller's DHCP
+    servers.
+
+    Only those host maps are computed, and only the hosts that changed since
+    they were last sent to the rack controller are sent to it. The DHCP
+    servers are configured in full, with `configure_dhcp`, when this is not
+    possible: the rack controller has not been configured with `state`, does
+    not support host map updates, or more than host maps have changed.
+
+    :param state: The `RackDHCPState` of the rack controller.
+    :param vlan_ids: The IDs of the VLANs on which host maps changed.
+    :raises: :py:class:`~.exceptions.NoConnectionsAvailable` when there
+        are no open connections to the specified cluster controller.
+    """
+    if not settings.DHCP_CONNECT:
+        return
+
+    if 4 not in state.servers or 6 not in state.servers:
+        # Unknown configuration; the DHCP servers must be configured first.
+        yield configure_dhcp(rack_controller, state)
+        return
+
+    client = yield getClientFor(rack_controller.system_id)
+    hosts = yield deferToDatabase(get_dhcp_hosts, rack_controller, vlan_ids)
+    try:
+        yield _update_dhcp_hosts(
+            client,
+            UpdateDHCPv4Hosts,
+            state,
+            4,
+            vlan_ids,
+            hosts.vlan_hosts_v4,
+            hosts.controller_macs,
+            hosts.omapi_key,
+        )
+        yield _update_dhcp_hosts(
+            client,
+            UpdateDHCPv6Hosts,
+            state,
+            6,
+            vlan_ids,
+            hosts.vlan_hosts_v6,
+            hosts.controller_macs,
+            hosts.omapi_key,
+        )
+    except Exception as exc:
+        log.msg(
+            "Configuring DHCP in full on rack controller '%s (%s)'; host "
+            "maps could not be updated: %s"
+            % (rack_controller.hostname, rack_controller.system_id, exc)
+        )
+        yield configure_dhcp(rack_controller, state)
+
+
+@inlineCallbacks
+def _update_dhcp_hosts(
+    client,
+    command,
+    state,
+    ip_version,
+    vlan_ids,
+    vlan_hosts,
+    controller_macs,
+    omapi_key,
+):
+    """Send the changes to the host maps on `vlan_ids` to a DHCP server.
+
+    :raises DHCPConfigurationChanged: when more than host maps changed.
+    """
+    host_maps = state.servers[ip_version]
+    if host_maps is None:
+        # The DHCP server is stopped; there are no host maps to update.
+        return
+    served_vlan_ids = set(vlan_ids).intersection(host_maps.vlan_hosts)
+    if served_vlan_ids != set(vlan_hosts):
+        raise DHCPConfigurationChanged(
+            "DHCPv%d is served on other VLANs." % ip_version
+        )
+    new_vlan_hosts = dict(host_maps.vlan_hosts)
+    new_vlan_hosts.update(vlan_hosts)
+    remove, add, modify = get_host_map_changes(
+        host_maps.vlan_hosts, new_vlan_hosts
+    )
+    if len(remove) + len(add) + len(modify) == 0:
+        return
+    changed_macs = {host["mac"] for host in chain(remove, add, modify)}
+    if not changed_macs.isdisjoint(controller_macs):
+        raise DHCPConfigurationChanged(
+            "DHCPv%d host maps of controllers changed." % ip_version
+        )
+
+    version = state.next_version()
+    # Until the DHCP server confirms the update its configuration is unknown.
+    del state.servers[ip_version]
+    yield client(
+        command,
+        _timeout=DHCP_TIMEOUT + 5,
+        omapi_key=omapi_key,
+        base_version=host_maps.version,
+        version=version,
+        remove=remove,
+        add=add,
+        modify=modify,
+    )
+    state.servers[ip_version] = DHCPHostMaps(version, new_vlan_hosts)
+    log.msg(
+        "Updated DHCPv%d host maps (%d removed, %d added, %d modified)."
+        % (ip_version, len(remove), len(add), len(modify))
+    )
+
+
 def validate_dhcp_config(test_dhcp_snippet=None):
     """Validate a DHCPD config with uncommitted values.
 
@@ -1108,12 +1364,14 @@ def _perform_dhcp_config(
             command,
             _timeout=DHCP_TIMEOUT + 5,
             shared_networks=shared_networks,
-            **args
+            **args,
         )
 
     def maybeDowngrade(failure):
         if failure.check(amp.UnhandledCommand):
             downgrade_shared_networks(shared_networks)
+            # Older commands do not take a version.
+            args.pop("version", None)
             return call(v1_command)
         else:
             return failure
@@ -39,10 +39,11 @@ from socket import gethostname
 
 from twisted.application.service import MultiService, Service
 from twisted.internet import reactor
-from twisted.internet.defer import DeferredList, inlineCallbacks, maybeDeferred
+from twisted.internet.defer import DeferredList, inlineCallbacks
 
 from maasserver.deprecations import log_deprecations
 from maasserver.utils.orm import disable_all_database_connections
+from maasserver.utils.startup import time_startup_phase
 from maasserver.utils.threads import deferToDatabase
 from provisioningserver.prometheus.metrics import set_global_labels
 from provisioningserver.utils.twisted import asynchronous
@@ -63,11 +64,45 @@ def make_DatabaseTaskService():
     return dbtasks.DatabaseTasksService()
 
 
+def make_DatabasePoolBudgetService():
+    from maasserver.regiondservices import database_pool
+
+    return database_pool.DatabasePoolBudgetService(reactor)
+
+
+def make_RuntimeMetricsService(postgresListener, dbtasks=None):
+    from maasserver.utils.threads import sample_database_pool
+    from provisioningserver.prometheus.runtime import RuntimeMetricsService
+
+    samplers = [sample_database_pool, postgresListener.sampleMetrics]
+    if dbtasks is not None:
+        samplers.append(dbtasks.sampleMetrics)
+    return RuntimeMetricsService(reactor, samplers)
+
+
+def make_PodUsageReconciliationService():
+    from maasserver.regiondservices import pod_usage
+
+    return pod_usage.PodUsageReconciliationService(reactor)
+
+
 def make_RegionControllerService(postgresListener):
+    from maasserver.config import RegionConfiguration
     from maasserver.region_controller import RegionControllerService
 
     log_deprecations()
-    return RegionControllerService(postgresListener)
+    with RegionConfiguration.open() as config:
+        return RegionControllerService(
+            postgresListener,
+            dnsReloadInterval=config.dns_reload_interval,
+            dnsReloadMaxDelay=config.dns_reload_max_delay,
+        )
+
+
+def make_RackConnectivityService(rpc, postgresListener):
+    from maasserver.regiondservices import rack_connectivity
+
+    return rack_connectivity.RackConnectivityService(rpc, postgresListener)
 
 
 def make_RegionService(ipcWorker):
@@ -223,12 +258,22 @@ class MAASServices(MultiService):
     @asynchronous
     @inlineCallbacks
     def startService(self):
-        yield maybeDeferred(self.eventloop.prepare)
+        yield time_startup_phase("prepare", self.eventloop.prepare)
         Service.startService(self)
-        yield self._set_globals()
-        yield DeferredList(
-            [maybeDeferred(service.startService) for service in self]
+        # The global labels are only used by metrics, so look them up while
+        # the services start rather than before.
+        d = self._set_globals()
+        yield time_startup_phase(
+            "services",
+            DeferredList,
+            [
+                time_startup_phase(
+                    "service:%s" % service.name, service.startService
+                )
+                for service in self
+            ],
         )
+        yield d
 
     @inlineCallbacks
     def _set_globals(self):
@@ -264,6 +309,22 @@ class RegionEventLoop:
             "factory": make_DatabaseTaskService,
             "requires": [],
         },
+        "database-pool-budget": {
+            "only_on_master": False,
+            "factory": make_DatabasePoolBudgetService,
+            "requires": [],
+        },
+        "runtime-metrics-master": {
+            "only_on_master": True,
+            "not_all_in_one": True,
+            "factory": make_RuntimeMetricsService,
+            "requires": ["postgres-listener-master"],
+        },
+        "runtime-metrics-worker": {
+            "only_on_master": False,
+            "factory": make_RuntimeMetricsService,
+            "requires": ["postgres-listener-worker", "database-tasks"],
+        },
         "region-controller": {
             "only_on_master": True,
             "factory": make_RegionControllerService,
@@ -274,11 +335,21 @@ class RegionEventLoop:
             "factory": make_RegionService,
             "requires": ["ipc-worker"],
         },
+        "rack-connectivity": {
+            "only_on_master": False,
+            "factory": make_RackConnectivityService,
+            "requires": ["rpc", "postgres-listener-worker"],
+        },
         "nonce-cleanup": {
             "only_on_master": True,
             "factory": make_NonceCleanupService,
             "requires": [],
         },
+        "pod-usage-reconciliation": {
+            "only_on_master": True,
+            "factory": make_PodUsageReconciliationService,
+            "requires": [],
+        },
         "dns-publication-cleanup": {
             "only_on_master": True,
             "factory": make_DNSPublicationGarbageService,
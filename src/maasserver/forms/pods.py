@@ -10,12 +10,14 @@ __all__ = [
     "PodForm",
 ]
 
+from collections import defaultdict
 from functools import partial
 from urllib.parse import urlparse
 
 import crochet
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db.models import Sum
 from django.forms import (
     BooleanField,
     CharField,
@@ -51,6 +53,7 @@ from maasserver.models import (
     Node,
     Pod,
     PodStoragePool,
+    PodUsage,
     RackController,
     ResourcePool,
     Tag,
@@ -63,6 +66,12 @@ from maasserver.node_constraint_filter_forms import (
     nodes_by_interface,
     storage_validator,
 )
+from maasserver.pod_placement import (
+    order_pods,
+    PLACEMENT_STRATEGY,
+    PodCapacity,
+    PodRequest,
+)
 from maasserver.rpc import getClientFromIdentifiers
 from maasserver.utils import absolute_reverse
 from maasserver.utils.dns import validate_hostname
@@ -896,6 +905,46 @@ class ComposeMachineForm(forms.Form):
             return created_machine
 
 
+def get_pod_capacities(pods):
+    """Return the `PodCapacity` of each of `pods`, keyed by pod ID.
+
+    Over-commit ratios are only applied to pods that can over-commit.
+    """
+    pod_ids = [pod.id for pod in pods]
+    usages = {
+        usage.pod_id: usage
+        for usage in PodUsage.objects.filter(pod_id__in=pod_ids)
+    }
+    storage_pools = defaultdict(list)
+    for pool in PodStoragePool.objects.filter(pod_id__in=pod_ids).annotate(
+        used=Sum("block_devices__size")
+    ):
+        storage_pools[pool.pod_id].append(pool)
+    capacities = {}
+    for pod in pods:
+        usage = usages.get(pod.id) or PodUsage()
+        if Capabilities.OVER_COMMIT in pod.capabilities:
+            cpu_ratio = pod.cpu_over_commit_ratio
+            memory_ratio = pod.memory_over_commit_ratio
+        else:
+            cpu_ratio = memory_ratio = 1
+        pools = storage_pools[pod.id]
+        pool_names = {pool.id: pool.name for pool in pools}
+        capacities[pod.id] = PodCapacity(
+            cores=pod.cores * cpu_ratio,
+            memory=pod.memory * memory_ratio,
+            storage=pod.local_storage,
+            used_cores=usage.cores,
+            used_memory=usage.memory,
+            used_storage=usage.local_storage,
+            storage_pools={
+                pool.name: (pool.storage, pool.used or 0) for pool in pools
+            },
+            default_storage_pool=pool_names.get(pod.default_storage_pool_id),
+        )
+    return capacities
+
+
 class ComposeMachineForPodsForm(forms.Form):
     def __init__(self, *args, **kwargs):
         self.request = kwargs.pop("request", None)
@@ -904,47 +953,84 @@ class ComposeMachineForPodsForm(forms.Form):
         self.pods = kwargs.pop("pods", None)
         if self.pods is None:
             raise ValueError("'pods' kwargs is required.")
+        self.strategy = kwargs.pop("strategy", PLACEMENT_STRATEGY.BEST_FIT)
         super().__init__(*args, **kwargs)
         self.pod_forms = [
             ComposeMachineForm(request=self.request, data=self.data, pod=pod)
             for pod in self.pods
         ]
+        # Why the machine couldn't be composed in each pod, keyed by pod name.
+        self.failures = {}
 
     def save(self):
         """Prevent from usage."""
         raise AttributeError("Use `compose` instead of `save`.")
 
+    def get_pod_request(self, form):
+        storage_constraints = get_storage_constraints_from_string(
+            form.get_value_for("storage")
+        )
+        disks = [(size, tags) for _, size, tags in storage_constraints or ()]
+        return PodRequest(
+            cores=form.get_value_for("cores"),
+            memory=form.get_value_for("memory"),
+            storage=sum(size for size, _ in disks),
+            disks=disks,
+        )
+
+    def get_ordered_pod_forms(self):
+        """Return the valid pod forms in the order their pods should be tried.
+
+        Pods that can't over-commit are tried before those that can. Within
+        each group pods are ordered by `self.strategy` using their recorded
+        capacity, leaving out pods that are known not to have room.
+        """
+        capacities = get_pod_capacities(
+            [form.pod for form in self.valid_pod_forms]
+        )
+        ordered_forms = []
+        for over_commit in (False, True):
+            forms_by_id = {
+                form.pod.id: form
+                for form in self.valid_pod_forms
+                if (Capabilities.OVER_COMMIT in form.pod.capabilities)
+                == over_commit
+            }
+            pod_ids, rejections = order_pods(
+                (
+                    (pod_id, capacities[pod_id], self.get_pod_request(form))
+                    for pod_id, form in forms_by_id.items()
+                ),
+                strategy=self.strategy,
+            )
+            for pod_id, reason in rejections.items():
+                self.failures[forms_by_id[pod_id].pod.name] = reason
+            ordered_forms.extend(forms_by_id[pod_id] for pod_id in pod_ids)
+        return ordered_forms
+
     def compose(self):
-        """Composed machine from available pod."""
-        non_commit_forms = [
-            form
-            for form in self.valid_pod_forms
-            if Capabilities.OVER_COMMIT not in form.pod.capabilities
-        ]
-        commit_forms = [
-            form
-            for form in self.valid_pod_forms
-            if Capabilities.OVER_COMMIT in form.pod.capabilities
-        ]
-        # XXX - we need a way to get errors back from these forms for debugging
-        # First, try to compose a machine from non-commitable pods.
-        for form in non_commit_forms:
+        """Compose a machine in the first pod that can hold it.
+
+        Failures are recorded in `self.failures`.
+
+        :return: The composed machine, or `None`.
+        """
+        self.failures = {}
+        for form in self.get_ordered_pod_forms():
             try:
                 return form.compose(
                     skip_commissioning=True,
                     creation_type=NODE_CREATION_TYPE.DYNAMIC,
                 )
-            except Exception:
-                continue
-        # Second, try to compose a machine from commitable pods
-        for form in commit_forms:
-            try:
-                return form.compose(
-                    skip_commissioning=True,
-                    creation_type=NODE_CREATION_TYPE.DYNAMIC,
+            except Exception as error:
+                self.failures[form.pod.name] = str(error)
+        if len(self.failures) != 0:
+            log.msg(
+                "Unable to compose a machine: %s"
+                % "; ".join(
+                    "%s: %s" % failure for failure in self.failures.items()
                 )
-            except Exception:
-                continue
+            )
         # No machine found.
         return None
 
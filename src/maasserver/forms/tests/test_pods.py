@@ -39,6 +39,7 @@ from maasserver.forms.pods import (
     DEFAULT_COMPOSED_MEMORY,
     DEFAULT_COMPOSED_STORAGE,
     get_known_host_interfaces,
+    get_pod_capacities,
     PodForm,
 )
 from maasserver.models import StaticIPAddress
@@ -46,6 +47,7 @@ from maasserver.models.bmc import Pod
 from maasserver.models.node import Machine
 from maasserver.models.resourcepool import ResourcePool
 from maasserver.models.zone import Zone
+from maasserver.pod_placement import PLACEMENT_STRATEGY, PodCapacity
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
     MAASServerTestCase,
@@ -53,6 +55,7 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import reload_object
 from maasserver.utils.threads import deferToDatabase
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
     MockCalledOnce,
     MockCalledOnceWith,
@@ -2596,6 +2599,184 @@ class TestComposeMachineForPodsForm(MAASServerTestCase):
         form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
         self.assertFalse(form.is_valid())
 
+    def make_equal_pods(self):
+        pods = self.make_pods()
+        for pod in pods:
+            pod.cores = pod.hints.cores = 16
+            pod.memory = pod.hints.memory = 8192
+            pod.local_storage = 0
+            pod.save()
+            pod.hints.save()
+        return pods
+
+    def use_cores(self, pod, cores):
+        factory.make_Machine(bmc=pod, cpu_count=cores, memory=0)
+
+    def patch_compose(self):
+        composed_in = []
+
+        def compose(form, **kwargs):
+            composed_in.append(form.pod)
+            raise PodProblem("No room in %s." % form.pod.name)
+
+        self.patch(ComposeMachineForm, "compose", compose)
+        return composed_in
+
+    def test_compose_uses_best_fit_by_default(self):
+        request = MagicMock()
+        pods = self.make_equal_pods()
+        self.use_cores(pods[0], 4)
+        self.use_cores(pods[1], 8)
+        data = self.make_data(pods)
+        data["cores"] = 2
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        composed_in = self.patch_compose()
+        self.assertTrue(form.is_valid())
+
+        self.assertIsNone(form.compose())
+        self.assertEqual([pods[1], pods[0], pods[2]], composed_in)
+
+    def test_compose_spread(self):
+        request = MagicMock()
+        pods = self.make_equal_pods()
+        self.use_cores(pods[0], 4)
+        self.use_cores(pods[1], 8)
+        data = self.make_data(pods)
+        data["cores"] = 2
+        form = ComposeMachineForPodsForm(
+            request=request,
+            data=data,
+            pods=pods,
+            strategy=PLACEMENT_STRATEGY.SPREAD,
+        )
+        composed_in = self.patch_compose()
+        self.assertTrue(form.is_valid())
+
+        self.assertIsNone(form.compose())
+        self.assertEqual([pods[2], pods[0], pods[1]], composed_in)
+
+    def test_compose_skips_pods_without_room(self):
+        request = MagicMock()
+        pods = self.make_pods()
+        self.use_cores(pods[0], pods[0].cores)
+        data = self.make_data(pods)
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        composed_in = self.patch_compose()
+        self.assertTrue(form.is_valid())
+
+        form.compose()
+        self.assertItemsEqual(pods[1:], composed_in)
+        self.assertEqual(
+            "Not enough cores; 0 available, %d requested." % data["cores"],
+            form.failures[pods[0].name],
+        )
+
+    def test_compose_checks_disks_against_their_storage_pool(self):
+        request = MagicMock()
+        pods = self.make_equal_pods()
+        for pod in pods:
+            pool = pod.default_storage_pool
+            pool.storage = 50 * 1000 ** 3
+            pool.save()
+        # The first pod's default pool is nearly full, though the pod has
+        # room in its other pools.
+        factory.make_PhysicalBlockDevice(
+            node=factory.make_Machine(bmc=pods[0], cpu_count=0, memory=0),
+            size=45 * 1000 ** 3,
+            storage_pool=pods[0].default_storage_pool,
+        )
+        data = self.make_data(pods)
+        data["storage"] = "root:10"
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        composed_in = self.patch_compose()
+        self.assertTrue(form.is_valid())
+
+        form.compose()
+        self.assertItemsEqual(pods[1:], composed_in)
+        self.assertEqual(
+            "Not enough storage in %s; %d available, %d requested."
+            % (
+                pods[0].default_storage_pool.name,
+                5 * 1000 ** 3,
+                10 * 1000 ** 3,
+            ),
+            form.failures[pods[0].name],
+        )
+
+    def test_compose_records_failures(self):
+        request = MagicMock()
+        pods = self.make_pods()
+        data = self.make_data(pods)
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        self.patch_compose()
+        self.assertTrue(form.is_valid())
+
+        self.assertIsNone(form.compose())
+        self.assertEqual(
+            {pod.name: "No room in %s." % pod.name for pod in pods},
+            form.failures,
+        )
+
+
+class TestGetPodCapacities(MAASServerTestCase):
+    def test_returns_capacities(self):
+        pod = make_pod_with_hints()
+        pod.capabilities = [Capabilities.OVER_COMMIT]
+        pod.cpu_over_commit_ratio = 2
+        pod.local_storage = 100 * 1024 ** 3
+        pod.save()
+        other_pod = make_pod_with_hints()
+        for _ in range(2):
+            machine = factory.make_Machine(bmc=pod)
+            factory.make_PhysicalBlockDevice(node=machine)
+        factory.make_Machine(bmc=other_pod)
+        self.assertEqual(
+            PodCapacity(
+                cores=pod.cores * 2,
+                memory=pod.memory,
+                storage=pod.local_storage,
+                used_cores=pod.get_used_cores(),
+                used_memory=pod.get_used_memory(),
+                used_storage=pod.get_used_local_storage(),
+                storage_pools={
+                    pool.name: (pool.storage, 0)
+                    for pool in pod.storage_pools.all()
+                },
+                default_storage_pool=pod.default_storage_pool.name,
+            ),
+            get_pod_capacities([pod, other_pod])[pod.id],
+        )
+
+    def test_ignores_over_commit_ratios_without_capability(self):
+        pod = make_pod_with_hints()
+        pod.capabilities = []
+        pod.cpu_over_commit_ratio = 2
+        pod.memory_over_commit_ratio = 3
+        pod.save()
+        capacity = get_pod_capacities([pod])[pod.id]
+        self.assertEqual(pod.cores, capacity.cores)
+        self.assertEqual(pod.memory, capacity.memory)
+
+    def test_returns_storage_used_in_each_pool(self):
+        pod = make_pod_with_hints()
+        pool = pod.default_storage_pool
+        machine = factory.make_Machine(bmc=pod)
+        for size in (10 * 1024 ** 3, 20 * 1024 ** 3):
+            factory.make_PhysicalBlockDevice(
+                node=machine, size=size, storage_pool=pool
+            )
+        capacity = get_pod_capacities([pod])[pod.id]
+        self.assertEqual(
+            (pool.storage, 30 * 1024 ** 3), capacity.storage_pools[pool.name]
+        )
+
+    def test_queries_are_constant(self):
+        pods = [make_pod_with_hints() for _ in range(3)]
+        for pod in pods:
+            factory.make_Machine(bmc=pod)
+        count, _ = count_queries(get_pod_capacities, pods)
+        self.assertEqual(2, count)
+
 
 class TestGetKnownHostInterfaces(MAASServerTestCase):
     def test_returns_empty_list_if_no_host(self):
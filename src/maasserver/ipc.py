@@ -14,6 +14,7 @@ from functools import partial
 import os
 from socket import gethostname
 
+from django.db.models import Count
 from netaddr import IPAddress
 from twisted.application import service
 from twisted.internet.defer import CancelledError, inlineCallbacks
@@ -61,6 +62,12 @@ def get_ipc_socket_path():
     )
 
 
+def _endpoint_key(process_id, address, port):
+    """Return a key for an endpoint that doesn't depend on how the address is
+    written."""
+    return process_id, IPAddress(address), port
+
+
 class WorkerIdentify(amp.Command):
     """Register worker with master using PID."""
 
@@ -245,7 +252,7 @@ class IPCMasterService(service.Service, object):
             self.connections[pid] = {
                 "process_id": process_id,
                 "connection": conn,
-                "rpc": {"port": None, "connections": set()},
+                "rpc": {"port": None, "connections": {}},
             }
             return process_id
 
@@ -378,7 +385,7 @@ class IPCMasterService(service.Service, object):
             return d
 
     @synchronous
-    def _registerConnection(self, process, ident, host, port, force_save=True):
+    def _registerConnection(self, process, ident, host, port):
         rackd = RackController.objects.get(system_id=ident)
         endpoint, _ = RegionControllerProcessEndpoint.objects.get_or_create(
             process=process, address=host, port=port
@@ -386,7 +393,7 @@ class IPCMasterService(service.Service, object):
         connection, created = RegionRackRPCConnection.objects.get_or_create(
             endpoint=endpoint, rack_controller=rackd
         )
-        if not created and force_save:
+        if not created:
             # Force the save so that signals connected to the
             # RegionRackRPCConnection are performed.
             connection.save(force_update=True)
@@ -473,32 +480,97 @@ class IPCMasterService(service.Service, object):
                 return d
 
     @synchronous
-    def _updateConnections(self, process, connections):
-        """Update the existing RPC connections into this region.
-
-        This is needed because the database could get in an incorrect state
-        because another process removed its references in the database and
-        the existing connections need to be re-created.
+    def _updateEndpointsAndConnections(self, region_obj):
+        """Make the endpoints and RPC connections in the database match the
+        workers' state.
+
+        Rows are only written when they differ from that state. What's in the
+        database is read each time because other processes can remove rows:
+        another region removes the processes it finds expired, along with
+        their endpoints and connections, and removing a rack controller
+        removes its connections.
         """
-        if not connections:
-            RegionRackRPCConnection.objects.filter(
-                endpoint__process=process
+        # The endpoints and connections the workers have, keyed on
+        # `_endpoint_key`. An endpoint is kept for each connection, even if
+        # it's on an address the worker is not listening on.
+        endpoints, connections = {}, set()
+        for conn in self.connections.values():
+            process_id = conn["process_id"]
+            if conn["rpc"]["port"]:
+                for addr, port in self._getListenAddresses(
+                    conn["rpc"]["port"]
+                ):
+                    key = _endpoint_key(process_id, addr, port)
+                    endpoints[key] = (process_id, addr, port)
+            for ident, host, port in conn["rpc"]["connections"].values():
+                key = _endpoint_key(process_id, host, port)
+                endpoints[key] = (process_id, host, port)
+                connections.add((key, ident))
+
+        existing_endpoints = {
+            _endpoint_key(process_id, addr, port): endpoint_id
+            for endpoint_id, process_id, addr, port in (
+                RegionControllerProcessEndpoint.objects.filter(
+                    process__region=region_obj
+                ).values_list("id", "process_id", "address", "port")
+            )
+        }
+        old_endpoint_ids = [
+            endpoint_id
+            for key, endpoint_id in existing_endpoints.items()
+            if key not in endpoints
+        ]
+        if old_endpoint_ids:
+            RegionControllerProcessEndpoint.objects.filter(
+                id__in=old_endpoint_ids
             ).delete()
-        else:
-            previous_connection_ids = set(
+        endpoint_ids = {
+            key: endpoint_id
+            for key, endpoint_id in existing_endpoints.items()
+            if key in endpoints
+        }
+        for key in endpoints.keys() - endpoint_ids.keys():
+            process_id, addr, port = endpoints[key]
+            endpoint_ids[key] = RegionControllerProcessEndpoint.objects.create(
+                process_id=process_id, address=addr, port=port
+            ).id
+
+        endpoint_keys = {
+            endpoint_id: key for key, endpoint_id in endpoint_ids.items()
+        }
+        existing_connections = {
+            (endpoint_keys[endpoint_id], ident): connection_id
+            for connection_id, endpoint_id, ident in (
                 RegionRackRPCConnection.objects.filter(
-                    endpoint__process=process
-                ).values_list("id", flat=True)
-            )
-            for _, (ident, host, port) in connections.items():
-                db_conn = self._registerConnection(
-                    process, ident, host, port, force_save=False
+                    endpoint_id__in=endpoint_keys
+                ).values_list(
+                    "id", "endpoint_id", "rack_controller__system_id"
                 )
-                previous_connection_ids.discard(db_conn.id)
-            if previous_connection_ids:
-                RegionRackRPCConnection.objects.filter(
-                    id__in=previous_connection_ids
-                ).delete()
+            )
+        }
+        old_connection_ids = [
+            connection_id
+            for key, connection_id in existing_connections.items()
+            if key not in connections
+        ]
+        if old_connection_ids:
+            RegionRackRPCConnection.objects.filter(
+                id__in=old_connection_ids
+            ).delete()
+        new_connections = connections - existing_connections.keys()
+        if new_connections:
+            rack_ids = dict(
+                RackController.objects.filter(
+                    system_id__in={ident for _, ident in new_connections}
+                ).values_list("system_id", "id")
+            )
+            for key, ident in new_connections:
+                # Skip rack controllers that have been removed.
+                if ident in rack_ids:
+                    RegionRackRPCConnection.objects.create(
+                        endpoint_id=endpoint_ids[key],
+                        rack_controller_id=rack_ids[ident],
+                    )
 
     @synchronous
     def _updateService(self, region_obj):
@@ -531,7 +603,11 @@ class IPCMasterService(service.Service, object):
     @transactional
     def _update(self):
         """Repopulate the database with process, endpoint, and connection
-        information."""
+        information.
+
+        The processes are marked as alive with a single query on each update,
+        and other rows are written only when they're out of date.
+        """
         # Get the region controller and update its hostname and last
         # updated time.
         region_obj = RegionController.objects.get_running_controller()
@@ -540,37 +616,28 @@ class IPCMasterService(service.Service, object):
             region_obj.hostname = hostname
             region_obj.save()
 
-        # Get all the existing processes for the region controller. This is
-        # used to remove the old processes that we did not update.
-        previous_process_ids = set(
-            RegionControllerProcess.objects.filter(
-                region=region_obj
+        # Update the time of all the current workers' processes at once.
+        # Caution is needed because other region controllers can remove
+        # expired processes, so re-create any that are missing.
+        pids = {
+            conn["process_id"]: pid for pid, conn in self.connections.items()
+        }
+        updated_count = RegionControllerProcess.objects.filter(
+            id__in=pids
+        ).update(updated=now())
+        if updated_count != len(pids):
+            existing_process_ids = RegionControllerProcess.objects.filter(
+                id__in=pids
             ).values_list("id", flat=True)
-        )
-
-        # Loop through all the current workers to update the records in the
-        # database. Caution is needed because other region controllers can
-        # remove expired processes.
-        for pid, conn in self.connections.items():
-            process = self._getProcessObjFor(pid)
-            process.updated = now()
-            process.save()
-            if conn["rpc"]["port"]:
-                # Update the endpoints for the provided port.
-                self._updateEndpoints(
-                    process, self._getListenAddresses(conn["rpc"]["port"])
-                )
-            else:
-                # RPC is not running, no endpoints.
-                self._updateEndpoints(process, [])
-            self._updateConnections(process, conn["rpc"]["connections"])
-            previous_process_ids.discard(process.id)
+            for process_id in pids.keys() - set(existing_process_ids):
+                self._getProcessObjFor(pids[process_id])
 
         # Delete all the old processes that are dead.
-        if previous_process_ids:
-            RegionControllerProcess.objects.filter(
-                id__in=previous_process_ids
-            ).delete()
+        RegionControllerProcess.objects.filter(region=region_obj).exclude(
+            id__in=pids
+        ).delete()
+
+        self._updateEndpointsAndConnections(region_obj)
 
         # Remove any old processes not owned by this controller. Every
         # controller should update its processes based on the `UPDATE_INTERVAL`
@@ -585,12 +652,13 @@ class IPCMasterService(service.Service, object):
         self._updateService(region_obj)
 
         # Update the status of all regions that have no processes running.
-        for other_region in RegionController.objects.exclude(
-            system_id=region_obj.id
-        ).prefetch_related("processes"):
-            # Use len with `all` so the prefetch cache is used.
-            if len(other_region.processes.all()) == 0:
-                Service.objects.mark_dead(other_region, dead_region=True)
+        dead_regions = (
+            RegionController.objects.exclude(id=region_obj.id)
+            .annotate(process_count=Count("processes"))
+            .filter(process_count=0)
+        )
+        for other_region in dead_regions:
+            Service.objects.mark_dead(other_region, dead_region=True)
 
     @asynchronous
     def update(self):
@@ -24,6 +24,7 @@ from twisted.logger import Logger
 from twisted.python.failure import Failure
 from zope.interface import implementer
 
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.events import EventGroup
 from provisioningserver.utils.twisted import callOut, suppress, synchronous
@@ -75,8 +76,9 @@ class PostgresListenerService(Service, object):
     HANDLE_NOTIFY_DELAY = 0.5
     CHANNEL_REGISTRAR_DELAY = 0.5
 
-    def __init__(self, alias="default"):
+    def __init__(self, alias="default", prometheus_metrics=PROMETHEUS_METRICS):
         self.alias = alias
+        self.prometheus_metrics = prometheus_metrics
         self.listeners = defaultdict(list)
         self.autoReconnect = False
         self.connection = None
@@ -455,6 +457,7 @@ class PostgresListenerService(Service, object):
         else:
             defers = []
             handlers = self.listeners[channel]
+            started = clock.seconds()
             # XXX: There could be an arbitrary number of listeners. Should we
             # limit concurrency here? Perhaps even do one at a time.
             for handler in handlers:
@@ -469,7 +472,25 @@ class PostgresListenerService(Service, object):
                     )
                 )
                 defers.append(d)
-            return defer.DeferredList(defers)
+
+            def observe(result):
+                self.prometheus_metrics.update(
+                    "maas_listener_handler_latency",
+                    "observe",
+                    value=clock.seconds() - started,
+                    labels={"channel": channel},
+                )
+                return result
+
+            return defer.DeferredList(defers).addCallback(observe)
+
+    def sampleMetrics(self, prometheus_metrics):
+        """Export the number of notifications waiting to be handled."""
+        prometheus_metrics.update(
+            "maas_listener_pending_notifications",
+            "set",
+            value=len(self.notifications),
+        )
 
     def _process_notifies(self):
         """Add each notify to to the notifications set.
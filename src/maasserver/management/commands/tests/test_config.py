@@ -123,6 +123,8 @@ class TestConfigurationSet(MAASTestCase):
             "database_keepalive_count",
             "database_keepalive_interval",
             "database_keepalive_idle",
+            "dns_reload_interval",
+            "dns_reload_max_delay",
         ):
             value = random.randint(0, 60)
         elif self.option == "num_workers":
@@ -9,6 +9,7 @@ import json
 import logging
 from pprint import pformat
 import sys
+import threading
 import traceback
 
 import attr
@@ -30,16 +31,9 @@ from django.utils.http import urlquote_plus
 
 from maasserver import logger
 from maasserver.clusterrpc.utils import get_error_message_for_exception
-from maasserver.components import (
-    discard_persistent_error,
-    register_persistent_error,
-)
-from maasserver.enum import COMPONENT
 from maasserver.exceptions import MAASAPIException
 from maasserver.models.config import Config
-from maasserver.models.node import RackController
 from maasserver.rbac import rbac
-from maasserver.rpc import getAllClients
 from maasserver.utils.orm import is_retryable_failure
 from provisioningserver.rpc.exceptions import (
     NoConnectionsAvailable,
@@ -107,52 +101,6 @@ class AccessMiddleware:
         return self.get_response(request)
 
 
-class ExternalComponentsMiddleware:
-    """Middleware to check external components at regular intervals."""
-
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def _check_rack_controller_connectivity(self):
-        """Check each rack controller to see if it's connected.
-
-        If any rack controllers are disconnected, add a persistent error.
-        """
-        controllers = RackController.objects.all()
-        connected_ids = {client.ident for client in getAllClients()}
-        disconnected_controllers = {
-            controller
-            for controller in controllers
-            if controller.system_id not in connected_ids
-        }
-        if len(disconnected_controllers) == 0:
-            discard_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        else:
-            if len(disconnected_controllers) == 1:
-                message = (
-                    "One rack controller is not yet connected to the region"
-                )
-            else:
-                message = (
-                    "%d rack controllers are not yet connected to the region"
-                    % len(disconnected_controllers)
-                )
-            message = (
-                '%s. Visit the <a href="/MAAS/l/controllers">'
-                "rack controllers page</a> for "
-                "more information." % message
-            )
-            register_persistent_error(COMPONENT.RACK_CONTROLLERS, message)
-
-    def __call__(self, request):
-        # This middleware hijacks the request to perform checks.  Any
-        # error raised during these checks should be caught to avoid
-        # disturbing the handling of the request.  Proper error reporting
-        # should be handled in the check method itself.
-        self._check_rack_controller_connectivity()
-        return self.get_response(request)
-
-
 class ExceptionMiddleware:
     """Convert exceptions into appropriate HttpResponse responses.
 
@@ -461,12 +409,94 @@ class ExternalAuthInfo:
     admin_group = attr.ib(default="")
 
 
+# The configuration items `ExternalAuthInfo` is made from.
+EXTERNAL_AUTH_CONFIG_NAMES = (
+    "external_auth_url",
+    "external_auth_domain",
+    "external_auth_admin_group",
+    "rbac_url",
+)
+
+
+def get_external_auth_info():
+    """Return `ExternalAuthInfo` if external authentication is enabled.
+
+    :return: An `ExternalAuthInfo` instance, or `None`.
+    """
+    configs = Config.objects.get_configs(EXTERNAL_AUTH_CONFIG_NAMES)
+    rbac_endpoint = configs.get("rbac_url")
+    candid_endpoint = configs.get("external_auth_url")
+    auth_endpoint, auth_domain, auth_admin_group = "", "", ""
+    if rbac_endpoint:
+        auth_type = "rbac"
+        auth_endpoint = rbac_endpoint.rstrip("/") + "/auth"
+    elif candid_endpoint:
+        auth_type = "candid"
+        auth_endpoint = candid_endpoint
+        auth_domain = configs.get("external_auth_domain")
+        auth_admin_group = configs.get("external_auth_admin_group")
+
+    if not auth_endpoint:
+        return None
+    # strip trailing slashes as js-bakery ends up using double slashes
+    # in the URL otherwise
+    return ExternalAuthInfo(
+        type=auth_type,
+        url=auth_endpoint.rstrip("/"),
+        domain=auth_domain,
+        admin_group=auth_admin_group,
+    )
+
+
+class ExternalAuthInfoCache:
+    """Hold `ExternalAuthInfo` for all the requests served by a process.
+
+    It's read from the database when first needed, and again once `clear`
+    has been called. That happens when one of `EXTERNAL_AUTH_CONFIG_NAMES`
+    is saved in this process, and when the web application is notified of a
+    change to any configuration item.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._cached = False
+        self._info = None
+
+    def get(self):
+        """Return the cached `ExternalAuthInfo`, or `None`."""
+        with self._lock:
+            if self._cached:
+                return self._info
+            generation = self._generation
+        info = get_external_auth_info()
+        with self._lock:
+            # Don't keep what was read if the cache was cleared meanwhile.
+            if generation == self._generation:
+                self._info, self._cached = info, True
+        return info
+
+    def clear(self, *args, **kwargs):
+        """Clear the cache.
+
+        Takes any arguments, to be usable as a signal or notification
+        handler.
+        """
+        with self._lock:
+            self._generation += 1
+            self._cached = False
+            self._info = None
+
+
+external_auth_info_cache = ExternalAuthInfoCache()
+
+
 class ExternalAuthInfoMiddleware:
     """A Middleware adding information about the external authentication.
 
     This adds an `external_auth_info` attribute to the request, which is an
     ExternalAuthInfo instance if external authentication is enabled, None
-    otherwise.
+    otherwise. It's read from `external_auth_info_cache`.
 
     """
 
@@ -474,37 +504,7 @@ class ExternalAuthInfoMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        configs = Config.objects.get_configs(
-            [
-                "external_auth_url",
-                "external_auth_domain",
-                "external_auth_admin_group",
-                "rbac_url",
-            ]
-        )
-        rbac_endpoint = configs.get("rbac_url")
-        candid_endpoint = configs.get("external_auth_url")
-        auth_endpoint, auth_domain, auth_admin_group = "", "", ""
-        if rbac_endpoint:
-            auth_type = "rbac"
-            auth_endpoint = rbac_endpoint.rstrip("/") + "/auth"
-        elif candid_endpoint:
-            auth_type = "candid"
-            auth_endpoint = candid_endpoint
-            auth_domain = configs.get("external_auth_domain")
-            auth_admin_group = configs.get("external_auth_admin_group")
-
-        auth_info = None
-        if auth_endpoint:
-            # strip trailing slashes as js-bakery ends up using double slashes
-            # in the URL otherwise
-            auth_info = ExternalAuthInfo(
-                type=auth_type,
-                url=auth_endpoint.rstrip("/"),
-                domain=auth_domain,
-                admin_group=auth_admin_group,
-            )
-        request.external_auth_info = auth_info
+        request.external_auth_info = external_auth_info_cache.get()
         return self.get_response(request)
 
 
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.12 on 2020-10-22 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maasserver", "0219_vm_nic_link"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="node",
+            name="power_state_queried",
+            field=models.DateTimeField(
+                blank=False,
+                db_index=True,
+                default=None,
+                editable=False,
+                null=True,
+            ),
+        ),
+    ]
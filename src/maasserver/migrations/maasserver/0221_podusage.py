@@ -0,0 +1,98 @@
+# Generated by Django 2.2.12 on 2020-10-26 10:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import maasserver.models.cleansave
+
+BMC_TYPE_POD = 1
+NODE_TYPE_MACHINE = 0
+
+
+def create_pod_usage(apps, schema_editor):
+    BMC = apps.get_model("maasserver", "BMC")
+    Node = apps.get_model("maasserver", "Node")
+    PhysicalBlockDevice = apps.get_model("maasserver", "PhysicalBlockDevice")
+    ISCSIBlockDevice = apps.get_model("maasserver", "ISCSIBlockDevice")
+    PodUsage = apps.get_model("maasserver", "PodUsage")
+
+    usages = {
+        pod_id: PodUsage(pod_id=pod_id)
+        for pod_id in BMC.objects.filter(bmc_type=BMC_TYPE_POD).values_list(
+            "id", flat=True
+        )
+    }
+    pod_ids = list(usages)
+    machines = (
+        Node.objects.filter(node_type=NODE_TYPE_MACHINE, bmc_id__in=pod_ids)
+        .values("bmc_id")
+        .annotate(cores=models.Sum("cpu_count"), memory=models.Sum("memory"))
+    )
+    for machine in machines:
+        usage = usages[machine["bmc_id"]]
+        usage.cores = machine["cores"]
+        usage.memory = machine["memory"]
+    physical = (
+        PhysicalBlockDevice.objects.filter(
+            node__node_type=NODE_TYPE_MACHINE, node__bmc_id__in=pod_ids
+        )
+        .values("node__bmc_id")
+        .annotate(storage=models.Sum("size"), disks=models.Count("id"))
+    )
+    for devices in physical:
+        usage = usages[devices["node__bmc_id"]]
+        usage.local_storage = devices["storage"]
+        usage.local_disks = devices["disks"]
+    iscsi = (
+        ISCSIBlockDevice.objects.filter(
+            node__node_type=NODE_TYPE_MACHINE, node__bmc_id__in=pod_ids
+        )
+        .values("node__bmc_id")
+        .annotate(storage=models.Sum("size"))
+    )
+    for devices in iscsi:
+        usages[devices["node__bmc_id"]].iscsi_storage = devices["storage"]
+    PodUsage.objects.bulk_create(usages.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maasserver", "0220_node_power_state_queried_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PodUsage",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cores", models.IntegerField(default=0)),
+                ("memory", models.IntegerField(default=0)),
+                ("local_storage", models.BigIntegerField(default=0)),
+                ("local_disks", models.IntegerField(default=0)),
+                ("iscsi_storage", models.BigIntegerField(default=0)),
+                (
+                    "pod",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="usage",
+                        to="maasserver.BMC",
+                    ),
+                ),
+            ],
+            bases=(
+                maasserver.models.cleansave.CleanSave,
+                models.Model,
+                object,
+            ),
+        ),
+        migrations.RunPython(create_pod_usage),
+    ]
@@ -60,6 +60,7 @@ __all__ = [
     "Pod",
     "PodHints",
     "PodStoragePool",
+    "PodUsage",
     "RackController",
     "RAID",
     "RBACLastSync",
@@ -172,6 +173,7 @@ from maasserver.models.partitiontable import PartitionTable
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.podhints import PodHints
 from maasserver.models.podstoragepool import PodStoragePool
+from maasserver.models.podusage import PodUsage
 from maasserver.models.rbacsync import RBACLastSync, RBACSync
 from maasserver.models.rdns import RDNS
 from maasserver.models.regioncontrollerprocess import RegionControllerProcess
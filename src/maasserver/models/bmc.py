@@ -56,6 +56,7 @@ from maasserver.models.node import get_default_zone, Machine, Node
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.podhints import PodHints
 from maasserver.models.podstoragepool import PodStoragePool
+from maasserver.models.podusage import PodUsage
 from maasserver.models.resourcepool import ResourcePool
 from maasserver.models.staticipaddress import StaticIPAddress
 from maasserver.models.subnet import Subnet
@@ -1423,6 +1424,7 @@ class Pod(BMC):
         VirtualMachine.objects.filter(bmc=self).exclude(
             identifier__in=existing_instance_names
         ).delete()
+        self.sync_usage()
 
     def sync_storage_pools(self, discovered_storage_pools):
         """Sync the storage pools for the pod."""
@@ -1585,42 +1587,45 @@ class Pod(BMC):
         hints.save()
         self.save()
 
+    def sync_usage(self):
+        """Recalculate the resources used by the machines in this pod.
+
+        The usage is kept up to date as machines change; this corrects it
+        after changes that MAAS didn't see, such as bulk updates.
+        """
+        PodUsage.objects.reconcile(pods=[self])
+
     def get_used_cores(self, machines=None):
         """Get the number of used cores in the pod.
 
-        :param machines: Deployed machines on this pod. Only used when
-            the deployed machines have already been pulled from the database
-            and no extra query needs to be performed.
+        :param machines: Deployed machines on this pod. When given, the
+            cores are totalled from these instead of read from the pod's
+            `PodUsage`.
         """
         if machines is None:
-            machines = Machine.objects.filter(bmc__id=self.id)
+            return self.usage.cores
         return sum(machine.cpu_count for machine in machines)
 
     def get_used_memory(self, machines=None):
         """Get the amount of used memory in the pod.
 
-        :param machines: Deployed machines on this pod. Only used when
-            the deployed machines have already been pulled from the database
-            and no extra query needs to be performed.
+        :param machines: Deployed machines on this pod. When given, the
+            memory is totalled from these instead of read from the pod's
+            `PodUsage`.
         """
         if machines is None:
-            machines = Machine.objects.filter(bmc__id=self.id)
+            return self.usage.memory
         return sum(machine.memory for machine in machines)
 
     def get_used_local_storage(self, machines=None):
         """Get the amount of used local storage in the pod.
 
-        :param machines: Deployed machines on this pod. Only used when
-            the deployed machines have already been pulled from the database
-            and no extra query needs to be performed.
+        :param machines: Deployed machines on this pod, with their block
+            devices prefetched. When given, the storage is totalled from
+            these instead of read from the pod's `PodUsage`.
         """
         if machines is None:
-            machines = (
-                Machine.objects.filter(bmc__id=self.id)
-                .prefetch_related("blockdevice_set__iscsiblockdevice")
-                .prefetch_related("blockdevice_set__virtualblockdevice")
-                .prefetch_related("blockdevice_set__physicalblockdevice")
-            )
+            return self.usage.local_storage
         return sum(
             blockdevice.size
             for machine in machines
@@ -1631,17 +1636,12 @@ class Pod(BMC):
     def get_used_local_disks(self, machines=None):
         """Get the amount of used local disks in the pod.
 
-        :param machines: Deployed machines on this clusted. Only used when
-            the deployed machines have already been pulled from the database
-            and no extra query needs to be performed.
+        :param machines: Deployed machines on this pod, with their block
+            devices prefetched. When given, the disks are counted from these
+            instead of read from the pod's `PodUsage`.
         """
         if machines is None:
-            machines = (
-                Machine.objects.filter(bmc__id=self.id)
-                .prefetch_related("blockdevice_set__iscsiblockdevice")
-                .prefetch_related("blockdevice_set__virtualblockdevice")
-                .prefetch_related("blockdevice_set__physicalblockdevice")
-            )
+            return self.usage.local_disks
         return len(
             [
                 blockdevice
@@ -1654,17 +1654,12 @@ class Pod(BMC):
     def get_used_iscsi_storage(self, machines=None):
         """Get the amount of used iSCSI storage in the pod.
 
-        :param machines: Deployed machines on this clusted. Only used when
-            the deployed machines have already been pulled from the database
-            and no extra query needs to be performed.
+        :param machines: Deployed machines on this pod, with their block
+            devices prefetched. When given, the storage is totalled from
+            these instead of read from the pod's `PodUsage`.
         """
         if machines is None:
-            machines = (
-                Machine.objects.filter(bmc__id=self.id)
-                .prefetch_related("blockdevice_set__iscsiblockdevice")
-                .prefetch_related("blockdevice_set__virtualblockdevice")
-                .prefetch_related("blockdevice_set__physicalblockdevice")
-            )
+            return self.usage.iscsi_storage
         return sum(
             blockdevice.size
             for machine in machines
@@ -22,7 +22,6 @@ from django.db.models import (
     BooleanField,
     CASCADE,
     CharField,
-    Count,
     ForeignKey,
     Manager,
     ManyToManyField,
@@ -77,6 +76,88 @@ def get_subnet_family(subnet):
         return None
 
 
+# The helpers below are shared by the interface models and the preseed
+# topology, which load related interfaces in different ways; they're given
+# functions that return the parents or children of an interface.
+
+
+def is_interface_enabled(iface, get_parents):
+    """Return whether `iface` is enabled.
+
+    VLANs follow their parent, and bonds and bridges are enabled when any
+    of their parents are.
+    """
+    if iface.type == INTERFACE_TYPE.VLAN:
+        parents = get_parents(iface)
+        if len(parents) > 0:
+            return is_interface_enabled(parents[0], get_parents)
+        else:
+            return True
+    elif iface.type in (INTERFACE_TYPE.BOND, INTERFACE_TYPE.BRIDGE):
+        parents = get_parents(iface)
+        if len(parents) > 0:
+            return any(
+                is_interface_enabled(parent, get_parents)
+                for parent in parents
+                if parent.id != iface.id
+            )
+        else:
+            return iface.enabled
+    else:
+        return iface.enabled
+
+
+def get_interface_effective_mtu(iface, get_children):
+    """Return the effective MTU value for `iface`."""
+    mtu = None
+    if iface.params:
+        mtu = iface.params.get("mtu", None)
+    if mtu is None and iface.vlan is not None:
+        mtu = iface.vlan.mtu
+    if mtu is None:
+        # Use default MTU for the interface when the interface has no
+        # MTU set and it is disconnected.
+        from maasserver.models.vlan import DEFAULT_MTU
+
+        mtu = DEFAULT_MTU
+    # Check if any child interface has a greater MTU. It is an invalid
+    # configuration for the parent MTU to be smaller. (LP: #1662948)
+    for child in get_children(iface):
+        mtu = max(mtu, get_interface_effective_mtu(child, get_children))
+    return mtu
+
+
+def get_vlan_interface_name(iface, is_controller, get_parent):
+    """Return the name of VLAN interface `iface`.
+
+    See `VLANInterface.get_name`. `get_parent` is only called when the name
+    is derived from the parent interface.
+    """
+    if is_controller and iface.name is not None:
+        # Controllers must preserve original VLAN interface names, since
+        # having an accurate name is important for MAAS (in order to
+        # perform actions such as providing DHCP or monitoring interfaces).
+        return iface.name
+    # This should never happen in production. (We raise a ValidationError.)
+    assert iface.vlan is not None, (
+        "Interface %d on %s (%s): Could not generate VLAN interface name; "
+        "related VLAN not found."
+    ) % (iface.id, iface.node.hostname, iface.node.system_id)
+    vid = iface.vlan.vid
+    parent = get_parent()
+    if parent is not None:
+        return "%s.%s" % (parent.name, vid)
+    return "vlan%s" % vid
+
+
+def _get_parents(iface):
+    return list(iface.parents.all())
+
+
+def _get_children(iface):
+    return [rel.child for rel in iface.children_relationships.all()]
+
+
 class InterfaceQueriesMixin(MAASQueriesMixin):
     def get_specifiers_q(self, specifiers, separator=":", **kwargs):
         """Returns a Q object for objects matching the given specifiers.
@@ -256,25 +337,35 @@ class InterfaceQueriesMixin(MAASQueriesMixin):
         visited).
         """
         query = self.filter(node=node)
-        query = query.annotate(parent_count=Count("parent_relationships"))
         query = query.prefetch_related("parent_relationships")
         query = query.order_by("name")
+        yield from self.order_parents_first(query)
+
+    @classmethod
+    def order_parents_first(cls, interfaces):
+        """Yields `interfaces` in the order `all_interfaces_parents_first`
+        visits them.
+
+        :param interfaces: Interfaces ordered by name, with their
+            `parent_relationships` already fetched.
+        """
         root_interfaces = []
         child_interfaces = OrderedDict()
-        for iface in query:
-            if iface.parent_count == 0:
+        for iface in interfaces:
+            # Cache each interface's set of immediate parents, for later
+            # comparison to the set of resolved interfaces.
+            parent_set = set(
+                interface.parent_id
+                for interface in iface.parent_relationships.all()
+            )
+            if len(parent_set) == 0:
                 root_interfaces.append(iface)
             else:
-                # Cache each interface's set of immediate parents, for later
-                # comparison to the set of resolved interfaces.
-                iface.parent_set = set(
-                    interface.parent_id
-                    for interface in iface.parent_relationships.all()
-                )
+                iface.parent_set = parent_set
                 child_interfaces[iface.id] = iface
         resolved = set()
         for iface in root_interfaces:
-            yield from self._resolve_interfaces_for_root(
+            yield from cls._resolve_interfaces_for_root(
                 iface, resolved, child_interfaces
             )
 
@@ -676,25 +767,7 @@ class Interface(CleanSave, TimestampedModel):
 
     def get_effective_mtu(self):
         """Return the effective MTU value for this interface."""
-        mtu = None
-        if self.params:
-            mtu = self.params.get("mtu", None)
-        if mtu is None and self.vlan is not None:
-            mtu = self.vlan.mtu
-        if mtu is None:
-            # Use default MTU for the interface when the interface has no
-            # MTU set and it is disconnected.
-            from maasserver.models.vlan import DEFAULT_MTU
-
-            mtu = DEFAULT_MTU
-        children = self.get_successors()
-        # Check if any child interface has a greater MTU. It is an invalid
-        # configuration for the parent MTU to be smaller. (LP: #1662948)
-        for child in children:
-            child_mtu = child.get_effective_mtu()
-            if mtu < child_mtu:
-                mtu = child_mtu
-        return mtu
+        return get_interface_effective_mtu(self, _get_children)
 
     def get_links(self):
         """Return the definition of links connected to this interface.
@@ -1733,15 +1806,7 @@ class ChildInterface(Interface):
         if self.id is None:
             return True
         else:
-            if self.parents.count() > 0:
-                is_enabled = {
-                    parent.is_enabled()
-                    for parent in self.parents.all()
-                    if parent != self
-                }
-                return True in is_enabled
-            else:
-                return self.enabled
+            return is_interface_enabled(self, _get_parents)
 
     def _validate_acceptable_parent_types(self, parent_types):
         """Raises a ValidationError if the interface has parents which are not
@@ -1889,16 +1954,6 @@ class VLANInterface(ChildInterface):
     def get_type(self):
         return INTERFACE_TYPE.VLAN
 
-    def is_enabled(self):
-        if self.id is None:
-            return True
-        else:
-            parent = self.parents.first()
-            if parent is not None:
-                return parent.is_enabled()
-            else:
-                return True
-
     def get_name(self):
         """Returns the name of this VLAN interface.
 
@@ -1917,22 +1972,15 @@ class VLANInterface(ChildInterface):
         :raises: AssertionError if the VLAN is not defined, or if the related
             VLAN is not tagged with a valid 802.1Q VLAN tag (between 1-4094).
         """
-        if self._is_related_node_a_controller() and self.name is not None:
-            # Controllers must preserve original VLAN interface names, since
-            # having an accurate name is important for MAAS (in order to
-            # perform actions such as providing DHCP or monitoring interfaces).
-            return self.name
-        # This should never happen in production. (We raise a ValidationError.)
-        assert self.vlan is not None, (
-            "Interface %d on %s (%s): Could not generate VLAN interface name; "
-            "related VLAN not found."
-        ) % (self.id, self.node.hostname, self.node.system_id)
-        vid = self.vlan.vid
-        if self.id is not None:
-            parent = self.parents.first()
-            if parent is not None:
-                return "%s.%s" % (parent.name, vid)
-        return "vlan%s" % vid
+
+        def get_parent():
+            if self.id is None:
+                return None
+            return self.parents.first()
+
+        return get_vlan_interface_name(
+            self, self._is_related_node_a_controller(), get_parent
+        )
 
     def clean(self):
         super().clean()
@@ -68,8 +68,8 @@ class LargeFile(CleanSave, TimestampedModel):
     Only unique files are stored in the database, as only one sha256 value
     can exist per file. This provides data deduplication on the file level.
 
-    Currently only used by `BootResourceFile`. This speeds up the import
-    process by only saving unique files.
+    Used by `BootResourceFile`, which speeds up the import process by only
+    saving unique files, and for large script outputs (see `ScriptResult`).
 
     :ivar sha256: Calculated SHA256 value of `content`.
     :ivar size: Current size of `content`.
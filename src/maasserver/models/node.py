@@ -77,6 +77,7 @@ from twisted.python.threadable import isInIOThread
 from maasserver import DefaultMeta, locks
 from maasserver.clusterrpc.pods import decompose_machine
 from maasserver.clusterrpc.power import (
+    get_power_command_batch,
     power_cycle,
     power_driver_check,
     power_off_node,
@@ -276,6 +277,47 @@ def get_bios_boot_from_bmc(bmc):
         return None
 
 
+def get_effective_power_parameters(
+    power_parameters, system_id, power_type, status, node_type, mac_address
+):
+    """Return effective power parameters, including any defaults.
+
+    This is `Node.get_effective_power_parameters` for callers that have
+    fetched the node's details in bulk.
+
+    :param power_parameters: The node's power parameters; this is updated
+        in place.
+    :param mac_address: The MAC address of the node's boot interface, as a
+        string, or `None`.
+    """
+    power_params = power_parameters
+    power_params.setdefault("system_id", system_id)
+    # TODO: This default ought to be in the virsh template.
+    if power_type == "virsh":
+        power_params.setdefault("power_address", "qemu://localhost/system")
+    else:
+        power_params.setdefault("power_address", "")
+    power_params.setdefault("username", "")
+    power_params.setdefault("power_id", system_id)
+    power_params.setdefault("power_driver", "")
+    power_params.setdefault("power_pass", "")
+    power_params.setdefault("power_off_mode", "")
+
+    # The "mac" parameter defaults to the node's boot interace MAC
+    # address, but only if not already set.
+    if "mac_address" not in power_params and mac_address is not None:
+        power_params["mac_address"] = mac_address
+
+    # boot_mode is something that tells the template whether this is
+    # a PXE boot or a local HD boot.
+    if status == NODE_STATUS.DEPLOYED or node_type != NODE_TYPE.MACHINE:
+        power_params["boot_mode"] = "local"
+    else:
+        power_params["boot_mode"] = "pxe"
+
+    return power_params
+
+
 def generate_node_system_id():
     """Return an unused six-digit system ID.
 
@@ -1098,7 +1140,7 @@ class Node(CleanSave, TimestampedModel):
     # for this node. This prevents other rack controllers from also checking
     # this node at the same time.
     power_state_queried = DateTimeField(
-        null=True, blank=False, default=None, editable=False
+        null=True, blank=False, default=None, editable=False, db_index=True
     )
 
     # Set when a rack controller has actually checked this power state and
@@ -3104,38 +3146,19 @@ class Node(CleanSave, TimestampedModel):
     def get_effective_power_parameters(self):
         """Return effective power parameters, including any defaults."""
         power_params = self.power_parameters.copy()
-
-        power_params.setdefault("system_id", self.system_id)
-        # TODO: This default ought to be in the virsh template.
-        if self.bmc is not None and self.bmc.power_type == "virsh":
-            power_params.setdefault("power_address", "qemu://localhost/system")
-        else:
-            power_params.setdefault("power_address", "")
-        power_params.setdefault("username", "")
-        power_params.setdefault("power_id", self.system_id)
-        power_params.setdefault("power_driver", "")
-        power_params.setdefault("power_pass", "")
-        power_params.setdefault("power_off_mode", "")
-
-        # The "mac" parameter defaults to the node's boot interace MAC
-        # address, but only if not already set.
+        mac_address = None
         if "mac_address" not in power_params:
             boot_interface = self.get_boot_interface()
             if boot_interface is not None:
-                mac = boot_interface.mac_address.get_raw()
-                power_params["mac_address"] = mac
-
-        # boot_mode is something that tells the template whether this is
-        # a PXE boot or a local HD boot.
-        if (
-            self.status == NODE_STATUS.DEPLOYED
-            or self.node_type != NODE_TYPE.MACHINE
-        ):
-            power_params["boot_mode"] = "local"
-        else:
-            power_params["boot_mode"] = "pxe"
-
-        return power_params
+                mac_address = boot_interface.mac_address.get_raw()
+        return get_effective_power_parameters(
+            power_params,
+            self.system_id,
+            self.power_type,
+            self.status,
+            self.node_type,
+            mac_address,
+        )
 
     def get_effective_power_info(self):
         """Get information on how to control this node's power.
@@ -5745,6 +5768,17 @@ class Node(CleanSave, TimestampedModel):
         return d
 
     def _power_control_node(self, defer, power_method, power_info):
+        # Inside `batch_power_commands` the power command is sent along with
+        # those of the other nodes powered by the same rack controller, and
+        # the post-commit hook in `defer` hands over to the batch rather than
+        # waiting for the command to be sent.
+        batch = get_power_command_batch()
+        if batch is not None and batch.accepts(power_method):
+            defer = batch.hand_over(self.system_id, defer)
+            power_method = batch.batched(power_method)
+        else:
+            batch = None
+
         # Check if the BMC is accessible. If not we need to do some work to
         # make sure we can determine which rack controller can power
         # control this node.
@@ -5803,9 +5837,16 @@ class Node(CleanSave, TimestampedModel):
                 return getClientFromIdentifiers(fallback_idents)
 
             def cb_check_power_driver(client, power_info):
-                d = Node.confirm_power_driver_operable(
-                    client, power_info.power_type, client.ident
-                )
+                if batch is None:
+                    d = Node.confirm_power_driver_operable(
+                        client, power_info.power_type, client.ident
+                    )
+                else:
+                    d = batch.check_power_driver(
+                        client,
+                        power_info.power_type,
+                        Node.confirm_power_driver_operable,
+                    )
                 d.addCallback(lambda _: client)
                 return d
 
@@ -5827,6 +5868,8 @@ class Node(CleanSave, TimestampedModel):
 
         # Power control the node.
         defer.addCallback(cb_power_control)
+        if batch is not None:
+            defer.addErrback(batch.discard, self.system_id)
         return defer
 
     @classmethod
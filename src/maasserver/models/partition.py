@@ -45,6 +45,64 @@ def get_max_mbr_partition_size():
     )
 
 
+def get_partition_number_in_table(
+    idx, partition_count, table_type, block_device, get_boot_details
+):
+    """Return the number of a partition in its partition table.
+
+    This is shared by `Partition.get_partition_number` and the preseed
+    topology, which load what's needed in different ways.
+
+    :param idx: The index of the partition in the table, ordered by ID.
+    :param partition_count: The number of partitions in the table.
+    :param table_type: The `PARTITION_TABLE_TYPE` of the table.
+    :param block_device: The block device the table is on.
+    :param get_boot_details: Called for GPT tables only, returning the
+        architecture, boot disk, BIOS boot method and VMFS6 layout block
+        device (or `None`) of the node.
+    """
+    if table_type == PARTITION_TABLE_TYPE.GPT:
+        # In some instances the first partition is skipped because it
+        # is used by the machine architecture for a specific reason.
+        #   * ppc64el - reserved for prep partition
+        #   * amd64 (not UEFI) - reserved for bios_grub partition
+        arch, boot_disk, bios_boot_method, vmfs_bd = get_boot_details()
+        if vmfs_bd is not None:
+            # VMware ESXi is a DD image but MAAS allows partitions to
+            # be added to the end of the disk as well as resize the
+            # datastore partition. The EFI partition is already in the
+            # image so there is no reason to account for it.
+            if vmfs_bd.id == block_device.id and idx >= 3:
+                # VMware ESXi skips the 4th partition.
+                return idx + 2
+            else:
+                return idx + 1
+        elif (
+            arch == "ppc64el"
+            and boot_disk is not None
+            and block_device.id == boot_disk.id
+        ):
+            return idx + 2
+        elif arch == "amd64" and bios_boot_method != "uefi":
+            if block_device.type == "physical":
+                # Delay the `type` check because it can cause a query. Only
+                # physical block devices get the bios_grub partition.
+                return idx + 2
+            else:
+                return idx + 1
+        else:
+            return idx + 1
+    elif table_type == PARTITION_TABLE_TYPE.MBR:
+        # If more than 4 partitions then the 4th partition number is
+        # skipped because that is used for the extended partition.
+        if partition_count > 4 and idx > 2:
+            return idx + 2
+        else:
+            return idx + 1
+    else:
+        raise ValueError("Unknown partition table type.")
+
+
 class PartitionManager(Manager):
     """Manager for `Partition` class."""
 
@@ -208,53 +266,28 @@ class Partition(CleanSave, TimestampedModel):
         # Avoid circular imports.
         from maasserver.storage_layouts import VMFS6StorageLayout
 
+        def get_boot_details():
+            node = self.get_node()
+            arch, _ = node.split_arch()
+            vmfs_layout = VMFS6StorageLayout(node)
+            return (
+                arch,
+                node.get_boot_disk(),
+                node.get_bios_boot_method(),
+                vmfs_layout.is_layout(),
+            )
+
         # Sort manually instead of with `order_by`, this will prevent django
         # from making a query if the partitions are already cached.
         partitions_in_table = self.partition_table.partitions.all()
         partitions_in_table = sorted(partitions_in_table, key=attrgetter("id"))
-        idx = partitions_in_table.index(self)
-        if self.partition_table.table_type == PARTITION_TABLE_TYPE.GPT:
-            # In some instances the first partition is skipped because it
-            # is used by the machine architecture for a specific reason.
-            #   * ppc64el - reserved for prep partition
-            #   * amd64 (not UEFI) - reserved for bios_grub partition
-            node = self.get_node()
-            arch, _ = node.split_arch()
-            boot_disk = node.get_boot_disk()
-            bios_boot_method = node.get_bios_boot_method()
-            block_device = self.partition_table.block_device
-            vmfs_layout = VMFS6StorageLayout(self.get_node())
-            vmfs_bd = vmfs_layout.is_layout()
-            if vmfs_bd is not None:
-                # VMware ESXi is a DD image but MAAS allows partitions to
-                # be added to the end of the disk as well as resize the
-                # datastore partition. The EFI partition is already in the
-                # image so there is no reason to account for it.
-                if vmfs_bd.id == block_device.id and idx >= 3:
-                    # VMware ESXi skips the 4th partition.
-                    return idx + 2
-                else:
-                    return idx + 1
-            elif arch == "ppc64el" and block_device.id == boot_disk.id:
-                return idx + 2
-            elif arch == "amd64" and bios_boot_method != "uefi":
-                if block_device.type == "physical":
-                    # Delay the `type` check because it can cause a query. Only
-                    # physical block devices get the bios_grub partition.
-                    return idx + 2
-                else:
-                    return idx + 1
-            else:
-                return idx + 1
-        elif self.partition_table.table_type == PARTITION_TABLE_TYPE.MBR:
-            # If more than 4 partitions then the 4th partition number is
-            # skipped because that is used for the extended partition.
-            if len(partitions_in_table) > 4 and idx > 2:
-                return idx + 2
-            else:
-                return idx + 1
-        else:
-            raise ValueError("Unknown partition table type.")
+        return get_partition_number_in_table(
+            partitions_in_table.index(self),
+            len(partitions_in_table),
+            self.partition_table.table_type,
+            self.partition_table.block_device,
+            get_boot_details,
+        )
 
     def save(self, *args, **kwargs):
         """Save partition."""
@@ -0,0 +1,160 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Model that holds the resources used by the machines in a Pod."""
+
+
+from django.db.models import (
+    BigIntegerField,
+    CASCADE,
+    Count,
+    F,
+    IntegerField,
+    Manager,
+    Model,
+    OneToOneField,
+    Sum,
+)
+
+from maasserver import DefaultMeta
+from maasserver.enum import NODE_TYPE
+from maasserver.models.cleansave import CleanSave
+
+# The resources recorded for each pod.
+USAGE_FIELDS = (
+    "cores",
+    "memory",
+    "local_storage",
+    "local_disks",
+    "iscsi_storage",
+)
+
+
+class PodUsageManager(Manager):
+    """Manager for `PodUsage`."""
+
+    def add(self, deltas, pod_id=None, node_id=None):
+        """Add `deltas` to the usage of a pod.
+
+        :param deltas: Dictionary mapping names in `USAGE_FIELDS` to the
+            amount to add; negative amounts are subtracted.
+        :param pod_id: The ID of the pod.
+        :param node_id: The ID of a machine; its pod is updated, if it has
+            one.
+        """
+        deltas = {
+            name: F(name) + delta
+            for name, delta in deltas.items()
+            if delta != 0
+        }
+        if len(deltas) == 0:
+            return
+        if pod_id is not None:
+            usages = self.filter(pod_id=pod_id)
+        elif node_id is not None:
+            usages = self.filter(
+                pod__node__id=node_id, pod__node__node_type=NODE_TYPE.MACHINE
+            )
+        else:
+            return
+        usages.update(**deltas)
+
+    def reconcile(self, pods=None):
+        """Recalculate the usage of `pods`, or of every pod.
+
+        The machines of the pods, and their block devices, are totalled with
+        a query for each; the usage of a pod is only saved when it differs.
+
+        :param pods: `Pod` instances; their usage is updated in place.
+        :return: A list of the `PodUsage` instances that were corrected.
+        """
+        # Circular imports.
+        from maasserver.models.iscsiblockdevice import ISCSIBlockDevice
+        from maasserver.models.node import Machine
+        from maasserver.models.physicalblockdevice import (
+            PhysicalBlockDevice,
+        )
+
+        usages = self.all()
+        if pods is not None:
+            usages = usages.filter(pod_id__in=[pod.id for pod in pods])
+        usages = {usage.pod_id: usage for usage in usages}
+        pod_ids = list(usages)
+        totals = {pod_id: dict.fromkeys(USAGE_FIELDS, 0) for pod_id in pod_ids}
+        machines = (
+            Machine.objects.filter(bmc_id__in=pod_ids)
+            .values("bmc_id")
+            .annotate(cores=Sum("cpu_count"), memory=Sum("memory"))
+        )
+        for machine in machines:
+            totals[machine["bmc_id"]].update(
+                cores=machine["cores"], memory=machine["memory"]
+            )
+        physical = (
+            PhysicalBlockDevice.objects.filter(
+                node__bmc_id__in=pod_ids, node__node_type=NODE_TYPE.MACHINE
+            )
+            .values("node__bmc_id")
+            .annotate(storage=Sum("size"), disks=Count("id"))
+        )
+        for devices in physical:
+            totals[devices["node__bmc_id"]].update(
+                local_storage=devices["storage"], local_disks=devices["disks"]
+            )
+        iscsi = (
+            ISCSIBlockDevice.objects.filter(
+                node__bmc_id__in=pod_ids, node__node_type=NODE_TYPE.MACHINE
+            )
+            .values("node__bmc_id")
+            .annotate(storage=Sum("size"))
+        )
+        for devices in iscsi:
+            totals[devices["node__bmc_id"]].update(
+                iscsi_storage=devices["storage"]
+            )
+
+        corrected = []
+        for pod_id, usage in usages.items():
+            changed = {
+                name: total
+                for name, total in totals[pod_id].items()
+                if getattr(usage, name) != total
+            }
+            if len(changed) > 0:
+                self.filter(id=usage.id).update(**changed)
+                for name, total in changed.items():
+                    setattr(usage, name, total)
+                corrected.append(usage)
+        if pods is not None:
+            for pod in pods:
+                if pod.id in usages:
+                    pod.usage = usages[pod.id]
+        return corrected
+
+
+class PodUsage(CleanSave, Model):
+    """Resources used by the machines in a pod.
+
+    This is kept up to date as machines and their block devices change, so
+    that it can be read without totalling the pod's machines; see
+    `maasserver.models.signals.podusage`. Changes that bypass signals are
+    corrected when the pod is synced and periodically by
+    `PodUsageReconciliationService`.
+    """
+
+    class Meta(DefaultMeta):
+        """Needed for South to recognize this model."""
+
+    objects = PodUsageManager()
+
+    pod = OneToOneField("BMC", related_name="usage", on_delete=CASCADE)
+
+    cores = IntegerField(default=0)
+
+    memory = IntegerField(default=0)  # MiB
+
+    local_storage = BigIntegerField(default=0)  # Bytes
+
+    local_disks = IntegerField(default=0)
+
+    iscsi_storage = BigIntegerField(default=0)  # Bytes
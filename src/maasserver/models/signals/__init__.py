@@ -19,6 +19,7 @@ __all__ = [
     "nodes",
     "partitions",
     "podhints",
+    "podusage",
     "power",
     "scriptresult",
     "services",
@@ -42,6 +43,7 @@ from maasserver.models.signals import (
     nodes,
     partitions,
     podhints,
+    podusage,
     power,
     scriptresult,
     services,
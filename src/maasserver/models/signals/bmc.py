@@ -7,7 +7,7 @@
 from django.db.models.signals import post_delete, post_save, pre_delete
 
 from maasserver.enum import BMC_TYPE
-from maasserver.models import BMC, Pod, PodHints
+from maasserver.models import BMC, Pod, PodHints, PodUsage
 from maasserver.utils.signals import SignalsManager
 
 BMC_CLASSES = [BMC, Pod]
@@ -55,5 +55,20 @@ def create_pod_hints(sender, instance, created, **kwargs):
 for klass in BMC_CLASSES:
     signals.watch(post_save, create_pod_hints, sender=klass)
 
+
+def create_pod_usage(sender, instance, created, **kwargs):
+    """Create `PodUsage` when `Pod` is created."""
+    if instance.bmc_type == BMC_TYPE.POD:
+        _, usage_created = PodUsage.objects.get_or_create(pod_id=instance.id)
+        if usage_created and not created:
+            # A BMC that controls machines has become a pod.
+            PodUsage.objects.reconcile(pods=[instance])
+    else:
+        PodUsage.objects.filter(pod_id=instance.id).delete()
+
+
+for klass in BMC_CLASSES:
+    signals.watch(post_save, create_pod_usage, sender=klass)
+
 # Enable all signals by default.
 signals.enable()
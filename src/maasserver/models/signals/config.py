@@ -15,9 +15,24 @@ def dns_kms_setting_changed(sender, instance, created, **kwargs):
     dns_kms_setting_changed()
 
 
+def external_auth_setting_changed(sender, instance, created, **kwargs):
+    from maasserver.middleware import external_auth_info_cache
+
+    external_auth_info_cache.clear()
+
+
 # Changes to windows_kms_host.
 signals.watch_config(dns_kms_setting_changed, "windows_kms_host")
 
+# Changes to the external authentication settings.
+for name in (
+    "external_auth_url",
+    "external_auth_domain",
+    "external_auth_admin_group",
+    "rbac_url",
+):
+    signals.watch_config(external_auth_setting_changed, name)
+
 
 # Enable all signals by default.
 signals.enable()
@@ -0,0 +1,164 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Keep the resources used in pods up to date.
+
+The resources that a node or block device uses in a pod are recorded on the
+instance when it's loaded and after it's saved. When it's saved or deleted,
+the difference is added to the pod's `PodUsage`.
+"""
+
+
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_init, post_save
+
+from maasserver.enum import NODE_TYPE
+from maasserver.models import (
+    Controller,
+    Device,
+    ISCSIBlockDevice,
+    Machine,
+    Node,
+    PhysicalBlockDevice,
+    PodUsage,
+    RackController,
+    RegionController,
+)
+from maasserver.utils.signals import SignalsManager
+
+NODE_CLASSES = [
+    Node,
+    Machine,
+    Device,
+    Controller,
+    RackController,
+    RegionController,
+]
+
+NODE_FIELDS = {"bmc_id", "node_type", "cpu_count", "memory"}
+
+BLOCK_DEVICE_FIELDS = {"node_id", "size"}
+
+signals = SignalsManager()
+
+
+def get_node_usage(node):
+    """Return the pod that `node` uses, and the resources it uses there."""
+    if not NODE_FIELDS.issubset(node.__dict__):
+        # Loading deferred fields would cost a query for every node.
+        return None
+    elif node.bmc_id is None or node.node_type != NODE_TYPE.MACHINE:
+        return (None, {})
+    else:
+        return (node.bmc_id, {"cores": node.cpu_count, "memory": node.memory})
+
+
+def get_block_device_usage(block_device):
+    """Return the machine that uses `block_device`, and the resources it
+    uses in that machine's pod."""
+    if not BLOCK_DEVICE_FIELDS.issubset(block_device.__dict__):
+        return None
+    elif isinstance(block_device, PhysicalBlockDevice):
+        usage = {"local_storage": block_device.size, "local_disks": 1}
+    else:
+        usage = {"iscsi_storage": block_device.size}
+    return (block_device.node_id, usage)
+
+
+def get_deltas(old_usage, new_usage):
+    """Return how the usage of each pod, machine or other key changes."""
+    deltas = {}
+    if old_usage is not None:
+        key, usage = old_usage
+        deltas.setdefault(key, Counter()).subtract(usage)
+    if new_usage is not None:
+        key, usage = new_usage
+        deltas.setdefault(key, Counter()).update(usage)
+    deltas.pop(None, None)
+    return deltas
+
+
+def record_node_usage(sender, instance, **kwargs):
+    instance._pod_usage = get_node_usage(instance)
+
+
+def update_pod_usage_for_node(sender, instance, created, **kwargs):
+    """Update the usage of the pods a machine was in and is now in."""
+    old_usage = None if created else getattr(instance, "_pod_usage", None)
+    new_usage = get_node_usage(instance)
+    if old_usage is None and not created:
+        # What the node used before is unknown.
+        instance._pod_usage = new_usage
+        return
+    for pod_id, deltas in get_deltas(old_usage, new_usage).items():
+        PodUsage.objects.add(deltas, pod_id=pod_id)
+    if not created and new_usage is not None and old_usage[0] != new_usage[0]:
+        # The storage of the machine moves with it.
+        storage = get_storage_usage(instance)
+        if old_usage[0] is not None:
+            PodUsage.objects.add(
+                {name: -amount for name, amount in storage.items()},
+                pod_id=old_usage[0],
+            )
+        if new_usage[0] is not None:
+            PodUsage.objects.add(storage, pod_id=new_usage[0])
+    instance._pod_usage = new_usage
+
+
+def remove_pod_usage_for_node(sender, instance, **kwargs):
+    """Remove the cores and memory of a deleted machine from its pod.
+
+    The storage is removed as its block devices are deleted.
+    """
+    old_usage = getattr(instance, "_pod_usage", None)
+    for pod_id, deltas in get_deltas(old_usage, None).items():
+        PodUsage.objects.add(deltas, pod_id=pod_id)
+
+
+def get_storage_usage(node):
+    """Return the storage used by the block devices of `node`."""
+    usage = Counter()
+    for block_device in PhysicalBlockDevice.objects.filter(node=node):
+        usage.update(get_block_device_usage(block_device)[1])
+    for block_device in ISCSIBlockDevice.objects.filter(node=node):
+        usage.update(get_block_device_usage(block_device)[1])
+    return usage
+
+
+for klass in NODE_CLASSES:
+    signals.watch(post_init, record_node_usage, sender=klass)
+    signals.watch(post_save, update_pod_usage_for_node, sender=klass)
+    signals.watch(post_delete, remove_pod_usage_for_node, sender=klass)
+
+
+def record_block_device_usage(sender, instance, **kwargs):
+    instance._pod_usage = get_block_device_usage(instance)
+
+
+def update_pod_usage_for_block_device(sender, instance, created, **kwargs):
+    """Update the usage of the pods of the machines a block device was in
+    and is now in."""
+    old_usage = None if created else getattr(instance, "_pod_usage", None)
+    new_usage = get_block_device_usage(instance)
+    if old_usage is not None or created:
+        for node_id, deltas in get_deltas(old_usage, new_usage).items():
+            PodUsage.objects.add(deltas, node_id=node_id)
+    instance._pod_usage = new_usage
+
+
+def remove_pod_usage_for_block_device(sender, instance, **kwargs):
+    """Remove the storage of a deleted block device from its pod."""
+    old_usage = getattr(instance, "_pod_usage", None)
+    for node_id, deltas in get_deltas(old_usage, None).items():
+        PodUsage.objects.add(deltas, node_id=node_id)
+
+
+for klass in [PhysicalBlockDevice, ISCSIBlockDevice]:
+    signals.watch(post_init, record_block_device_usage, sender=klass)
+    signals.watch(post_save, update_pod_usage_for_block_device, sender=klass)
+    signals.watch(post_delete, remove_pod_usage_for_block_device, sender=klass)
+
+
+# Enable all signals by default.
+signals.enable()
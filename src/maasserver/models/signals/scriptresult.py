@@ -4,7 +4,9 @@
 """Emit ScriptResult status transition event."""
 
 
-from maasserver.models import Event
+from django.db.models.signals import post_delete
+
+from maasserver.models import Event, LargeFile
 from maasserver.preseed import CURTIN_INSTALL_LOG
 from maasserver.utils.signals import SignalsManager
 from metadataserver.enum import (
@@ -14,7 +16,7 @@ from metadataserver.enum import (
     SCRIPT_STATUS_FAILED,
     SCRIPT_STATUS_RUNNING,
 )
-from metadataserver.models.scriptresult import ScriptResult
+from metadataserver.models.scriptresult import OUTPUT_FIELDS, ScriptResult
 from provisioningserver.events import EVENT_TYPES
 
 signals = SignalsManager()
@@ -90,12 +92,27 @@ def emit_script_result_status_transition_event(
             )
 
 
+def delete_output_files(sender, instance, **kwargs):
+    """Delete the `LargeFile`s holding the outputs of a deleted result.
+
+    Files still used by other results are kept, see `LargeFile.delete`.
+    """
+    largefile_ids = {
+        getattr(instance, "%s_file_id" % name) for name in OUTPUT_FIELDS
+    }
+    largefile_ids.discard(None)
+    if len(largefile_ids) > 0:
+        for largefile in LargeFile.objects.filter(id__in=largefile_ids):
+            largefile.delete()
+
+
 signals.watch_fields(
     emit_script_result_status_transition_event,
     ScriptResult,
     ["status"],
     delete=False,
 )
+signals.watch(post_delete, delete_output_files, ScriptResult)
 
 # Enable all signals by default.
 signals.enable()
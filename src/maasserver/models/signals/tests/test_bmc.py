@@ -11,6 +11,7 @@ handle cleaning up orphaned IPs after BMC model instance deletion.
 
 from maasserver.enum import BMC_TYPE
 from maasserver.models.podhints import PodHints
+from maasserver.models.podusage import PodUsage
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
@@ -35,3 +36,25 @@ class TestCreatePodHints(MAASServerTestCase):
         self.assertRaises(
             PodHints.DoesNotExist, lambda: reload_object(pod).hints
         )
+
+
+class TestCreatePodUsage(MAASServerTestCase):
+    def test_creates_usage_for_pod(self):
+        pod = factory.make_Pod()
+        self.assertEqual(0, reload_object(pod).usage.cores)
+
+    def test_creates_usage_bmc_converted_to_pod(self):
+        bmc = factory.make_BMC()
+        factory.make_Node(bmc=bmc, cpu_count=4)
+        bmc.bmc_type = BMC_TYPE.POD
+        bmc.save()
+        self.assertEqual(4, reload_object(bmc).usage.cores)
+
+    def test_deletes_usage_when_chassis_converted_to_bmc(self):
+        pod = factory.make_Pod()
+        pod = pod.as_bmc()
+        pod.bmc_type = BMC_TYPE.BMC
+        pod.save()
+        self.assertRaises(
+            PodUsage.DoesNotExist, lambda: reload_object(pod).usage
+        )
@@ -4,6 +4,7 @@
 """Test the behaviour of config signals."""
 
 
+from maasserver.middleware import external_auth_info_cache
 from maasserver.models import domain as domain_module
 from maasserver.models.config import Config
 from maasserver.testing.testcase import MAASServerTestCase
@@ -17,3 +18,8 @@ class TestConfigSignals(MAASServerTestCase):
         )
         Config.objects.set_config("windows_kms_host", "8.8.8.8")
         self.assertThat(dns_kms_setting_changed, MockCalledOnceWith())
+
+    def test_changing_external_auth_setting_clears_cache(self):
+        clear = self.patch(external_auth_info_cache, "clear")
+        Config.objects.set_config("rbac_url", "https://rbac.example.com")
+        self.assertThat(clear, MockCalledOnceWith())
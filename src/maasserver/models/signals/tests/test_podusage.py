@@ -0,0 +1,149 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Test the signals that keep `PodUsage` up to date."""
+
+
+from maasserver.enum import NODE_TYPE
+from maasserver.models import Node
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+
+
+class TestPodUsageSignals(MAASServerTestCase):
+    def get_usage(self, pod):
+        usage = reload_object(pod).usage
+        return {
+            "cores": usage.cores,
+            "memory": usage.memory,
+            "local_storage": usage.local_storage,
+            "local_disks": usage.local_disks,
+            "iscsi_storage": usage.iscsi_storage,
+        }
+
+    def make_machine(self, pod, **kwargs):
+        return factory.make_Node(
+            bmc=pod, cpu_count=4, memory=2048, with_boot_disk=False, **kwargs
+        )
+
+    def test_machine_created(self):
+        pod = factory.make_Pod()
+        self.make_machine(pod)
+        self.assertEqual(
+            {
+                "cores": 4,
+                "memory": 2048,
+                "local_storage": 0,
+                "local_disks": 0,
+                "iscsi_storage": 0,
+            },
+            self.get_usage(pod),
+        )
+
+    def test_device_created(self):
+        pod = factory.make_Pod()
+        self.make_machine(pod, node_type=NODE_TYPE.DEVICE)
+        self.assertEqual(0, self.get_usage(pod)["cores"])
+
+    def test_machine_changed(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        machine = reload_object(machine)
+        machine.cpu_count = 2
+        machine.memory = 4096
+        machine.save()
+        usage = self.get_usage(pod)
+        self.assertEqual((2, 4096), (usage["cores"], usage["memory"]))
+
+    def test_machine_deleted(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        factory.make_PhysicalBlockDevice(node=machine, size=1024 ** 3)
+        self.make_machine(pod)
+        machine.delete()
+        usage = self.get_usage(pod)
+        self.assertEqual(
+            (4, 2048, 0, 0),
+            (
+                usage["cores"],
+                usage["memory"],
+                usage["local_storage"],
+                usage["local_disks"],
+            ),
+        )
+
+    def test_machine_moved_between_pods(self):
+        pod = factory.make_Pod()
+        other_pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        factory.make_PhysicalBlockDevice(node=machine, size=1024 ** 3)
+        machine.bmc = other_pod
+        machine.save()
+        self.assertEqual(0, self.get_usage(pod)["local_storage"])
+        usage = self.get_usage(other_pod)
+        self.assertEqual(
+            (4, 1024 ** 3), (usage["cores"], usage["local_storage"])
+        )
+
+    def test_machine_converted_to_device(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        factory.make_ISCSIBlockDevice(node=machine, size=1024 ** 3)
+        machine.node_type = NODE_TYPE.DEVICE
+        machine.save()
+        usage = self.get_usage(pod)
+        self.assertEqual((0, 0), (usage["cores"], usage["iscsi_storage"]))
+
+    def test_ignores_nodes_with_deferred_fields(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        machine = Node.objects.only("id", "hostname").get(id=machine.id)
+        machine.hostname = factory.make_name("host")
+        machine.save()
+        self.assertEqual(4, self.get_usage(pod)["cores"])
+
+    def test_block_devices_created(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        factory.make_PhysicalBlockDevice(node=machine, size=1024 ** 3)
+        factory.make_PhysicalBlockDevice(node=machine, size=1024 ** 3)
+        factory.make_ISCSIBlockDevice(node=machine, size=2 * 1024 ** 3)
+        usage = self.get_usage(pod)
+        self.assertEqual(
+            (2 * 1024 ** 3, 2, 2 * 1024 ** 3),
+            (
+                usage["local_storage"],
+                usage["local_disks"],
+                usage["iscsi_storage"],
+            ),
+        )
+
+    def test_block_device_resized(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        block_device = factory.make_PhysicalBlockDevice(
+            node=machine, size=1024 ** 3
+        )
+        block_device.size = 3 * 1024 ** 3
+        block_device.save()
+        usage = self.get_usage(pod)
+        self.assertEqual(
+            (3 * 1024 ** 3, 1),
+            (usage["local_storage"], usage["local_disks"]),
+        )
+
+    def test_block_device_deleted(self):
+        pod = factory.make_Pod()
+        machine = self.make_machine(pod)
+        block_device = factory.make_ISCSIBlockDevice(
+            node=machine, size=1024 ** 3
+        )
+        block_device.delete()
+        self.assertEqual(0, self.get_usage(pod)["iscsi_storage"])
+
+    def test_block_device_of_machine_outside_pod(self):
+        pod = factory.make_Pod()
+        machine = factory.make_Node(with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(node=machine)
+        self.assertEqual(0, self.get_usage(pod)["local_disks"])
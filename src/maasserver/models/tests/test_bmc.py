@@ -50,6 +50,7 @@ from maasserver.models.iscsiblockdevice import (
 )
 from maasserver.models.node import Machine
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
+from maasserver.models.podusage import PodUsage
 from maasserver.models.resourcepool import ResourcePool
 from maasserver.models.staticipaddress import StaticIPAddress
 from maasserver.models.virtualmachine import (
@@ -66,6 +67,7 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import reload_object
 from maasserver.utils.threads import deferToDatabase
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnceWith
 from provisioningserver.drivers.pod import (
     BlockDeviceType,
@@ -1972,6 +1974,13 @@ class TestPod(MAASServerTestCase):
         pod.sync(discovered, factory.make_User())
         self.assertIsNone(reload_object(machine))
 
+    def test_sync_pod_reconciles_usage(self):
+        pod = factory.make_Pod()
+        PodUsage.objects.filter(pod=pod).update(cores=4)
+        discovered = self.make_discovered_pod(machines=[])
+        pod.sync(discovered, factory.make_User())
+        self.assertEqual(0, pod.get_used_cores())
+
     def test_sync_moves_machine_under_pod(self):
         pod = factory.make_Pod()
         machine = factory.make_Node(interface=True)
@@ -2547,6 +2556,56 @@ class TestPod(MAASServerTestCase):
             factory.make_ISCSIBlockDevice(node=node, size=storage)
         self.assertEquals(total_storage, pod.get_used_iscsi_storage())
 
+    def test_get_used_resources_without_queries(self):
+        pod = factory.make_Pod()
+        for _ in range(3):
+            node = factory.make_Node(bmc=pod, with_boot_disk=False)
+            factory.make_PhysicalBlockDevice(node=node)
+            factory.make_ISCSIBlockDevice(node=node)
+        pod = Pod.objects.select_related("usage").get(id=pod.id)
+        count, _ = count_queries(
+            lambda: (
+                pod.get_used_cores(),
+                pod.get_used_memory(),
+                pod.get_used_local_storage(),
+                pod.get_used_local_disks(),
+                pod.get_used_iscsi_storage(),
+            )
+        )
+        self.assertEqual(0, count)
+
+    def test_get_used_resources_of_machines(self):
+        pod = factory.make_Pod()
+        node = factory.make_Node(
+            bmc=pod, cpu_count=2, memory=1024, with_boot_disk=False
+        )
+        factory.make_PhysicalBlockDevice(node=node, size=1024 ** 3)
+        factory.make_ISCSIBlockDevice(node=node, size=2 * 1024 ** 3)
+        # Resources of the given machines are totalled, not read from the
+        # pod's usage.
+        PodUsage.objects.filter(pod=pod).delete()
+        machines = Machine.objects.filter(id=node.id).prefetch_related(
+            "blockdevice_set__iscsiblockdevice",
+            "blockdevice_set__physicalblockdevice",
+        )
+        self.assertEqual(
+            (2, 1024, 1024 ** 3, 1, 2 * 1024 ** 3),
+            (
+                pod.get_used_cores(machines),
+                pod.get_used_memory(machines),
+                pod.get_used_local_storage(machines),
+                pod.get_used_local_disks(machines),
+                pod.get_used_iscsi_storage(machines),
+            ),
+        )
+
+    def test_sync_usage(self):
+        pod = factory.make_Pod()
+        factory.make_Node(bmc=pod, cpu_count=4)
+        PodUsage.objects.filter(pod=pod).update(cores=0)
+        pod.sync_usage()
+        self.assertEqual(4, pod.get_used_cores())
+
     def test_sync_machine_memory(self):
         pod = factory.make_Pod(pod_type="lxd")
         machine = factory.make_Machine(memory=1234)
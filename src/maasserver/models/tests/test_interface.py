@@ -54,6 +54,7 @@ from maasserver.models.interface import (
     BridgeInterface,
     Interface,
     InterfaceRelationship,
+    is_interface_enabled,
     PhysicalInterface,
     UnknownInterface,
     VLANInterface,
@@ -1774,6 +1775,25 @@ class InterfaceMTUTest(MAASServerTestCase):
         self.assertEquals([parent.id], [p.id for p in bridge.parents.all()])
 
 
+class TestIsInterfaceEnabled(MAASServerTestCase):
+    def test_uses_given_parents(self):
+        node = factory.make_Node()
+        eth0 = factory.make_Interface(node=node)
+        eth1 = factory.make_Interface(node=node, enabled=False)
+        bond = factory.make_Interface(
+            INTERFACE_TYPE.BOND, node=node, parents=[eth0, eth1]
+        )
+        self.assertTrue(is_interface_enabled(bond, lambda iface: [eth0]))
+        self.assertFalse(is_interface_enabled(bond, lambda iface: [eth1]))
+
+    def test_vlan_follows_first_parent(self):
+        node = factory.make_Node()
+        eth0 = factory.make_Interface(node=node, enabled=False)
+        vlan = factory.make_Interface(INTERFACE_TYPE.VLAN, parents=[eth0])
+        self.assertFalse(is_interface_enabled(vlan, lambda iface: [eth0]))
+        self.assertTrue(is_interface_enabled(vlan, lambda iface: []))
+
+
 class VLANInterfaceTest(MAASServerTestCase):
     def test_vlan_has_generated_name(self):
         name = factory.make_name("eth", size=2)
@@ -49,7 +49,9 @@ from maasserver.clusterrpc.driver_parameters import get_driver_types
 from maasserver.clusterrpc.power import (
     power_cycle,
     power_off_node,
+    power_on_node,
     power_query,
+    PowerCommandBatch,
 )
 from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
 from maasserver.enum import (
@@ -9829,6 +9831,109 @@ class TestNode_PostCommit_PowerControl(MAASTransactionServerTestCase):
             none_routable_racks,
         )
 
+    def patch_power_control(self, node, rack_controller):
+        client = Mock()
+        client.ident = rack_controller.system_id
+        self.patch(
+            node_module, "getClientFromIdentifiers"
+        ).return_value = defer.succeed(client)
+        self.patch(node_module, "getAllClients").return_value = [client]
+        self.patch(
+            Node, "confirm_power_driver_operable"
+        ).return_value = defer.succeed(None)
+        self.patch(node.bmc, "is_accessible").return_value = True
+        return client
+
+    def patch_power_command_batch(self):
+        batch = PowerCommandBatch()
+        self.patch(node_module, "get_power_command_batch").return_value = batch
+        self.patch(batch, "submit").return_value = defer.succeed(None)
+        return batch
+
+    @wait_for_reactor
+    @defer.inlineCallbacks
+    def test_submits_power_command_to_batch(self):
+        d = self.patch_post_commit()
+        rack_controller = yield deferToDatabase(self.make_rack_controller)
+        node, power_info = yield deferToDatabase(
+            self.make_node, layer2_rack=rack_controller
+        )
+        client = self.patch_power_control(node, rack_controller)
+        batch = self.patch_power_command_batch()
+
+        yield node._power_control_node(d, power_on_node, power_info)
+
+        self.assertThat(
+            batch.submit,
+            MockCalledOnceWith(
+                power_on_node,
+                client,
+                node.system_id,
+                node.hostname,
+                power_info,
+            ),
+        )
+        self.assertIn(node.system_id, batch.nodes)
+
+    @wait_for_reactor
+    @defer.inlineCallbacks
+    def test_checks_power_driver_through_batch(self):
+        d = self.patch_post_commit()
+        rack_controller = yield deferToDatabase(self.make_rack_controller)
+        node, power_info = yield deferToDatabase(
+            self.make_node, layer2_rack=rack_controller
+        )
+        client = self.patch_power_control(node, rack_controller)
+        batch = self.patch_power_command_batch()
+
+        yield node._power_control_node(d, power_on_node, power_info)
+
+        self.assertEqual(
+            [(client.ident, power_info.power_type)],
+            list(batch.driver_checks),
+        )
+
+    @wait_for_reactor
+    @defer.inlineCallbacks
+    def test_does_not_batch_other_power_methods(self):
+        d = self.patch_post_commit()
+        rack_controller = yield deferToDatabase(self.make_rack_controller)
+        node, power_info = yield deferToDatabase(
+            self.make_node, layer2_rack=rack_controller
+        )
+        client = self.patch_power_control(node, rack_controller)
+        batch = self.patch_power_command_batch()
+
+        power_method = Mock()
+        yield node._power_control_node(d, power_method, power_info)
+
+        self.assertThat(
+            power_method,
+            MockCalledOnceWith(
+                client, node.system_id, node.hostname, power_info
+            ),
+        )
+        self.assertThat(batch.submit, MockNotCalled())
+        self.assertEqual({}, batch.nodes)
+
+    @wait_for_reactor
+    @defer.inlineCallbacks
+    def test_discards_node_from_batch_on_failure(self):
+        d = self.patch_post_commit()
+        rack_controller = yield deferToDatabase(self.make_rack_controller)
+        node, power_info = yield deferToDatabase(
+            self.make_node, layer2_rack=rack_controller
+        )
+        self.patch_power_control(node, rack_controller)
+        self.patch(node.bmc, "is_accessible").side_effect = ZeroDivisionError
+        batch = self.patch_power_command_batch()
+
+        with ExpectedException(ZeroDivisionError):
+            yield node._power_control_node(d, power_on_node, power_info)
+
+        self.assertThat(batch.submit, MockNotCalled())
+        self.assertEqual(set(), batch.expected)
+
 
 class TestNode_Delete_With_Transactional_Events(MAASTransactionServerTestCase):
     """
@@ -21,6 +21,7 @@ from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
 from maasserver.models.filesystemgroup import VolumeGroup
 from maasserver.models.partition import (
     MIN_PARTITION_SIZE,
+    get_partition_number_in_table,
     Partition,
     PARTITION_ALIGNMENT_SIZE,
 )
@@ -232,6 +233,43 @@ class TestPartitionManager(MAASServerTestCase):
         )
 
 
+class TestGetPartitionNumberInTable(MAASServerTestCase):
+    """Tests for `get_partition_number_in_table`."""
+
+    def test_mbr_does_not_get_boot_details(self):
+        block_device = factory.make_PhysicalBlockDevice()
+
+        def get_boot_details():
+            self.fail("Boot details loaded for an MBR table.")
+
+        self.assertEqual(
+            [1, 2, 3, 5, 6],
+            [
+                get_partition_number_in_table(
+                    idx,
+                    5,
+                    PARTITION_TABLE_TYPE.MBR,
+                    block_device,
+                    get_boot_details,
+                )
+                for idx in range(5)
+            ],
+        )
+
+    def test_ppc64el_without_boot_disk(self):
+        block_device = factory.make_PhysicalBlockDevice()
+        self.assertEqual(
+            1,
+            get_partition_number_in_table(
+                0,
+                1,
+                PARTITION_TABLE_TYPE.GPT,
+                block_device,
+                lambda: ("ppc64el", None, None, None),
+            ),
+        )
+
+
 class TestPartition(MAASServerTestCase):
     """Tests for the `Partition` model."""
 
@@ -0,0 +1,90 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the PodUsage model."""
+
+
+from maasserver.enum import NODE_TYPE
+from maasserver.models import Node, PodUsage
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
+
+
+class TestPodUsageManager(MAASServerTestCase):
+    def make_pod_with_machines(self):
+        pod = factory.make_Pod()
+        for _ in range(2):
+            machine = factory.make_Node(
+                bmc=pod, cpu_count=2, memory=1024, with_boot_disk=False
+            )
+            factory.make_PhysicalBlockDevice(node=machine, size=10 * 1024 ** 3)
+            factory.make_ISCSIBlockDevice(node=machine, size=5 * 1024 ** 3)
+        return pod
+
+    def test_add_to_pod(self):
+        pod = factory.make_Pod()
+        PodUsage.objects.add({"cores": 4, "memory": -1024}, pod_id=pod.id)
+        usage = reload_object(pod).usage
+        self.assertEqual((4, -1024), (usage.cores, usage.memory))
+
+    def test_add_to_pod_of_machine(self):
+        pod = factory.make_Pod()
+        machine = factory.make_Node(bmc=pod)
+        PodUsage.objects.add({"local_disks": 2}, node_id=machine.id)
+        self.assertEqual(2, reload_object(pod).usage.local_disks)
+
+    def test_add_ignores_nodes_that_are_not_machines(self):
+        pod = factory.make_Pod()
+        device = factory.make_Node(bmc=pod, node_type=NODE_TYPE.DEVICE)
+        PodUsage.objects.add({"local_disks": 2}, node_id=device.id)
+        self.assertEqual(0, reload_object(pod).usage.local_disks)
+
+    def test_add_without_changes_does_not_query(self):
+        pod = factory.make_Pod()
+        count, _ = count_queries(
+            PodUsage.objects.add, {"cores": 0}, pod_id=pod.id
+        )
+        self.assertEqual(0, count)
+
+    def test_reconcile_corrects_usage(self):
+        pod = self.make_pod_with_machines()
+        other_pod = self.make_pod_with_machines()
+        PodUsage.objects.filter(pod=pod).update(cores=0, local_storage=1)
+        Node.objects.filter(bmc=other_pod).update(memory=2048)
+        corrected = PodUsage.objects.reconcile()
+        self.assertItemsEqual(
+            [pod.id, other_pod.id], [usage.pod_id for usage in corrected]
+        )
+        usage = reload_object(pod).usage
+        self.assertEqual(
+            (4, 2048, 20 * 1024 ** 3, 2, 10 * 1024 ** 3),
+            (
+                usage.cores,
+                usage.memory,
+                usage.local_storage,
+                usage.local_disks,
+                usage.iscsi_storage,
+            ),
+        )
+        self.assertEqual(4096, reload_object(other_pod).usage.memory)
+
+    def test_reconcile_leaves_correct_usage(self):
+        self.make_pod_with_machines()
+        self.assertEqual([], PodUsage.objects.reconcile())
+
+    def test_reconcile_replaces_usage_of_pods(self):
+        pod = self.make_pod_with_machines()
+        self.assertEqual(4, pod.usage.cores)
+        Node.objects.filter(bmc=pod).update(cpu_count=3)
+        PodUsage.objects.reconcile(pods=[pod])
+        self.assertEqual(6, pod.usage.cores)
+
+    def test_reconcile_queries_are_constant(self):
+        pods = [self.make_pod_with_machines() for _ in range(3)]
+        PodUsage.objects.all().update(cores=0)
+        count, _ = count_queries(PodUsage.objects.reconcile, pods=pods)
+        # One query for the usages, three to total them, and one for each
+        # usage that's corrected.
+        self.assertEqual(7, count)
@@ -15,14 +15,18 @@ order as they do in `ACTION_CLASSES`.
 
 from abc import ABCMeta, abstractmethod, abstractproperty
 from collections import OrderedDict
+from inspect import signature
 
 from crochet import TimeoutError
-from django.core.exceptions import ValidationError
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.http.request import HttpRequest
+from twisted.internet.defer import CancelledError
 
 from maasserver import locks
 from maasserver.audit import create_audit_event
 from maasserver.clusterrpc.boot_images import RackControllersImporter
+from maasserver.clusterrpc.power import batch_power_commands
+from maasserver.clusterrpc.utils import get_error_message_for_exception
 from maasserver.enum import (
     ENDPOINT,
     NODE_ACTION_TYPE,
@@ -35,6 +39,8 @@ from maasserver.enum import (
 )
 from maasserver.exceptions import (
     IPAddressCheckFailed,
+    MAASAPIException,
+    MAASException,
     NodeActionError,
     StaticIPAddressExhaustion,
 )
@@ -42,7 +48,7 @@ from maasserver.models import Config, ResourcePool, Tag, Zone
 from maasserver.node_status import is_failed_status, NON_MONITORED_STATUSES
 from maasserver.permissions import NodePermission
 from maasserver.preseed import get_curtin_config
-from maasserver.utils.orm import post_commit_do
+from maasserver.utils.orm import post_commit_do, savepoint
 from maasserver.utils.osystems import (
     validate_hwe_kernel,
     validate_osystem_and_distro_series,
@@ -55,6 +61,7 @@ from provisioningserver.rpc.exceptions import (
 )
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.shell import ExternalProcessError
+from provisioningserver.utils.twisted import suppress
 
 # All node statuses.
 ALL_STATUSES = set(NODE_STATUS_CHOICES_DICT.keys())
@@ -973,3 +980,75 @@ def compile_node_actions(node, user, request=None, classes=ACTION_CLASSES):
         for action in actions
         if action.is_actionable() and action.is_permitted()
     )
+
+
+def execute_node_actions(
+    nodes, user, action_name, request=None, endpoint=ENDPOINT.UI, extra=None
+):
+    """Perform the action named `action_name` on each of `nodes`.
+
+    Each node is acted on in a savepoint of its own, so that a node the
+    action can't be performed on doesn't stop it being performed on the
+    others. The power commands of all the nodes are sent once the
+    transaction has committed, together for each rack controller (see
+    `PowerCommandBatch`).
+
+    :param extra: A dict of parameters passed to the `execute` method of
+        each action.
+    :raise NodeActionError: If there is no action named `action_name`, or
+        it does not take all the parameters in `extra`.
+    :return: A tuple of `(errors, powering)`. `errors` maps the system_id
+        of each node to a message saying why the action could not be
+        performed on it, or to `None` if it was. `powering` maps the
+        system_id of each node the action sends a power command for to a
+        `Deferred` that fires once the transaction has committed and the
+        command has been sent, with `None` or a message saying why the node
+        could not be powered.
+    """
+    action_class = ACTIONS_DICT.get(action_name)
+    if action_class is None:
+        raise NodeActionError("%s action does not exist." % action_name)
+    if extra is None:
+        extra = {}
+    # Check the parameters up front, so a bad one isn't a TypeError from
+    # each action.
+    params = list(signature(action_class._execute).parameters)[1:]
+    unknown = sorted(set(extra) - set(params))
+    if len(unknown) > 0:
+        raise NodeActionError(
+            "%s action does not take parameter(s): %s."
+            % (action_name, ", ".join(unknown))
+        )
+    errors, powering = OrderedDict(), OrderedDict()
+    with batch_power_commands() as batch:
+        for node in nodes:
+            action = action_class(node, user, request, endpoint=endpoint)
+            if not action.is_actionable():
+                errors[node.system_id] = (
+                    "%s action is not available for this node." % action_name
+                )
+                continue
+            try:
+                with savepoint():
+                    action.execute(**extra)
+            except (
+                MAASException,
+                MAASAPIException,
+                PermissionDenied,
+                ValidationError,
+            ) as error:
+                errors[node.system_id] = get_error_message_for_exception(error)
+                # The node's post-commit hook has been cancelled.
+                d = batch.nodes.pop(node.system_id, None)
+                if d is not None:
+                    d.addErrback(suppress, CancelledError)
+            else:
+                errors[node.system_id] = None
+                d = batch.nodes.get(node.system_id)
+                if d is not None:
+                    d.addCallbacks(
+                        lambda _: None,
+                        lambda failure: failure.getErrorMessage(),
+                    )
+                    powering[node.system_id] = d
+    return errors, powering
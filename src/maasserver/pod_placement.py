@@ -0,0 +1,156 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Choose the pods in which to compose machines."""
+
+__all__ = [
+    "order_pods",
+    "PLACEMENT_STRATEGY",
+    "PodCapacity",
+    "PodRequest",
+]
+
+import attr
+
+
+class PLACEMENT_STRATEGY:
+    """How to choose between pods that have room for a machine."""
+
+    #: Prefer the pods that will have the least room left, packing machines
+    #: into as few pods as possible.
+    BEST_FIT = "best-fit"
+    #: Prefer the pods that will have the most room left, spreading machines
+    #: between pods.
+    SPREAD = "spread"
+
+
+@attr.s
+class PodCapacity:
+    """Resources of a pod, as last recorded by MAAS.
+
+    Totals include any over-commit. A total of zero means that it isn't
+    known, and that resource isn't considered.
+
+    When the pod's storage pools are known, disks are checked against the
+    pool each would be allocated from, rather than against the total.
+    """
+
+    cores = attr.ib(converter=float, default=0)
+    memory = attr.ib(converter=float, default=0)
+    storage = attr.ib(converter=float, default=0)
+    used_cores = attr.ib(converter=int, default=0)
+    used_memory = attr.ib(converter=int, default=0)
+    used_storage = attr.ib(converter=int, default=0)
+    #: Maps the name of each storage pool to its `(total, used)` bytes.
+    storage_pools = attr.ib(factory=dict)
+    #: The name of the pool disks without a pool tag are allocated from.
+    default_storage_pool = attr.ib(default=None)
+
+    def get_resources(self):
+        return (
+            ("cores", self.cores, self.used_cores),
+            ("memory", self.memory, self.used_memory),
+            ("storage", self.storage, self.used_storage),
+        )
+
+
+@attr.s
+class PodRequest:
+    """Resources requested for a machine in a pod."""
+
+    cores = attr.ib(converter=int, default=0)
+    memory = attr.ib(converter=int, default=0)
+    storage = attr.ib(converter=int, default=0)
+    #: The `(size, tags)` of each disk requested.
+    disks = attr.ib(factory=list)
+
+
+def get_storage_pool_shortfall(capacity, request):
+    """Return why the disks in `request` don't fit in the storage pools of
+    `capacity`, or `None`.
+
+    Each disk is allocated as the pod drivers allocate it: from a pool named
+    in its tags, else from the default pool, else from any pool with room.
+    """
+    available = {
+        name: total - used
+        for name, (total, used) in capacity.storage_pools.items()
+    }
+    for size, tags in request.disks:
+        tagged = [name for name in available if name in (tags or ())]
+        if len(tagged) != 0:
+            candidates = tagged
+        elif capacity.default_storage_pool in available:
+            candidates = [capacity.default_storage_pool]
+        else:
+            candidates = list(available)
+        for name in candidates:
+            if size <= available[name]:
+                available[name] -= size
+                break
+        else:
+            return "Not enough storage in %s; %d available, %d requested." % (
+                ", ".join(candidates),
+                max([0] + [available[name] for name in candidates]),
+                size,
+            )
+    return None
+
+
+def get_shortfall(capacity, request):
+    """Return why `request` doesn't fit in `capacity`, or `None`."""
+    for name, total, used in capacity.get_resources():
+        if name == "storage" and len(capacity.storage_pools) != 0:
+            # Checked against each pool instead, below.
+            continue
+        requested = getattr(request, name)
+        if total > 0 and used + requested > total:
+            return "Not enough %s; %d available, %d requested." % (
+                name,
+                max(0, int(total - used)),
+                requested,
+            )
+    if len(capacity.storage_pools) != 0:
+        return get_storage_pool_shortfall(capacity, request)
+    return None
+
+
+def get_room_left(capacity, request):
+    """Return the average fraction of the pod's resources left free once a
+    machine for `request` has been composed in it."""
+    fractions = [
+        (total - used - getattr(request, name)) / total
+        for name, total, used in capacity.get_resources()
+        if total > 0
+    ]
+    if len(fractions) == 0:
+        return 0.0
+    else:
+        return sum(fractions) / len(fractions)
+
+
+def order_pods(placements, strategy=PLACEMENT_STRATEGY.BEST_FIT):
+    """Order the pods in which a machine could be composed.
+
+    :param placements: Iterable of ``(key, capacity, request)`` tuples, where
+        `key` identifies a pod, `capacity` is its `PodCapacity` and `request`
+        is the `PodRequest` for the machine in that pod.
+    :param strategy: One of `PLACEMENT_STRATEGY`.
+    :return: A list of the keys of the pods with room for the machine, best
+        first, and a dictionary mapping the keys of the other pods to the
+        reason they were rejected. Pods that score the same keep their order.
+    """
+    candidates, rejections = [], {}
+    for key, capacity, request in placements:
+        shortfall = get_shortfall(capacity, request)
+        if shortfall is None:
+            candidates.append((get_room_left(capacity, request), key))
+        else:
+            rejections[key] = shortfall
+    if strategy == PLACEMENT_STRATEGY.BEST_FIT:
+        candidates.sort(key=lambda candidate: candidate[0])
+    elif strategy == PLACEMENT_STRATEGY.SPREAD:
+        candidates.sort(key=lambda candidate: -candidate[0])
+    else:
+        raise ValueError("Unknown placement strategy: %r" % (strategy,))
+    return [key for _, key in candidates], rejections
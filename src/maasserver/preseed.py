@@ -33,6 +33,11 @@ from maasserver.exceptions import ClusterUnavailable, MissingBootImage
 from maasserver.models import BootResource, Config, PackageRepository
 from maasserver.models.filesystem import Filesystem
 from maasserver.node_status import COMMISSIONING_LIKE_STATUSES
+from maasserver.preseed_cache import (
+    get_preseed_fingerprint,
+    preseed_templates,
+    rendered_preseeds,
+)
 from maasserver.preseed_network import compose_curtin_network_config
 from maasserver.preseed_storage import compose_curtin_storage_config
 from maasserver.server_address import get_maas_facing_server_host
@@ -371,11 +376,21 @@ def get_curtin_userdata(request, node):
     :return: The rendered user-data string.
     :rtype: unicode.
     """
-    # Pack the curtin and the configuration into a script to execute on the
-    # deploying node.
-    return pack_install(
-        configs=get_curtin_yaml_config(request, node),
-        args=[get_curtin_installer_url(node)],
+
+    def render():
+        # Pack the curtin and the configuration into a script to execute on
+        # the deploying node.
+        return pack_install(
+            configs=get_curtin_yaml_config(request, node),
+            args=[get_curtin_installer_url(node)],
+        )
+
+    # Curtin fetches its user-data more than once while deploying, so it's
+    # only rendered again once something it's rendered from changes.
+    return rendered_preseeds.get(
+        ("curtin_userdata", node.id),
+        get_preseed_fingerprint(request, node),
+        render,
     )
 
 
@@ -585,27 +600,36 @@ def get_preseed(request, node) -> bytes:
     :return: The rendered preseed string.
     :rtype: unicode.
     """
-    config = Config.objects.get_configs(
-        ["commissioning_osystem", "commissioning_distro_series"]
-    )
-    if node.status in COMMISSIONING_LIKE_STATUSES or node.ephemeral_deployment:
-        return render_preseed(
-            request,
-            node,
-            PRESEED_TYPE.COMMISSIONING,
-            osystem=config["commissioning_osystem"],
-            release=config["commissioning_distro_series"],
-        )
-    else:
-        return render_preseed(
-            request,
-            node,
-            get_preseed_type_for(node),
-            osystem=node.get_osystem(config["commissioning_osystem"]),
-            release=node.get_distro_series(
-                config["commissioning_distro_series"]
-            ),
+
+    def render():
+        config = Config.objects.get_configs(
+            ["commissioning_osystem", "commissioning_distro_series"]
         )
+        if (
+            node.status in COMMISSIONING_LIKE_STATUSES
+            or node.ephemeral_deployment
+        ):
+            return render_preseed(
+                request,
+                node,
+                PRESEED_TYPE.COMMISSIONING,
+                osystem=config["commissioning_osystem"],
+                release=config["commissioning_distro_series"],
+            )
+        else:
+            return render_preseed(
+                request,
+                node,
+                get_preseed_type_for(node),
+                osystem=node.get_osystem(config["commissioning_osystem"]),
+                release=node.get_distro_series(
+                    config["commissioning_distro_series"]
+                ),
+            )
+
+    return rendered_preseeds.get(
+        ("preseed", node.id), get_preseed_fingerprint(request, node), render
+    )
 
 
 UBUNTU_NAME = UbuntuOS().name
@@ -722,6 +746,27 @@ def get_preseed_template(filenames):
         return None, None
 
 
+def get_parsed_preseed_template(filenames):
+    """Get the parsed `PreseedTemplate` for the first template found.
+
+    Templates are only parsed again once they've been modified; each call
+    returns a copy of the parsed template, or None if none was found.
+
+    :param filenames: An iterable of relative filenames.
+    """
+    assert not isinstance(filenames, (bytes, str))
+    for location in settings.PRESEED_TEMPLATE_LOCATIONS:
+        for filename in filenames:
+            filepath = os.path.join(location, filename)
+            template = preseed_templates.get(
+                filepath,
+                lambda content: PreseedTemplate(content, name=filepath),
+            )
+            if template is not None:
+                return template
+    return None
+
+
 def get_escape_singleton():
     """Return a singleton containing methods to escape various formats used in
     the preseed templates.
@@ -770,14 +815,13 @@ def load_preseed_template(node, prefix, osystem="", release=""):
         filenames = list(
             get_preseed_filenames(node, name, osystem, release, default)
         )
-        filepath, content = get_preseed_template(filenames)
-        if filepath is None:
+        template = get_parsed_preseed_template(filenames)
+        if template is None:
             raise TemplateNotFoundError(name)
-        # This is where the closure happens: pass `get_template` when
-        # instanciating PreseedTemplate.
-        return PreseedTemplate(
-            content, name=filepath, get_template=get_template
-        )
+        # This is where the closure happens: parsed templates are shared, so
+        # `get_template` is set on the copy returned for this lookup.
+        template.get_template = get_template
+        return template
 
     return get_template(prefix, None, default=True)
 
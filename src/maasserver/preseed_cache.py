@@ -0,0 +1,321 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Caches for preseed templates and the preseeds rendered from them.
+
+Cloud-init and curtin fetch their preseed and user-data several times while
+a machine deploys. Each fetch used to find and parse the templates on disk
+again, then render everything from the database, which costs hundreds of
+queries and an RPC call to the rack.
+
+Parsed templates are kept keyed by their path, modification time and size.
+Rendered preseeds are kept per node, along with a fingerprint of the rows
+and files they are rendered from. The fingerprint is computed with a single
+query on every fetch, so a preseed never has to be invalidated explicitly:
+once anything it depends on changes, the fingerprint no longer matches and
+the preseed is rendered again.
+"""
+
+__all__ = [
+    "get_preseed_fingerprint",
+    "preseed_templates",
+    "PreseedTemplateCache",
+    "RenderedPreseedCache",
+    "rendered_preseeds",
+]
+
+from collections import OrderedDict
+from copy import copy
+from hashlib import sha256
+import os
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+
+from maasserver.utils import get_remote_ip
+
+# Upper bound on the number of parsed templates kept. MAAS ships a few dozen
+# templates; the rest of the space is for templates added by the user.
+TEMPLATE_CACHE_MAX_ENTRIES = 256
+
+# Upper bound on the memory used by rendered preseeds. Curtin user-data
+# bundles curtin itself and is a few hundred kilobytes, so this holds the
+# user-data of a few hundred deploying machines.
+RENDERED_CACHE_MAX_SIZE = 128 * 1024 * 1024
+
+# Fields of a node that change without affecting its preseeds, such as
+# those refreshed by the power and status monitors.
+VOLATILE_NODE_FIELDS = frozenset(
+    (
+        "description",
+        "error",
+        "error_description",
+        "last_image_sync",
+        "locked",
+        "power_state",
+        "power_state_queried",
+        "power_state_updated",
+        "status_expires",
+        "updated",
+    )
+)
+
+# Tables whose rows may change the preseed of any node, such as the subnets
+# and VLANs its interfaces are on, or the images it's deployed with.
+GLOBAL_TABLES = (
+    "maasserver_bootresource",
+    "maasserver_bootresourceset",
+    "maasserver_domain",
+    "maasserver_fabric",
+    "maasserver_licensekey",
+    "maasserver_packagerepository",
+    "maasserver_space",
+    "maasserver_staticroute",
+    "maasserver_subnet",
+    "maasserver_vlan",
+)
+
+# Each row is the name of what's counted, a count, and a summary of the rows
+# that changes whenever one of them is updated.
+FINGERPRINT_QUERY = """\
+WITH
+  blockdevice AS (
+    SELECT id, updated FROM maasserver_blockdevice
+    WHERE node_id = %(node_id)s),
+  partitiontable AS (
+    SELECT id, updated FROM maasserver_partitiontable
+    WHERE block_device_id IN (SELECT id FROM blockdevice)),
+  partition AS (
+    SELECT id, updated FROM maasserver_partition
+    WHERE partition_table_id IN (SELECT id FROM partitiontable)),
+  filesystem AS (
+    SELECT id, updated, filesystem_group_id, cache_set_id
+    FROM maasserver_filesystem
+    WHERE node_id = %(node_id)s
+       OR block_device_id IN (SELECT id FROM blockdevice)
+       OR partition_id IN (SELECT id FROM partition)),
+  interface AS (
+    SELECT id, updated FROM maasserver_interface
+    WHERE node_id = %(node_id)s),
+  link AS (
+    SELECT interface_id, staticipaddress_id
+    FROM maasserver_interface_ip_addresses
+    WHERE interface_id IN (SELECT id FROM interface))
+SELECT 'blockdevice', count(*), max(updated)::text FROM blockdevice
+UNION ALL
+SELECT 'partitiontable', count(*), max(updated)::text FROM partitiontable
+UNION ALL
+SELECT 'partition', count(*), max(updated)::text FROM partition
+UNION ALL
+SELECT 'filesystem', count(*), max(updated)::text FROM filesystem
+UNION ALL
+SELECT 'filesystemgroup', count(*), max(updated)::text
+  FROM maasserver_filesystemgroup
+  WHERE id IN (SELECT filesystem_group_id FROM filesystem)
+UNION ALL
+SELECT 'cacheset', count(*), max(updated)::text FROM maasserver_cacheset
+  WHERE id IN (SELECT cache_set_id FROM filesystem)
+UNION ALL
+SELECT 'interface', count(*), max(updated)::text FROM interface
+UNION ALL
+SELECT 'interfacerelationship', count(*), max(updated)::text
+  FROM maasserver_interfacerelationship
+  WHERE child_id IN (SELECT id FROM interface)
+UNION ALL
+SELECT 'link', count(*),
+  md5(string_agg(interface_id || ':' || staticipaddress_id, ','
+                 ORDER BY interface_id, staticipaddress_id))
+  FROM link
+UNION ALL
+SELECT 'staticipaddress', count(*), max(updated)::text
+  FROM maasserver_staticipaddress
+  WHERE id IN (SELECT staticipaddress_id FROM link)
+UNION ALL
+SELECT 'owner', count(*), max(email) FROM auth_user
+  WHERE id = %(owner_id)s
+UNION ALL
+SELECT 'config', count(*),
+  md5(string_agg(name || '=' || coalesce(value::text, ''), ','
+                 ORDER BY name))
+  FROM maasserver_config
+""" + "".join(
+    "UNION ALL\nSELECT '%s', count(*), max(updated)::text FROM %s\n"
+    % (table, table)
+    for table in GLOBAL_TABLES
+)
+
+
+def get_template_locations_fingerprint(locations):
+    """Return the names, modification times and sizes of every template.
+
+    Templates may include others through inheritance, so the whole of each
+    location is taken into account.
+    """
+    entries = []
+    for location in locations:
+        try:
+            with os.scandir(location) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append(
+                        (entry.path, stat.st_mtime_ns, stat.st_size)
+                    )
+        except OSError:
+            continue
+    return sorted(entries)
+
+
+def get_preseed_fingerprint(request, node):
+    """Return a fingerprint of everything a preseed for `node` depends on.
+
+    This covers the node's own fields except `VOLATILE_NODE_FIELDS`, its
+    storage and network, the subnets, routes, repositories and images shared
+    by every node, the configuration, the preseed templates, and the address
+    the request was made from and to.
+
+    The node's metadata token isn't covered: it's created when the first
+    preseed is rendered, and is only replaced along with the node's status.
+    """
+    skipped = VOLATILE_NODE_FIELDS.union(node.get_deferred_fields())
+    node_fields = [
+        (field.attname, getattr(node, field.attname))
+        for field in node._meta.concrete_fields
+        if field.attname not in skipped
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            FINGERPRINT_QUERY,
+            {"node_id": node.id, "owner_id": node.owner_id},
+        )
+        rows = cursor.fetchall()
+    fingerprint = (
+        node_fields,
+        sorted(rows),
+        get_template_locations_fingerprint(
+            settings.PRESEED_TEMPLATE_LOCATIONS
+        ),
+        request.build_absolute_uri("/"),
+        get_remote_ip(request),
+    )
+    return sha256(repr(fingerprint).encode("utf-8")).hexdigest()
+
+
+class PreseedTemplateCache:
+    """A bounded, least-recently-used cache of parsed preseed templates.
+
+    Entries are keyed by the template's path, modification time and size, so
+    a template that's edited is parsed again the next time it's loaded.
+
+    Templates are loaded in the database thread pool so access is serialised
+    with a lock.
+    """
+
+    def __init__(self, max_entries=TEMPLATE_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, filepath, parse):
+        """Return the template at `filepath`, or None if there isn't one.
+
+        :param filepath: The path of the template.
+        :param parse: A callable taking the content of the template and
+            returning the parsed template. A shallow copy of the parsed
+            template is returned, so it's safe to customise its attributes.
+        """
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        key = filepath, stat.st_mtime_ns, stat.st_size
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return copy(template)
+            self.misses += 1
+        try:
+            with open(filepath, "r", encoding="utf-8") as stream:
+                content = stream.read()
+        except IOError:
+            return None
+        template = parse(content)
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+        return copy(template)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+class RenderedPreseedCache:
+    """A bounded, least-recently-used cache of rendered preseeds.
+
+    Only the latest rendering of each preseed is kept, along with the
+    fingerprint of what it was rendered from; a rendering whose fingerprint
+    no longer matches is replaced the next time it's asked for.
+
+    Preseeds are rendered in the database thread pool so access is
+    serialised with a lock.
+    """
+
+    def __init__(self, max_size=RENDERED_CACHE_MAX_SIZE):
+        super().__init__()
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._preseeds = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, fingerprint, render):
+        """Return the preseed for `key`, calling `render` to produce it.
+
+        :param key: A hashable key identifying the preseed, such as its kind
+            and the id of the node.
+        :param fingerprint: The fingerprint of what the preseed is rendered
+            from, as returned by `get_preseed_fingerprint`.
+        :param render: A no-argument callable returning the preseed as
+            bytes or a string.
+        """
+        with self._lock:
+            entry = self._preseeds.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._preseeds.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Render outside of the lock; this hits the database.
+        preseed = render()
+        with self._lock:
+            entry = self._preseeds.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry[1])
+            if len(preseed) <= self.max_size:
+                self._preseeds[key] = fingerprint, preseed
+                self.size += len(preseed)
+                while self.size > self.max_size:
+                    _, (_, evicted) = self._preseeds.popitem(last=False)
+                    self.size -= len(evicted)
+        return preseed
+
+    def clear(self):
+        with self._lock:
+            self._preseeds.clear()
+            self.size = 0
+
+
+preseed_templates = PreseedTemplateCache()
+
+rendered_preseeds = RenderedPreseedCache()
@@ -18,8 +18,7 @@ from maasserver.enum import (
     IPADDRESS_TYPE,
     NODE_STATUS,
 )
-from maasserver.models import Interface, StaticIPAddress
-from maasserver.models.staticroute import StaticRoute
+from maasserver.preseed_topology import NodeTopology
 from provisioningserver.utils.netplan import (
     get_netplan_bond_parameters,
     get_netplan_bridge_parameters,
@@ -80,6 +79,7 @@ class InterfaceConfiguration:
         self.type = iface.type
         self.id = iface.id
         self.node_config = node_config
+        self.topology = node_config.topology
         self.routes = node_config.routes
         self.gateways = node_config.gateways
         self.secondary_gateway_routes = []
@@ -92,7 +92,7 @@ class InterfaceConfiguration:
         self.version = version
         self.source_routing = source_routing
         self.config = None
-        self.name = self.iface.get_name()
+        self.name = self.topology.get_name(self.iface)
 
         if self.type == INTERFACE_TYPE.PHYSICAL:
             self.config = self._generate_physical_operation(version=version)
@@ -158,13 +158,17 @@ class InterfaceConfiguration:
     def _get_dhcp_type(self):
         """Return the DHCP type for the interface."""
         dhcp_types = set()
+        node = self.node_config.node
+        addresses = self.topology.get_addresses(self.iface)
         if (
-            self.iface == self.iface.node.boot_interface
+            self.iface.id == node.boot_interface_id
             and NODE_STATUS.COMMISSIONING
-            in {self.iface.node.status, self.iface.node.previous_status}
-            and self.iface.ip_addresses.exclude(
-                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=None
-            ).exists()
+            in {node.status, node.previous_status}
+            and any(
+                address.alloc_type != IPADDRESS_TYPE.DISCOVERED
+                or address.ip is not None
+                for address in addresses
+            )
         ):
             # AUTOIP assignment happens as a post_commit() hook after a node
             # starts testing or deploying so MAAS can verify the IP address is
@@ -174,13 +178,15 @@ class InterfaceConfiguration:
             # configuration file with dhcp being run on the boot interface.
             # This is the same configuration run at boot so testing will be
             # done with the booted configuration.
-            qs = self.iface.ip_addresses.all()
+            dhcp_ips = addresses
         else:
-            qs = self.iface.ip_addresses.filter(
-                alloc_type=IPADDRESS_TYPE.DHCP
-            ).select_related("subnet")
+            dhcp_ips = [
+                address
+                for address in addresses
+                if address.alloc_type == IPADDRESS_TYPE.DHCP
+            ]
 
-        for dhcp_ip in qs:
+        for dhcp_ip in dhcp_ips:
             if dhcp_ip.subnet is None:
                 # No subnet is linked so no IP family can be determined. So
                 # we allow both families to be DHCP'd.
@@ -309,7 +315,7 @@ class InterfaceConfiguration:
 
     def _get_matching_routes(self, source):
         """Return all route objects matching `source`."""
-        return {route for route in self.routes if route.source == source}
+        return {route for route in self.routes if route.source_id == source.id}
 
     def _generate_addresses(self, version=1):
         """Generate the various addresses needed for this interface."""
@@ -317,11 +323,12 @@ class InterfaceConfiguration:
         v2_cidrs = []
         v2_config = {}
         v2_nameservers = {}
-        addresses = list(
-            self.iface.ip_addresses.exclude(
-                alloc_type__in=[IPADDRESS_TYPE.DISCOVERED, IPADDRESS_TYPE.DHCP]
-            ).order_by("id")
-        )
+        addresses = [
+            address
+            for address in self.topology.get_addresses(self.iface)
+            if address.alloc_type
+            not in (IPADDRESS_TYPE.DISCOVERED, IPADDRESS_TYPE.DHCP)
+        ]
         dhcp_type = self._get_dhcp_type()
         if _is_link_up(addresses) and not dhcp_type:
             if version == 1:
@@ -375,30 +382,20 @@ class InterfaceConfiguration:
                             v2_nameservers["addresses"] = []
 
                     if subnet.allow_dns:
-                        for ip in StaticIPAddress.objects.filter(
-                            interface__node__in=[
-                                subnet.vlan.primary_rack,
-                                subnet.vlan.secondary_rack,
-                            ],
-                            subnet__vlan=subnet.vlan,
-                            alloc_type__in=[
-                                IPADDRESS_TYPE.AUTO,
-                                IPADDRESS_TYPE.STICKY,
-                            ],
-                        ).exclude(ip=None):
-                            if ip.ip in v2_nameservers["addresses"]:
+                        for ip in self.topology.get_rack_addresses(
+                            subnet.vlan_id
+                        ):
+                            if ip in v2_nameservers["addresses"]:
                                 continue
-                            ip_address = IPAddress(ip.ip)
+                            ip_address = IPAddress(ip)
                             if ip_address.version != subnet.get_ip_version():
                                 continue
                             if not subnet.gateway_ip:
                                 if ip_address not in subnet.get_ipnetwork():
                                     # without gateway, only use in-subnet addrs
                                     continue
-                            v1_subnet_operation["dns_nameservers"].append(
-                                ip.ip
-                            )
-                            v2_nameservers["addresses"].append(ip.ip)
+                            v1_subnet_operation["dns_nameservers"].append(ip)
+                            v2_nameservers["addresses"].append(ip)
 
                     for ip in subnet.dns_servers:
                         if ip in v2_nameservers["addresses"]:
@@ -446,7 +443,7 @@ class InterfaceConfiguration:
                     "id": name,
                     "type": "vlan",
                     "name": name,
-                    "vlan_link": self.iface.parents.first().get_name(),
+                    "vlan_link": self._get_parent_names()[0],
                     "vlan_id": vlan.vid,
                 }
             )
@@ -454,11 +451,29 @@ class InterfaceConfiguration:
                 vlan_operation["subnets"] = addrs
         elif version == 2:
             vlan_operation.update(
-                {"id": vlan.vid, "link": self.iface.parents.first().get_name()}
+                {"id": vlan.vid, "link": self._get_parent_names()[0]}
             )
             vlan_operation.update(addrs)
         return vlan_operation
 
+    def _get_parent_names(self):
+        """Return the names of the parents of this interface, oldest
+        first."""
+        return [
+            self.topology.get_name(parent)
+            for parent in self.topology.get_parents(self.iface)
+        ]
+
+    def _get_sorted_parent_names(self):
+        """Return the names of the parents of this interface, ordered by
+        their `name`."""
+        return [
+            self.topology.get_name(parent)
+            for parent in sorted(
+                self.topology.get_parents(self.iface), key=attrgetter("name")
+            )
+        ]
+
     def _generate_bond_operation(self, version=1):
         """Generate bond operation for `iface` and place in
         `network_config`."""
@@ -471,10 +486,7 @@ class InterfaceConfiguration:
                     "type": "bond",
                     "name": self.name,
                     "mac_address": str(self.iface.mac_address),
-                    "bond_interfaces": [
-                        parent.get_name()
-                        for parent in self.iface.parents.order_by("name")
-                    ],
+                    "bond_interfaces": self._get_sorted_parent_names(),
                     "params": self._get_bond_params(),
                 }
             )
@@ -484,10 +496,7 @@ class InterfaceConfiguration:
             bond_operation.update(
                 {
                     "macaddress": str(self.iface.mac_address),
-                    "interfaces": [
-                        parent.get_name()
-                        for parent in self.iface.parents.order_by("name")
-                    ],
+                    "interfaces": self._get_sorted_parent_names(),
                 }
             )
             bond_params = get_netplan_bond_parameters(self._get_bond_params())
@@ -507,10 +516,7 @@ class InterfaceConfiguration:
                     "type": "bridge",
                     "name": self.name,
                     "mac_address": str(self.iface.mac_address),
-                    "bridge_interfaces": [
-                        parent.get_name()
-                        for parent in self.iface.parents.order_by("name")
-                    ],
+                    "bridge_interfaces": self._get_sorted_parent_names(),
                     "params": self._get_bridge_params(version=version),
                 }
             )
@@ -520,10 +526,7 @@ class InterfaceConfiguration:
             bridge_operation.update(
                 {
                     "macaddress": str(self.iface.mac_address),
-                    "interfaces": [
-                        parent.get_name()
-                        for parent in self.iface.parents.order_by("name")
-                    ],
+                    "interfaces": self._get_sorted_parent_names(),
                 }
             )
             if self.iface.params:
@@ -557,7 +560,7 @@ class InterfaceConfiguration:
                     and key != "mtu"
                 ):
                     params[key] = _get_param_value(value)
-        params["mtu"] = self.iface.get_effective_mtu()
+        params["mtu"] = self.topology.get_effective_mtu(self.iface)
         return params
 
     def _get_bond_params(self):
@@ -598,11 +601,14 @@ class InterfaceConfiguration:
 class NodeNetworkConfiguration:
     """Generator for the YAML network configuration for curtin."""
 
-    def __init__(self, node, version=1, source_routing=False):
+    def __init__(self, node, version=1, source_routing=False, topology=None):
         """Create the YAML network configuration for the specified node, and
         store it in the `config` ivar.
         """
         self.node = node
+        if topology is None:
+            topology = NodeTopology(node)
+        self.topology = topology.network
         self.matching_routes = set()
         self.v1_config = []
         self.v2_config = [("version", 2)]
@@ -638,11 +644,10 @@ class NodeNetworkConfiguration:
         else:
             default_source_ip = None
 
-        self.routes = StaticRoute.objects.all()
+        self.routes = self.topology.routes
 
-        interfaces = Interface.objects.all_interfaces_parents_first(self.node)
-        for iface in interfaces:
-            if not iface.is_enabled():
+        for iface in self.topology.interfaces:
+            if not self.topology.is_enabled(iface):
                 continue
             generator = InterfaceConfiguration(
                 iface,
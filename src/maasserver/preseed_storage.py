@@ -6,7 +6,6 @@
 
 from operator import attrgetter
 
-from django.db.models import Q, Sum
 import yaml
 
 from maasserver.enum import (
@@ -24,14 +23,18 @@ from maasserver.models.partitiontable import (
 )
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.virtualblockdevice import VirtualBlockDevice
+from maasserver.preseed_topology import NodeTopology
 
 
 class CurtinStorageGenerator:
     """Generates the YAML storage configuration for curtin."""
 
-    def __init__(self, node):
+    def __init__(self, node, topology=None):
         self.node = node
-        self.boot_disk = node.get_boot_disk()
+        if topology is None:
+            topology = NodeTopology(node)
+        self.storage = topology.storage
+        self.boot_disk = self.storage.boot_disk
         self.grub_device_ids = []
         self.boot_first_partitions = []
         self.operations = {
@@ -88,8 +91,7 @@ class CurtinStorageGenerator:
         These operations come from all of the physical block devices attached
         to the node.
         """
-        for block_device in self.node.blockdevice_set.order_by("id"):
-            block_device = block_device.actual_instance
+        for block_device in self.storage.block_devices:
             if isinstance(
                 block_device, (ISCSIBlockDevice, PhysicalBlockDevice)
             ):
@@ -121,14 +123,17 @@ class CurtinStorageGenerator:
 
     def _requires_prep_partition(self, block_device):
         """Return True if block device requires the prep partition."""
-        arch, _ = self.node.split_arch()
-        return arch == "ppc64el" and block_device.id in self.grub_device_ids
+        return (
+            self.storage.arch == "ppc64el"
+            and block_device.id in self.grub_device_ids
+        )
 
     def _requires_bios_grub_partition(self, block_device):
         """Return True if block device requires the bios_grub partition."""
-        arch, _ = self.node.split_arch()
-        bios_boot_method = self.node.get_bios_boot_method()
-        return arch == "amd64" and bios_boot_method != "uefi"
+        return (
+            self.storage.arch == "amd64"
+            and self.storage.bios_boot_method != "uefi"
+        )
 
     def _add_partition_operations(self):
         """Add all the partition operations.
@@ -136,14 +141,14 @@ class CurtinStorageGenerator:
         These operations come from all the partitions on all block devices
         attached to the node.
         """
-        for block_device in self.node.blockdevice_set.order_by("id"):
+        for block_device in self.storage.block_devices:
             requires_prep = self._requires_prep_partition(block_device)
             requires_bios_grub = self._requires_bios_grub_partition(
                 block_device
             )
-            partition_table = block_device.get_partitiontable()
+            partition_table = self.storage.get_partitiontable(block_device)
             if partition_table is not None:
-                partitions = list(partition_table.partitions.order_by("id"))
+                partitions = self.storage.get_partitions(partition_table)
                 for idx, partition in enumerate(partitions):
                     # If this is the first partition and prep or bios_grub
                     # partition is required then track this as a first
@@ -163,18 +168,20 @@ class CurtinStorageGenerator:
         These operations come from all the block devices and partitions
         attached to the node.
         """
-        for block_device in self.node.blockdevice_set.order_by("id"):
-            filesystem = block_device.get_effective_filesystem()
+        for block_device in self.storage.block_devices:
+            filesystem = self.storage.get_effective_filesystem(block_device)
             if self._requires_format_operation(filesystem):
                 self.operations["format"].append(filesystem)
                 if filesystem.is_mounted:
                     self.operations["mount"].append(filesystem)
             else:
-                partition_table = block_device.get_partitiontable()
+                partition_table = self.storage.get_partitiontable(block_device)
                 if partition_table is not None:
-                    for partition in partition_table.partitions.order_by("id"):
+                    for partition in self.storage.get_partitions(
+                        partition_table
+                    ):
                         partition_filesystem = (
-                            partition.get_effective_filesystem()
+                            self.storage.get_effective_filesystem(partition)
                         )
                         if self._requires_format_operation(
                             partition_filesystem
@@ -187,32 +194,31 @@ class CurtinStorageGenerator:
                                     partition_filesystem
                                 )
 
-        for filesystem in self.node.special_filesystems.filter(acquired=True):
-            self.operations["mount"].append(filesystem)
+        for filesystem in self.storage.special_filesystems:
+            if filesystem.acquired:
+                self.operations["mount"].append(filesystem)
 
     def _requires_format_operation(self, filesystem):
         """Return True if the filesystem requires a format operation."""
         return (
             filesystem is not None
             and filesystem.filesystem_group_id is None
-            and filesystem.cache_set is None
+            and filesystem.cache_set_id is None
         )
 
     def _find_grub_devices(self):
         """Save which devices should have grub installed."""
         for raid in self.operations["raid"]:
-            partition_ids, block_devices_ids = zip(
-                *raid.filesystems.values_list("partition", "block_device")
-            )
-            partition_ids = set(partition_ids)
-            partition_ids.discard(None)
-            block_devices_ids = set(block_devices_ids)
-            block_devices_ids.discard(None)
-            devices = PhysicalBlockDevice.objects.filter(
-                Q(id__in=block_devices_ids)
-                | Q(partitiontable__partitions__in=partition_ids)
-            )
-            devices = list(devices.values_list("id", flat=True))
+            devices = set()
+            for filesystem in self.storage.get_filesystems(raid):
+                if filesystem.partition_id is not None:
+                    partition = self.storage.get_parent(filesystem)
+                    device = self.storage.get_block_device(partition)
+                else:
+                    device = self.storage.get_parent(filesystem)
+                if isinstance(device, PhysicalBlockDevice):
+                    devices.add(device.id)
+            devices = sorted(devices)
             if self.boot_disk.id in devices:
                 self.grub_device_ids = devices
 
@@ -252,9 +258,9 @@ class CurtinStorageGenerator:
         # is the boot disk.
         add_prep_partition = False
         add_bios_grub_partition = False
-        partition_table = block_device.get_partitiontable()
-        bios_boot_method = self.node.get_bios_boot_method()
-        node_arch, _ = self.node.split_arch()
+        partition_table = self.storage.get_partitiontable(block_device)
+        bios_boot_method = self.storage.bios_boot_method
+        node_arch = self.storage.arch
         should_install_grub = block_device.id in self.grub_device_ids
 
         if partition_table is not None:
@@ -352,10 +358,9 @@ class CurtinStorageGenerator:
             if partition in self.boot_first_partitions:
                 # This is the first partition in the boot disk and add prep
                 # partition at the beginning of the partition table.
-                device_name = partition.partition_table.block_device.get_name()
-                if self._requires_prep_partition(
-                    partition.partition_table.block_device
-                ):
+                block_device = self.storage.get_block_device(partition)
+                device_name = block_device.get_name()
+                if self._requires_prep_partition(block_device):
                     self._generate_prep_partition(device_name)
                 self._generate_partition_operation(
                     partition, include_initial=False
@@ -368,12 +373,12 @@ class CurtinStorageGenerator:
     def _generate_partition_operation(self, partition, include_initial):
         """Generate partition operation for `partition` and place in
         `storage_config`."""
-        partition_table = partition.partition_table
-        block_device = partition_table.block_device
-        partition_number = partition.get_partition_number()
+        partition_table = self.storage.get_partition_table(partition)
+        block_device = self.storage.get_block_device(partition)
+        partition_number = self.storage.get_partition_number(partition)
         partition_operation = {
-            "id": partition.get_name(),
-            "name": partition.get_name(),
+            "id": self.storage.get_name(partition),
+            "name": self.storage.get_name(partition),
             "type": "partition",
             "number": partition_number,
             "uuid": partition.uuid,
@@ -392,21 +397,23 @@ class CurtinStorageGenerator:
             if partition_number == 5:
                 # Calculate the remaining size of the disk available for the
                 # extended partition.
+                partitions = self.storage.get_partitions(partition_table)
                 extended_size = block_device.size - PARTITION_TABLE_EXTRA_SPACE
-                previous_partitions = Partition.objects.filter(
-                    id__lt=partition.id, partition_table=partition_table
-                )
-                extended_size = extended_size - (
-                    previous_partitions.aggregate(Sum("size"))["size__sum"]
+                extended_size = extended_size - sum(
+                    previous_partition.size
+                    for previous_partition in partitions
+                    if previous_partition.id < partition.id
                 )
                 # Curtin adds 1MiB between each logical partition inside the
                 # extended partition. It incorrectly adds onto the size
                 # automatically so we have to extract that size from the
                 # overall size of the extended partition.
-                following_partitions = Partition.objects.filter(
-                    id__gte=partition.id, partition_table=partition_table
-                )
-                logical_extra_space = following_partitions.count() * (1 << 20)
+                following_partitions = [
+                    following_partition
+                    for following_partition in partitions
+                    if following_partition.id >= partition.id
+                ]
+                logical_extra_space = len(following_partitions) * (1 << 20)
                 extended_size = extended_size - logical_extra_space
                 self.storage_config.append(
                     {
@@ -440,15 +447,16 @@ class CurtinStorageGenerator:
     def _generate_format_operation(self, filesystem):
         """Generate format operation for `filesystem` and place in
         `storage_config`."""
-        device_or_partition = filesystem.get_parent()
+        device_or_partition = self.storage.get_parent(filesystem)
+        name = self.storage.get_name(device_or_partition)
         self.storage_config.append(
             {
-                "id": "%s_format" % device_or_partition.get_name(),
+                "id": "%s_format" % name,
                 "type": "format",
                 "fstype": filesystem.fstype,
                 "uuid": filesystem.uuid,
                 "label": filesystem.label,
-                "volume": device_or_partition.get_name(),
+                "volume": name,
             }
         )
 
@@ -467,10 +475,10 @@ class CurtinStorageGenerator:
             "uuid": filesystem_group.uuid,
             "devices": [],
         }
-        for filesystem in filesystem_group.filesystems.all():
-            block_or_partition = filesystem.get_parent()
+        for filesystem in self.storage.get_filesystems(filesystem_group):
+            block_or_partition = self.storage.get_parent(filesystem)
             volume_group_operation["devices"].append(
-                block_or_partition.get_name()
+                self.storage.get_name(block_or_partition)
             )
         volume_group_operation["devices"] = sorted(
             volume_group_operation["devices"]
@@ -511,9 +519,9 @@ class CurtinStorageGenerator:
             "devices": [],
             "spare_devices": [],
         }
-        for filesystem in filesystem_group.filesystems.all():
-            block_or_partition = filesystem.get_parent()
-            name = block_or_partition.get_name()
+        for filesystem in self.storage.get_filesystems(filesystem_group):
+            block_or_partition = self.storage.get_parent(filesystem)
+            name = self.storage.get_name(block_or_partition)
             if filesystem.fstype == FILESYSTEM_TYPE.RAID:
                 raid_operation["devices"].append(name)
             elif filesystem.fstype == FILESYSTEM_TYPE.RAID_SPARE:
@@ -522,8 +530,8 @@ class CurtinStorageGenerator:
         raid_operation["spare_devices"] = sorted(
             raid_operation["spare_devices"]
         )
-        block_device = filesystem_group.virtual_device
-        partition_table = block_device.get_partitiontable()
+        block_device = self.storage.get_virtual_device(filesystem_group)
+        partition_table = self.storage.get_partitiontable(block_device)
         if partition_table is not None:
             raid_operation["ptable"] = self._get_ptable_type(partition_table)
         self.storage_config.append(raid_operation)
@@ -547,18 +555,25 @@ class CurtinStorageGenerator:
     def _generate_bcache_operation(self, filesystem_group):
         """Generate bcache operation for `filesystem_group` and place in
         `storage_config`."""
+        backing_filesystem = [
+            filesystem
+            for filesystem in self.storage.get_filesystems(filesystem_group)
+            if filesystem.fstype == FILESYSTEM_TYPE.BCACHE_BACKING
+        ][0]
+        backing_device = self.storage.get_parent(backing_filesystem)
+        cache_device = self.storage.get_cache_device(
+            filesystem_group.cache_set_id
+        )
         bcache_operation = {
             "id": filesystem_group.name,
             "name": filesystem_group.name,
             "type": "bcache",
-            "backing_device": filesystem_group.get_bcache_backing_filesystem()
-            .get_parent()
-            .get_name(),
-            "cache_device": filesystem_group.cache_set.get_device().get_name(),
+            "backing_device": self.storage.get_name(backing_device),
+            "cache_device": self.storage.get_name(cache_device),
             "cache_mode": filesystem_group.cache_mode,
         }
-        block_device = filesystem_group.virtual_device
-        partition_table = block_device.get_partitiontable()
+        block_device = self.storage.get_virtual_device(filesystem_group)
+        partition_table = self.storage.get_partitiontable(block_device)
         if partition_table is not None:
             bcache_operation["ptable"] = self._get_ptable_type(partition_table)
         self.storage_config.append(bcache_operation)
@@ -566,14 +581,19 @@ class CurtinStorageGenerator:
     def _generate_vmfs_operations(self):
         """Generate all vmfs operations."""
         for vmfs in self.operations["vmfs"]:
+            devices = []
+            for fs in self.storage.get_filesystems(vmfs):
+                parent = self.storage.get_parent(fs)
+                if isinstance(parent, Partition):
+                    devices.append(self.storage.get_name(parent))
+                else:
+                    devices.append(parent.name)
             self.storage_config.append(
                 {
                     "id": vmfs.name,
                     "name": vmfs.name,
                     "type": "vmfs6",
-                    "devices": sorted(
-                        [fs.get_parent().name for fs in vmfs.filesystems.all()]
-                    ),
+                    "devices": sorted(devices),
                 }
             )
 
@@ -677,7 +697,7 @@ class CurtinStorageGenerator:
     def _generate_mount_operation(self, filesystem):
         """Generate mount operation for `filesystem` and place in
         `storage_config`."""
-        device_or_partition = filesystem.get_parent()
+        device_or_partition = self.storage.get_parent(filesystem)
         stanza = {"type": "mount"}
         if device_or_partition == self.node:
             # this is a special filesystem
@@ -691,11 +711,9 @@ class CurtinStorageGenerator:
                 }
             )
         else:
+            name = self.storage.get_name(device_or_partition)
             stanza.update(
-                {
-                    "id": "%s_mount" % device_or_partition.get_name(),
-                    "device": "%s_format" % device_or_partition.get_name(),
-                }
+                {"id": "%s_mount" % name, "device": "%s_format" % name}
             )
         if filesystem.uses_mount_point:
             stanza["path"] = filesystem.mount_point
@@ -0,0 +1,385 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Snapshots of a node's storage and network topology for preseeds.
+
+Generating the curtin configuration walks every block device, partition,
+filesystem, interface, IP address, subnet and route of a node. Walking them
+through the ORM costs queries for each of them, so these snapshots fetch the
+whole topology in a fixed number of queries and answer the questions the
+generators ask from memory.
+"""
+
+__all__ = ["NodeTopology", "NetworkTopology", "StorageTopology"]
+
+from collections import defaultdict
+from itertools import chain
+from operator import attrgetter
+
+from django.db.models import Q
+
+from maasserver.enum import INTERFACE_TYPE, IPADDRESS_TYPE
+from maasserver.models import (
+    Filesystem,
+    Interface,
+    ISCSIBlockDevice,
+    Partition,
+    PartitionTable,
+    PhysicalBlockDevice,
+    StaticIPAddress,
+    VirtualBlockDevice,
+)
+from maasserver.models.interface import (
+    get_interface_effective_mtu,
+    get_vlan_interface_name,
+    is_interface_enabled,
+)
+from maasserver.models.partition import get_partition_number_in_table
+from maasserver.models.staticroute import StaticRoute
+from maasserver.storage_layouts import VMFS6StorageLayout
+from maasserver.utils.storage import select_effective_filesystem
+
+
+class NodeTopology:
+    """The storage and network topology of a node.
+
+    Each half is loaded the first time it's needed, and then kept.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self._storage = None
+        self._network = None
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = StorageTopology(self.node)
+        return self._storage
+
+    @property
+    def network(self):
+        if self._network is None:
+            self._network = NetworkTopology(self.node)
+        return self._network
+
+
+class StorageTopology:
+    """The block devices, partitions and filesystems of a node.
+
+    Loading it costs six queries, however many devices the node has.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.block_devices = sorted(
+            chain(
+                PhysicalBlockDevice.objects.filter(node=node),
+                ISCSIBlockDevice.objects.filter(node=node),
+                VirtualBlockDevice.objects.filter(node=node).select_related(
+                    "filesystem_group"
+                ),
+            ),
+            key=attrgetter("id"),
+        )
+        self._block_devices = {
+            block_device.id: block_device
+            for block_device in self.block_devices
+        }
+        self._partition_tables = {}
+        for partition_table in PartitionTable.objects.filter(
+            block_device__node=node
+        ).order_by("id"):
+            self._partition_tables.setdefault(
+                partition_table.block_device_id, partition_table
+            )
+        self._partition_table_devices = {
+            partition_table.id: self._block_devices[block_device_id]
+            for block_device_id, partition_table in (
+                self._partition_tables.items()
+            )
+        }
+        self._partitions = defaultdict(list)
+        self._partitions_by_id = {}
+        for partition in Partition.objects.filter(
+            partition_table__block_device__node=node
+        ).order_by("id"):
+            if partition.partition_table_id in self._partition_table_devices:
+                self._partitions[partition.partition_table_id].append(
+                    partition
+                )
+                self._partitions_by_id[partition.id] = partition
+        self._partition_filesystems = defaultdict(list)
+        self._block_device_filesystems = defaultdict(list)
+        self._group_filesystems = defaultdict(list)
+        self._cache_set_filesystems = defaultdict(list)
+        self.special_filesystems = []
+        for filesystem in Filesystem.objects.filter(
+            Q(block_device__node=node)
+            | Q(partition__partition_table__block_device__node=node)
+            | Q(node=node)
+        ).order_by("id"):
+            if filesystem.partition_id is not None:
+                self._partition_filesystems[filesystem.partition_id].append(
+                    filesystem
+                )
+            elif filesystem.block_device_id is not None:
+                self._block_device_filesystems[
+                    filesystem.block_device_id
+                ].append(filesystem)
+            if filesystem.node_id == node.id:
+                self.special_filesystems.append(filesystem)
+            if filesystem.filesystem_group_id is not None:
+                self._group_filesystems[filesystem.filesystem_group_id].append(
+                    filesystem
+                )
+            if filesystem.cache_set_id is not None:
+                self._cache_set_filesystems[filesystem.cache_set_id].append(
+                    filesystem
+                )
+        self._virtual_devices = defaultdict(list)
+        for block_device in self.block_devices:
+            if isinstance(block_device, VirtualBlockDevice):
+                self._virtual_devices[block_device.filesystem_group_id].append(
+                    block_device
+                )
+
+        self.physical_block_devices = [
+            block_device
+            for block_device in self.block_devices
+            if isinstance(block_device, PhysicalBlockDevice)
+        ]
+        self.boot_disk = self._block_devices.get(node.boot_disk_id)
+        if self.boot_disk is None:
+            if node.boot_disk_id is not None:
+                self.boot_disk = node.get_boot_disk()
+            elif len(self.physical_block_devices) > 0:
+                # Fallback to using the first created physical block device
+                # as the boot disk, as `Node.get_boot_disk` does.
+                self.boot_disk = self.physical_block_devices[0]
+        self.arch, _ = node.split_arch()
+        self.bios_boot_method = node.get_bios_boot_method()
+        self.vmfs_block_device = None
+        for block_device in self.physical_block_devices:
+            partition_table = self.get_partitiontable(block_device)
+            if partition_table is not None:
+                if VMFS6StorageLayout.is_layout_partition_table(
+                    partition_table, self.get_partitions(partition_table)
+                ):
+                    self.vmfs_block_device = block_device
+                    break
+
+    def get_partitiontable(self, block_device):
+        """Return the partition table of `block_device`, or None."""
+        return self._partition_tables.get(block_device.id)
+
+    def get_partitions(self, partition_table):
+        """Return the partitions in `partition_table`, ordered by ID."""
+        return self._partitions.get(partition_table.id, [])
+
+    def get_block_device(self, partition):
+        """Return the block device that `partition` is on."""
+        return self._partition_table_devices[partition.partition_table_id]
+
+    def get_partition_table(self, partition):
+        """Return the partition table that `partition` is in."""
+        block_device = self.get_block_device(partition)
+        return self._partition_tables[block_device.id]
+
+    def get_effective_filesystem(self, model):
+        """Return the filesystem on a block device or partition."""
+        if isinstance(model, Partition):
+            filesystems = self._partition_filesystems.get(model.id, [])
+        else:
+            filesystems = self._block_device_filesystems.get(model.id, [])
+        return select_effective_filesystem(self.node, filesystems)
+
+    def get_filesystems(self, filesystem_group):
+        """Return the filesystems that make up `filesystem_group`."""
+        return self._group_filesystems.get(filesystem_group.id, [])
+
+    def get_virtual_device(self, filesystem_group):
+        """Return the virtual block device of a RAID or bcache."""
+        virtual_devices = self._virtual_devices.get(filesystem_group.id, [])
+        if len(virtual_devices) > 0:
+            return virtual_devices[0]
+        else:
+            return None
+
+    def get_cache_device(self, cache_set_id):
+        """Return the block device or partition that caches a bcache."""
+        filesystems = self._cache_set_filesystems.get(cache_set_id, [])
+        if len(filesystems) > 0:
+            return self.get_parent(filesystems[0])
+        else:
+            return None
+
+    def get_parent(self, filesystem):
+        """Return the block device, partition or node `filesystem` is on.
+
+        This is `Filesystem.get_parent` for the loaded topology.
+        """
+        if filesystem.partition_id is not None:
+            return self._partitions_by_id[filesystem.partition_id]
+        elif filesystem.block_device_id is not None:
+            return self._block_devices[filesystem.block_device_id]
+        elif filesystem.node_id is not None:
+            return self.node
+        else:
+            return None
+
+    def get_name(self, model):
+        """Return the name of a block device or partition."""
+        if isinstance(model, Partition):
+            return "%s-part%s" % (
+                self.get_block_device(model).get_name(),
+                self.get_partition_number(model),
+            )
+        else:
+            return model.get_name()
+
+    def get_partition_number(self, partition):
+        """Return the number of `partition` in its partition table.
+
+        This is `Partition.get_partition_number` for the loaded topology,
+        which otherwise costs several queries for each partition.
+        """
+        partition_table = self.get_partition_table(partition)
+        partitions_in_table = self.get_partitions(partition_table)
+        return get_partition_number_in_table(
+            partitions_in_table.index(partition),
+            len(partitions_in_table),
+            partition_table.table_type,
+            self.get_block_device(partition),
+            lambda: (
+                self.arch,
+                self.boot_disk,
+                self.bios_boot_method,
+                self.vmfs_block_device,
+            ),
+        )
+
+
+class NetworkTopology:
+    """The interfaces, IP addresses, subnets and routes of a node.
+
+    Loading it costs at most six queries, however many interfaces the node
+    has.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        interfaces = list(
+            Interface.objects.filter(node=node)
+            .select_related("vlan")
+            .prefetch_related("parent_relationships")
+            .order_by("name")
+        )
+        self._interfaces = {iface.id: iface for iface in interfaces}
+        self._parents = {}
+        self._children = defaultdict(list)
+        for iface in interfaces:
+            parents = [
+                self._interfaces[relationship.parent_id]
+                for relationship in iface.parent_relationships.all()
+                if relationship.parent_id in self._interfaces
+            ]
+            # Parents are ordered as `iface.parents.all()` would be.
+            self._parents[iface.id] = sorted(
+                parents, key=attrgetter("created", "id")
+            )
+            for parent in parents:
+                self._children[parent.id].append(iface)
+        self.interfaces = list(
+            Interface.objects.order_parents_first(interfaces)
+        )
+
+        self._addresses = defaultdict(list)
+        links = (
+            Interface.ip_addresses.through.objects.filter(interface__node=node)
+            .select_related("staticipaddress__subnet__vlan")
+            .order_by("staticipaddress_id")
+        )
+        vlans = {}
+        for link in links:
+            address = link.staticipaddress
+            self._addresses[link.interface_id].append(address)
+            subnet = address.subnet
+            if subnet is not None and subnet.allow_dns:
+                vlans[subnet.vlan_id] = subnet.vlan
+
+        self.routes = list(
+            StaticRoute.objects.select_related("source", "destination")
+        )
+
+        # The addresses of the racks serving each VLAN, which are offered to
+        # the node as DNS servers.
+        self._rack_addresses = defaultdict(list)
+        rack_ids = {
+            rack_id
+            for vlan in vlans.values()
+            for rack_id in (vlan.primary_rack_id, vlan.secondary_rack_id)
+            if rack_id is not None
+        }
+        if len(rack_ids) > 0:
+            rack_addresses = (
+                StaticIPAddress.objects.filter(
+                    interface__node__in=rack_ids,
+                    subnet__vlan__in=list(vlans),
+                    alloc_type__in=[
+                        IPADDRESS_TYPE.AUTO,
+                        IPADDRESS_TYPE.STICKY,
+                    ],
+                )
+                .exclude(ip=None)
+                .order_by("id")
+                .values_list("subnet__vlan_id", "interface__node_id", "ip")
+            )
+            for vlan_id, rack_id, ip in rack_addresses:
+                vlan = vlans[vlan_id]
+                if rack_id in (vlan.primary_rack_id, vlan.secondary_rack_id):
+                    self._rack_addresses[vlan_id].append(ip)
+
+    def get_parents(self, iface):
+        """Return the parents of `iface`, oldest first."""
+        return self._parents.get(iface.id, [])
+
+    def get_addresses(self, iface):
+        """Return the IP addresses linked to `iface`, ordered by ID."""
+        return self._addresses.get(iface.id, [])
+
+    def get_rack_addresses(self, vlan_id):
+        """Return the addresses of the racks that serve a VLAN."""
+        return self._rack_addresses.get(vlan_id, [])
+
+    def get_name(self, iface):
+        """Return the name of `iface`.
+
+        This is `Interface.get_name` for the loaded topology.
+        """
+        if iface.type != INTERFACE_TYPE.VLAN:
+            return iface.name
+
+        def get_parent():
+            parents = self.get_parents(iface)
+            return parents[0] if len(parents) > 0 else None
+
+        return get_vlan_interface_name(
+            iface, self.node.is_controller, get_parent
+        )
+
+    def is_enabled(self, iface):
+        """Return whether `iface` should be configured.
+
+        This is `Interface.is_enabled` for the loaded topology.
+        """
+        return is_interface_enabled(iface, self.get_parents)
+
+    def get_effective_mtu(self, iface):
+        """Return the MTU of `iface`.
+
+        This is `Interface.get_effective_mtu` for the loaded topology.
+        """
+        return get_interface_effective_mtu(
+            iface, lambda parent: self._children.get(parent.id, [])
+        )
@@ -5,13 +5,18 @@ from twisted.web.server import Site
 
 from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.prometheus.resource import PrometheusMetricsResource
+from provisioningserver.utils.debug import ProfilerResource
 from provisioningserver.utils.twisted import reducedWebLogFormatter
 
 
 def create_prometheus_exporter_service(reactor, port):
-    """Return a service exposing prometheus metrics on the specified port."""
+    """Return a service exposing prometheus metrics on the specified port.
+
+    The on-demand profiler for the process is exposed alongside them.
+    """
     root = Resource()
     root.putChild(b"metrics", PrometheusMetricsResource(PROMETHEUS_METRICS))
+    root.putChild(b"profile", ProfilerResource())
     site = Site(root, logFormatter=reducedWebLogFormatter)
     endpoint = TCP6ServerEndpoint(reactor, port)
     service = StreamServerEndpointService(endpoint, site)
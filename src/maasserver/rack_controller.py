@@ -30,6 +30,10 @@ DHCP:
     for messages on 'sys_dhcp_{id}' channel and set that rack controller as
     needing an update. Any time a message is received on this queue that rack
     controller is marked as needing an update.
+
+    A 'hosts_{vlan_id}' message means only the host maps on that VLAN have
+    changed. Unless the rack controller also needs a full update, only the
+    changes to those host maps are sent to it.
 """
 
 
@@ -78,6 +82,10 @@ class RackControllerService(Service):
         self.processingDone = None
         self.watching = set()
         self.needsDHCPUpdate = set()
+        # Maps the ID of each rack controller that needs its host maps
+        # updated to the IDs of the VLANs on which they changed.
+        self.needsDHCPHostsUpdate = {}
+        self.dhcpStates = {}
         self.ipcWorker = ipcWorker
         self.postgresListener = postgresListener
 
@@ -160,6 +168,8 @@ class RackControllerService(Service):
 
             self.watching = set()
             self.needsDHCPUpdate = set()
+            self.needsDHCPHostsUpdate = {}
+            self.dhcpStates = {}
             self.starting = None
             if self.processing.running:
                 self.processing.stop()
@@ -197,6 +207,8 @@ class RackControllerService(Service):
                     rack_id=rack_id,
                 )
             self.needsDHCPUpdate.discard(rack_id)
+            self.needsDHCPHostsUpdate.pop(rack_id, None)
+            self.dhcpStates.pop(rack_id, None)
             self.watching.discard(rack_id)
         elif action == "watch":
             if rack_id not in self.watching:
@@ -236,7 +248,13 @@ class RackControllerService(Service):
         _, rack_id = channel.split("sys_dhcp_")
         rack_id = int(rack_id)
         if rack_id in self.watching:
-            self.needsDHCPUpdate.add(rack_id)
+            if message.startswith("hosts_"):
+                vlan_id = int(message.split("_", 1)[1])
+                self.needsDHCPHostsUpdate.setdefault(rack_id, set()).add(
+                    vlan_id
+                )
+            else:
+                self.needsDHCPUpdate.add(rack_id)
             self.startProcessing()
 
             log.debug(
@@ -266,9 +284,27 @@ class RackControllerService(Service):
         if not self.running:
             # We're shutting down.
             self.processing.stop()
-        elif len(self.needsDHCPUpdate) == 0:
+        elif len(self.needsDHCPUpdate) == 0 and not self.needsDHCPHostsUpdate:
             # Nothing more to do.
             self.processing.stop()
+        elif len(self.needsDHCPUpdate) == 0:
+
+            def _retryHostsOnFailure(failure, rack_id, vlan_ids):
+                self.needsDHCPHostsUpdate.setdefault(rack_id, set()).update(
+                    vlan_ids
+                )
+                return failure
+
+            rack_id, vlan_ids = self.needsDHCPHostsUpdate.popitem()
+            d = maybeDeferred(self.processDHCPHosts, rack_id, vlan_ids)
+            d.addErrback(_retryHostsOnFailure, rack_id, vlan_ids)
+            d.addErrback(lambda f: f.trap(NoConnectionsAvailable))
+            d.addErrback(
+                log.err,
+                "Failed updating DHCP host maps on rack controller 'id:%d'."
+                % rack_id,
+            )
+            return d
         else:
 
             def _retryOnFailure(failure, rack_id):
@@ -276,6 +312,8 @@ class RackControllerService(Service):
                 return failure
 
             rack_id = self.needsDHCPUpdate.pop()
+            # Configuring DHCP in full includes all host maps.
+            self.needsDHCPHostsUpdate.pop(rack_id, None)
             d = maybeDeferred(self.processDHCP, rack_id)
             d.addErrback(_retryOnFailure, rack_id)
             d.addErrback(lambda f: f.trap(NoConnectionsAvailable))
@@ -297,5 +335,29 @@ class RackControllerService(Service):
         d = deferToDatabase(
             transactional(RackController.objects.get), id=rack_id
         )
-        d.addCallback(dhcp.configure_dhcp)
+        d.addCallback(dhcp.configure_dhcp, self.getDHCPState(rack_id))
+        return d
+
+    def processDHCPHosts(self, rack_id, vlan_ids):
+        """Process DHCP host map changes on `vlan_ids` for the rack
+        controller."""
+        log.debug(
+            "[pid:{pid()}] pushing DHCP host maps to rack: {rack_id}",
+            pid=os.getpid,
+            rack_id=rack_id,
+        )
+
+        d = deferToDatabase(
+            transactional(RackController.objects.get), id=rack_id
+        )
+        d.addCallback(
+            dhcp.update_dhcp_hosts, self.getDHCPState(rack_id), vlan_ids
+        )
         return d
+
+    def getDHCPState(self, rack_id):
+        """Return the `RackDHCPState` for the rack controller."""
+        state = self.dhcpStates.get(rack_id)
+        if state is None:
+            state = self.dhcpStates[rack_id] = dhcp.RackDHCPState()
+        return state
@@ -1,7 +1,8 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from functools import partial
 import http.client
 import threading
+import time
 from typing import Mapping, Sequence, Union
 from urllib.parse import parse_qs, quote, urlparse
 
@@ -15,6 +16,17 @@ from maasserver.macaroon_auth import (
     UserDetails,
 )
 from maasserver.models import Config, ResourcePool
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
+
+# How long, in seconds, permissions fetched from RBAC are reused for by all
+# requests served by a process. Denials are reused for less time, so that
+# access granted in RBAC is picked up sooner.
+PERMISSION_CACHE_TTL = 30
+PERMISSION_CACHE_NEGATIVE_TTL = 10
+
+# The number of (user, permission) results held by each of the caches of
+# allowed and denied permissions.
+PERMISSION_CACHE_SIZE = 10000
 
 
 class SyncConflictError(Exception):
@@ -216,19 +228,112 @@ class FakeRBACClient(RBACClient):
         )
 
 
+class PermissionCache:
+    """A bounded cache of permissions, shared by all threads of a process.
+
+    Results are keyed on resource type, user and permission, and expire
+    after a TTL. Those that allow access to some resources and those that
+    deny access to all are held separately, with their own TTL, so that a
+    run of denials cannot evict the permissions of active users.
+    """
+
+    def __init__(
+        self,
+        size=PERMISSION_CACHE_SIZE,
+        ttl=PERMISSION_CACHE_TTL,
+        negative_ttl=PERMISSION_CACHE_NEGATIVE_TTL,
+        clock=time.monotonic,
+        prometheus_metrics=PROMETHEUS_METRICS,
+    ):
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.prometheus_metrics = prometheus_metrics
+        self._lock = threading.Lock()
+        self._allowed = OrderedDict()
+        self._denied = OrderedDict()
+
+    def get(self, resource_type, user, permission):
+        """Return the cached result, or `None` if there is none."""
+        key = resource_type, user, permission
+        now = self.clock()
+        with self._lock:
+            for entries, access in (
+                (self._allowed, "allowed"),
+                (self._denied, "denied"),
+            ):
+                entry = entries.get(key)
+                if entry is None:
+                    continue
+                expires, identifiers = entry
+                if expires <= now:
+                    del entries[key]
+                    continue
+                entries.move_to_end(key)
+                break
+            else:
+                return None
+        self._record("hit", access)
+        return identifiers
+
+    def set(self, resource_type, user, permission, identifiers):
+        """Cache the result of a lookup that missed the cache."""
+        key = resource_type, user, permission
+        if identifiers is ALL_RESOURCES or len(identifiers) > 0:
+            entries, others = self._allowed, self._denied
+            ttl, access = self.ttl, "allowed"
+        else:
+            entries, others = self._denied, self._allowed
+            ttl, access = self.negative_ttl, "denied"
+        now = self.clock()
+        with self._lock:
+            others.pop(key, None)
+            entries[key] = now + ttl, identifiers
+            entries.move_to_end(key)
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+        self._record("miss", access)
+
+    def clear(self):
+        """Clear all cached results."""
+        with self._lock:
+            self._allowed.clear()
+            self._denied.clear()
+
+    def __len__(self):
+        return len(self._allowed) + len(self._denied)
+
+    def _record(self, result, access):
+        self.prometheus_metrics.update(
+            "maas_rbac_permission_cache_lookups",
+            "inc",
+            labels={"result": result, "access": access},
+        )
+
+
 # Set when there is no client for the current request.
 NO_CLIENT = object()
 
 
 class RBACWrapper:
-    """Object for querying RBAC information."""
+    """Object for querying RBAC information.
+
+    Permissions are cached for the current request by each thread, and
+    across requests by `shared_cache`. The shared cache is cleared when the
+    RBAC configuration changes, and when `sys_rbac` is notified: that is,
+    when a change is recorded in the `RBACSync` journal.
+    """
 
-    def __init__(self, client_class=None):
+    def __init__(self, client_class=None, shared_cache=None):
         # A client is created per thread.
         self._store = threading.local()
         self._client_class = client_class
         if self._client_class is None:
             self._client_class = RBACClient
+        self.shared_cache = shared_cache
+        if self.shared_cache is None:
+            self.shared_cache = PermissionCache()
 
     def _get_rbac_url(self):
         """Return the configured RBAC url."""
@@ -264,12 +369,16 @@ class RBACWrapper:
                     # now that RBAC is enabled.
                     client = self._client_class(url, auth_info)
                     self._store.client = client
+                    self.shared_cache.clear()
                 elif client._url != url or client._auth_info != auth_info:
                     # URL or creds differ, re-create the client.
                     client = self._client_class(url, auth_info)
                     self._store.client = client
+                    self.shared_cache.clear()
             else:
                 # RBAC is now disabled.
+                if client is not NO_CLIENT:
+                    self.shared_cache.clear()
                 client = None
                 self._store.client = NO_CLIENT
 
@@ -304,10 +413,18 @@ class RBACWrapper:
         return scoped
 
     def clear_cache(self):
-        """Clears the entire cache."""
+        """Clears the entire cache for the current thread."""
         if hasattr(self._store, "cache"):
             delattr(self._store, "cache")
 
+    def clear_shared_cache(self):
+        """Clears the cache shared by all threads."""
+        self.shared_cache.clear()
+
+    def mark_changed(self, channel, message):
+        """Called when the `sys_rbac` message is received."""
+        self.clear_shared_cache()
+
     def get_resource_pool_ids(
         self, user: str, *permissions: Sequence[str]
     ) -> Mapping[str, ResourcesResultType]:
@@ -356,7 +473,8 @@ class RBACWrapper:
         """Get the resource pool identifiers from RBAC.
 
         Uses the thread-local cache so only one request is made to RBAC per
-        request to MAAS.
+        request to MAAS, and the shared cache so that requests are only made
+        to RBAC once its results expire.
 
         @param user: The user name of the user.
         @param permission: A permission that the user should
@@ -366,6 +484,12 @@ class RBACWrapper:
         results, missing = {}, []
         for permission in permissions:
             identifiers = cache.get(permission, None)
+            if identifiers is None:
+                identifiers = self.shared_cache.get(
+                    "resource-pool", user, permission
+                )
+                if identifiers is not None:
+                    cache[permission] = identifiers
             if identifiers is None:
                 missing.append(permission)
             else:
@@ -378,6 +502,9 @@ class RBACWrapper:
             for permission in missing:
                 identifiers = fetched.get(permission, {})
                 cache[permission] = results[permission] = identifiers
+                self.shared_cache.set(
+                    "resource-pool", user, permission, identifiers
+                )
 
         return results
 
@@ -12,6 +12,14 @@ DNS:
     as requiring an update. Once marked for update the DNS configuration is
     updated and bind9 is told to reload.
 
+    Reloads are debounced so that a burst of changes, like those made while
+    deploying many machines, is published together: bind9 is reloaded once
+    no message has arrived for `dns_reload_interval` seconds, or once the
+    oldest unpublished message is `dns_reload_max_delay` seconds old, but
+    never sooner than `dns_reload_interval` seconds after the last reload.
+    Since this service runs only in the master regiond process, bind9 is
+    reloaded by a single process on each region controller.
+
 Proxy:
     The regiond process listens for messages from Postgres on channel
     'sys_proxy'. Any time a message is recieved on that channel the maas-proxy
@@ -22,17 +30,21 @@ RBAC:
     The regiond process listens for messages from Postgres on channel
     'sys_rbac'. Any time a message is recieved on that channel the RBAC
     micro-service is marked as required a sync. Once marked for sync the
-    RBAC micro-service will be pushed the changed information.
+    RBAC micro-service will be pushed the changed information. The web
+    application in every regiond process listens on the same channel, to
+    clear the permissions it has cached across requests.
 """
 
 
 from operator import attrgetter
 
+from django.utils import timezone
 from twisted.application.service import Service
 from twisted.internet import reactor
 from twisted.internet.defer import DeferredList, inlineCallbacks
 from twisted.internet.task import LoopingCall
 from twisted.names.client import Resolver
+from twisted.python.failure import Failure
 
 from maasserver import locks
 from maasserver.dns.config import dns_update_all_zones
@@ -48,6 +60,7 @@ from maasserver.utils import synchronised
 from maasserver.utils.orm import transactional, with_connection
 from maasserver.utils.threads import deferToDatabase
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.twisted import asynchronous, FOREVER, pause
 
 log = LegacyLogger()
@@ -72,22 +85,36 @@ class RegionControllerService(Service):
         clock=reactor,
         retryOnFailure=True,
         rbacRetryOnFailureDelay=10,
+        dnsReloadInterval=0,
+        dnsReloadMaxDelay=0,
+        prometheus_metrics=PROMETHEUS_METRICS,
     ):
         """Initialise a new `RegionControllerService`.
 
         :param postgresListener: The `PostgresListenerService` that is running
             in this regiond process.
+        :param dnsReloadInterval: The minimum time between DNS reloads, and
+            the time without changes after which DNS is reloaded.
+        :param dnsReloadMaxDelay: The maximum time a change waits for DNS to
+            be reloaded while changes keep arriving.
         """
         super().__init__()
         self.clock = clock
         self.retryOnFailure = retryOnFailure
         self.rbacRetryOnFailureDelay = rbacRetryOnFailureDelay
+        self.dnsReloadInterval = dnsReloadInterval
+        self.dnsReloadMaxDelay = dnsReloadMaxDelay
         self.processing = LoopingCall(self.process)
         self.processing.clock = self.clock
         self.processingDefer = None
         self.needsDNSUpdate = False
         self.needsProxyUpdate = False
         self.needsRBACUpdate = False
+        # When the oldest and newest unpublished DNS changes were notified,
+        # and when DNS was last reloaded, according to `clock`.
+        self.dnsFirstChanged = None
+        self.dnsLastChanged = None
+        self.dnsLastReloaded = None
         self.postgresListener = postgresListener
         self.dnsResolver = Resolver(
             resolv=None,
@@ -98,6 +125,7 @@ class RegionControllerService(Service):
         self.previousSerial = None
         self.rbacClient = None
         self.rbacInit = False
+        self.prometheus_metrics = prometheus_metrics
 
     @asynchronous(timeout=FOREVER)
     def startService(self):
@@ -132,6 +160,10 @@ class RegionControllerService(Service):
 
     def markDNSForUpdate(self, channel, message):
         """Called when the `sys_dns` message is received."""
+        now = self.clock.seconds()
+        if self.dnsFirstChanged is None:
+            self.dnsFirstChanged = now
+        self.dnsLastChanged = now
         self.needsDNSUpdate = True
         self.startProcessing()
 
@@ -175,10 +207,12 @@ class RegionControllerService(Service):
                 return pause(delay)
 
         defers = []
-        if self.needsDNSUpdate:
+        if self.needsDNSUpdate and self._isDNSReloadDue():
             self.needsDNSUpdate = False
+            self.dnsFirstChanged = self.dnsLastChanged = None
             d = deferToDatabase(transactional(dns_update_all_zones))
             d.addCallback(self._checkSerial)
+            d.addBoth(self._recordDNSReload)
             d.addCallback(self._logDNSReload)
             # Order here matters, first needsDNSUpdate is set then pass the
             # failure onto `_onDNSReloadFailure` to do the correct thing
@@ -205,12 +239,45 @@ class RegionControllerService(Service):
                 self.rbacRetryOnFailureDelay if self.retryOnFailure else None,
             )
             defers.append(d)
-        if len(defers) == 0:
-            # Nothing more to do.
+        if len(defers) > 0:
+            return DeferredList(defers)
+        elif not self.needsDNSUpdate:
+            # Nothing more to do. Otherwise the DNS reload is being held back
+            # to batch further changes, so keep looping until it is due.
             self.processing.stop()
             self.processingDefer = None
+
+    def _isDNSReloadDue(self):
+        """Return True if DNS should be reloaded now.
+
+        The first reload, on start-up, is never held back. Reloads that were
+        not notified, like retries, are held back only by the minimum
+        interval between reloads.
+        """
+        now = self.clock.seconds()
+        if self.dnsLastReloaded is None:
+            return True
+        elif now - self.dnsLastReloaded < self.dnsReloadInterval:
+            return False
+        elif self.dnsFirstChanged is None:
+            return True
         else:
-            return DeferredList(defers)
+            return (
+                now - self.dnsLastChanged >= self.dnsReloadInterval
+                or now - self.dnsFirstChanged >= self.dnsReloadMaxDelay
+            )
+
+    def _recordDNSReload(self, result):
+        """Record that DNS was reloaded, successfully or not."""
+        self.dnsLastReloaded = self.clock.seconds()
+        if isinstance(result, Failure):
+            labels = {"result": "failure"}
+        else:
+            labels = {"result": "success"}
+        self.prometheus_metrics.update(
+            "maas_dns_reloads", "inc", labels=labels
+        )
+        return result
 
     @inlineCallbacks
     def _checkSerial(self, result):
@@ -261,7 +328,9 @@ class RegionControllerService(Service):
             # This is a reload since the region has been running. Get the
             # reason for the reload.
 
-            def _logReason(reasons):
+            def _logReason(publications):
+                self._recordPublicationLatency(publications)
+                reasons = [source for source, _ in publications]
                 if len(reasons) == 0:
                     msg = (
                         "Reloaded DNS configuration; previous failure (retry)"
@@ -275,7 +344,7 @@ class RegionControllerService(Service):
                 log.msg(msg)
 
             d = deferToDatabase(
-                self._getReloadReasons, self.previousSerial, serial
+                self._getReloadPublications, self.previousSerial, serial
             )
             d.addCallback(_logReason)
             d.addErrback(log.err, "Failed to log reason for DNS reload")
@@ -294,13 +363,33 @@ class RegionControllerService(Service):
         return d
 
     @transactional
-    def _getReloadReasons(self, previousSerial, currentSerial):
-        return [
-            publication.source
-            for publication in DNSPublication.objects.filter(
+    def _getReloadPublications(self, previousSerial, currentSerial):
+        """Return the source and creation time of each publication reloaded.
+
+        The most recent publication comes first.
+        """
+        return list(
+            DNSPublication.objects.filter(
                 serial__gt=previousSerial, serial__lte=currentSerial
-            ).order_by("-id")
-        ]
+            )
+            .order_by("-id")
+            .values_list("source", "created")
+        )
+
+    def _recordPublicationLatency(self, publications):
+        """Record how long the reloaded publications waited for DNS."""
+        if len(publications) == 0:
+            return
+        now = timezone.now()
+        for _, created in publications:
+            self.prometheus_metrics.update(
+                "maas_dns_publication_latency",
+                "observe",
+                value=(now - created).total_seconds(),
+            )
+        self.prometheus_metrics.update(
+            "maas_dns_reload_publications", "observe", value=len(publications)
+        )
 
     def _getRBACClient(self):
         """Return the `RBACClient`.
@@ -0,0 +1,89 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Size the database thread-pool to this worker's share of connections."""
+
+
+from datetime import timedelta
+
+from django.db import connection
+from twisted.application.internet import TimerService
+from twisted.internet import reactor
+
+from maasserver.models.node import RegionController
+from maasserver.models.regioncontrollerprocess import RegionControllerProcess
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import (
+    deferToDatabase,
+    max_threads_for_database_pool_ceiling,
+)
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.twisted import (
+    PrioritisedThreadPool,
+    synchronous,
+)
+
+log = LegacyLogger()
+
+# Connections left for everything that isn't a region process, e.g.
+# administrators and `maas-region` commands.
+reserved_connections = 10
+
+
+@synchronous
+@transactional
+def get_connection_share():
+    """Return the number of connections each region process may use.
+
+    PostgreSQL's connection limit, less those reserved for superusers and
+    `reserved_connections`, is shared equally between every region worker
+    and every region's master process.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT current_setting('max_connections')::int - "
+            "current_setting('superuser_reserved_connections')::int"
+        )
+        [available] = cursor.fetchone()
+    processes = (
+        RegionControllerProcess.objects.count()
+        + RegionController.objects.count()
+    )
+    return (available - reserved_connections) // max(1, processes)
+
+
+class DatabasePoolBudgetService(TimerService):
+    """Adjust the maximum size of this worker's database thread-pool.
+
+    Each worker is allowed its share of the cluster's connection budget,
+    less the connection used by its `PostgresListenerService`, up to
+    `max_threads_for_database_pool_ceiling`. The share is recalculated
+    periodically as region processes come and go.
+    """
+
+    interval = timedelta(seconds=60).total_seconds()
+
+    def __init__(self, clock=reactor):
+        super().__init__(self.interval, self._tryUpdate)
+        self.clock = clock
+
+    def _tryUpdate(self):
+        d = deferToDatabase(get_connection_share)
+        d.addCallback(self._updateMaximum)
+        d.addErrback(
+            log.err, "Failed to update the database thread-pool budget."
+        )
+        return d
+
+    def _updateMaximum(self, share):
+        pool = reactor.threadpoolForDatabase
+        if isinstance(pool, PrioritisedThreadPool):
+            maximum = pool.maximum
+            pool.setMaximum(
+                min(share - 1, max_threads_for_database_pool_ceiling)
+            )
+            if pool.maximum != maximum:
+                log.msg(
+                    "Database thread-pool may now use up to %d "
+                    "connections." % pool.maximum
+                )
@@ -0,0 +1,55 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Correct the resources recorded as used in pods."""
+
+
+from datetime import timedelta
+
+from twisted.application.internet import TimerService
+from twisted.internet import reactor
+
+from maasserver.models import PodUsage
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.twisted import synchronous
+
+log = LegacyLogger()
+
+
+@synchronous
+@transactional
+def reconcile_pod_usage():
+    """Recalculate the usage of every pod.
+
+    :return: The names of the pods whose usage was corrected.
+    """
+    return sorted(usage.pod.name for usage in PodUsage.objects.reconcile())
+
+
+class PodUsageReconciliationService(TimerService):
+    """Periodically recalculate the resources used in each pod.
+
+    `PodUsage` is updated as machines and block devices are saved, so this
+    only corrects changes made without signals, such as bulk updates.
+    """
+
+    interval = timedelta(minutes=10).total_seconds()
+
+    def __init__(self, clock=reactor):
+        super().__init__(self.interval, self._tryReconcile)
+        self.clock = clock
+
+    def _tryReconcile(self):
+        d = deferToDatabase(reconcile_pod_usage)
+        d.addCallback(self._logCorrections)
+        d.addErrback(log.err, "Failed to reconcile pod resource usage.")
+        return d
+
+    def _logCorrections(self, names):
+        if len(names) > 0:
+            log.msg(
+                "Corrected the recorded resource usage of pods: %s"
+                % ", ".join(names)
+            )
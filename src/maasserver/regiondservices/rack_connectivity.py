@@ -0,0 +1,196 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Report rack controllers that are not connected to the region.
+
+Each regiond worker keeps the set of rack controllers, and the set of those
+connected to it, in memory. Connections are tracked through the events of
+the `RegionService`, and rack controllers being added or removed through the
+'controller' notifications of the Postgres listener. A persistent error is
+registered while any rack controller is not connected, and discarded once
+they all are; the database is only written when the number of disconnected
+rack controllers changes.
+"""
+
+
+from twisted.application.service import Service
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredLock, inlineCallbacks
+
+from maasserver.components import (
+    discard_persistent_error,
+    register_persistent_error,
+)
+from maasserver.enum import COMPONENT
+from maasserver.models.node import RackController
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.twisted import asynchronous, FOREVER, synchronous
+
+log = LegacyLogger()
+
+
+@synchronous
+@transactional
+def get_rack_controller_ids():
+    """Return the system IDs of all rack controllers."""
+    return set(RackController.objects.values_list("system_id", flat=True))
+
+
+@synchronous
+@transactional
+def report_disconnected_rack_controllers(count):
+    """Register or discard the error for disconnected rack controllers.
+
+    :param count: The number of rack controllers not connected.
+    """
+    if count == 0:
+        discard_persistent_error(COMPONENT.RACK_CONTROLLERS)
+    else:
+        if count == 1:
+            message = "One rack controller is not yet connected to the region"
+        else:
+            message = (
+                "%d rack controllers are not yet connected to the region"
+                % count
+            )
+        message = (
+            '%s. Visit the <a href="/MAAS/l/controllers">'
+            "rack controllers page</a> for "
+            "more information." % message
+        )
+        register_persistent_error(COMPONENT.RACK_CONTROLLERS, message)
+
+
+class RackConnectivityService(Service):
+    """Track which rack controllers are connected to this process.
+
+    See module documentation for more details.
+    """
+
+    # Changes are reported after this many seconds, so that a burst of
+    # connections, as when a region starts, is reported once.
+    UPDATE_DELAY = 1.0
+
+    def __init__(self, rpcService, postgresListener, clock=reactor):
+        """Initialise a new `RackConnectivityService`.
+
+        :param rpcService: The `RegionService` that is running in this
+            regiond process.
+        :param postgresListener: The `PostgresListenerService` that is running
+            in this regiond process.
+        """
+        super().__init__()
+        self.clock = clock
+        self.rpcService = rpcService
+        self.postgresListener = postgresListener
+        # The system IDs of all rack controllers, and of those connected.
+        self.rackIds = set()
+        self.connectedIds = set()
+        # The number of disconnected rack controllers last reported.
+        self.reported = None
+        self.needsReload = True
+        self.pending = None
+        self.lock = DeferredLock()
+
+    @property
+    def disconnectedIds(self):
+        """The system IDs of the rack controllers not connected."""
+        return self.rackIds - self.connectedIds
+
+    @asynchronous(timeout=FOREVER)
+    def startService(self):
+        """Start tracking rack controllers."""
+        super().startService()
+        self.connectedIds = {
+            ident
+            for ident, connections in self.rpcService.connections.items()
+            if len(connections) > 0
+        }
+        self.rpcService.events.connected.registerHandler(self.rackConnected)
+        self.rpcService.events.disconnected.registerHandler(
+            self.rackDisconnected
+        )
+        self.postgresListener.register("controller", self.controllerChanged)
+        self.postgresListener.events.connected.registerHandler(
+            self.markForReload
+        )
+        self.markForReload()
+
+    @asynchronous(timeout=FOREVER)
+    def stopService(self):
+        """Stop tracking rack controllers."""
+        super().stopService()
+        self.rpcService.events.connected.unregisterHandler(self.rackConnected)
+        self.rpcService.events.disconnected.unregisterHandler(
+            self.rackDisconnected
+        )
+        self.postgresListener.unregister("controller", self.controllerChanged)
+        self.postgresListener.events.connected.unregisterHandler(
+            self.markForReload
+        )
+        if self.pending is not None and self.pending.active():
+            self.pending.cancel()
+        self.pending = None
+        # Wait for an update in progress to finish.
+        return self.lock.run(lambda: None)
+
+    def rackConnected(self, ident):
+        """Called when a rack controller connects to this process."""
+        if ident not in self.connectedIds:
+            self.connectedIds.add(ident)
+            self.scheduleUpdate()
+
+    def rackDisconnected(self, ident):
+        """Called when a connection from a rack controller is lost."""
+        # A rack controller may still have other connections open.
+        if len(self.rpcService.connections.get(ident, ())) == 0:
+            if ident in self.connectedIds:
+                self.connectedIds.discard(ident)
+                self.scheduleUpdate()
+
+    def controllerChanged(self, action, system_id):
+        """Called when the `controller` message is received."""
+        self.markForReload()
+
+    def markForReload(self):
+        """Reload the rack controllers from the database."""
+        self.needsReload = True
+        self.scheduleUpdate()
+
+    def scheduleUpdate(self):
+        """Report the rack controllers after `UPDATE_DELAY` seconds."""
+        if self.running and (
+            self.pending is None or not self.pending.active()
+        ):
+            self.pending = self.clock.callLater(
+                self.UPDATE_DELAY, self._runUpdate
+            )
+
+    def _runUpdate(self):
+        def eb_retry(failure):
+            log.err(failure, "Failed to report disconnected rack controllers.")
+            self.scheduleUpdate()
+
+        self.pending = None
+        d = self.lock.run(self.update)
+        d.addErrback(eb_retry)
+        return d
+
+    @inlineCallbacks
+    def update(self):
+        """Reload the rack controllers if needed, and report any changes."""
+        if self.needsReload:
+            self.needsReload = False
+            try:
+                self.rackIds = yield deferToDatabase(get_rack_controller_ids)
+            except Exception:
+                self.needsReload = True
+                raise
+        disconnected = len(self.disconnectedIds)
+        if disconnected != self.reported:
+            yield deferToDatabase(
+                report_disconnected_rack_controllers, disconnected
+            )
+            self.reported = disconnected
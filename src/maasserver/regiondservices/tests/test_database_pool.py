@@ -0,0 +1,82 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.regiondservices.database_pool`."""
+
+
+from unittest.mock import Mock
+
+from django.db import connection
+from twisted.internet import reactor
+from twisted.internet.defer import succeed
+
+from maasserver.regiondservices import database_pool
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.threads import max_threads_for_database_pool_ceiling
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils.twisted import PrioritisedThreadPool
+
+
+class TestGetConnectionShare(MAASServerTestCase):
+    def get_available(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW max_connections")
+            [max_connections] = cursor.fetchone()
+            cursor.execute("SHOW superuser_reserved_connections")
+            [reserved] = cursor.fetchone()
+        return (
+            int(max_connections)
+            - int(reserved)
+            - database_pool.reserved_connections
+        )
+
+    def test_shares_between_masters_and_workers(self):
+        region = factory.make_RegionController()
+        for _ in range(3):
+            factory.make_RegionControllerProcess(region=region)
+        self.assertEqual(
+            self.get_available() // 4, database_pool.get_connection_share()
+        )
+
+    def test_without_processes(self):
+        self.assertEqual(
+            self.get_available(), database_pool.get_connection_share()
+        )
+
+
+class TestDatabasePoolBudgetService(MAASTestCase):
+    def make_pool(self):
+        pool = PrioritisedThreadPool(
+            Mock(min=0), [("high", 1), ("low", 1)], maximum=4
+        )
+        self.patch(reactor, "threadpoolForDatabase", pool)
+        return pool
+
+    def test_service_uses__tryUpdate_as_periodic_function(self):
+        service = database_pool.DatabasePoolBudgetService(reactor)
+        self.assertEqual((service._tryUpdate, (), {}), service.call)
+        self.assertEqual(60.0, service.step)
+
+    def test_tryUpdate_sets_maximum(self):
+        pool = self.make_pool()
+        self.patch(database_pool, "deferToDatabase").return_value = succeed(12)
+        service = database_pool.DatabasePoolBudgetService(reactor)
+        service._tryUpdate()
+        # One connection is left for the listener.
+        self.assertEqual(11, pool.maximum)
+
+    def test_updateMaximum_is_bounded(self):
+        pool = self.make_pool()
+        service = database_pool.DatabasePoolBudgetService(reactor)
+        service._updateMaximum(1000)
+        self.assertEqual(max_threads_for_database_pool_ceiling, pool.maximum)
+        service._updateMaximum(0)
+        self.assertEqual(pool.minimum, pool.maximum)
+
+    def test_updateMaximum_ignores_other_pools(self):
+        pool = Mock(spec=["start"])
+        self.patch(reactor, "threadpoolForDatabase", pool)
+        service = database_pool.DatabasePoolBudgetService(reactor)
+        service._updateMaximum(10)
+        self.assertEqual([], pool.mock_calls)
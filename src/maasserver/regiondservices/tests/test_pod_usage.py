@@ -0,0 +1,65 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.regiondservices.pod_usage`."""
+
+
+from twisted.internet import reactor
+from twisted.internet.defer import fail, succeed
+
+from maasserver.models import PodUsage
+from maasserver.regiondservices import pod_usage
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.testcase import MAASTestCase
+
+
+class TestReconcilePodUsage(MAASServerTestCase):
+    def test_returns_names_of_corrected_pods(self):
+        pod = factory.make_Pod(name="pod-b")
+        other_pod = factory.make_Pod(name="pod-a")
+        factory.make_Pod()
+        for each_pod in (pod, other_pod):
+            factory.make_Node(bmc=each_pod, cpu_count=2)
+        PodUsage.objects.update(cores=0)
+        self.assertEqual(["pod-a", "pod-b"], pod_usage.reconcile_pod_usage())
+
+
+class TestPodUsageReconciliationService(MAASTestCase):
+    def test_service_uses__tryReconcile_as_periodic_function(self):
+        service = pod_usage.PodUsageReconciliationService(reactor)
+        self.assertEqual((service._tryReconcile, (), {}), service.call)
+        self.assertEqual(600.0, service.step)
+
+    def test_tryReconcile_logs_corrections(self):
+        self.patch(pod_usage, "deferToDatabase").return_value = succeed(
+            ["pod-a", "pod-b"]
+        )
+        log = self.patch(pod_usage, "log")
+        service = pod_usage.PodUsageReconciliationService(reactor)
+        service._tryReconcile()
+        self.assertThat(
+            log.msg,
+            MockCalledOnceWith(
+                "Corrected the recorded resource usage of pods: pod-a, pod-b"
+            ),
+        )
+
+    def test_tryReconcile_is_quiet_without_corrections(self):
+        self.patch(pod_usage, "deferToDatabase").return_value = succeed([])
+        log = self.patch(pod_usage, "log")
+        service = pod_usage.PodUsageReconciliationService(reactor)
+        service._tryReconcile()
+        self.assertThat(log.msg, MockNotCalled())
+
+    def test_tryReconcile_logs_failures(self):
+        self.patch(pod_usage, "deferToDatabase").return_value = fail(
+            ZeroDivisionError()
+        )
+        log = self.patch(pod_usage, "log")
+        service = pod_usage.PodUsageReconciliationService(reactor)
+        service._tryReconcile()
+        [(failure, message), _] = log.err.call_args
+        self.assertIsInstance(failure.value, ZeroDivisionError)
+        self.assertEqual("Failed to reconcile pod resource usage.", message)
@@ -0,0 +1,233 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.regiondservices.rack_connectivity`."""
+
+
+from collections import defaultdict
+from unittest.mock import call, sentinel
+
+from twisted.internet.defer import maybeDeferred
+from twisted.internet.task import Clock
+
+from maasserver.components import (
+    get_persistent_error,
+    register_persistent_error,
+)
+from maasserver.enum import COMPONENT, NODE_TYPE
+from maasserver.regiondservices import rack_connectivity
+from maasserver.regiondservices.rack_connectivity import (
+    RackConnectivityService,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.listener import FakePostgresListenerService
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils.events import EventGroup
+
+
+class TestGetRackControllerIds(MAASServerTestCase):
+    def test_returns_system_ids_of_rack_controllers(self):
+        rack = factory.make_RackController()
+        region_rack = factory.make_Node(
+            node_type=NODE_TYPE.REGION_AND_RACK_CONTROLLER
+        )
+        factory.make_RegionController()
+        factory.make_Machine()
+        self.assertEqual(
+            {rack.system_id, region_rack.system_id},
+            rack_connectivity.get_rack_controller_ids(),
+        )
+
+
+class TestReportDisconnectedRackControllers(MAASServerTestCase):
+    def test_registers_error_for_one_rack_controller(self):
+        rack_connectivity.report_disconnected_rack_controllers(1)
+        self.assertEqual(
+            "One rack controller is not yet connected to the region. Visit "
+            'the <a href="/MAAS/l/controllers">'
+            "rack controllers page</a> for more "
+            "information.",
+            get_persistent_error(COMPONENT.RACK_CONTROLLERS),
+        )
+
+    def test_registers_error_for_several_rack_controllers(self):
+        rack_connectivity.report_disconnected_rack_controllers(2)
+        self.assertEqual(
+            "2 rack controllers are not yet connected to the region. Visit "
+            'the <a href="/MAAS/l/controllers">'
+            "rack controllers page</a> for more "
+            "information.",
+            get_persistent_error(COMPONENT.RACK_CONTROLLERS),
+        )
+
+    def test_discards_error_once_all_are_connected(self):
+        register_persistent_error(
+            COMPONENT.RACK_CONTROLLERS, "Who flung that batter pudding?"
+        )
+        rack_connectivity.report_disconnected_rack_controllers(0)
+        self.assertIsNone(get_persistent_error(COMPONENT.RACK_CONTROLLERS))
+
+
+class FakeRegionService:
+    """Holds connections and fires events as `RegionService` does."""
+
+    def __init__(self):
+        self.connections = defaultdict(set)
+        self.events = EventGroup("connected", "disconnected")
+
+    def connect(self, ident, connection=None):
+        connection = object() if connection is None else connection
+        self.connections[ident].add(connection)
+        self.events.connected.fire(ident)
+        return connection
+
+    def disconnect(self, ident, connection):
+        self.connections[ident].discard(connection)
+        self.events.disconnected.fire(ident)
+
+
+class TestRackConnectivityService(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.racks = {"rack-a", "rack-b", "rack-c"}
+        self.get_rack_controller_ids = self.patch(
+            rack_connectivity, "get_rack_controller_ids"
+        )
+        self.get_rack_controller_ids.side_effect = lambda: set(self.racks)
+        self.report = self.patch(
+            rack_connectivity, "report_disconnected_rack_controllers"
+        )
+        self.patch(rack_connectivity, "deferToDatabase", maybeDeferred)
+        self.clock = Clock()
+        self.rpc = FakeRegionService()
+        self.listener = FakePostgresListenerService()
+
+    def make_service(self):
+        service = RackConnectivityService(
+            self.rpc, self.listener, clock=self.clock
+        )
+        service.startService()
+        self.addCleanup(service.stopService)
+        return service
+
+    def advance(self):
+        self.clock.advance(RackConnectivityService.UPDATE_DELAY)
+
+    def test_init_sets_properties(self):
+        service = RackConnectivityService(sentinel.rpc, sentinel.listener)
+        self.assertIs(sentinel.rpc, service.rpcService)
+        self.assertIs(sentinel.listener, service.postgresListener)
+        self.assertEqual(set(), service.rackIds)
+        self.assertEqual(set(), service.connectedIds)
+        self.assertIsNone(service.reported)
+
+    def test_start_and_stop_registers_handlers(self):
+        service = RackConnectivityService(
+            self.rpc, self.listener, clock=self.clock
+        )
+        service.startService()
+        self.assertIn(
+            service.rackConnected, self.rpc.events.connected.handlers
+        )
+        self.assertIn(
+            service.rackDisconnected, self.rpc.events.disconnected.handlers
+        )
+        self.assertIn(
+            service.controllerChanged, self.listener.listeners["controller"]
+        )
+        self.assertIn(
+            service.markForReload, self.listener.events.connected.handlers
+        )
+        service.stopService()
+        self.assertEqual(set(), self.rpc.events.connected.handlers)
+        self.assertEqual(set(), self.rpc.events.disconnected.handlers)
+        self.assertNotIn("controller", self.listener.listeners)
+        self.assertNotIn(
+            service.markForReload, self.listener.events.connected.handlers
+        )
+
+    def test_reports_rack_controllers_connected_before_start(self):
+        self.rpc.connect("rack-a")
+        self.make_service()
+        self.advance()
+        self.assertThat(self.report, MockCalledOnceWith(2))
+
+    def test_reports_burst_of_connections_once(self):
+        service = self.make_service()
+        for rack in sorted(self.racks):
+            self.rpc.connect(rack)
+        self.advance()
+        self.assertThat(self.report, MockCalledOnceWith(0))
+        self.assertEqual(set(), service.disconnectedIds)
+
+    def test_does_not_report_without_changes(self):
+        self.make_service()
+        self.advance()
+        self.rpc.connect("unknown-rack")
+        self.advance()
+        self.assertThat(self.report, MockCalledOnceWith(3))
+
+    def test_ignores_loss_of_one_of_several_connections(self):
+        connection = self.rpc.connect("rack-a")
+        self.rpc.connect("rack-a")
+        service = self.make_service()
+        self.advance()
+        self.rpc.disconnect("rack-a", connection)
+        self.advance()
+        self.assertThat(self.report, MockCalledOnceWith(2))
+        self.assertIn("rack-a", service.connectedIds)
+
+    def test_reports_disconnection(self):
+        connections = {rack: self.rpc.connect(rack) for rack in self.racks}
+        self.make_service()
+        self.advance()
+        self.rpc.disconnect("rack-b", connections["rack-b"])
+        self.advance()
+        self.assertThat(self.report, MockCallsMatch(call(0), call(1)))
+
+    def test_reloads_rack_controllers_when_notified(self):
+        self.make_service()
+        self.advance()
+        self.racks.add("rack-d")
+        self.listener.listeners["controller"][0]("create", "rack-d")
+        self.advance()
+        self.assertEqual(2, self.get_rack_controller_ids.call_count)
+        self.assertThat(self.report, MockCallsMatch(call(3), call(4)))
+
+    def test_reloads_rack_controllers_when_listener_reconnects(self):
+        self.make_service()
+        self.advance()
+        self.racks.discard("rack-c")
+        self.listener.events.connected.fire()
+        self.advance()
+        self.assertThat(self.report, MockCallsMatch(call(3), call(2)))
+
+    def test_retries_after_failure(self):
+        log = self.patch(rack_connectivity, "log")
+        self.report.side_effect = [ZeroDivisionError(), None]
+        service = self.make_service()
+        self.advance()
+        [(failure, message), _] = log.err.call_args
+        self.assertIsInstance(failure.value, ZeroDivisionError)
+        self.assertEqual(
+            "Failed to report disconnected rack controllers.", message
+        )
+        self.assertIsNone(service.reported)
+        self.advance()
+        self.assertEqual(2, self.report.call_count)
+        self.assertEqual(3, service.reported)
+
+    def test_stop_cancels_pending_update(self):
+        service = RackConnectivityService(
+            self.rpc, self.listener, clock=self.clock
+        )
+        service.startService()
+        service.stopService()
+        self.advance()
+        self.assertThat(self.report, MockNotCalled())
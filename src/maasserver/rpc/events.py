@@ -4,6 +4,8 @@
 """RPC helpers relating to events."""
 
 
+from netaddr import AddrFormatError, EUI, mac_unix_expanded
+
 from maasserver.enum import INTERFACE_TYPE
 from maasserver.models import Event, EventType, Interface, Node
 from maasserver.utils.orm import transactional
@@ -128,3 +130,83 @@ def send_event_ip_address(ip_address, type_name, description, timestamp):
             description=description,
             created=timestamp,
         )
+
+
+def _normalise_mac(mac_address):
+    """Return `mac_address` as PostgreSQL formats it, or None if invalid."""
+    try:
+        return str(EUI(mac_address, dialect=mac_unix_expanded))
+    except (AddrFormatError, TypeError):
+        return None
+
+
+@synchronous
+@transactional
+def send_events(node_events, timestamp):
+    """Send a batch of events, each for a node found by MAC or IP address.
+
+    for :py:class:`~provisioningserver.rpc.region.SendEvents`.
+
+    The event types, and the nodes with each address, are found with one
+    query each for the whole batch. Events for unknown event types or nodes
+    are not recorded. An event sent with a count of more than one is recorded
+    once, noting the number of times it happened.
+    """
+    event_types = EventType.objects.in_bulk(
+        {event["type_name"] for event in node_events}, field_name="name"
+    )
+    mac_addresses = {
+        event["mac_address"]: _normalise_mac(event["mac_address"])
+        for event in node_events
+        if event["mac_address"]
+    }
+    ip_addresses = {
+        event["ip_address"] for event in node_events if event["ip_address"]
+    }
+    nodes_by_mac = {
+        str(mac_address): node_id
+        for mac_address, node_id in Interface.objects.filter(
+            type=INTERFACE_TYPE.PHYSICAL,
+            mac_address__in=set(mac_addresses.values()) - {None},
+            node__isnull=False,
+        ).values_list("mac_address", "node_id")
+    }
+    nodes_by_ip = dict(
+        Interface.objects.filter(
+            ip_addresses__ip__in=ip_addresses, node__isnull=False
+        ).values_list("ip_addresses__ip", "node_id")
+    )
+    events = []
+    for event in node_events:
+        event_type = event_types.get(event["type_name"])
+        if event["mac_address"]:
+            mac_address = mac_addresses[event["mac_address"]]
+            node_id = nodes_by_mac.get(mac_address)
+        else:
+            node_id = nodes_by_ip.get(event["ip_address"])
+        if event_type is None or node_id is None:
+            # The node doesn't exist, but we don't raise an exception - it's
+            # entirely possible the cluster has started sending events for a
+            # node that we don't know about yet. This is most likely to
+            # happen when a new node is trying to enlist.
+            log.debug(
+                "Event '{type}: {description}' sent for unknown event type "
+                "or non-existent node with address '{address}'.",
+                type=event["type_name"],
+                description=event["description"],
+                address=event["mac_address"] or event["ip_address"],
+            )
+            continue
+        description = event["description"]
+        if event["count"] > 1:
+            description = "%s (%d times)" % (description, event["count"])
+        events.append(
+            Event(
+                node_id=node_id,
+                type=event_type,
+                description=description.lstrip(),
+                created=timestamp,
+                updated=timestamp,
+            )
+        )
+    Event.objects.bulk_create(events)
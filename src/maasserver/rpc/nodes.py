@@ -4,6 +4,7 @@
 """RPC helpers relating to nodes."""
 
 __all__ = [
+    "list_due_nodes_power_parameters",
     "mark_node_failed",
     "update_node_power_state",
     "commission_node",
@@ -15,16 +16,26 @@ import json
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db.models import F, Q
+from django.db.models import F, OuterRef, Q, Subquery
+from twisted.protocols.amp import MAX_VALUE_LENGTH
 
 from maasserver import exceptions, ntp
 from maasserver.api.utils import get_overridden_query_dict
 from maasserver.enum import NODE_STATUS
+from maasserver.fields import MACAddressField
 from maasserver.forms import AdminMachineWithMACAddressesForm
-from maasserver.models import Node, PhysicalInterface, RackController
+from maasserver.models import (
+    Interface,
+    Node,
+    PhysicalInterface,
+    RackController,
+    StaticIPAddress,
+)
+from maasserver.models.node import get_effective_power_parameters
 from maasserver.models.timestampedmodel import now
 from maasserver.utils.orm import transactional
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
+from provisioningserver.rpc.arguments import StructureAsJSON
 from provisioningserver.rpc.exceptions import (
     CommissionNodeFailed,
     NodeAlreadyExists,
@@ -52,8 +63,12 @@ def mark_node_failed(system_id, error_description):
         raise NodeStateViolation(e)
 
 
-def _gen_cluster_nodes_power_parameters(nodes, limit):
-    """Generate power parameters for `nodes`.
+def _gen_cluster_nodes_power_parameters(rack, limit):
+    """Generate power parameters for nodes that `rack` should check.
+
+    Nodes are those with a queryable BMC on a subnet `rack` is connected
+    to that haven't been checked in the last 5 minutes, least recently
+    checked first. Everything needed is fetched in a single query.
 
     These fulfil a subset of the return schema for the RPC call for
     :py:class:`~provisioningserver.rpc.region.ListNodePowerParameters`.
@@ -64,27 +79,98 @@ def _gen_cluster_nodes_power_parameters(nodes, limit):
     queryable_power_types = [
         driver.name for _, driver in PowerDriverRegistry if driver.queryable
     ]
-
+    subnet_ids = (
+        StaticIPAddress.objects.filter(interface__node=rack)
+        .exclude(ip__isnull=True)
+        .exclude(subnet_id__isnull=True)
+        .values("subnet_id")
+    )
+    # A node's boot interface defaults to its first interface; see
+    # `Node.get_boot_interface`.
+    first_mac_address = (
+        Interface.objects.filter(node_id=OuterRef("id"))
+        .order_by("id")
+        .values("mac_address")[:1]
+    )
     qs = (
-        nodes.exclude(status=NODE_STATUS.BROKEN)
-        .filter(bmc__power_type__in=queryable_power_types)
+        Node.objects.filter(
+            bmc__ip_address__ip__isnull=False,
+            bmc__ip_address__subnet_id__in=subnet_ids,
+            bmc__power_type__in=queryable_power_types,
+        )
+        .exclude(status=NODE_STATUS.BROKEN)
         .filter(
             Q(power_state_queried=None)
             | Q(power_state_queried__lte=five_minutes_ago)
         )
+        .annotate(
+            first_mac_address=Subquery(
+                first_mac_address, output_field=MACAddressField()
+            )
+        )
         .order_by(F("power_state_queried").asc(nulls_first=True), "system_id")
-        .distinct()
+        .values_list(
+            "system_id",
+            "hostname",
+            "power_state",
+            "status",
+            "node_type",
+            "instance_power_parameters",
+            "bmc__power_type",
+            "bmc__power_parameters",
+            "boot_interface__mac_address",
+            "first_mac_address",
+        )
     )
-    for node in qs[:limit]:
-        power_info = node.get_effective_power_info()
-        if power_info.power_type is not None:
-            yield {
-                "system_id": node.system_id,
-                "hostname": node.hostname,
-                "power_state": node.power_state,
-                "power_type": power_info.power_type,
-                "context": power_info.power_parameters,
-            }
+    if limit is not None:
+        qs = qs[:limit]
+    for row in qs:
+        (
+            system_id,
+            hostname,
+            power_state,
+            status,
+            node_type,
+            instance_power_parameters,
+            power_type,
+            bmc_power_parameters,
+            boot_mac_address,
+            first_mac_address,
+        ) = row
+        # Overlay instance power parameters over BMC power parameters; see
+        # `Node.power_parameters`.
+        power_parameters = {
+            **(bmc_power_parameters or {}),
+            **(instance_power_parameters or {}),
+        }
+        mac_address = boot_mac_address or first_mac_address
+        yield {
+            "system_id": system_id,
+            "hostname": hostname,
+            "power_state": power_state,
+            "power_type": power_type,
+            "context": get_effective_power_parameters(
+                power_parameters,
+                system_id,
+                power_type,
+                status,
+                node_type,
+                None if mac_address is None else mac_address.get_raw(),
+            ),
+        }
+
+
+def _mark_queried(details):
+    """Record that the power of the given nodes is being checked.
+
+    This is done for all of the nodes in one query, so that another rack
+    controller does not check them at the same time.
+    """
+    system_ids = [detail["system_id"] for detail in details]
+    if len(system_ids) > 0:
+        Node.objects.filter(system_id__in=system_ids).update(
+            power_state_queried=now()
+        )
 
 
 def _gen_up_to_json_limit(things, limit):
@@ -136,19 +222,40 @@ def list_cluster_nodes_power_parameters(system_id, limit=10):
         raise NoSuchCluster.from_uuid(system_id)
 
     # Generate all the the power queries that will fit into the response.
-    nodes = rack.get_bmc_accessible_nodes()
-    details = _gen_cluster_nodes_power_parameters(nodes, limit)
+    details = _gen_cluster_nodes_power_parameters(rack, limit)
     details = _gen_up_to_json_limit(details, 60 * (2 ** 10))  # 60kiB
     details = list(details)
+    _mark_queried(details)
+    return details
 
-    # Update the queried time on all of the nodes at once. So another
-    # rack controller does not update them at the same time. This operation
-    # is done on all nodes at the same time in one query.
-    system_ids = [detail["system_id"] for detail in details]
-    Node.objects.filter(system_id__in=system_ids).update(
-        power_state_queried=now()
-    )
 
+@synchronous
+@transactional
+def list_due_nodes_power_parameters(system_id, limit=1000):
+    """Return the power parameters of every node a rack should check now.
+
+    For :py:class:`~provisioningserver.rpc.region.ListDueNodePowerParameters`.
+
+    Unlike `list_cluster_nodes_power_parameters` the details aren't limited
+    to a page; everything that's due is returned at once, up to `limit`
+    nodes and as many as fit into a single AMP value when encoded as
+    :py:class:`~provisioningserver.rpc.arguments.StructureAsJSON`. Nodes
+    that don't fit are left for the next call.
+    """
+    try:
+        rack = RackController.objects.get(system_id=system_id)
+    except RackController.DoesNotExist:
+        raise NoSuchCluster.from_uuid(system_id)
+
+    details = list(_gen_cluster_nodes_power_parameters(rack, limit))
+    encoder = StructureAsJSON()
+    count = len(details)
+    while count > 0:
+        if len(encoder.toString(details[:count])) <= MAX_VALUE_LENGTH:
+            break
+        count //= 2
+    details = details[:count]
+    _mark_queried(details)
     return details
 
 
@@ -7,6 +7,7 @@
 from collections import defaultdict
 import copy
 from datetime import datetime
+from functools import partial
 from os import urandom
 import random
 from socket import AF_INET, AF_INET6
@@ -53,7 +54,10 @@ from maasserver.rpc.nodes import (
 from maasserver.rpc.services import update_services
 from maasserver.security import get_shared_secret
 from maasserver.utils.orm import transactional
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_PRIORITY,
+    deferToDatabaseWithPriority,
+)
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.prometheus.metrics import (
     GLOBAL_LABELS,
@@ -76,6 +80,10 @@ from provisioningserver.utils.version import get_maas_version
 
 log = LegacyLogger()
 
+# Racks make RPC calls on behalf of machines that are booting, so these have
+# priority over all other database work.
+deferToDatabase = partial(deferToDatabaseWithPriority, DATABASE_PRIORITY.RPC)
+
 
 class Region(RPCProtocol):
     """The RPC protocol supported by a region controller.
@@ -273,6 +281,17 @@ class Region(RPCProtocol):
         d.addCallback(lambda nodes: {"nodes": nodes})
         return d
 
+    @region.ListDueNodePowerParameters.responder
+    def list_due_node_power_parameters(self, system_id):
+        """list_due_node_power_parameters()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.ListDueNodePowerParameters`.
+        """
+        d = deferToDatabase(nodes.list_due_nodes_power_parameters, system_id)
+        d.addCallback(lambda nodes: {"nodes": nodes})
+        return d
+
     @region.UpdateLastImageSync.responder
     def update_last_image_sync(self, system_id):
         """update_last_image_sync()
@@ -363,6 +382,19 @@ class Region(RPCProtocol):
         # Don't wait for the record to be written.
         return succeed({})
 
+    @region.SendEvents.responder
+    def send_events(self, node_events):
+        """send_events()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.SendEvents`.
+        """
+        timestamp = datetime.now()
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        dbtasks.addTask(events.send_events, node_events, timestamp)
+        # Don't wait for the records to be written.
+        return succeed({})
+
     @region.ReportForeignDHCPServer.responder
     def report_foreign_dhcp_server(
         self, system_id, interface_name, dhcp_ip=None
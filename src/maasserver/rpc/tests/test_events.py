@@ -13,6 +13,7 @@ from maasserver.models.eventtype import EventType
 from maasserver.rpc import events
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 from provisioningserver.rpc.exceptions import NoSuchEventType
 
 
@@ -178,3 +179,91 @@ class TestSendEventIPAddress(MAASServerTestCase):
             description=description,
             created=timestamp,
         )
+
+
+class TestSendEvents(MAASServerTestCase):
+    def make_event(self, event_type, count=1, **address):
+        event = {
+            "type_name": event_type.name,
+            "description": factory.make_name("description"),
+            "count": count,
+            "mac_address": None,
+            "ip_address": None,
+        }
+        event.update(address)
+        return event
+
+    def test_creates_events_for_nodes_by_mac_and_ip(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node(interface=True)
+        interface = node.interface_set.first()
+        ip = factory.make_StaticIPAddress(interface=interface)
+        timestamp = datetime.datetime.utcnow()
+        by_mac = self.make_event(
+            event_type, mac_address=interface.mac_address.get_raw().upper()
+        )
+        by_ip = self.make_event(event_type, ip_address=ip.ip)
+        events.send_events([by_mac, by_ip], timestamp)
+        self.assertEqual(
+            [
+                (node.id, event_type.id, by_mac["description"], timestamp),
+                (node.id, event_type.id, by_ip["description"], timestamp),
+            ],
+            list(
+                Event.objects.order_by("id").values_list(
+                    "node_id", "type_id", "description", "created"
+                )
+            ),
+        )
+
+    def test_records_repeated_event_once_with_count(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node(interface=True)
+        ip = factory.make_StaticIPAddress(interface=node.interface_set.first())
+        event = self.make_event(event_type, count=5, ip_address=ip.ip)
+        events.send_events([event], datetime.datetime.utcnow())
+        self.assertEqual(
+            ["%s (5 times)" % event["description"]],
+            list(Event.objects.values_list("description", flat=True)),
+        )
+
+    def test_skips_unknown_nodes_and_event_types(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node(interface=True)
+        ip = factory.make_StaticIPAddress(interface=node.interface_set.first())
+        unknown_type = self.make_event(event_type, ip_address=ip.ip)
+        unknown_type["type_name"] = factory.make_name("type")
+        node_events = [
+            unknown_type,
+            self.make_event(event_type, ip_address=factory.make_ip_address()),
+            self.make_event(
+                event_type, mac_address=factory.make_mac_address()
+            ),
+            self.make_event(event_type, mac_address="not-a-mac"),
+        ]
+        # Exception should not be raised.
+        events.send_events(node_events, datetime.datetime.utcnow())
+        self.assertEqual(0, Event.objects.count())
+
+    def test_queries_are_independent_of_number_of_events(self):
+        event_type = factory.make_EventType()
+        node_events = []
+        for _ in range(3):
+            node = factory.make_Node(interface=True)
+            interface = node.interface_set.first()
+            ip = factory.make_StaticIPAddress(interface=interface)
+            node_events.append(
+                self.make_event(
+                    event_type, mac_address=interface.mac_address.get_raw()
+                )
+            )
+            node_events.append(self.make_event(event_type, ip_address=ip.ip))
+        timestamp = datetime.datetime.utcnow()
+        count_one, _ = count_queries(
+            events.send_events, node_events[:2], timestamp
+        )
+        count_all, _ = count_queries(
+            events.send_events, node_events, timestamp
+        )
+        self.assertEqual(count_one, count_all)
+        self.assertEqual(8, Event.objects.count())
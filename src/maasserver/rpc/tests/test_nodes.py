@@ -21,6 +21,7 @@ from testtools.matchers import (
     LessThan,
     Not,
 )
+from twisted.protocols.amp import MAX_VALUE_LENGTH
 
 from maasserver import ntp
 from maasserver.enum import INTERFACE_TYPE, NODE_STATUS, NODE_TYPE, POWER_STATE
@@ -32,6 +33,7 @@ from maasserver.rpc.nodes import (
     get_controller_type,
     get_time_configuration,
     list_cluster_nodes_power_parameters,
+    list_due_nodes_power_parameters,
     mark_node_failed,
     request_node_info_by_mac_address,
     update_node_power_state,
@@ -48,9 +50,11 @@ from maasserver.testing.testcase import (
     MAASTransactionServerTestCase,
 )
 from maasserver.utils.orm import post_commit_hooks, reload_object
+from maastesting.djangotestcase import count_queries
 from maastesting.twisted import always_succeed_with
 from metadataserver.builtin_scripts import load_builtin_scripts
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
+from provisioningserver.rpc.arguments import StructureAsJSON
 from provisioningserver.rpc.cluster import DescribePowerTypes
 from provisioningserver.rpc.exceptions import (
     CommissionNodeFailed,
@@ -536,6 +540,119 @@ class TestListClusterNodesPowerParameters(MAASServerTestCase):
         )
 
 
+class TestListDueNodesPowerParameters(MAASServerTestCase):
+    """Tests for the `list_due_nodes_power_parameters()` function."""
+
+    def make_Node(self, **kwargs):
+        # Ensure that this node was last queried at least 5 minutes ago.
+        power_state_queried = now() - timedelta(minutes=randint(6, 16))
+        return factory.make_Node(
+            power_state_queried=power_state_queried, **kwargs
+        )
+
+    def make_rack_with_large_subnet(self):
+        rack = factory.make_RackController(power_type="")
+        subnet = factory.make_Subnet(
+            cidr=str(factory.make_ipv6_network(slash=8))
+        )
+        factory.make_StaticIPAddress(
+            ip=factory.pick_ip_in_Subnet(subnet),
+            subnet=subnet,
+            interface=rack.get_boot_interface(),
+        )
+        return rack
+
+    def test_raises_NoSuchCluster_if_rack_doesnt_exist(self):
+        self.assertRaises(
+            NoSuchCluster,
+            list_due_nodes_power_parameters,
+            factory.make_name("system_id"),
+        )
+
+    def test_returns_all_due_nodes(self):
+        rack = self.make_rack_with_large_subnet()
+        nodes = [self.make_Node(bmc_connected_to=rack) for _ in range(12)]
+        # Recently checked.
+        factory.make_Node(bmc_connected_to=rack, power_state_queried=now())
+        power_parameters = list_due_nodes_power_parameters(rack.system_id)
+        self.assertEqual(
+            [
+                {
+                    "system_id": node.system_id,
+                    "hostname": node.hostname,
+                    "power_state": node.power_state,
+                    "power_type": node.get_effective_power_type(),
+                    "context": node.get_effective_power_parameters(),
+                }
+                for node in sorted(
+                    nodes, key=attrgetter("power_state_queried", "system_id")
+                )
+            ],
+            power_parameters,
+        )
+
+    def test_uses_boot_interface_mac_address(self):
+        rack = self.make_rack_with_large_subnet()
+        node = self.make_Node(bmc_connected_to=rack, interface=True)
+        boot_interface = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=node
+        )
+        node.boot_interface = boot_interface
+        node.save()
+        [power_parameters] = list_due_nodes_power_parameters(rack.system_id)
+        self.assertEqual(
+            boot_interface.mac_address.get_raw(),
+            power_parameters["context"]["mac_address"],
+        )
+        self.assertEqual(
+            node.get_effective_power_parameters(),
+            power_parameters["context"],
+        )
+
+    def test_queries_once(self):
+        rack = self.make_rack_with_large_subnet()
+        for _ in range(3):
+            self.make_Node(bmc_connected_to=rack)
+        count_one, _ = count_queries(
+            list_due_nodes_power_parameters, rack.system_id
+        )
+        for _ in range(6):
+            self.make_Node(bmc_connected_to=rack)
+        count_many, _ = count_queries(
+            list_due_nodes_power_parameters, rack.system_id
+        )
+        self.assertEqual(count_one, count_many)
+
+    def test_marks_nodes_as_queried(self):
+        rack = self.make_rack_with_large_subnet()
+        for _ in range(3):
+            self.make_Node(bmc_connected_to=rack)
+        self.assertThat(
+            list_due_nodes_power_parameters(rack.system_id), HasLength(3)
+        )
+        self.assertEqual([], list_due_nodes_power_parameters(rack.system_id))
+
+    def test_returns_what_fits_in_an_amp_value(self):
+        rack = self.make_rack_with_large_subnet()
+        # Power parameters that compress badly.
+        for _ in range(40):
+            self.make_Node(
+                bmc_connected_to=rack,
+                power_parameters={"key": factory.make_string(3000)},
+            )
+        power_parameters = list_due_nodes_power_parameters(rack.system_id)
+        self.assertThat(len(power_parameters), LessThan(40))
+        self.assertThat(
+            len(StructureAsJSON().toString(power_parameters)),
+            LessThan(MAX_VALUE_LENGTH + 1),
+        )
+        # The rest are returned by the next call.
+        self.assertThat(
+            list_due_nodes_power_parameters(rack.system_id),
+            Not(HasLength(0)),
+        )
+
+
 class TestUpdateNodePowerState(MAASServerTestCase):
     def test_raises_NoSuchNode_if_node_doesnt_exist(self):
         self.assertRaises(
@@ -68,6 +68,7 @@ from provisioningserver.rpc.region import (
     GetSyslogConfiguration,
     GetTimeConfiguration,
     Identify,
+    ListDueNodePowerParameters,
     ListNodePowerParameters,
     MarkNodeFailed,
     RegisterEventType,
@@ -78,6 +79,7 @@ from provisioningserver.rpc.region import (
     RequestRackRefresh,
     SendEvent,
     SendEventMACAddress,
+    SendEvents,
     UpdateInterfaces,
     UpdateLease,
     UpdateNodePowerState,
@@ -601,6 +603,76 @@ class TestRegionProtocol_ListNodePowerParameters(
         return assert_fails_with(d, NoSuchCluster)
 
 
+class TestRegionProtocol_ListDueNodePowerParameters(
+    MAASTransactionServerTestCase
+):
+    @transactional
+    def create_node(self, **kwargs):
+        node = factory.make_Node(**kwargs)
+        return node
+
+    @transactional
+    def create_rack_controller(self, **kwargs):
+        rack = factory.make_RackController(**kwargs)
+        return rack
+
+    @transactional
+    def get_node_power_parameters(self, node):
+        return node.get_effective_power_parameters()
+
+    def test_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(
+            ListDueNodePowerParameters.commandName
+        )
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_returns_correct_arguments(self):
+        rack = yield deferToDatabase(
+            self.create_rack_controller, power_type=""
+        )
+
+        nodes = []
+        for _ in range(12):
+            node = yield deferToDatabase(
+                self.create_node,
+                power_type="virsh",
+                power_state_updated=None,
+                bmc_connected_to=rack,
+            )
+            power_params = yield deferToDatabase(
+                self.get_node_power_parameters, node
+            )
+            nodes.append(
+                {
+                    "system_id": node.system_id,
+                    "hostname": node.hostname,
+                    "power_state": node.power_state,
+                    "power_type": node.get_effective_power_type(),
+                    "context": power_params,
+                }
+            )
+
+        response = yield call_responder(
+            Region(), ListDueNodePowerParameters, {"system_id": rack.system_id}
+        )
+
+        self.maxDiff = None
+        self.assertItemsEqual(nodes, response["nodes"])
+
+    @wait_for_reactor
+    def test_raises_exception_if_rack_doesnt_exist(self):
+        system_id = factory.make_name("system_id")
+
+        d = call_responder(
+            Region(), ListDueNodePowerParameters, {"system_id": system_id}
+        )
+
+        return assert_fails_with(d, NoSuchCluster)
+
+
 class TestRegionProtocol_UpdateNodePowerState(MAASTransactionServerTestCase):
     @transactional
     def create_node(self, power_state):
@@ -1047,6 +1119,79 @@ class TestRegionProtocol_SendEventMACAddress(MAASTransactionServerTestCase):
         )
 
 
+class TestRegionProtocol_SendEvents(MAASTransactionServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_send_events_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(SendEvents.commandName)
+        self.assertIsNotNone(responder)
+
+    @transactional
+    def make_interface_with_ip(self):
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        ip = factory.make_StaticIPAddress(interface=interface)
+        return interface.mac_address.get_raw(), ip.ip, interface.node.id
+
+    @transactional
+    def get_events(self, type_name):
+        return list(
+            Event.objects.filter(type__name=type_name)
+            .order_by("id")
+            .values_list("node_id", "description", "created")
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_send_events_stores_events_with_timestamp_received(self):
+        timestamp = datetime.now() - timedelta(seconds=randint(99, 99999))
+        self.patch(regionservice, "datetime").now.return_value = timestamp
+        event_type = factory.make_name("type_name")
+        yield deferToDatabase(
+            transactional(EventType.objects.register), event_type, "", 0
+        )
+        mac_address, ip, node_id = yield deferToDatabase(
+            self.make_interface_with_ip
+        )
+
+        yield eventloop.start()
+        try:
+            response = yield call_responder(
+                Region(),
+                SendEvents,
+                {
+                    "node_events": [
+                        {
+                            "type_name": event_type,
+                            "description": "by-mac",
+                            "count": 1,
+                            "mac_address": mac_address,
+                        },
+                        {
+                            "type_name": event_type,
+                            "description": "by-ip",
+                            "count": 3,
+                            "ip_address": ip,
+                        },
+                    ]
+                },
+            )
+        finally:
+            yield eventloop.reset()
+
+        self.assertEqual({}, response)
+        events = yield deferToDatabase(self.get_events, event_type)
+        self.assertEqual(
+            [
+                (node_id, "by-mac", timestamp),
+                (node_id, "by-ip (3 times)", timestamp),
+            ],
+            events,
+        )
+
+
 class TestRegionProtocol_UpdateServices(MAASTransactionServerTestCase):
     def setUp(self):
         super().setUp()
@@ -25,6 +25,7 @@ from maasserver.utils.orm import (
     transactional,
     with_connection,
 )
+from maasserver.utils.startup import startup_phase, time_startup_phase
 from maasserver.utils.threads import deferToDatabase
 from metadataserver.builtin_scripts import load_builtin_scripts
 from provisioningserver.drivers.osystem.ubuntu import UbuntuOS
@@ -56,11 +57,18 @@ def start_up(master=False):
             # when Sir Topham Hatt graduated Sodor Academy. (Ensure we have a
             # shared-secret so that a cluster on the same host as this region
             # can authenticate.)
-            yield security.get_shared_secret()
+            yield time_startup_phase(
+                "shared-secret", security.get_shared_secret
+            )
             # Execute other start-up tasks that must not run concurrently with
             # other invocations of themselves, across the whole of this MAAS
-            # installation.
-            yield deferToDatabase(inner_start_up, master=master)
+            # installation. The time includes waiting for the lock.
+            yield time_startup_phase(
+                "inner-start-up",
+                deferToDatabase,
+                inner_start_up,
+                master=master,
+            )
         except SystemExit:
             raise
         except KeyboardInterrupt:
@@ -106,16 +114,18 @@ def inner_start_up(master=False):
     # only created once. If get_or_create_running_controller() is called before
     # this it will fail on first run.
     if master:
-        load_builtin_scripts()
+        with startup_phase("builtin-scripts"):
+            load_builtin_scripts()
 
     # Ensure the this region is represented in the database. The first regiond
     # to pass through inner_start_up on this host can do this; it should NOT
     # be restricted to masters only. This also ensures that the MAAS ID is set
     # on the filesystem; it will be done in a post-commit hook and will thus
     # happen before `locks.startup` is released.
-    region = RegionController.objects.get_or_create_running_controller()
-    # Ensure that uuid is created after creating
-    RegionController.objects.get_or_create_uuid()
+    with startup_phase("region-controller"):
+        region = RegionController.objects.get_or_create_running_controller()
+        # Ensure that uuid is created after creating
+        RegionController.objects.get_or_create_uuid()
 
     # Only perform the following if the master process for the
     # region controller.
@@ -146,7 +156,8 @@ def inner_start_up(master=False):
             )
 
         # Update deprecation notifications if needed
-        sync_deprecation_notifications()
+        with startup_phase("deprecations"):
+            sync_deprecation_notifications()
 
         # Refresh soon after this transaction is in.
         post_commit_do(reactor.callLater, 0, refreshRegion, region)
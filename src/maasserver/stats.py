@@ -32,7 +32,7 @@ from maasserver.models import (
     Fabric,
     Machine,
     Node,
-    Pod,
+    PodUsage,
     Space,
     StaticIPAddress,
     Subnet,
@@ -112,23 +112,20 @@ def get_kvm_pods_stats():
     available_resources["over_memory"] = over_memory
 
     # Calculate utilization
-    pod_machines = Pod.objects.all()
-    machines = cores = memory = storage = 0
-    for pod in pod_machines:
-        machines += Node.objects.filter(bmc__id=pod.id).count()
-        cores += pod.get_used_cores()
-        memory += pod.get_used_memory()
-        storage += pod.get_used_local_storage()
+    machines = Node.objects.filter(bmc__bmc_type=BMC_TYPE.POD).count()
+    utilized_resources = PodUsage.objects.filter(
+        pod__bmc_type=BMC_TYPE.POD
+    ).aggregate(
+        cores=NotNullSum("cores"),
+        memory=NotNullSum("memory"),
+        storage=NotNullSum("local_storage"),
+    )
 
     return {
         "kvm_pods": len(pods),
         "kvm_machines": machines,
         "kvm_available_resources": available_resources,
-        "kvm_utilized_resources": {
-            "cores": cores,
-            "memory": memory,
-            "storage": storage,
-        },
+        "kvm_utilized_resources": utilized_resources,
     }
 
 
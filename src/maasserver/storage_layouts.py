@@ -860,28 +860,31 @@ class VMFS6StorageLayout(StorageLayoutBase):
             pt = bd.get_partitiontable()
             if pt is None:
                 continue
-            if pt.table_type != PARTITION_TABLE_TYPE.GPT:
-                continue
-            if len(pt.partitions.all()) < len(self.base_partitions):
-                continue
-            ordered_partitions = sorted(
-                pt.partitions.all(), key=lambda part: part.id
-            )
-            for i, (partition, base_partition) in enumerate(
-                zip(ordered_partitions, self.base_partitions)
-            ):
-                if partition.bootable != base_partition.get("bootable", False):
-                    break
-                # Skip checking the size of the Datastore partition as that
-                # changes based on available disk size/user input.
-                if base_partition["size"] == 0:
-                    continue
-                if partition.size != base_partition["size"]:
-                    break
-                if (i + 1) == len(self.base_partitions):
-                    return bd
+            if self.is_layout_partition_table(pt, pt.partitions.all()):
+                return bd
         return None
 
+    @classmethod
+    def is_layout_partition_table(cls, partition_table, partitions):
+        """Checks if `partitions` of `partition_table` are a VMFS6 layout."""
+        if partition_table.table_type != PARTITION_TABLE_TYPE.GPT:
+            return False
+        if len(partitions) < len(cls.base_partitions):
+            return False
+        ordered_partitions = sorted(partitions, key=lambda part: part.id)
+        for partition, base_partition in zip(
+            ordered_partitions, cls.base_partitions
+        ):
+            if partition.bootable != base_partition.get("bootable", False):
+                return False
+            # Skip checking the size of the Datastore partition as that
+            # changes based on available disk size/user input.
+            if base_partition["size"] == 0:
+                continue
+            if partition.size != base_partition["size"]:
+                return False
+        return True
+
 
 class BlankStorageLayout(StorageLayoutBase):
     """Blank layout.
@@ -82,10 +82,11 @@ class LogSQL(fixtures.Fixture):
 
 
 class RBACClearFixture(fixtures.Fixture):
-    """Fixture that clears the RBAC thread-local cache between tests."""
+    """Fixture that clears the RBAC caches between tests."""
 
     def _setUp(self):
         self.addCleanup(rbac.clear)
+        self.addCleanup(rbac.clear_shared_cache)
 
 
 class RBACForceOffFixture(fixtures.Fixture):
@@ -129,6 +130,7 @@ class RBACEnabled(fixtures.Fixture):
         def cleanup():
             rbac._store.client = None
             rbac.clear()
+            rbac.clear_shared_cache()
 
         self.addCleanup(cleanup)
 
@@ -81,11 +81,16 @@ class MAASRegionTestCaseBase(PostCommitHooksTestMixin):
     def setUpFixtures(self):
         """This should be called by a subclass once other set-up is done."""
         # Avoid circular imports.
+        from maasserver.middleware import external_auth_info_cache
         from maasserver.models import signals
 
         # Always clear the RBAC thread-local between tests.
         self.useFixture(RBACClearFixture())
 
+        # Don't let external authentication settings leak between tests.
+        external_auth_info_cache.clear()
+        self.addCleanup(external_auth_info_cache.clear)
+
         # XXX: allenap bug=1427628 2015-03-03: This should not be here.
         self.useFixture(IntroCompletedFixture())
 
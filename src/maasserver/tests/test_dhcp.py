@@ -53,19 +53,25 @@ from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.testcase import MAASTestCase
 from maastesting.twisted import always_fail_with, always_succeed_with
 from provisioningserver.rpc.cluster import (
     ConfigureDHCPv4,
     ConfigureDHCPv4_V2,
     ConfigureDHCPv6,
     ConfigureDHCPv6_V2,
+    UpdateDHCPv4Hosts,
+    UpdateDHCPv6Hosts,
     ValidateDHCPv4Config,
     ValidateDHCPv4Config_V2,
     ValidateDHCPv6Config,
     ValidateDHCPv6Config_V2,
 )
 from provisioningserver.rpc.dhcp import downgrade_shared_networks
-from provisioningserver.rpc.exceptions import CannotConfigureDHCP
+from provisioningserver.rpc.exceptions import (
+    CannotConfigureDHCP,
+    DHCPHostsOutOfDate,
+)
 from provisioningserver.utils.twisted import synchronous
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
@@ -2462,6 +2468,104 @@ class TestGetDHCPConfiguration(MAASServerTestCase):
             config.shared_networks_v6, addr6.subnet, [addr6.ip]
         )
 
+    def test_includes_hosts_by_vlan(self):
+        rack, (addr4, addr6) = self.make_RackController_ready_for_DHCP()
+        config = dhcp.get_dhcp_configuration(rack)
+        vlan = addr4.subnet.vlan
+        self.assertEqual({vlan.id: config.hosts_v4}, config.vlan_hosts_v4)
+        self.assertEqual({vlan.id: config.hosts_v6}, config.vlan_hosts_v6)
+
+
+class TestGetDHCPHosts(MAASServerTestCase):
+    """Tests for `get_dhcp_hosts`."""
+
+    def make_vlan_with_machine(self, rack):
+        vlan = factory.make_VLAN(dhcp_on=True, primary_rack=rack)
+        subnet = factory.make_Subnet(vlan=vlan, version=4)
+        factory.make_Interface(INTERFACE_TYPE.PHYSICAL, node=rack, vlan=vlan)
+        machine = factory.make_Node()
+        interface = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=machine, vlan=vlan
+        )
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.AUTO, subnet=subnet, interface=interface
+        )
+        return vlan
+
+    def test_returns_same_hosts_as_configuration(self):
+        rack = factory.make_RackController(interface=False)
+        vlan = self.make_vlan_with_machine(rack)
+        config = dhcp.get_dhcp_configuration(rack)
+        hosts = dhcp.get_dhcp_hosts(rack, {vlan.id})
+        self.assertEqual(config.vlan_hosts_v4, hosts.vlan_hosts_v4)
+        self.assertEqual(config.vlan_hosts_v6, hosts.vlan_hosts_v6)
+        self.assertEqual(config.omapi_key, hosts.omapi_key)
+
+    def test_returns_hosts_only_on_vlans(self):
+        rack = factory.make_RackController(interface=False)
+        vlan = self.make_vlan_with_machine(rack)
+        self.make_vlan_with_machine(rack)
+        hosts = dhcp.get_dhcp_hosts(rack, {vlan.id})
+        self.assertEqual([vlan.id], list(hosts.vlan_hosts_v4))
+
+    def test_returns_controller_macs(self):
+        rack = factory.make_RackController(interface=False)
+        vlan = self.make_vlan_with_machine(rack)
+        [interface] = rack.interface_set.all()
+        hosts = dhcp.get_dhcp_hosts(rack, {vlan.id})
+        self.assertIn(str(interface.mac_address), hosts.controller_macs)
+        for host in hosts.vlan_hosts_v4[vlan.id]:
+            self.assertNotIn(host["mac"], hosts.controller_macs)
+
+
+class TestGetHostMapChanges(MAASTestCase):
+    """Tests for `get_host_map_changes`."""
+
+    def make_host(self, **kwargs):
+        host = {
+            "host": factory.make_name("host"),
+            "mac": factory.make_mac_address(),
+            "ip": factory.make_ipv4_address(),
+            "dhcp_snippets": [],
+        }
+        host.update(kwargs)
+        return host
+
+    def test_returns_nothing_when_unchanged(self):
+        vlan_hosts = {1: [self.make_host()], 2: [self.make_host()]}
+        self.assertEqual(
+            ([], [], []), dhcp.get_host_map_changes(vlan_hosts, vlan_hosts)
+        )
+
+    def test_returns_removed_added_and_modified_hosts(self):
+        removed, modified, same = (self.make_host() for _ in range(3))
+        added = self.make_host()
+        renamed = dict(modified, host=factory.make_name("host"))
+        self.assertEqual(
+            ([removed], [added], [renamed]),
+            dhcp.get_host_map_changes(
+                {1: [removed, modified], 2: [same]},
+                {1: [renamed, added], 2: [same]},
+            ),
+        )
+
+    def test_hosts_moving_between_vlans_are_modified(self):
+        host = self.make_host()
+        moved = dict(host, ip=factory.make_ipv4_address())
+        self.assertEqual(
+            ([], [], [moved]),
+            dhcp.get_host_map_changes({1: [host]}, {1: [], 2: [moved]}),
+        )
+
+
+class TestRackDHCPState(MAASTestCase):
+    """Tests for `RackDHCPState`."""
+
+    def test_next_version_increments(self):
+        state = dhcp.RackDHCPState()
+        self.assertEqual([1, 2, 3], [state.next_version() for _ in range(3)])
+        self.assertEqual({}, state.servers)
+
 
 class TestConfigureDHCP(MAASTransactionServerTestCase):
     """Tests for `configure_dhcp`."""
@@ -2796,6 +2900,254 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
 
         yield deferToDatabase(service_status_updated)
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_records_host_maps_in_state(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc, rack_controller
+        )
+        ipv4_stub.side_effect = always_succeed_with({})
+        ipv6_stub.side_effect = always_succeed_with({})
+        state = dhcp.RackDHCPState()
+
+        yield dhcp.configure_dhcp(rack_controller, state)
+
+        self.assertEqual(
+            {
+                4: dhcp.DHCPHostMaps(1, config.vlan_hosts_v4),
+                6: dhcp.DHCPHostMaps(1, config.vlan_hosts_v6),
+            },
+            state.servers,
+        )
+        if self.command_v4 is ConfigureDHCPv4_V2:
+            self.assertEqual(1, ipv4_stub.call_args[1]["version"])
+            self.assertEqual(1, ipv6_stub.call_args[1]["version"])
+        else:
+            self.assertNotIn("version", ipv4_stub.call_args[1])
+            self.assertNotIn("version", ipv6_stub.call_args[1])
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_records_stopped_servers_in_state(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, _ = yield deferToDatabase(
+            self.create_rack_controller, dhcp_on=False
+        )
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc, rack_controller
+        )
+        ipv4_stub.side_effect = always_succeed_with({})
+        ipv6_stub.side_effect = always_succeed_with({})
+        state = dhcp.RackDHCPState()
+
+        yield dhcp.configure_dhcp(rack_controller, state)
+
+        self.assertEqual({4: None, 6: None}, state.servers)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_forgets_host_maps_when_configuration_fails(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, _ = yield deferToDatabase(self.create_rack_controller)
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc, rack_controller
+        )
+        ipv4_stub.side_effect = always_fail_with(CannotConfigureDHCP())
+        ipv6_stub.side_effect = always_succeed_with({})
+        state = dhcp.RackDHCPState()
+        state.servers[4] = dhcp.DHCPHostMaps(0, {})
+
+        with ExpectedException(CannotConfigureDHCP):
+            yield dhcp.configure_dhcp(rack_controller, state)
+
+        self.assertNotIn(4, state.servers)
+        self.assertIn(6, state.servers)
+
+
+class TestUpdateDHCPHosts(MAASTransactionServerTestCase):
+    """Tests for `update_dhcp_hosts`."""
+
+    @synchronous
+    def prepare_rpc(self, rack_controller):
+        """Set up test case for speaking RPC to `rack_controller`."""
+        self.useFixture(RegionEventLoopFixture("rpc"))
+        self.useFixture(RunningEventLoopFixture())
+        fixture = self.useFixture(MockLiveRegionToClusterRPCFixture())
+        cluster = fixture.makeCluster(
+            rack_controller, UpdateDHCPv4Hosts, UpdateDHCPv6Hosts
+        )
+        cluster.UpdateDHCPv4Hosts.side_effect = always_succeed_with({})
+        cluster.UpdateDHCPv6Hosts.side_effect = always_succeed_with({})
+        return cluster
+
+    @transactional
+    def create_rack_controller(self):
+        """Create a `rack_controller` serving DHCPv4 on a VLAN, and return
+        it with the VLAN and the `RackDHCPState` of its configuration."""
+        rack_controller = factory.make_RackController(interface=False)
+        vlan = factory.make_VLAN(dhcp_on=True, primary_rack=rack_controller)
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(vlan=vlan)
+        interface = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=rack_controller, vlan=vlan
+        )
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            subnet=subnet,
+            interface=interface,
+        )
+        config = dhcp.get_dhcp_configuration(rack_controller)
+        state = dhcp.RackDHCPState()
+        state.servers[4] = dhcp.DHCPHostMaps(
+            state.next_version(), config.vlan_hosts_v4
+        )
+        state.servers[6] = None
+        return rack_controller, vlan, state
+
+    @transactional
+    def create_machine_ip(self, vlan):
+        """Give a machine an IP address on `vlan`, and return its host."""
+        machine = factory.make_Node()
+        interface = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=machine, vlan=vlan
+        )
+        sip = factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.AUTO,
+            subnet=vlan.subnet_set.first(),
+            interface=interface,
+        )
+        return {
+            "host": dhcp.make_interface_hostname(interface),
+            "mac": str(interface.mac_address),
+            "ip": str(sip.ip),
+            "dhcp_snippets": [],
+        }
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_only_changed_hosts(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        configure_dhcp = self.patch(dhcp, "configure_dhcp")
+        rack_controller, vlan, state = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        cluster = yield deferToThread(self.prepare_rpc, rack_controller)
+        host = yield deferToDatabase(self.create_machine_ip, vlan)
+
+        yield dhcp.update_dhcp_hosts(rack_controller, state, {vlan.id})
+
+        self.assertThat(
+            cluster.UpdateDHCPv4Hosts,
+            MockCalledOnceWith(
+                ANY,
+                omapi_key=ANY,
+                base_version=1,
+                version=2,
+                remove=[],
+                add=[host],
+                modify=[],
+            ),
+        )
+        self.assertThat(cluster.UpdateDHCPv6Hosts, MockNotCalled())
+        self.assertThat(configure_dhcp, MockNotCalled())
+        self.assertEqual(2, state.servers[4].version)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_nothing_when_hosts_unchanged(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        configure_dhcp = self.patch(dhcp, "configure_dhcp")
+        rack_controller, vlan, state = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        cluster = yield deferToThread(self.prepare_rpc, rack_controller)
+
+        yield dhcp.update_dhcp_hosts(rack_controller, state, {vlan.id})
+
+        self.assertThat(cluster.UpdateDHCPv4Hosts, MockNotCalled())
+        self.assertThat(configure_dhcp, MockNotCalled())
+        self.assertEqual(1, state.servers[4].version)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_configures_when_state_unknown(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        configure_dhcp = self.patch(dhcp, "configure_dhcp")
+        configure_dhcp.return_value = defer.succeed(None)
+        rack_controller, vlan, state = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        del state.servers[6]
+
+        yield dhcp.update_dhcp_hosts(rack_controller, state, {vlan.id})
+
+        self.assertThat(
+            configure_dhcp, MockCalledOnceWith(rack_controller, state)
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_configures_when_controller_hosts_change(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        configure_dhcp = self.patch(dhcp, "configure_dhcp")
+        configure_dhcp.return_value = defer.succeed(None)
+        rack_controller, vlan, state = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        cluster = yield deferToThread(self.prepare_rpc, rack_controller)
+        state.servers[4] = state.servers[4]._replace(vlan_hosts={vlan.id: []})
+
+        yield dhcp.update_dhcp_hosts(rack_controller, state, {vlan.id})
+
+        self.assertThat(cluster.UpdateDHCPv4Hosts, MockNotCalled())
+        self.assertThat(
+            configure_dhcp, MockCalledOnceWith(rack_controller, state)
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_configures_when_vlans_change(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        configure_dhcp = self.patch(dhcp, "configure_dhcp")
+        configure_dhcp.return_value = defer.succeed(None)
+        rack_controller, vlan, state = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        cluster = yield deferToThread(self.prepare_rpc, rack_controller)
+        state.servers[4] = state.servers[4]._replace(vlan_hosts={})
+
+        yield dhcp.update_dhcp_hosts(rack_controller, state, {vlan.id})
+
+        self.assertThat(cluster.UpdateDHCPv4Hosts, MockNotCalled())
+        self.assertThat(
+            configure_dhcp, MockCalledOnceWith(rack_controller, state)
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_configures_when_rack_is_out_of_date(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        configure_dhcp = self.patch(dhcp, "configure_dhcp")
+        configure_dhcp.return_value = defer.succeed(None)
+        rack_controller, vlan, state = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        cluster = yield deferToThread(self.prepare_rpc, rack_controller)
+        cluster.UpdateDHCPv4Hosts.side_effect = always_fail_with(
+            DHCPHostsOutOfDate()
+        )
+        yield deferToDatabase(self.create_machine_ip, vlan)
+
+        yield dhcp.update_dhcp_hosts(rack_controller, state, {vlan.id})
+
+        self.assertThat(
+            configure_dhcp, MockCalledOnceWith(rack_controller, state)
+        )
+        self.assertNotIn(4, state.servers)
+
 
 class TestValidateDHCPConfig(MAASTransactionServerTestCase):
     """Tests for `validate_dhcp_config`."""
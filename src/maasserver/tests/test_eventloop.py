@@ -28,17 +28,30 @@ from maasserver import (
 )
 from maasserver.eventloop import DEFAULT_PORT, MAASServices
 from maasserver.prometheus.stats import PrometheusService
-from maasserver.regiondservices import ntp, service_monitor_service, syslog
+from maasserver.regiondservices import (
+    database_pool,
+    ntp,
+    pod_usage,
+    rack_connectivity,
+    service_monitor_service,
+    syslog,
+)
 from maasserver.rpc import regionservice
+from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.eventloop import RegionEventLoopFixture
 from maasserver.testing.listener import FakePostgresListenerService
 from maasserver.testing.testcase import MAASServerTestCase
-from maasserver.utils import dbtasks
+from maasserver.utils import dbtasks, startup
 from maasserver.utils.orm import DisabledDatabaseConnection, transactional
+from maasserver.utils.threads import sample_database_pool
 from maastesting.factory import factory
 from maastesting.matchers import MockCallsMatch
 from maastesting.testcase import MAASTestCase
 from metadataserver import api_twisted
+from provisioningserver.prometheus.runtime import (
+    RuntimeMetricsService,
+    sample_reactor_thread_pool,
+)
 from provisioningserver.utils.twisted import asynchronous
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
@@ -75,6 +88,21 @@ class TestMAASServices(MAASServerTestCase):
         self.assertThat(calls, MockCallsMatch(call(), call()))
         self.assertThat(services.running, Equals(1))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_records_startup_phases(self):
+        record = self.patch(startup, "record_startup_phase")
+        fake_eventloop = Mock()
+        services = MAASServices(fake_eventloop)
+        service = Mock()
+        service.name = "sodor"
+        services.addService(service)
+        yield services.startService()
+        self.assertItemsEqual(
+            ["prepare", "service:sodor", "services"],
+            [phase for (phase, _), _ in record.call_args_list],
+        )
+
     @wait_for_reactor
     @inlineCallbacks
     def test_sets_global_labels(self):
@@ -331,6 +359,43 @@ class TestFactories(MAASServerTestCase):
             eventloop.loop.factories["database-tasks"]["only_on_master"]
         )
 
+    def test_make_DatabasePoolBudgetService(self):
+        service = eventloop.make_DatabasePoolBudgetService()
+        self.assertThat(
+            service, IsInstance(database_pool.DatabasePoolBudgetService)
+        )
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_DatabasePoolBudgetService,
+            eventloop.loop.factories["database-pool-budget"]["factory"],
+        )
+        self.assertEqual(
+            [], eventloop.loop.factories["database-pool-budget"]["requires"]
+        )
+        self.assertFalse(
+            eventloop.loop.factories["database-pool-budget"]["only_on_master"]
+        )
+
+    def test_make_PodUsageReconciliationService(self):
+        service = eventloop.make_PodUsageReconciliationService()
+        self.assertThat(
+            service, IsInstance(pod_usage.PodUsageReconciliationService)
+        )
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_PodUsageReconciliationService,
+            eventloop.loop.factories["pod-usage-reconciliation"]["factory"],
+        )
+        self.assertEqual(
+            [],
+            eventloop.loop.factories["pod-usage-reconciliation"]["requires"],
+        )
+        self.assertTrue(
+            eventloop.loop.factories["pod-usage-reconciliation"][
+                "only_on_master"
+            ]
+        )
+
     def test_make_RegionControllerService(self):
         service = eventloop.make_RegionControllerService(
             sentinel.postgresListener
@@ -347,6 +412,18 @@ class TestFactories(MAASServerTestCase):
             eventloop.loop.factories["region-controller"]["only_on_master"]
         )
 
+    def test_make_RegionControllerService_configures_dns_reloads(self):
+        self.useFixture(
+            RegionConfigurationFixture(
+                dns_reload_interval=3, dns_reload_max_delay=20
+            )
+        )
+        service = eventloop.make_RegionControllerService(
+            sentinel.postgresListener
+        )
+        self.assertEqual(3, service.dnsReloadInterval)
+        self.assertEqual(20, service.dnsReloadMaxDelay)
+
     def test_make_RegionService(self):
         service = eventloop.make_RegionService(sentinel.ipcWorker)
         self.assertThat(service, IsInstance(regionservice.RegionService))
@@ -360,6 +437,56 @@ class TestFactories(MAASServerTestCase):
             ["ipc-worker"], eventloop.loop.factories["rpc"]["requires"]
         )
 
+    def test_make_RackConnectivityService(self):
+        service = eventloop.make_RackConnectivityService(
+            sentinel.rpc, FakePostgresListenerService()
+        )
+        self.assertThat(
+            service, IsInstance(rack_connectivity.RackConnectivityService)
+        )
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_RackConnectivityService,
+            eventloop.loop.factories["rack-connectivity"]["factory"],
+        )
+        self.assertFalse(
+            eventloop.loop.factories["rack-connectivity"]["only_on_master"]
+        )
+        self.assertEquals(
+            ["rpc", "postgres-listener-worker"],
+            eventloop.loop.factories["rack-connectivity"]["requires"],
+        )
+
+    def test_make_RuntimeMetricsService(self):
+        listener = FakePostgresListenerService()
+        database_tasks = dbtasks.DatabaseTasksService()
+        service = eventloop.make_RuntimeMetricsService(
+            listener, database_tasks
+        )
+        self.assertThat(service, IsInstance(RuntimeMetricsService))
+        self.assertEqual(
+            [
+                sample_reactor_thread_pool,
+                sample_database_pool,
+                listener.sampleMetrics,
+                database_tasks.sampleMetrics,
+            ],
+            service.samplers,
+        )
+        # It is registered as factories in RegionEventLoop, for the master
+        # process and for the workers.
+        master = eventloop.loop.factories["runtime-metrics-master"]
+        self.assertIs(eventloop.make_RuntimeMetricsService, master["factory"])
+        self.assertTrue(master["only_on_master"])
+        self.assertTrue(master["not_all_in_one"])
+        self.assertEqual(["postgres-listener-master"], master["requires"])
+        worker = eventloop.loop.factories["runtime-metrics-worker"]
+        self.assertIs(eventloop.make_RuntimeMetricsService, worker["factory"])
+        self.assertFalse(worker["only_on_master"])
+        self.assertEqual(
+            ["postgres-listener-worker", "database-tasks"], worker["requires"]
+        )
+
     def test_make_NonceCleanupService(self):
         service = eventloop.make_NonceCleanupService()
         self.assertThat(
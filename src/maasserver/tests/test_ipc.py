@@ -16,7 +16,7 @@ from testtools.matchers import MatchesStructure
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks, succeed
 
-from maasserver import workers
+from maasserver import ipc, workers
 from maasserver.enum import SERVICE_STATUS
 from maasserver.ipc import (
     get_ipc_socket_path,
@@ -383,6 +383,7 @@ class TestIPCCommunication(MAASTransactionServerTestCase):
         yield deferToDatabase(load_builtin_scripts)
         current_time = now()
         self.patch(timestampedmodel, "now").return_value = current_time
+        self.patch(ipc, "now").return_value = current_time
 
         master = self.make_IPCMasterService()
         yield master.startService()
@@ -506,3 +507,79 @@ class TestIPCCommunication(MAASTransactionServerTestCase):
         self.assertItemsEqual(rpc_connections, [])
 
         yield master.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_update_does_not_rewrite_unchanged_endpoints_or_connections(self):
+        yield deferToDatabase(load_builtin_scripts)
+        master = self.make_IPCMasterService()
+        yield master.startService()
+
+        pid = random.randint(1, 512)
+        port = random.randint(1, 512)
+        yield master.registerWorker(pid, MagicMock())
+        yield master.registerWorkerRPC(pid, port)
+        rackd = yield deferToDatabase(factory.make_RackController)
+        yield master.registerWorkerRPCConnection(
+            pid, str(uuid.uuid4()), rackd.system_id, "::1", port
+        )
+        yield master.update()
+
+        def get_rows():
+            return (
+                set(
+                    RegionControllerProcessEndpoint.objects.values_list(
+                        "id", "updated"
+                    )
+                ),
+                set(
+                    RegionRackRPCConnection.objects.values_list(
+                        "id", "updated"
+                    )
+                ),
+            )
+
+        rows = yield deferToDatabase(get_rows)
+        yield master.update()
+        self.assertEqual(rows, (yield deferToDatabase(get_rows)))
+        self.assertEqual(1, len(rows[1]))
+
+        yield master.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_update_recreates_removed_rpc_connections(self):
+        yield deferToDatabase(load_builtin_scripts)
+        master = self.make_IPCMasterService()
+        yield master.startService()
+
+        pid = random.randint(1, 512)
+        port = random.randint(1, 512)
+        address = factory.make_ipv4_address()
+        yield master.registerWorker(pid, MagicMock())
+        yield master.registerWorkerRPC(pid, port)
+        rackd = yield deferToDatabase(factory.make_RackController)
+        yield master.registerWorkerRPCConnection(
+            pid, str(uuid.uuid4()), rackd.system_id, address, port
+        )
+
+        def delete_connections():
+            RegionRackRPCConnection.objects.all().delete()
+
+        def get_connections():
+            return list(
+                RegionRackRPCConnection.objects.values_list(
+                    "endpoint__address",
+                    "endpoint__port",
+                    "rack_controller__system_id",
+                )
+            )
+
+        yield deferToDatabase(delete_connections)
+        yield master.update()
+
+        # The endpoint is kept although the worker is not listening on it.
+        connections = yield deferToDatabase(get_connections)
+        self.assertEqual([(address, port, rackd.system_id)], connections)
+
+        yield master.stopService()
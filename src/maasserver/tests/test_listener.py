@@ -28,6 +28,7 @@ from twisted.internet.defer import (
     inlineCallbacks,
     returnValue,
 )
+from twisted.internet.task import Clock
 from twisted.logger import LogLevel
 from twisted.python.failure import Failure
 
@@ -522,6 +523,42 @@ class TestPostgresListenerService(MAASServerTestCase):
         listener.doRead()
         self.assertItemsEqual(listener.notifications, set(notifications))
 
+    def test_handleNotify_observes_handler_latency(self):
+        prometheus_metrics = Mock()
+        listener = PostgresListenerService(
+            prometheus_metrics=prometheus_metrics
+        )
+        handled = Deferred()
+        listener.register("node", lambda action, obj_id: handled)
+        clock = Clock()
+        listener.handleNotify(("node_create", "payload"), clock=clock)
+        clock.advance(2)
+        self.assertThat(prometheus_metrics.update, MockNotCalled())
+        handled.callback(None)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_listener_handler_latency",
+                "observe",
+                value=2,
+                labels={"channel": "node"},
+            ),
+        )
+
+    def test_sampleMetrics_exports_pending_notifications(self):
+        listener = PostgresListenerService()
+        listener.notifications.update(
+            {("node_create", "a"), ("node_update", "b")}
+        )
+        prometheus_metrics = Mock()
+        listener.sampleMetrics(prometheus_metrics)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_listener_pending_notifications", "set", value=2
+            ),
+        )
+
     @wait_for_reactor
     @inlineCallbacks
     def test_listener_ignores_ENOENT_when_removing_itself_from_reactor(self):
@@ -8,7 +8,6 @@ import http.client
 import json
 import logging
 import random
-from unittest.mock import Mock
 
 from crochet import TimeoutError
 from django.conf import settings
@@ -19,11 +18,6 @@ from fixtures import FakeLogger
 from testtools.matchers import Contains, Equals, Not
 
 from maasserver import middleware as middleware_module
-from maasserver.components import (
-    get_persistent_error,
-    register_persistent_error,
-)
-from maasserver.enum import COMPONENT
 from maasserver.exceptions import MAASAPIException, MAASAPINotFound
 from maasserver.middleware import (
     AccessMiddleware,
@@ -31,8 +25,8 @@ from maasserver.middleware import (
     CSRFHelperMiddleware,
     DebuggingLoggerMiddleware,
     ExceptionMiddleware,
+    external_auth_info_cache,
     ExternalAuthInfoMiddleware,
-    ExternalComponentsMiddleware,
     is_public_path,
     RBACMiddleware,
     RPCErrorsMiddleware,
@@ -46,6 +40,7 @@ from maasserver.utils.orm import (
     make_deadlock_failure,
     make_serialization_failure,
 )
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnceWith
 from maastesting.utils import sample_binary_data
 from provisioningserver.rpc.exceptions import (
@@ -537,104 +532,6 @@ class APIRPCErrorsMiddlewareTest(MAASServerTestCase):
         )
 
 
-class ExternalComponentsMiddlewareTest(MAASServerTestCase):
-    """Tests for the ExternalComponentsMiddleware."""
-
-    def process_request(self, request):
-        def get_response(request):
-            return None
-
-        middleware = ExternalComponentsMiddleware(get_response)
-        return middleware(request)
-
-    def quick_process(self):
-        request = factory.make_fake_request(factory.make_string(), "GET")
-        return self.process_request(request)
-
-    def test_checks_connectivity_of_rack_controllers(self):
-        getAllClients = self.patch(middleware_module, "getAllClients")
-
-        self.quick_process()
-
-        self.assertThat(getAllClients, MockCalledOnceWith())
-
-    def test_registers_error_if_all_rack_controllers_are_disconnected(self):
-        factory.make_RackController()
-
-        getAllClients = self.patch(middleware_module, "getAllClients")
-        getAllClients.return_value = []
-
-        self.quick_process()
-
-        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        self.assertEqual(
-            "One rack controller is not yet connected to the region. Visit "
-            'the <a href="/MAAS/l/controllers">'
-            "rack controllers page</a> for more "
-            "information.",
-            error,
-        )
-
-    def test_registers_error_if_any_clusters_are_disconnected(self):
-        rack_controllers = [
-            factory.make_RackController(),
-            factory.make_RackController(),
-            factory.make_RackController(),
-        ]
-
-        getAllClients = self.patch(middleware_module, "getAllClients")
-        getAllClients.return_value = [
-            Mock(ident=rack_controllers[0].system_id)
-        ]
-
-        self.quick_process()
-
-        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        self.assertEqual(
-            "2 rack controllers are not yet connected to the region. Visit "
-            'the <a href="/MAAS/l/controllers">'
-            "rack controllers page</a> for more "
-            "information.",
-            error,
-        )
-
-    def test_removes_error_once_all_clusters_are_connected(self):
-        rack_controllers = [
-            factory.make_RackController(),
-            factory.make_RackController(),
-        ]
-
-        getAllClients = self.patch(middleware_module, "getAllClients")
-        getAllClients.return_value = [
-            Mock(ident=rack.system_id) for rack in rack_controllers
-        ]
-
-        register_persistent_error(
-            COMPONENT.RACK_CONTROLLERS, "Who flung that batter pudding?"
-        )
-
-        self.quick_process()
-
-        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        self.assertIsNone(error)
-
-    def test_does_not_suppress_exceptions_from_connectivity_checks(self):
-        def get_response(request):
-            return None
-
-        middleware = ExternalComponentsMiddleware(get_response)
-
-        error_type = factory.make_exception_type()
-        check_rack_controller_connectivity = self.patch(
-            middleware, "_check_rack_controller_connectivity"
-        )
-        check_rack_controller_connectivity.side_effect = error_type
-        self.assertRaises(error_type, middleware, None)
-        self.assertThat(
-            check_rack_controller_connectivity, MockCalledOnceWith()
-        )
-
-
 class CSRFHelperMiddlewareTest(MAASServerTestCase):
     """Tests for the CSRFHelperMiddleware."""
 
@@ -720,6 +617,36 @@ class TestExternalAuthInfoMiddleware(MAASServerTestCase):
         self.assertEqual(request.external_auth_info.type, "candid")
         self.assertEqual(request.external_auth_info.url, "https://example.com")
 
+    def test_reuses_info_across_requests(self):
+        Config.objects.set_config("external_auth_url", "https://example.com/")
+        request = factory.make_fake_request("/")
+        self.process_request(request)
+        other_request = factory.make_fake_request("/")
+        count, _ = count_queries(self.process_request, other_request)
+        self.assertEqual(0, count)
+        self.assertIs(
+            request.external_auth_info, other_request.external_auth_info
+        )
+
+    def test_rereads_info_once_config_changes(self):
+        self.process_request(factory.make_fake_request("/"))
+        Config.objects.set_config("external_auth_url", "https://example.com/")
+        request = factory.make_fake_request("/")
+        self.process_request(request)
+        self.assertEqual(request.external_auth_info.url, "https://example.com")
+
+    def test_rereads_info_once_cleared(self):
+        self.process_request(factory.make_fake_request("/"))
+        # Bulk creation doesn't send signals, as when another process
+        # changes configuration.
+        Config.objects.bulk_create(
+            [Config(name="rbac_url", value="https://rbac.example.com")]
+        )
+        external_auth_info_cache.clear("update", "1")
+        request = factory.make_fake_request("/")
+        self.process_request(request)
+        self.assertEqual(request.external_auth_info.type, "rbac")
+
 
 class RBACMiddlewareTest(MAASServerTestCase):
     """Tests for the RBACMiddleware."""
@@ -10,9 +10,14 @@ from unittest.mock import ANY
 from django.db import transaction
 from netaddr import IPNetwork
 from testtools.matchers import Equals
+from twisted.internet.defer import Deferred
 
 from maasserver import locks
 from maasserver.clusterrpc.boot_images import RackControllersImporter
+from maasserver.clusterrpc.power import (
+    get_power_command_batch,
+    PowerCommandBatch,
+)
 from maasserver.clusterrpc.utils import get_error_message_for_exception
 from maasserver.enum import (
     INTERFACE_TYPE,
@@ -26,7 +31,7 @@ from maasserver.enum import (
     NODE_TYPE_CHOICES_DICT,
     POWER_STATE,
 )
-from maasserver.exceptions import NodeActionError
+from maasserver.exceptions import NodeActionError, PowerProblem
 from maasserver.models import Config, Event, signals, StaticIPAddress
 from maasserver.models.signals.testing import SignalsDisabled
 import maasserver.node_action as node_action_module
@@ -39,6 +44,7 @@ from maasserver.node_action import (
     compile_node_actions,
     Delete,
     Deploy,
+    execute_node_actions,
     ExitRescueMode,
     ImportImages,
     Lock,
@@ -70,6 +76,7 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import post_commit, post_commit_hooks, reload_object
 from maastesting.matchers import MockCalledOnce, MockCalledOnceWith
+from maastesting.twisted import extract_result
 from metadataserver.builtin_scripts import load_builtin_scripts
 from metadataserver.enum import RESULT_TYPE, SCRIPT_STATUS, SCRIPT_TYPE
 from metadataserver.models import ScriptSet
@@ -1859,3 +1866,127 @@ class TestActionsErrorHandling(MAASServerTestCase):
             ),
             str(exception),
         )
+
+
+class TestExecuteNodeActions(MAASServerTestCase):
+    def make_nodes(self, user, count=2, status=NODE_STATUS.DEPLOYED):
+        return [
+            factory.make_Node(status=status, owner=user) for _ in range(count)
+        ]
+
+    def test_raises_error_for_unknown_action(self):
+        user = factory.make_User()
+        self.assertRaises(
+            NodeActionError,
+            execute_node_actions,
+            self.make_nodes(user),
+            user,
+            factory.make_name("action"),
+        )
+
+    def test_raises_error_for_unknown_parameters(self):
+        user = factory.make_User()
+        nodes = self.make_nodes(user)
+        error = self.assertRaises(
+            NodeActionError,
+            execute_node_actions,
+            nodes,
+            user,
+            Lock.name,
+            extra={"user": user, "erase": True},
+        )
+        self.assertEqual(
+            "lock action does not take parameter(s): erase, user.",
+            str(error),
+        )
+        for node in nodes:
+            self.assertFalse(reload_object(node).locked)
+
+    def test_passes_extra_to_each_action(self):
+        user = factory.make_admin()
+        nodes = self.make_nodes(user)
+        zone = factory.make_Zone()
+        errors, _ = execute_node_actions(
+            nodes, user, SetZone.name, extra={"zone_id": zone.id}
+        )
+        self.assertEqual({node.system_id: None for node in nodes}, errors)
+        for node in nodes:
+            self.assertEqual(zone, reload_object(node).zone)
+
+    def test_performs_action_on_each_node(self):
+        user = factory.make_User()
+        nodes = self.make_nodes(user)
+        errors, powering = execute_node_actions(nodes, user, Lock.name)
+        self.assertEqual({node.system_id: None for node in nodes}, errors)
+        self.assertEqual({}, powering)
+        for node in nodes:
+            self.assertTrue(reload_object(node).locked)
+
+    def test_reports_nodes_action_is_not_available_for(self):
+        user = factory.make_User()
+        [deployed] = self.make_nodes(user, 1)
+        [ready] = self.make_nodes(user, 1, status=NODE_STATUS.READY)
+        errors, _ = execute_node_actions([deployed, ready], user, Lock.name)
+        self.assertEqual(
+            {
+                deployed.system_id: None,
+                ready.system_id: "lock action is not available for this node.",
+            },
+            errors,
+        )
+        self.assertFalse(reload_object(ready).locked)
+
+    def test_rolls_back_only_nodes_action_fails_for(self):
+        user = factory.make_User()
+        nodes = self.make_nodes(user)
+
+        def _execute(action):
+            action.node.lock(user, "via test")
+            if action.node == nodes[1]:
+                raise NodeActionError("Failed.")
+
+        self.patch(Lock, "_execute", _execute)
+        errors, _ = execute_node_actions(nodes, user, Lock.name)
+        self.assertEqual(
+            {nodes[0].system_id: None, nodes[1].system_id: "Failed."}, errors
+        )
+        self.assertTrue(reload_object(nodes[0]).locked)
+        self.assertFalse(reload_object(nodes[1]).locked)
+
+    def test_batches_power_commands_of_all_nodes(self):
+        user = factory.make_User()
+        nodes = self.make_nodes(user)
+        batches = []
+
+        def _execute(action):
+            batches.append(get_power_command_batch())
+
+        self.patch(Lock, "_execute", _execute)
+        execute_node_actions(nodes, user, Lock.name)
+        self.assertIsInstance(batches[0], PowerCommandBatch)
+        self.assertEqual([batches[0]] * len(nodes), batches)
+        self.assertIsNone(get_power_command_batch())
+
+    def test_returns_power_result_of_each_node_powered(self):
+        user = factory.make_User()
+        nodes = self.make_nodes(user, 3)
+        hooks = {}
+
+        def _execute(action):
+            if action.node != nodes[2]:
+                hook = hooks[action.node.system_id] = Deferred()
+                get_power_command_batch().hand_over(
+                    action.node.system_id, hook
+                )
+
+        self.patch(Lock, "_execute", _execute)
+        errors, powering = execute_node_actions(nodes, user, Lock.name)
+        hooks[nodes[0].system_id].callback(None)
+        hooks[nodes[1].system_id].errback(PowerProblem("Problem."))
+        self.assertEqual(
+            {nodes[0].system_id: None, nodes[1].system_id: "Problem."},
+            {
+                system_id: extract_result(d)
+                for system_id, d in powering.items()
+            },
+        )
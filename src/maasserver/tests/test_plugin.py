@@ -119,9 +119,12 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
         self.assertIsInstance(service, MultiService)
         expected_services = [
             "database-tasks",
+            "database-pool-budget",
             "postgres-listener-worker",
+            "rack-connectivity",
             "rack-controller",
             "rpc",
+            "runtime-metrics-worker",
             "status-worker",
             "web",
             "ipc-worker",
@@ -156,9 +159,12 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
         self.assertIsInstance(service, MultiService)
         expected_services = [
             "database-tasks",
+            "database-pool-budget",
             "postgres-listener-worker",
+            "rack-connectivity",
             "rack-controller",
             "rpc",
+            "runtime-metrics-worker",
             "status-worker",
             "web",
             "ipc-worker",
@@ -244,6 +250,7 @@ class TestRegionMasterServiceMaker(TestServiceMaker):
         expected_services = [
             "region-controller",
             "nonce-cleanup",
+            "pod-usage-reconciliation",
             "dns-publication-cleanup",
             "service-monitor",
             "status-monitor",
@@ -251,6 +258,7 @@ class TestRegionMasterServiceMaker(TestServiceMaker):
             "prometheus",
             "prometheus-exporter",
             "postgres-listener-master",
+            "runtime-metrics-master",
             "networks-monitor",
             "active-discovery",
             "reverse-dns",
@@ -357,9 +365,12 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
         expected_services = [
             # Worker services.
             "database-tasks",
+            "database-pool-budget",
             "postgres-listener-worker",
+            "rack-connectivity",
             "rack-controller",
             "rpc",
+            "runtime-metrics-worker",
             "service-monitor",
             "status-worker",
             "web",
@@ -367,6 +378,7 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             # Master services.
             "region-controller",
             "nonce-cleanup",
+            "pod-usage-reconciliation",
             "dns-publication-cleanup",
             "status-monitor",
             "stats",
@@ -380,6 +392,7 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             "reverse-dns",
             "ntp",
             "syslog",
+            # "runtime-metrics-master",  Prevented in all-in-one.
             # "workers",  Prevented in all-in-one.
             "ipc-master",
         ]
@@ -0,0 +1,150 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.pod_placement`."""
+
+
+from maasserver.pod_placement import (
+    get_room_left,
+    get_shortfall,
+    get_storage_pool_shortfall,
+    order_pods,
+    PLACEMENT_STRATEGY,
+    PodCapacity,
+    PodRequest,
+)
+from maastesting.testcase import MAASTestCase
+
+
+class TestGetShortfall(MAASTestCase):
+    def test_returns_None_when_request_fits(self):
+        capacity = PodCapacity(cores=8, memory=4096, used_cores=4)
+        self.assertIsNone(get_shortfall(capacity, PodRequest(4, 4096)))
+
+    def test_describes_shortfall(self):
+        capacity = PodCapacity(cores=8, memory=4096, used_memory=2048)
+        self.assertEqual(
+            "Not enough memory; 2048 available, 3072 requested.",
+            get_shortfall(capacity, PodRequest(2, 3072)),
+        )
+
+    def test_ignores_unknown_totals(self):
+        capacity = PodCapacity(cores=8, memory=4096, used_storage=10)
+        self.assertIsNone(get_shortfall(capacity, PodRequest(2, 1024, 10)))
+
+
+class TestGetStoragePoolShortfall(MAASTestCase):
+    def make_capacity(self, default=None):
+        return PodCapacity(
+            storage_pools={"small": (10, 5), "large": (100, 10)},
+            default_storage_pool=default,
+        )
+
+    def test_uses_pool_named_in_tags(self):
+        capacity = self.make_capacity(default="large")
+        self.assertEqual(
+            "Not enough storage in small; 5 available, 20 requested.",
+            get_storage_pool_shortfall(
+                capacity, PodRequest(disks=[(20, ["small"])])
+            ),
+        )
+        self.assertIsNone(
+            get_storage_pool_shortfall(
+                capacity, PodRequest(disks=[(5, ["small", "ssd"])])
+            )
+        )
+
+    def test_uses_default_pool(self):
+        capacity = self.make_capacity(default="small")
+        self.assertEqual(
+            "Not enough storage in small; 5 available, 20 requested.",
+            get_storage_pool_shortfall(
+                capacity, PodRequest(disks=[(20, None)])
+            ),
+        )
+
+    def test_uses_any_pool_without_default(self):
+        capacity = self.make_capacity()
+        self.assertIsNone(
+            get_storage_pool_shortfall(
+                capacity, PodRequest(disks=[(20, None)])
+            )
+        )
+
+    def test_allocates_each_disk(self):
+        capacity = self.make_capacity(default="large")
+        self.assertEqual(
+            "Not enough storage in large; 40 available, 50 requested.",
+            get_storage_pool_shortfall(
+                capacity, PodRequest(disks=[(50, None), (50, None)])
+            ),
+        )
+
+    def test_replaces_total_storage_check(self):
+        capacity = self.make_capacity(default="large")
+        capacity.storage = 20
+        self.assertIsNone(
+            get_shortfall(capacity, PodRequest(storage=50, disks=[(50, [])]))
+        )
+        self.assertEqual(
+            "Not enough storage in large; 90 available, 95 requested.",
+            get_shortfall(capacity, PodRequest(storage=95, disks=[(95, [])])),
+        )
+
+
+class TestGetRoomLeft(MAASTestCase):
+    def test_averages_fractions_left(self):
+        capacity = PodCapacity(cores=8, memory=4096, storage=100)
+        self.assertAlmostEqual(
+            (0.5 + 0.75 + 0.9) / 3,
+            get_room_left(capacity, PodRequest(4, 1024, 10)),
+        )
+
+    def test_without_known_totals(self):
+        self.assertEqual(0.0, get_room_left(PodCapacity(), PodRequest(1)))
+
+
+class TestOrderPods(MAASTestCase):
+    def make_placements(self):
+        request = PodRequest(cores=2, memory=1024)
+        return [
+            (
+                "half",
+                PodCapacity(8, 8192, used_cores=4, used_memory=4096),
+                request,
+            ),
+            ("full", PodCapacity(8, 8192, used_cores=7), request),
+            ("empty", PodCapacity(8, 8192), request),
+            (
+                "tight",
+                PodCapacity(8, 8192, used_cores=6, used_memory=6144),
+                request,
+            ),
+        ]
+
+    def test_spread_prefers_most_room(self):
+        pods, rejections = order_pods(
+            self.make_placements(), PLACEMENT_STRATEGY.SPREAD
+        )
+        self.assertEqual(["empty", "half", "tight"], pods)
+        self.assertEqual(
+            {"full": "Not enough cores; 1 available, 2 requested."},
+            rejections,
+        )
+
+    def test_best_fit_prefers_least_room(self):
+        pods, rejections = order_pods(
+            self.make_placements(), PLACEMENT_STRATEGY.BEST_FIT
+        )
+        self.assertEqual(["tight", "half", "empty"], pods)
+        self.assertEqual(["full"], list(rejections))
+
+    def test_keeps_order_of_equal_pods(self):
+        request = PodRequest(cores=1)
+        pods, _ = order_pods(
+            [(index, PodCapacity(4), request) for index in range(5)]
+        )
+        self.assertEqual(list(range(5)), pods)
+
+    def test_rejects_unknown_strategy(self):
+        self.assertRaises(ValueError, order_pods, [], "first-fit")
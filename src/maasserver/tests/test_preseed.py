@@ -440,6 +440,18 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         template = load_preseed_template(node, prefix)
         self.assertRaises(TemplateNotFoundError, template.substitute)
 
+    def test_load_preseed_template_loads_modified_template(self):
+        prefix = factory.make_string()
+        self.create_template(self.location, prefix)
+        node = factory.make_Node()
+        load_preseed_template(node, prefix)
+        self.create_template(self.location, prefix, "modified")
+        path = os.path.join(self.location, prefix)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        template = load_preseed_template(node, prefix)
+        self.assertEqual("modified", template.substitute())
+
 
 class TestPreseedContext(MAASServerTestCase):
     """Tests for `get_preseed_context`."""
@@ -1008,6 +1020,27 @@ class TestGetCurtinUserData(
             MockCalledOnceWith(node, version=ANY, source_routing=ANY),
         )
 
+    def test_get_curtin_userdata_renders_once_until_node_changes(self):
+        node = factory.make_Node_with_Interface_on_Subnet(
+            primary_rack=self.rpc_rack_controller, osystem="ubuntu"
+        )
+        self.configure_get_boot_images_for_node(node, "xinstall")
+        mock_compose_network = self.patch(
+            preseed_module, "compose_curtin_network_config"
+        )
+        mock_compose_network.return_value = []
+        user_data = get_curtin_userdata(make_HttpRequest(), node)
+        self.assertEqual(
+            user_data, get_curtin_userdata(make_HttpRequest(), node)
+        )
+        self.assertThat(
+            mock_compose_network,
+            MockCalledOnceWith(node, version=ANY, source_routing=ANY),
+        )
+        factory.make_Interface(node=node)
+        get_curtin_userdata(make_HttpRequest(), node)
+        self.assertEqual(2, mock_compose_network.call_count)
+
     def test_get_curtin_userdata_includes_storage_for_dd(self):
         # Tests that storage config is sent when deploying windows. This is
         # required to select the correct root device based on the boot device
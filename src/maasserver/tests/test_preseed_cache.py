@@ -0,0 +1,229 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.preseed_cache`."""
+
+
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from django.conf import settings
+
+from maasserver.models import Config
+from maasserver.preseed_cache import (
+    get_preseed_fingerprint,
+    PreseedTemplateCache,
+    RenderedPreseedCache,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
+from maastesting.http import make_HttpRequest
+from maastesting.testcase import MAASTestCase
+
+
+class TestPreseedTemplateCache(MAASTestCase):
+    def test_parses_template_once(self):
+        path = self.make_file(contents="content")
+        parse = Mock(side_effect=lambda content: [content])
+        cache = PreseedTemplateCache()
+        self.assertEqual(["content"], cache.get(path, parse))
+        self.assertEqual(["content"], cache.get(path, parse))
+        parse.assert_called_once_with("content")
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_returns_copies(self):
+        path = self.make_file(contents="content")
+        cache = PreseedTemplateCache()
+        template = cache.get(
+            path, lambda content: SimpleNamespace(content=content)
+        )
+        template.content = "changed"
+        self.assertEqual("content", cache.get(path, Mock()).content)
+
+    def test_parses_modified_template_again(self):
+        path = self.make_file(contents="content")
+        cache = PreseedTemplateCache()
+        cache.get(path, list)
+        with open(path, "w") as stream:
+            stream.write("modified")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(list("modified"), cache.get(path, list))
+
+    def test_returns_None_for_missing_template(self):
+        parse = Mock()
+        cache = PreseedTemplateCache()
+        path = os.path.join(self.make_dir(), factory.make_name("template"))
+        self.assertIsNone(cache.get(path, parse))
+        parse.assert_not_called()
+
+    def test_evicts_least_recently_used(self):
+        paths = [self.make_file(contents=str(i)) for i in range(3)]
+        cache = PreseedTemplateCache(max_entries=2)
+        for path in paths:
+            cache.get(path, list)
+        parse = Mock(side_effect=list)
+        cache.get(paths[0], parse)
+        cache.get(paths[2], parse)
+        parse.assert_called_once_with("0")
+
+
+class TestRenderedPreseedCache(MAASTestCase):
+    def test_renders_once_for_fingerprint(self):
+        render = Mock(return_value=b"preseed")
+        cache = RenderedPreseedCache()
+        self.assertEqual(b"preseed", cache.get("key", "fp", render))
+        self.assertEqual(b"preseed", cache.get("key", "fp", render))
+        render.assert_called_once_with()
+        self.assertEqual((1, 1, 7), (cache.hits, cache.misses, cache.size))
+
+    def test_replaces_preseed_when_fingerprint_changes(self):
+        cache = RenderedPreseedCache()
+        cache.get("key", "fp1", lambda: b"old")
+        self.assertEqual(b"newer", cache.get("key", "fp2", lambda: b"newer"))
+        self.assertEqual(b"newer", cache.get("key", "fp2", Mock()))
+        self.assertEqual(5, cache.size)
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderedPreseedCache(max_size=10)
+        cache.get("a", "fp", lambda: b"aaaa")
+        cache.get("b", "fp", lambda: b"bbbb")
+        cache.get("a", "fp", Mock())
+        cache.get("c", "fp", lambda: b"cccc")
+        render = Mock(return_value=b"bbbb")
+        cache.get("a", "fp", render)
+        cache.get("b", "fp", render)
+        render.assert_called_once_with()
+
+    def test_does_not_keep_preseeds_larger_than_cache(self):
+        cache = RenderedPreseedCache(max_size=2)
+        cache.get("key", "fp", lambda: b"preseed")
+        self.assertEqual(0, cache.size)
+
+
+class TestGetPreseedFingerprint(MAASServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [self.make_dir()])
+
+    def assertFingerprintChanges(self, node, change):
+        request = make_HttpRequest()
+        before = get_preseed_fingerprint(request, node)
+        change()
+        self.assertNotEqual(
+            before, get_preseed_fingerprint(request, reload_object(node))
+        )
+
+    def test_is_stable(self):
+        node = factory.make_Node_with_Interface_on_Subnet()
+        request = make_HttpRequest()
+        self.assertEqual(
+            get_preseed_fingerprint(request, node),
+            get_preseed_fingerprint(request, reload_object(node)),
+        )
+
+    def test_uses_one_query(self):
+        node = factory.make_Node_with_Interface_on_Subnet()
+        count, _ = count_queries(
+            get_preseed_fingerprint, make_HttpRequest(), node
+        )
+        self.assertEqual(1, count)
+
+    def test_changes_with_node(self):
+        node = factory.make_Node()
+
+        def change():
+            node.distro_series = factory.make_name("series")
+            node.save()
+
+        self.assertFingerprintChanges(node, change)
+
+    def test_ignores_power_state(self):
+        node = factory.make_Node(power_state="off")
+        request = make_HttpRequest()
+        before = get_preseed_fingerprint(request, node)
+        node.update_power_state("on")
+        self.assertEqual(
+            before, get_preseed_fingerprint(request, reload_object(node))
+        )
+
+    def test_changes_with_storage(self):
+        node = factory.make_Node()
+        self.assertFingerprintChanges(
+            node, lambda: factory.make_PhysicalBlockDevice(node=node)
+        )
+
+    def test_changes_with_filesystems(self):
+        node = factory.make_Node()
+        partition = factory.make_Partition(node=node)
+        self.assertFingerprintChanges(
+            node, lambda: factory.make_Filesystem(partition=partition)
+        )
+
+    def test_changes_with_interfaces(self):
+        node = factory.make_Node()
+        self.assertFingerprintChanges(
+            node, lambda: factory.make_Interface(node=node)
+        )
+
+    def test_changes_with_addresses(self):
+        node = factory.make_Node_with_Interface_on_Subnet()
+        iface = node.interface_set.first()
+        subnet = iface.vlan.subnet_set.first()
+        self.assertFingerprintChanges(
+            node,
+            lambda: factory.make_StaticIPAddress(
+                interface=iface, subnet=subnet
+            ),
+        )
+
+    def test_changes_with_addresses_moved_between_interfaces(self):
+        node = factory.make_Node()
+        subnet = factory.make_Subnet()
+        ifaces = [
+            factory.make_Interface(node=node, vlan=subnet.vlan)
+            for _ in range(2)
+        ]
+        ips = [
+            factory.make_StaticIPAddress(interface=iface, subnet=subnet)
+            for iface in ifaces
+        ]
+
+        def change():
+            for ip, iface in zip(ips, reversed(ifaces)):
+                ip.interface_set.set([iface])
+
+        self.assertFingerprintChanges(node, change)
+
+    def test_changes_with_subnets(self):
+        node = factory.make_Node()
+        self.assertFingerprintChanges(node, factory.make_Subnet)
+
+    def test_changes_with_config(self):
+        node = factory.make_Node()
+        self.assertFingerprintChanges(
+            node,
+            lambda: Config.objects.set_config(
+                "remote_syslog", factory.make_hostname()
+            ),
+        )
+
+    def test_changes_with_templates(self):
+        node = factory.make_Node()
+        [location] = settings.PRESEED_TEMPLATE_LOCATIONS
+        self.assertFingerprintChanges(
+            node,
+            lambda: factory.make_file(location, "curtin_userdata", "{{}}"),
+        )
+
+    def test_changes_with_request(self):
+        node = factory.make_Node()
+        self.assertNotEqual(
+            get_preseed_fingerprint(make_HttpRequest(), node),
+            get_preseed_fingerprint(
+                make_HttpRequest(http_host=factory.make_hostname()), node
+            ),
+        )
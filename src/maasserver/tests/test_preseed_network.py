@@ -36,6 +36,7 @@ from maasserver.preseed_network import (
 )
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 from provisioningserver.utils.network import get_source_address
 
 
@@ -1902,3 +1903,46 @@ class TestGetNextRoutingTableId(MAASServerTestCase):
             generator.get_next_routing_table_id()
         with ExpectedException(IndexError):
             generator.get_next_routing_table_id()
+
+
+class TestComposeCurtinNetworkConfigQueries(MAASServerTestCase):
+    def make_interfaces(self, node, subnet):
+        iface = factory.make_Interface(node=node, vlan=subnet.vlan)
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY, interface=iface, subnet=subnet
+        )
+        vlan_iface = factory.make_Interface(
+            iftype=INTERFACE_TYPE.VLAN, node=node, parents=[iface]
+        )
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            interface=vlan_iface,
+            subnet=factory.make_Subnet(vlan=vlan_iface.vlan),
+        )
+        bond_iface = factory.make_Interface(
+            iftype=INTERFACE_TYPE.BOND,
+            node=node,
+            vlan=subnet.vlan,
+            parents=[
+                factory.make_Interface(node=node, vlan=subnet.vlan)
+                for _ in range(2)
+            ],
+        )
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            interface=bond_iface,
+            subnet=subnet,
+        )
+
+    def count_compose_queries(self, sets):
+        node = factory.make_Node()
+        subnet = factory.make_Subnet()
+        for _ in range(sets):
+            self.make_interfaces(node, subnet)
+        count, _ = count_queries(compose_curtin_network_config, node)
+        return count
+
+    def test_queries_do_not_grow_with_interfaces(self):
+        self.assertEqual(
+            self.count_compose_queries(1), self.count_compose_queries(3)
+        )
@@ -36,6 +36,7 @@ from maasserver.preseed_storage import compose_curtin_storage_config
 from maasserver.storage_layouts import VMFS6StorageLayout
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 
 
 class AssertStorageConfigMixin:
@@ -2670,3 +2671,71 @@ class TestVMFS(MAASServerTestCase, AssertStorageConfigMixin):
         node._create_acquired_filesystems()
         config = compose_curtin_storage_config(node)
         self.assertStorageConfig(self.STORAGE_CONFIG, config, True)
+
+
+class TestComposeCurtinStorageConfigQueries(MAASServerTestCase):
+    def make_storage(self, node):
+        disk = factory.make_PhysicalBlockDevice(node=node, size=20 * 1024 ** 3)
+        partition_table = factory.make_PartitionTable(
+            table_type=PARTITION_TABLE_TYPE.GPT, block_device=disk
+        )
+        data_partition, lvm_partition, backing_partition = [
+            factory.make_Partition(
+                partition_table=partition_table, size=4 * 1024 ** 3
+            )
+            for _ in range(3)
+        ]
+        factory.make_Filesystem(
+            partition=data_partition,
+            fstype=FILESYSTEM_TYPE.EXT4,
+            mount_point=factory.make_absolute_path(),
+        )
+        volume_group = VolumeGroup.objects.create_volume_group(
+            name=factory.make_name("vg"),
+            block_devices=[],
+            partitions=[lvm_partition],
+        )
+        logical_volume = volume_group.create_logical_volume(
+            name=factory.make_name("lv"), size=2 * 1024 ** 3
+        )
+        factory.make_Filesystem(
+            block_device=logical_volume,
+            fstype=FILESYSTEM_TYPE.EXT4,
+            mount_point=factory.make_absolute_path(),
+        )
+        cache_disk = factory.make_PhysicalBlockDevice(node=node)
+        Bcache.objects.create_bcache(
+            name=factory.make_name("bcache"),
+            backing_partition=backing_partition,
+            cache_set=factory.make_CacheSet(block_device=cache_disk),
+            cache_mode=CACHE_MODE_TYPE.WRITETHROUGH,
+        )
+        raid = RAID.objects.create_raid(
+            level=FILESYSTEM_GROUP_TYPE.RAID_1,
+            name=factory.make_name("md"),
+            block_devices=[
+                factory.make_PhysicalBlockDevice(node=node) for _ in range(2)
+            ],
+        )
+        factory.make_Filesystem(
+            block_device=raid.virtual_device,
+            fstype=FILESYSTEM_TYPE.EXT4,
+            mount_point=factory.make_absolute_path(),
+        )
+
+    def count_compose_queries(self, layouts):
+        node = factory.make_Node(
+            status=NODE_STATUS.ALLOCATED,
+            bios_boot_method="uefi",
+            with_boot_disk=False,
+        )
+        for _ in range(layouts):
+            self.make_storage(node)
+        node._create_acquired_filesystems()
+        count, _ = count_queries(compose_curtin_storage_config, node)
+        return count
+
+    def test_queries_do_not_grow_with_storage(self):
+        self.assertEqual(
+            self.count_compose_queries(1), self.count_compose_queries(3)
+        )
@@ -0,0 +1,266 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Test `maasserver.preseed_topology`."""
+
+
+from maasserver.enum import (
+    FILESYSTEM_GROUP_TYPE,
+    FILESYSTEM_TYPE,
+    INTERFACE_TYPE,
+    IPADDRESS_TYPE,
+    NODE_STATUS,
+    PARTITION_TABLE_TYPE,
+)
+from maasserver.models import Interface
+from maasserver.models.filesystemgroup import RAID
+from maasserver.preseed_topology import (
+    NetworkTopology,
+    NodeTopology,
+    StorageTopology,
+)
+from maasserver.storage_layouts import VMFS6StorageLayout
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
+
+
+class TestNodeTopology(MAASServerTestCase):
+    def test_loads_storage_once(self):
+        node = factory.make_Node()
+        topology = NodeTopology(node)
+        self.assertIsInstance(topology.storage, StorageTopology)
+        count, _ = count_queries(getattr, topology, "storage")
+        self.assertEqual(0, count)
+
+    def test_loads_network_once(self):
+        node = factory.make_Node()
+        topology = NodeTopology(node)
+        self.assertIsInstance(topology.network, NetworkTopology)
+        count, _ = count_queries(getattr, topology, "network")
+        self.assertEqual(0, count)
+
+
+class TestStorageTopology(MAASServerTestCase):
+    def make_partitions(self, node, table_type, count):
+        block_device = factory.make_PhysicalBlockDevice(
+            node=node, size=100 * 1024 ** 3
+        )
+        partition_table = factory.make_PartitionTable(
+            table_type=table_type, block_device=block_device
+        )
+        return [
+            factory.make_Partition(
+                partition_table=partition_table, size=1024 ** 3
+            )
+            for _ in range(count)
+        ]
+
+    def assertPartitionsMatchModels(self, node, partitions):
+        storage = StorageTopology(node)
+        for partition in partitions:
+            partition = reload_object(partition)
+            self.assertEqual(
+                (partition.get_partition_number(), partition.get_name()),
+                (
+                    storage.get_partition_number(partition),
+                    storage.get_name(partition),
+                ),
+            )
+
+    def test_numbers_gpt_partitions_for_bios_boot(self):
+        node = factory.make_Node(
+            architecture="amd64/generic",
+            bios_boot_method="pxe",
+            with_boot_disk=False,
+        )
+        partitions = self.make_partitions(node, PARTITION_TABLE_TYPE.GPT, 3)
+        self.assertPartitionsMatchModels(node, partitions)
+
+    def test_numbers_gpt_partitions_on_ppc64el_boot_disk(self):
+        node = factory.make_Node(
+            architecture="ppc64el/generic",
+            bios_boot_method="uefi",
+            with_boot_disk=False,
+        )
+        partitions = self.make_partitions(node, PARTITION_TABLE_TYPE.GPT, 2)
+        partitions += self.make_partitions(node, PARTITION_TABLE_TYPE.GPT, 2)
+        self.assertPartitionsMatchModels(node, partitions)
+
+    def test_numbers_mbr_logical_partitions(self):
+        node = factory.make_Node(with_boot_disk=False)
+        partitions = self.make_partitions(node, PARTITION_TABLE_TYPE.MBR, 6)
+        self.assertPartitionsMatchModels(node, partitions)
+
+    def test_numbers_vmfs6_partitions(self):
+        node = factory.make_Node(
+            architecture="amd64/generic",
+            bios_boot_method="uefi",
+            with_boot_disk=False,
+        )
+        boot_disk = factory.make_PhysicalBlockDevice(
+            node=node, size=100 * 1024 ** 3
+        )
+        VMFS6StorageLayout(node).configure()
+        storage = StorageTopology(node)
+        self.assertEqual(boot_disk.id, storage.vmfs_block_device.id)
+        self.assertPartitionsMatchModels(
+            node, boot_disk.get_partitiontable().partitions.all()
+        )
+
+    def test_finds_effective_filesystems(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.ALLOCATED, with_boot_disk=False
+        )
+        [partition] = self.make_partitions(node, PARTITION_TABLE_TYPE.GPT, 1)
+        block_device = factory.make_PhysicalBlockDevice(node=node)
+        factory.make_Filesystem(partition=partition, acquired=True)
+        factory.make_Filesystem(
+            block_device=block_device,
+            fstype=FILESYSTEM_TYPE.EXT4,
+            acquired=False,
+        )
+        storage = StorageTopology(node)
+        self.assertEqual(
+            partition.get_effective_filesystem(),
+            storage.get_effective_filesystem(partition),
+        )
+        self.assertIsNone(storage.get_effective_filesystem(block_device))
+
+    def test_finds_parents_of_filesystems(self):
+        node = factory.make_Node(with_boot_disk=False)
+        block_devices = [
+            factory.make_PhysicalBlockDevice(node=node) for _ in range(2)
+        ]
+        raid = RAID.objects.create_raid(
+            level=FILESYSTEM_GROUP_TYPE.RAID_1,
+            name="md0",
+            block_devices=block_devices,
+        )
+        special = factory.make_Filesystem(
+            node=node, fstype=FILESYSTEM_TYPE.RAMFS, mount_point="/tmp"
+        )
+        storage = StorageTopology(node)
+        self.assertItemsEqual(
+            [block_device.id for block_device in block_devices],
+            [
+                storage.get_parent(filesystem).id
+                for filesystem in storage.get_filesystems(raid)
+            ],
+        )
+        self.assertEqual(raid.virtual_device, storage.get_virtual_device(raid))
+        self.assertIs(node, storage.get_parent(special))
+        self.assertEqual([special], storage.special_filesystems)
+
+    def test_loads_in_constant_queries(self):
+        node = factory.make_Node(bios_boot_method="uefi", with_boot_disk=False)
+        for _ in range(3):
+            for partition in self.make_partitions(
+                node, PARTITION_TABLE_TYPE.GPT, 2
+            ):
+                factory.make_Filesystem(partition=partition)
+        count, _ = count_queries(StorageTopology, node)
+        # Three queries for block devices, and one each for partition
+        # tables, partitions and filesystems.
+        self.assertEqual(6, count)
+
+
+class TestNetworkTopology(MAASServerTestCase):
+    def make_interfaces(self, node):
+        eth0 = factory.make_Interface(node=node)
+        eth1 = factory.make_Interface(node=node, enabled=False)
+        bond = factory.make_Interface(
+            INTERFACE_TYPE.BOND, node=node, parents=[eth0, eth1]
+        )
+        vlan = factory.make_Interface(
+            INTERFACE_TYPE.VLAN, parents=[bond], params={"mtu": 9000}
+        )
+        return [eth0, eth1, bond, vlan]
+
+    def assertInterfacesMatchModels(self, node):
+        network = NetworkTopology(node)
+        expected = [
+            (
+                iface.id,
+                iface.get_name(),
+                iface.is_enabled(),
+                iface.get_effective_mtu(),
+            )
+            for iface in Interface.objects.all_interfaces_parents_first(node)
+        ]
+        self.assertEqual(
+            expected,
+            [
+                (
+                    iface.id,
+                    network.get_name(iface),
+                    network.is_enabled(iface),
+                    network.get_effective_mtu(iface),
+                )
+                for iface in network.interfaces
+            ],
+        )
+
+    def test_matches_interface_models(self):
+        node = factory.make_Node()
+        self.make_interfaces(node)
+        self.assertInterfacesMatchModels(node)
+
+    def test_matches_interface_models_on_controller(self):
+        node = factory.make_RackController()
+        self.make_interfaces(node)
+        self.assertInterfacesMatchModels(node)
+
+    def test_get_addresses(self):
+        node = factory.make_Node()
+        iface = factory.make_Interface(node=node)
+        subnet = factory.make_Subnet(vlan=iface.vlan)
+        addresses = [
+            factory.make_StaticIPAddress(
+                alloc_type=IPADDRESS_TYPE.STICKY,
+                interface=iface,
+                subnet=subnet,
+            )
+            for _ in range(2)
+        ]
+        network = NetworkTopology(node)
+        self.assertEqual(addresses, network.get_addresses(iface))
+
+    def test_get_rack_addresses(self):
+        rack = factory.make_RackController()
+        subnet = factory.make_Subnet(allow_dns=True)
+        vlan = subnet.vlan
+        vlan.primary_rack = rack
+        vlan.save()
+        rack_iface = factory.make_Interface(node=rack, vlan=vlan)
+        rack_address = factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            interface=rack_iface,
+            subnet=subnet,
+        )
+        node = factory.make_Node()
+        iface = factory.make_Interface(node=node, vlan=vlan)
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY, interface=iface, subnet=subnet
+        )
+        network = NetworkTopology(node)
+        self.assertEqual(
+            [rack_address.ip], network.get_rack_addresses(vlan.id)
+        )
+
+    def test_loads_in_constant_queries(self):
+        def count_topology_queries(sets):
+            node = factory.make_Node()
+            subnet = factory.make_Subnet()
+            for _ in range(sets):
+                for iface in self.make_interfaces(node):
+                    factory.make_StaticIPAddress(
+                        alloc_type=IPADDRESS_TYPE.STICKY,
+                        interface=iface,
+                        subnet=subnet,
+                    )
+            count, _ = count_queries(NetworkTopology, node)
+            return count
+
+        self.assertEqual(count_topology_queries(1), count_topology_queries(3))
@@ -48,6 +48,8 @@ class TestRackControllerService(
                 starting=None,
                 watching=set(),
                 needsDHCPUpdate=set(),
+                needsDHCPHostsUpdate={},
+                dhcpStates={},
                 ipcWorker=sentinel.ipcWorker,
                 postgresListener=sentinel.listener,
             ),
@@ -209,11 +211,15 @@ class TestRackControllerService(
         service.processId = processId
         service.watching = {rack_id}
         service.needsDHCPUpdate = {rack_id}
+        service.needsDHCPHostsUpdate = {rack_id: {1}}
+        service.dhcpStates = {rack_id: sentinel.state}
         listener.register(f"sys_dhcp_{rack_id}", service.dhcpHandler)
         service.coreHandler("sys_core_%d" % processId, "unwatch_%d" % rack_id)
         self.assertNotIn(f"sys_dhcp_{rack_id}", listener.listeners)
         self.assertEquals(set(), service.watching)
         self.assertEquals(set(), service.needsDHCPUpdate)
+        self.assertEquals({}, service.needsDHCPHostsUpdate)
+        self.assertEquals({}, service.dhcpStates)
 
     def test_coreHandler_unwatch_doesnt_call_unregister(self):
         processId = random.randint(0, 100)
@@ -281,6 +287,18 @@ class TestRackControllerService(
         self.assertEquals(set([rack_id]), service.needsDHCPUpdate)
         self.assertThat(mock_startProcessing, MockCalledOnceWith())
 
+    def test_dhcpHandler_adds_hosts_to_needsDHCPHostsUpdate(self):
+        rack_id = random.randint(0, 100)
+        listener = self.make_listener_without_delay()
+        service = RackControllerService(sentinel.ipcWorker, listener)
+        service.watching = set([rack_id])
+        mock_startProcessing = self.patch(service, "startProcessing")
+        service.dhcpHandler("sys_dhcp_%d" % rack_id, "hosts_1")
+        service.dhcpHandler("sys_dhcp_%d" % rack_id, "hosts_2")
+        self.assertEquals(set(), service.needsDHCPUpdate)
+        self.assertEquals({rack_id: {1, 2}}, service.needsDHCPHostsUpdate)
+        self.assertThat(mock_startProcessing, MockCallsMatch(call(), call()))
+
     def test_dhcpHandler_doesnt_add_to_needsDHCPUpdate(self):
         rack_id = random.randint(0, 100)
         listener = self.make_listener_without_delay()
@@ -389,4 +407,97 @@ class TestRackControllerService(
         )
         mock_configure_dhcp.return_value = succeed(None)
         yield service.processDHCP(rack.id)
-        self.assertThat(mock_configure_dhcp, MockCalledOnceWith(rack))
+        self.assertThat(
+            mock_configure_dhcp,
+            MockCalledOnceWith(rack, service.dhcpStates[rack.id]),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processDHCP_keeps_state_for_rack_controller(self):
+        rack = yield deferToDatabase(
+            transactional(factory.make_RackController)
+        )
+        service = RackControllerService(sentinel.ipcWorker, sentinel.listener)
+        mock_configure_dhcp = self.patch(
+            rack_controller.dhcp, "configure_dhcp"
+        )
+        mock_configure_dhcp.return_value = succeed(None)
+        yield service.processDHCP(rack.id)
+        yield service.processDHCP(rack.id)
+        state = service.dhcpStates[rack.id]
+        self.assertThat(
+            mock_configure_dhcp,
+            MockCallsMatch(call(rack, state), call(rack, state)),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processDHCPHosts_calls_update_dhcp_hosts(self):
+        rack = yield deferToDatabase(
+            transactional(factory.make_RackController)
+        )
+        service = RackControllerService(sentinel.ipcWorker, sentinel.listener)
+        state = service.getDHCPState(rack.id)
+        mock_update_dhcp_hosts = self.patch(
+            rack_controller.dhcp, "update_dhcp_hosts"
+        )
+        mock_update_dhcp_hosts.return_value = succeed(None)
+        yield service.processDHCPHosts(rack.id, {1, 2})
+        self.assertThat(
+            mock_update_dhcp_hosts, MockCalledOnceWith(rack, state, {1, 2})
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_calls_processDHCPHosts_for_rack_controller(self):
+        rack_id = random.randint(0, 100)
+        service = RackControllerService(sentinel.ipcWorker, sentinel.listener)
+        service.watching = set([rack_id])
+        service.needsDHCPHostsUpdate = {rack_id: {1}}
+        service.running = True
+        mock_processDHCP = self.patch(service, "processDHCP")
+        mock_processDHCPHosts = self.patch(service, "processDHCPHosts")
+        service.startProcessing()
+        yield service.processingDone
+        self.assertThat(mock_processDHCP, MockNotCalled())
+        self.assertThat(
+            mock_processDHCPHosts, MockCalledOnceWith(rack_id, {1})
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_prefers_processDHCP_over_processDHCPHosts(self):
+        rack_id = random.randint(0, 100)
+        service = RackControllerService(sentinel.ipcWorker, sentinel.listener)
+        service.watching = set([rack_id])
+        service.needsDHCPUpdate = set([rack_id])
+        service.needsDHCPHostsUpdate = {rack_id: {1}}
+        service.running = True
+        mock_processDHCP = self.patch(service, "processDHCP")
+        mock_processDHCPHosts = self.patch(service, "processDHCPHosts")
+        service.startProcessing()
+        yield service.processingDone
+        self.assertThat(mock_processDHCP, MockCalledOnceWith(rack_id))
+        self.assertThat(mock_processDHCPHosts, MockNotCalled())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_calls_processDHCPHosts_again_on_failure(self):
+        rack_id = random.randint(0, 100)
+        service = RackControllerService(sentinel.ipcWorker, sentinel.listener)
+        service.watching = set([rack_id])
+        service.needsDHCPHostsUpdate = {rack_id: {1}}
+        service.running = True
+        mock_processDHCPHosts = self.patch(service, "processDHCPHosts")
+        mock_processDHCPHosts.side_effect = [
+            fail(factory.make_exception()),
+            succeed(None),
+        ]
+        service.startProcessing()
+        for _ in range(2):
+            yield service.processingDone
+        self.assertThat(
+            mock_processDHCPHosts,
+            MockCallsMatch(call(rack_id, {1}), call(rack_id, {1})),
+        )
@@ -6,12 +6,14 @@ from unittest import mock
 from django.db import transaction
 from macaroonbakery.bakery import PrivateKey
 from macaroonbakery.httpbakery.agent import Agent, AuthInfo
+import prometheus_client
 import requests
 
 from maasserver.models import Config, ResourcePool
 from maasserver.rbac import (
     ALL_RESOURCES,
     FakeRBACClient,
+    PermissionCache,
     rbac,
     RBACClient,
     RBACUserClient,
@@ -26,6 +28,9 @@ from maasserver.testing.testcase import (
 )
 from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnceWith, MockCallsMatch
+from maastesting.testcase import MAASTestCase
+from provisioningserver.prometheus.metrics import METRICS_DEFINITIONS
+from provisioningserver.prometheus.utils import create_metrics
 
 
 class TestRBACClient(MAASServerTestCase):
@@ -335,11 +340,48 @@ class TestRBACWrapperGetResourcePools(MAASServerTestCase):
         self.store.allow("user", new_pool, "view")
         pools_two = self.rbac.get_resource_pool_ids("user", "view")["view"]
         self.rbac.clear_cache()
+        self.rbac.clear_shared_cache()
         pools_three = self.rbac.get_resource_pool_ids("user", "view")["view"]
         self.assertItemsEqual([self.default_pool.id], pools_one)
         self.assertItemsEqual([self.default_pool.id], pools_two)
         self.assertItemsEqual([self.default_pool.id, new_pool.id], pools_three)
 
+    def test_get_resource_pool_ids_shares_results_across_requests(self):
+        allowed_for_user = self.patch(self.client, "allowed_for_user")
+        allowed_for_user.return_value = {"view": [self.default_pool.id]}
+        pools_one = self.rbac.get_resource_pool_ids("user", "view")["view"]
+        self.rbac.clear_cache()
+        pools_two = self.rbac.get_resource_pool_ids("user", "view")["view"]
+        self.assertItemsEqual([self.default_pool.id], pools_one)
+        self.assertItemsEqual([self.default_pool.id], pools_two)
+        self.assertThat(
+            allowed_for_user,
+            MockCalledOnceWith("resource-pool", "user", "view"),
+        )
+
+    def test_get_resource_pool_ids_fetches_only_uncached_permissions(self):
+        self.store.allow("user", self.default_pool, "view")
+        self.store.allow("user", self.default_pool, "edit")
+        self.rbac.get_resource_pool_ids("user", "view")
+        self.rbac.clear_cache()
+        allowed_for_user = self.patch(self.client, "allowed_for_user")
+        allowed_for_user.return_value = {"edit": [self.default_pool.id]}
+        self.assertEqual(
+            {"view": [self.default_pool.id], "edit": [self.default_pool.id]},
+            self.rbac.get_resource_pool_ids("user", "view", "edit"),
+        )
+        self.assertThat(
+            allowed_for_user,
+            MockCalledOnceWith("resource-pool", "user", "edit"),
+        )
+
+    def test_mark_changed_clears_shared_cache(self):
+        self.store.allow("user", self.default_pool, "view")
+        self.rbac.get_resource_pool_ids("user", "view")
+        self.assertEqual(1, len(self.rbac.shared_cache))
+        self.rbac.mark_changed("sys_rbac", "")
+        self.assertEqual(0, len(self.rbac.shared_cache))
+
     def test_get_resource_pool_ids_ALL_RESOURCES_always_returns_all(self):
         self.store.allow("user", ALL_RESOURCES, "view")
         pools_one = self.rbac.get_resource_pool_ids("user", "view")["view"]
@@ -398,6 +440,21 @@ class TestRBACWrapperClient(MAASServerTestCase):
         Config.objects.set_config("rbac_url", "http://rbac-other.example.com")
         self.assertIsNot(rbac1, rbac.client)
 
+    def test_clear_new_url_clears_shared_cache(self):
+        rbac.client
+        rbac.shared_cache.set("resource-pool", "user", "view", [1])
+        rbac.clear()
+        Config.objects.set_config("rbac_url", "http://rbac-other.example.com")
+        rbac.client
+        self.assertEqual(0, len(rbac.shared_cache))
+
+    def test_clear_same_url_keeps_shared_cache(self):
+        rbac.client
+        rbac.shared_cache.set("resource-pool", "user", "view", [1])
+        rbac.clear()
+        rbac.client
+        self.assertEqual(1, len(rbac.shared_cache))
+
     def test_clear_new_auth_url_creates_new_client(self):
         rbac1 = rbac.client
         rbac.clear()
@@ -416,6 +473,107 @@ class TestRBACWrapperNoClient(MAASServerTestCase):
         self.assertEqual((1, 0), (first, second))
 
 
+class TestPermissionCache(MAASTestCase):
+    """Tests for `PermissionCache`."""
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        self.prometheus_metrics = create_metrics(
+            METRICS_DEFINITIONS, registry=prometheus_client.CollectorRegistry()
+        )
+
+    def make_cache(self, **kwargs):
+        return PermissionCache(
+            clock=lambda: self.now,
+            prometheus_metrics=self.prometheus_metrics,
+            **kwargs
+        )
+
+    def test_get_returns_None_if_not_cached(self):
+        cache = self.make_cache()
+        self.assertIsNone(cache.get("resource-pool", "user", "view"))
+
+    def test_get_returns_cached_identifiers(self):
+        cache = self.make_cache()
+        cache.set("resource-pool", "user", "view", [1, 2])
+        cache.set("resource-pool", "other", "edit", ALL_RESOURCES)
+        self.assertEqual([1, 2], cache.get("resource-pool", "user", "view"))
+        self.assertIs(
+            ALL_RESOURCES, cache.get("resource-pool", "other", "edit")
+        )
+        self.assertIsNone(cache.get("resource-pool", "user", "edit"))
+
+    def test_expires_allowed_after_ttl(self):
+        cache = self.make_cache(ttl=30, negative_ttl=10)
+        cache.set("resource-pool", "user", "view", [1])
+        self.now += 29
+        self.assertEqual([1], cache.get("resource-pool", "user", "view"))
+        self.now += 1
+        self.assertIsNone(cache.get("resource-pool", "user", "view"))
+        self.assertEqual(0, len(cache))
+
+    def test_expires_denied_after_negative_ttl(self):
+        cache = self.make_cache(ttl=30, negative_ttl=10)
+        cache.set("resource-pool", "user", "view", [])
+        self.now += 9
+        self.assertEqual([], cache.get("resource-pool", "user", "view"))
+        self.now += 1
+        self.assertIsNone(cache.get("resource-pool", "user", "view"))
+
+    def test_evicts_least_recently_used(self):
+        cache = self.make_cache(size=2)
+        cache.set("resource-pool", "user1", "view", [1])
+        cache.set("resource-pool", "user2", "view", [2])
+        cache.get("resource-pool", "user1", "view")
+        cache.set("resource-pool", "user3", "view", [3])
+        self.assertEqual([1], cache.get("resource-pool", "user1", "view"))
+        self.assertIsNone(cache.get("resource-pool", "user2", "view"))
+        self.assertEqual([3], cache.get("resource-pool", "user3", "view"))
+
+    def test_denials_do_not_evict_allowed(self):
+        cache = self.make_cache(size=2)
+        cache.set("resource-pool", "user", "view", [1])
+        for index in range(5):
+            cache.set("resource-pool", "user%d" % index, "view", [])
+        self.assertEqual([1], cache.get("resource-pool", "user", "view"))
+        self.assertEqual(3, len(cache))
+
+    def test_set_replaces_result_of_other_kind(self):
+        cache = self.make_cache()
+        cache.set("resource-pool", "user", "view", [1])
+        cache.set("resource-pool", "user", "view", [])
+        self.assertEqual([], cache.get("resource-pool", "user", "view"))
+        self.assertEqual(1, len(cache))
+
+    def test_clear(self):
+        cache = self.make_cache()
+        cache.set("resource-pool", "user", "view", [1])
+        cache.set("resource-pool", "user", "edit", [])
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    def test_records_hits_and_misses(self):
+        cache = self.make_cache()
+        cache.set("resource-pool", "user", "view", [1])
+        cache.set("resource-pool", "user", "edit", [])
+        cache.get("resource-pool", "user", "view")
+        cache.get("resource-pool", "user", "view")
+        cache.get("resource-pool", "user", "edit")
+        metrics = self.prometheus_metrics.generate_latest().decode("ascii")
+        for labels, count in (
+            ('result="miss",access="allowed"', 1),
+            ('result="miss",access="denied"', 1),
+            ('result="hit",access="allowed"', 2),
+            ('result="hit",access="denied"', 1),
+        ):
+            self.assertIn(
+                "maas_rbac_permission_cache_lookups_total{%s} %d.0"
+                % (labels, count),
+                metrics,
+            )
+
+
 class TestRBACWrapperClientThreads(MAASTransactionServerTestCase):
     def test_different_clients_per_threads(self):
 
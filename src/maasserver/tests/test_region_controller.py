@@ -6,14 +6,16 @@
 
 from operator import attrgetter
 import random
-from unittest.mock import ANY, call, MagicMock, sentinel
+from unittest.mock import ANY, call, MagicMock, Mock, sentinel
 
 from crochet import wait_for
 from testtools import ExpectedException
 from testtools.matchers import MatchesStructure
 from twisted.internet import reactor
 from twisted.internet.defer import fail, inlineCallbacks, succeed
+from twisted.internet.task import Clock
 from twisted.names.dns import A, Record_SOA, RRHeader, SOA
+from twisted.python.failure import Failure
 
 from maasserver import region_controller
 from maasserver.models.config import Config
@@ -117,6 +119,118 @@ class TestRegionControllerService(MAASServerTestCase):
         self.assertTrue(service.needsDNSUpdate)
         self.assertThat(mock_startProcessing, MockCalledOnceWith())
 
+    def test_markDNSForUpdate_records_first_and_last_change(self):
+        clock = Clock()
+        service = RegionControllerService(sentinel.listener, clock=clock)
+        self.patch(service, "startProcessing")
+        clock.advance(10)
+        service.markDNSForUpdate(None, None)
+        clock.advance(1)
+        service.markDNSForUpdate(None, None)
+        self.assertEqual(10, service.dnsFirstChanged)
+        self.assertEqual(11, service.dnsLastChanged)
+
+    def make_held_back_service(self, interval=2, max_delay=5):
+        clock = Clock()
+        service = RegionControllerService(
+            sentinel.listener,
+            clock=clock,
+            dnsReloadInterval=interval,
+            dnsReloadMaxDelay=max_delay,
+        )
+        self.patch(service, "startProcessing")
+        clock.advance(100)
+        service.dnsLastReloaded = clock.seconds()
+        return service, clock
+
+    def test_isDNSReloadDue_when_never_reloaded(self):
+        service, clock = self.make_held_back_service()
+        service.dnsLastReloaded = None
+        service.markDNSForUpdate(None, None)
+        self.assertTrue(service._isDNSReloadDue())
+
+    def test_isDNSReloadDue_not_within_interval_of_last_reload(self):
+        service, clock = self.make_held_back_service()
+        service.needsDNSUpdate = True
+        clock.advance(1.9)
+        self.assertFalse(service._isDNSReloadDue())
+        clock.advance(0.1)
+        self.assertTrue(service._isDNSReloadDue())
+
+    def test_isDNSReloadDue_waits_for_changes_to_stop(self):
+        service, clock = self.make_held_back_service()
+        clock.advance(10)
+        service.markDNSForUpdate(None, None)
+        clock.advance(1)
+        service.markDNSForUpdate(None, None)
+        clock.advance(1.9)
+        self.assertFalse(service._isDNSReloadDue())
+        clock.advance(0.1)
+        self.assertTrue(service._isDNSReloadDue())
+
+    def test_isDNSReloadDue_after_max_delay_while_changes_arrive(self):
+        service, clock = self.make_held_back_service()
+        clock.advance(10)
+        for _ in range(5):
+            service.markDNSForUpdate(None, None)
+            self.assertFalse(service._isDNSReloadDue())
+            clock.advance(1)
+        self.assertTrue(service._isDNSReloadDue())
+
+    def test_process_holds_back_dns_reload_until_due(self):
+        clock = Clock()
+        service = RegionControllerService(
+            sentinel.listener, clock=clock, dnsReloadInterval=2
+        )
+        service.dnsLastReloaded = clock.seconds()
+        mock_deferToDatabase = self.patch(region_controller, "deferToDatabase")
+        mock_deferToDatabase.return_value = succeed(None)
+        service.markDNSForUpdate(None, None)
+        clock.advance(1)
+        self.assertThat(mock_deferToDatabase, MockNotCalled())
+        self.assertTrue(service.processing.running)
+        clock.advance(1)
+        self.assertThat(mock_deferToDatabase, MockCalledOnceWith(ANY))
+        self.assertFalse(service.needsDNSUpdate)
+        self.assertIsNone(service.dnsFirstChanged)
+        self.assertIsNone(service.dnsLastChanged)
+        clock.advance(0.1)
+        self.assertFalse(service.processing.running)
+
+    def test_recordDNSReload_counts_successful_reload(self):
+        clock = Clock()
+        prometheus_metrics = Mock()
+        service = RegionControllerService(
+            sentinel.listener,
+            clock=clock,
+            prometheus_metrics=prometheus_metrics,
+        )
+        clock.advance(10)
+        self.assertIs(
+            sentinel.result, service._recordDNSReload(sentinel.result)
+        )
+        self.assertEqual(10, service.dnsLastReloaded)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_dns_reloads", "inc", labels={"result": "success"}
+            ),
+        )
+
+    def test_recordDNSReload_counts_failed_reload(self):
+        prometheus_metrics = Mock()
+        service = RegionControllerService(
+            sentinel.listener, prometheus_metrics=prometheus_metrics
+        )
+        failure = Failure(factory.make_exception())
+        self.assertIs(failure, service._recordDNSReload(failure))
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_dns_reloads", "inc", labels={"result": "failure"}
+            ),
+        )
+
     def test_markProxyForUpdate_sets_needsProxyUpdate_and_starts_process(self):
         listener = MagicMock()
         service = self.make_service(listener)
@@ -658,6 +772,48 @@ class TestRegionControllerServiceTransactional(MAASTransactionServerTestCase):
         self.assertThat(mock_check_serial, MockCalledOnceWith(dns_result))
         self.assertThat(mock_msg, MockCalledOnceWith(expected_msg))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_updates_zones_records_publication_latency(self):
+        def _create_publications():
+            return [
+                DNSPublication.objects.create(
+                    source=factory.make_name("reason")
+                )
+                for _ in range(3)
+            ]
+
+        publications = yield deferToDatabase(_create_publications)
+        prometheus_metrics = Mock()
+        service = RegionControllerService(
+            sentinel.listener, prometheus_metrics=prometheus_metrics
+        )
+        service.needsDNSUpdate = True
+        service.previousSerial = publications[0].serial
+        dns_result = (
+            publications[-1].serial,
+            True,
+            [factory.make_name("domain") for _ in range(3)],
+        )
+        self.patch(
+            region_controller, "dns_update_all_zones"
+        ).return_value = dns_result
+        self.patch(service, "_checkSerial").return_value = succeed(dns_result)
+        self.patch(region_controller.log, "msg")
+        service.startProcessing()
+        yield service.processingDefer
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCallsMatch(
+                call("maas_dns_reloads", "inc", labels={"result": "success"}),
+                call("maas_dns_publication_latency", "observe", value=ANY),
+                call("maas_dns_publication_latency", "observe", value=ANY),
+                call("maas_dns_reload_publications", "observe", value=2),
+            ),
+        )
+        for _, _, kwargs in prometheus_metrics.update.mock_calls[1:3]:
+            self.assertGreaterEqual(kwargs["value"], 0)
+
     def test_rbacSync_returns_None_when_nothing_to_do(self):
         RBACSync.objects.clear("resource-pool")
 
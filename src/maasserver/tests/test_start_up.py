@@ -114,6 +114,26 @@ class TestInnerStartUp(MAASServerTestCase):
             start_up.inner_start_up(master=True)
         self.assertThat(start_up.load_builtin_scripts, MockCalledOnceWith())
 
+    def test_records_startup_phases(self):
+        self.patch_autospec(start_up, "load_builtin_scripts")
+        startup_phase = self.patch(start_up, "startup_phase")
+        with post_commit_hooks:
+            start_up.inner_start_up(master=True)
+        self.assertThat(
+            startup_phase,
+            MockCallsMatch(
+                call("builtin-scripts"),
+                call().__enter__(),
+                call().__exit__(None, None, None),
+                call("region-controller"),
+                call().__enter__(),
+                call().__exit__(None, None, None),
+                call("deprecations"),
+                call().__enter__(),
+                call().__exit__(None, None, None),
+            ),
+        )
+
     def test_does_not_call_load_builtin_scripts_if_not_master(self):
         self.patch_autospec(start_up, "load_builtin_scripts")
         with post_commit_hooks:
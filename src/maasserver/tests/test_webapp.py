@@ -16,6 +16,8 @@ from twisted.web.server import Site
 from twisted.web.test.requesthelper import DummyChannel, DummyRequest
 
 from maasserver import eventloop, webapp
+from maasserver.middleware import external_auth_info_cache
+from maasserver.rbac import rbac
 from maasserver.testing.listener import FakePostgresListenerService
 from maasserver.webapp import DocsFallbackFile, OverlaySite
 from maasserver.websockets.protocol import WebSocketFactory
@@ -253,6 +255,40 @@ class TestWebApplicationService(MAASTestCase):
         self.assertFalse(service.running)
         self.assertFalse(service.starting)
 
+    def test_start_and_stop_registers_for_rbac_changes(self):
+        service = self.make_webapp()
+        service.privilegedStartService()
+        service.startService()
+        self.assertIn(
+            rbac.mark_changed, service.listener.listeners["sys_rbac"]
+        )
+        service.stopService()
+        self.assertNotIn(
+            rbac.mark_changed, service.listener.listeners["sys_rbac"]
+        )
+
+    def test_start_and_stop_registers_for_config_changes(self):
+        service = self.make_webapp()
+        service.privilegedStartService()
+        service.startService()
+        self.assertIn(
+            external_auth_info_cache.clear,
+            service.listener.listeners["config"],
+        )
+        self.assertIn(
+            external_auth_info_cache.clear,
+            service.listener.events.connected.handlers,
+        )
+        service.stopService()
+        self.assertNotIn(
+            external_auth_info_cache.clear,
+            service.listener.listeners["config"],
+        )
+        self.assertNotIn(
+            external_auth_info_cache.clear,
+            service.listener.events.connected.handlers,
+        )
+
     def test_successful_start_installs_wsgi_resource(self):
         service = self.make_webapp()
         self.addCleanup(service.stopService)
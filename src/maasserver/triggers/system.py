@@ -396,18 +396,22 @@ DHCP_VLAN_UPDATE = dedent(
     """
 )
 
-# Helper that alerts the primary and secondary rack controller for a VLAN.
-DHCP_ALERT = dedent(
+# Helper that notifies the primary and secondary rack controller for a VLAN
+# with a message. The rack controllers of the VLAN that relays to the VLAN
+# are notified too.
+DHCP_NOTIFY = dedent(
     """\
-    CREATE OR REPLACE FUNCTION sys_dhcp_alert(vlan maasserver_vlan)
+    CREATE OR REPLACE FUNCTION sys_dhcp_notify(
+      vlan maasserver_vlan, message text)
     RETURNS void AS $$
     DECLARE
       relay_vlan maasserver_vlan;
     BEGIN
       IF vlan.dhcp_on THEN
-        PERFORM pg_notify(CONCAT('sys_dhcp_', vlan.primary_rack_id), '');
+        PERFORM pg_notify(CONCAT('sys_dhcp_', vlan.primary_rack_id), message);
         IF vlan.secondary_rack_id IS NOT NULL THEN
-          PERFORM pg_notify(CONCAT('sys_dhcp_', vlan.secondary_rack_id), '');
+          PERFORM pg_notify(
+            CONCAT('sys_dhcp_', vlan.secondary_rack_id), message);
         END IF;
       END IF;
       IF vlan.relay_vlan_id IS NOT NULL THEN
@@ -416,10 +420,10 @@ DHCP_ALERT = dedent(
         WHERE maasserver_vlan.id = vlan.relay_vlan_id;
         IF relay_vlan.dhcp_on THEN
           PERFORM pg_notify(CONCAT(
-            'sys_dhcp_', relay_vlan.primary_rack_id), '');
+            'sys_dhcp_', relay_vlan.primary_rack_id), message);
           IF relay_vlan.secondary_rack_id IS NOT NULL THEN
             PERFORM pg_notify(CONCAT(
-              'sys_dhcp_', relay_vlan.secondary_rack_id), '');
+              'sys_dhcp_', relay_vlan.secondary_rack_id), message);
           END IF;
         END IF;
       END IF;
@@ -429,6 +433,34 @@ DHCP_ALERT = dedent(
     """
 )
 
+# Helper that alerts the primary and secondary rack controller for a VLAN
+# that the DHCP configuration must be rebuilt in full.
+DHCP_ALERT = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_dhcp_alert(vlan maasserver_vlan)
+    RETURNS void AS $$
+    BEGIN
+      PERFORM sys_dhcp_notify(vlan, '');
+      RETURN;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+# Helper that alerts the primary and secondary rack controller for a VLAN
+# that only the host maps on the VLAN changed.
+DHCP_ALERT_HOSTS = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_dhcp_alert_hosts(vlan maasserver_vlan)
+    RETURNS void AS $$
+    BEGIN
+      PERFORM sys_dhcp_notify(vlan, CONCAT('hosts_', vlan.id));
+      RETURN;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
 # Triggered when a subnet's VLAN, CIDR, gateway IP, or DNS servers change.
 # If the VLAN was changed it alerts both the rack controllers of the old VLAN
 # and then the rack controllers of the new VLAN. Any other field that is
@@ -573,7 +605,7 @@ DHCP_STATICIPADDRESS_INSERT = dedent(
         FROM maasserver_vlan, maasserver_subnet
         WHERE maasserver_subnet.id = NEW.subnet_id AND
           maasserver_subnet.vlan_id = maasserver_vlan.id;
-        PERFORM sys_dhcp_alert(vlan);
+        PERFORM sys_dhcp_alert_hosts(vlan);
       END IF;
       RETURN NEW;
     END;
@@ -606,11 +638,11 @@ DHCP_STATICIPADDRESS_UPDATE = dedent(
             maasserver_subnet.vlan_id = maasserver_vlan.id;
           IF old_vlan.id != new_vlan.id THEN
             -- Different VLAN's; update each if DHCP enabled.
-            PERFORM sys_dhcp_alert(old_vlan);
-            PERFORM sys_dhcp_alert(new_vlan);
+            PERFORM sys_dhcp_alert_hosts(old_vlan);
+            PERFORM sys_dhcp_alert_hosts(new_vlan);
           ELSE
             -- Same VLAN so only need to update once.
-            PERFORM sys_dhcp_alert(new_vlan);
+            PERFORM sys_dhcp_alert_hosts(new_vlan);
           END IF;
         ELSIF (OLD.ip IS NULL AND NEW.ip IS NOT NULL) OR
           (OLD.ip IS NOT NULL and NEW.ip IS NULL) OR
@@ -622,7 +654,7 @@ DHCP_STATICIPADDRESS_UPDATE = dedent(
           FROM maasserver_vlan, maasserver_subnet
           WHERE maasserver_subnet.id = NEW.subnet_id AND
             maasserver_subnet.vlan_id = maasserver_vlan.id;
-          PERFORM sys_dhcp_alert(new_vlan);
+          PERFORM sys_dhcp_alert_hosts(new_vlan);
         END IF;
       END IF;
       RETURN NEW;
@@ -646,7 +678,7 @@ DHCP_STATICIPADDRESS_DELETE = dedent(
         FROM maasserver_vlan, maasserver_subnet
         WHERE maasserver_subnet.id = OLD.subnet_id AND
           maasserver_subnet.vlan_id = maasserver_vlan.id;
-        PERFORM sys_dhcp_alert(vlan);
+        PERFORM sys_dhcp_alert_hosts(vlan);
       END IF;
       RETURN NEW;
     END;
@@ -684,7 +716,7 @@ DHCP_INTERFACE_UPDATE = dedent(
           AND host(maasserver_staticipaddress.ip) != ''
           AND maasserver_vlan.id = maasserver_subnet.vlan_id)
         LOOP
-          PERFORM sys_dhcp_alert(vlan);
+          PERFORM sys_dhcp_alert_hosts(vlan);
         END LOOP;
       END IF;
       RETURN NEW;
@@ -724,7 +756,7 @@ DHCP_NODE_UPDATE = dedent(
           AND host(maasserver_staticipaddress.ip) != ''
           AND maasserver_vlan.id = maasserver_subnet.vlan_id)
         LOOP
-          PERFORM sys_dhcp_alert(vlan);
+          PERFORM sys_dhcp_alert_hosts(vlan);
         END LOOP;
       END IF;
       RETURN NEW;
@@ -1960,7 +1992,9 @@ def register_system_triggers():
     )
 
     # DHCP
+    register_procedure(DHCP_NOTIFY)
     register_procedure(DHCP_ALERT)
+    register_procedure(DHCP_ALERT_HOSTS)
 
     # - VLAN
     register_procedure(DHCP_VLAN_UPDATE)
@@ -2200,6 +2200,37 @@ class TestDHCPStaticIPAddressListener(
 ):
     """End-to-end test for the DHCP triggers code."""
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_hosts_message_for_staticipaddress_vlan(self):
+        yield deferToDatabase(register_system_triggers)
+        primary_rack = yield deferToDatabase(self.create_rack_controller)
+        vlan = yield deferToDatabase(
+            self.create_vlan, {"dhcp_on": True, "primary_rack": primary_rack}
+        )
+        subnet = yield deferToDatabase(self.create_subnet, {"vlan": vlan})
+        user = yield deferToDatabase(self.create_user)
+
+        listener = self.make_listener_without_delay()
+        primary_dv = DeferredValue()
+        listener.register(
+            "sys_dhcp_%s" % primary_rack.id, lambda *args: primary_dv.set(args)
+        )
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.create_staticipaddress,
+                params={
+                    "subnet": subnet,
+                    "alloc_type": IPADDRESS_TYPE.USER_RESERVED,
+                    "user": user,
+                },
+            )
+            _, message = yield primary_dv.get(timeout=2)
+            self.assertEqual("hosts_%d" % vlan.id, message)
+        finally:
+            yield listener.stopService()
+
     @wait_for_reactor
     @inlineCallbacks
     def test_sends_message_for_new_staticipaddress(self):
@@ -115,6 +115,14 @@ class DatabaseTasksService(Service, object):
         self.queue.put(task)
         return done
 
+    def sampleMetrics(self, prometheus_metrics):
+        """Export the number of tasks waiting to run."""
+        prometheus_metrics.update(
+            "maas_database_tasks_queue_depth",
+            "set",
+            value=len(self.queue.pending),
+        )
+
     @asynchronous(timeout=FOREVER)
     def startService(self):
         """Open the queue and start processing database tasks.
@@ -0,0 +1,63 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Timing of the phases of a region controller process's start-up."""
+
+__all__ = [
+    "record_startup_phase",
+    "startup_phase",
+    "time_startup_phase",
+]
+
+from contextlib import contextmanager
+import time
+
+from twisted.internet.defer import maybeDeferred
+
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
+
+log = LegacyLogger()
+
+
+def record_startup_phase(
+    phase, duration, prometheus_metrics=PROMETHEUS_METRICS
+):
+    """Log and export the time a start-up phase took.
+
+    :param phase: The name of the phase.
+    :param duration: The time the phase took, in seconds.
+    """
+    log.msg("Start-up phase '%s' took %.3f seconds." % (phase, duration))
+    prometheus_metrics.update(
+        "maas_region_startup_phase_duration",
+        "set",
+        value=duration,
+        labels={"phase": phase},
+    )
+
+
+@contextmanager
+def startup_phase(phase):
+    """Record the time the code in this context takes as `phase`."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record_startup_phase(phase, time.monotonic() - start)
+
+
+def time_startup_phase(phase, func, *args, **kwargs):
+    """Call `func` and record the time it takes as `phase`.
+
+    If `func` returns a `Deferred` the phase ends when it fires.
+
+    :return: A `Deferred` with the result of `func`.
+    """
+    start = time.monotonic()
+
+    def record(result):
+        record_startup_phase(phase, time.monotonic() - start)
+        return result
+
+    return maybeDeferred(func, *args, **kwargs).addBoth(record)
@@ -24,8 +24,19 @@ def get_effective_filesystem(model):
 
     assert isinstance(model, (BlockDevice, Partition))
 
-    node = model.get_node()
-    filesystems = list(model.filesystem_set.all())
+    return select_effective_filesystem(
+        model.get_node(), model.filesystem_set.all()
+    )
+
+
+def select_effective_filesystem(node, filesystems):
+    """Return the effective `Filesystem` out of `filesystems`.
+
+    :param node: The `Node` that the filesystems belong to.
+    :param filesystems: The filesystems on a single `BlockDevice` or
+        `Partition`.
+    """
+    filesystems = list(filesystems)
     if node.is_in_allocated_state():
         # Return the acquired filesystem.
         for filesystem in filesystems:
@@ -6,7 +6,7 @@
 
 import random
 import threading
-from unittest.mock import sentinel
+from unittest.mock import Mock, sentinel
 
 from crochet import wait_for
 from testtools.matchers import (
@@ -34,6 +34,7 @@ from maasserver.utils.dbtasks import (
 )
 from maasserver.utils.orm import transactional
 from maastesting.factory import factory
+from maastesting.matchers import MockCalledOnceWith
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
 
@@ -194,6 +195,18 @@ class TestDatabaseTaskService(MAASTestCase):
 
         self.assertThat(things, Equals([]))
 
+    def test_sampleMetrics_exports_queue_depth(self):
+        service = DatabaseTasksService()
+        service.queue.pending.extend([sentinel.task1, sentinel.task2])
+        prometheus_metrics = Mock()
+        service.sampleMetrics(prometheus_metrics)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_database_tasks_queue_depth", "set", value=2
+            ),
+        )
+
     def test_sync_task_fires_with_service(self):
         service = DatabaseTasksService()
         service.startService()
@@ -0,0 +1,77 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.utils.startup`."""
+
+
+from unittest.mock import ANY, Mock, sentinel
+
+from twisted.internet.defer import Deferred
+
+from maasserver.utils import startup
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.testcase import MAASTestCase
+from maastesting.twisted import extract_result, TwistedLoggerFixture
+
+
+class TestRecordStartupPhase(MAASTestCase):
+    def test_logs_and_exports_duration(self):
+        prometheus_metrics = Mock()
+        with TwistedLoggerFixture() as logger:
+            startup.record_startup_phase(
+                "sodor", 1.5, prometheus_metrics=prometheus_metrics
+            )
+        self.assertEqual(
+            "Start-up phase 'sodor' took 1.500 seconds.", logger.output
+        )
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_region_startup_phase_duration",
+                "set",
+                value=1.5,
+                labels={"phase": "sodor"},
+            ),
+        )
+
+
+class TestStartupPhase(MAASTestCase):
+    def test_records_time_taken(self):
+        record = self.patch(startup, "record_startup_phase")
+        with startup.startup_phase("sodor"):
+            self.assertThat(record, MockNotCalled())
+        self.assertThat(record, MockCalledOnceWith("sodor", ANY))
+        [_, duration], _ = record.call_args
+        self.assertGreaterEqual(duration, 0)
+
+    def test_records_time_taken_on_error(self):
+        record = self.patch(startup, "record_startup_phase")
+        with self.assertRaisesRegex(ZeroDivisionError, "boom"):
+            with startup.startup_phase("sodor"):
+                raise ZeroDivisionError("boom")
+        self.assertThat(record, MockCalledOnceWith("sodor", ANY))
+
+
+class TestTimeStartupPhase(MAASTestCase):
+    def test_records_time_when_deferred_fires(self):
+        record = self.patch(startup, "record_startup_phase")
+        d = Deferred()
+        func = Mock(return_value=d)
+        result = startup.time_startup_phase("sodor", func, sentinel.arg)
+        self.assertThat(func, MockCalledOnceWith(sentinel.arg))
+        self.assertThat(record, MockNotCalled())
+        d.callback(sentinel.result)
+        self.assertThat(record, MockCalledOnceWith("sodor", ANY))
+        self.assertIs(sentinel.result, extract_result(result))
+
+    def test_records_time_of_synchronous_call(self):
+        record = self.patch(startup, "record_startup_phase")
+        result = startup.time_startup_phase("sodor", lambda: sentinel.result)
+        self.assertThat(record, MockCalledOnceWith("sodor", ANY))
+        self.assertIs(sentinel.result, extract_result(result))
+
+    def test_records_time_and_passes_failure_on(self):
+        record = self.patch(startup, "record_startup_phase")
+        result = startup.time_startup_phase("sodor", lambda: 1 / 0)
+        self.assertThat(record, MockCalledOnceWith("sodor", ANY))
+        self.assertRaises(ZeroDivisionError, extract_result, result)
@@ -5,7 +5,7 @@
 
 
 import random
-from unittest.mock import sentinel
+from unittest.mock import call, Mock, sentinel
 
 from crochet import wait_for
 from django.db import connection
@@ -15,8 +15,13 @@ from twisted.internet.defer import DeferredSemaphore, inlineCallbacks
 
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils import orm, threads
+from maastesting.matchers import MockCallsMatch, MockNotCalled
 from maastesting.testcase import MAASTestCase
-from provisioningserver.utils.twisted import ThreadPool, ThreadUnpool
+from provisioningserver.utils.twisted import (
+    PrioritisedThreadPool,
+    ThreadPool,
+    ThreadUnpool,
+)
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
 
@@ -33,6 +38,11 @@ class TestMakeFunctions(MAASTestCase):
         self.assertThat(pool.max, Equals(threads.max_threads_for_default_pool))
         self.assertThat(pool.min, Equals(0))
 
+    def test_make_default_pool_observes_wait(self):
+        pool = threads.make_default_pool()
+        self.assertIs(threads._observe_thread_pool_wait, pool.observe)
+        self.assertEqual("default", pool.name)
+
     def test_make_default_pool_accepts_max_threads_setting(self):
         maxthreads = random.randint(1, 1000)
         pool = threads.make_default_pool(maxthreads)
@@ -41,18 +51,40 @@ class TestMakeFunctions(MAASTestCase):
 
     def test_make_database_pool_creates_connected_pool(self):
         pool = threads.make_database_pool()
-        self.assertThat(pool, IsInstance(ThreadPool))
-        self.assertThat(pool.context.contextFactory, Is(orm.FullyConnected))
+        self.assertThat(pool, IsInstance(PrioritisedThreadPool))
+        self.assertThat(pool.pool, IsInstance(ThreadPool))
         self.assertThat(
-            pool.max, Equals(threads.max_threads_for_database_pool)
+            pool.pool.context.contextFactory, Is(orm.FullyConnected)
         )
-        self.assertThat(pool.min, Equals(0))
+        self.assertThat(
+            pool.maximum, Equals(threads.max_threads_for_database_pool)
+        )
+        self.assertThat(pool.pool.min, Equals(0))
+
+    def test_make_database_pool_prioritises_work(self):
+        pool = threads.make_database_pool()
+        self.assertEqual(
+            [
+                threads.DATABASE_PRIORITY.RPC,
+                threads.DATABASE_PRIORITY.API,
+                threads.DATABASE_PRIORITY.WEBSOCKET,
+                threads.DATABASE_PRIORITY.BACKGROUND,
+            ],
+            list(pool.priorities),
+        )
+        self.assertEqual(threads.DATABASE_PRIORITY.BACKGROUND, pool.default)
+        # The pool starts with only the reserved slots.
+        self.assertEqual(
+            sum(reserved for _, reserved in threads.database_pool_priorities),
+            pool.limit,
+        )
+        self.assertEqual(pool.limit, pool.pool.max)
 
     def test_make_database_pool_accepts_max_threads_setting(self):
-        maxthreads = random.randint(1, 1000)
+        maxthreads = random.randint(10, 1000)
         pool = threads.make_database_pool(maxthreads)
-        self.assertThat(pool.max, Equals(maxthreads))
-        self.assertThat(pool.min, Equals(0))
+        self.assertThat(pool.maximum, Equals(maxthreads))
+        self.assertThat(pool.pool.min, Equals(0))
 
     def test_make_database_unpool_creates_unpool(self):
         pool = threads.make_database_unpool()
@@ -69,6 +101,43 @@ class TestMakeFunctions(MAASTestCase):
         self.assertThat(pool.lock.limit, Equals(maxthreads))
 
 
+class TestSampleDatabasePool(MAASTestCase):
+    """Tests for `sample_database_pool`."""
+
+    def test_exports_queue_depth_for_each_class_of_work(self):
+        pool = threads.make_database_pool()
+        pool.queues[threads.DATABASE_PRIORITY.RPC].extend([sentinel.work])
+        self.patch(reactor, "threadpoolForDatabase", pool)
+        prometheus_metrics = Mock()
+        threads.sample_database_pool(prometheus_metrics)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCallsMatch(
+                *(
+                    call(
+                        "maas_thread_pool_queue_depth",
+                        "set",
+                        value=(
+                            1
+                            if priority == threads.DATABASE_PRIORITY.RPC
+                            else 0
+                        ),
+                        labels={"pool": "database:%s" % priority},
+                    )
+                    for priority in pool.priorities
+                )
+            ),
+        )
+
+    def test_does_nothing_for_unpool(self):
+        self.patch(
+            reactor, "threadpoolForDatabase", threads.make_database_unpool()
+        )
+        prometheus_metrics = Mock()
+        threads.sample_database_pool(prometheus_metrics)
+        self.assertThat(prometheus_metrics.update, MockNotCalled())
+
+
 class TestInstallFunctions(MAASTestCase):
     """Tests for the `install_*` functions."""
 
@@ -113,6 +182,27 @@ class TestDeferToDatabase(MAASServerTestCase):
         )
 
 
+class TestDeferToDatabaseWithPriority(MAASServerTestCase):
+    def test_uses_pool_for_priority(self):
+        pool = threads.make_database_pool()
+        self.patch(reactor, "threadpoolForDatabase", pool)
+        deferToThreadPool = self.patch(threads.threads, "deferToThreadPool")
+        threads.deferToDatabaseWithPriority(
+            threads.DATABASE_PRIORITY.RPC, sentinel.func, sentinel.arg
+        )
+        [call] = deferToThreadPool.mock_calls
+        _, (_, view, func, arg), _ = call
+        self.assertIs(pool, view.pool)
+        self.assertEqual(threads.DATABASE_PRIORITY.RPC, view.priority)
+        self.assertEqual((sentinel.func, sentinel.arg), (func, arg))
+
+    def test_get_database_pool_returns_unprioritised_pool(self):
+        self.assertIs(
+            reactor.threadpoolForDatabase,
+            threads.get_database_pool(threads.DATABASE_PRIORITY.API),
+        )
+
+
 class TestCallOutToDatabase(MAASServerTestCase):
     @wait_for_reactor
     @inlineCallbacks
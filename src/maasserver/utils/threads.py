@@ -11,12 +11,16 @@ pools to limit the number of connections each `regiond` process will consume.
 
 __all__ = [
     "callOutToDatabase",
+    "DATABASE_PRIORITY",
     "deferToDatabase",
+    "deferToDatabaseWithPriority",
+    "get_database_pool",
     "install_database_pool",
     "install_database_unpool",
     "install_default_pool",
     "make_database_pool",
     "make_default_pool",
+    "sample_database_pool",
 ]
 
 from django.conf import settings
@@ -30,9 +34,11 @@ from maasserver.utils.orm import (
     TotallyDisconnected,
 )
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.twisted import (
     asynchronous,
     FOREVER,
+    PrioritisedThreadPool,
     ThreadPool,
     ThreadUnpool,
 )
@@ -50,6 +56,34 @@ max_threads_for_default_pool = 50
 # PostgreSQL connection (default is 100 connections).
 max_threads_for_database_pool = 9
 
+# Upper bound on the number of database connections a worker can use when
+# the database's connection budget allows more than the default.
+max_threads_for_database_pool_ceiling = 32
+
+
+class DATABASE_PRIORITY:
+    """Classes of work sharing the database thread-pool."""
+
+    # RPC calls from racks, often on behalf of machines that are booting.
+    RPC = "rpc"
+    # Requests to the web application and API.
+    API = "api"
+    # Calls to WebSocket handlers, for the web UI.
+    WEBSOCKET = "websocket"
+    # Everything else: database tasks, listener handlers, services.
+    BACKGROUND = "background"
+
+
+# Classes of work from highest to lowest priority with the number of slots
+# reserved for each. Slots beyond those reserved go to the highest priority
+# class with work waiting.
+database_pool_priorities = (
+    (DATABASE_PRIORITY.RPC, 2),
+    (DATABASE_PRIORITY.API, 1),
+    (DATABASE_PRIORITY.WEBSOCKET, 1),
+    (DATABASE_PRIORITY.BACKGROUND, 1),
+)
+
 
 def make_default_pool(maxthreads=max_threads_for_default_pool):
     """Create a general thread-pool for non-database activity.
@@ -57,17 +91,52 @@ def make_default_pool(maxthreads=max_threads_for_default_pool):
     Its sole consumer is the old-school web application, i.e. the plain HTTP
     service. All threads are fully connected to the database.
     """
-    return ThreadPool(0, maxthreads, "default", TotallyDisconnected)
+    return ThreadPool(
+        0,
+        maxthreads,
+        "default",
+        TotallyDisconnected,
+        observe=_observe_thread_pool_wait,
+    )
+
+
+def _observe_thread_pool_wait(pool, wait):
+    PROMETHEUS_METRICS.update(
+        "maas_thread_pool_wait_time",
+        "observe",
+        value=wait,
+        labels={"pool": pool},
+    )
+
+
+def _observe_database_pool_wait(priority, wait):
+    PROMETHEUS_METRICS.update(
+        "maas_database_pool_wait_time",
+        "observe",
+        value=wait,
+        labels={"priority": priority},
+    )
 
 
 def make_database_pool(maxthreads=max_threads_for_database_pool):
     """Create a general thread-pool for database activity.
 
     Its consumer are the old-school web application, i.e. the plain HTTP and
-    HTTP API services, and the WebSocket service, for the responsive web UI.
-    All threads are fully connected to the database.
+    HTTP API services, the WebSocket service, for the responsive web UI, RPC
+    calls from racks, and background tasks. All threads are fully connected
+    to the database.
+
+    Work is prioritised according to `database_pool_priorities`, and the
+    pool grows and shrinks between the number of reserved slots and
+    `maxthreads` with demand.
     """
-    return ThreadPool(0, maxthreads, "database", FullyConnected)
+    return PrioritisedThreadPool(
+        ThreadPool(0, maxthreads, "database", FullyConnected),
+        database_pool_priorities,
+        maxthreads,
+        default=DATABASE_PRIORITY.BACKGROUND,
+        observe=_observe_database_pool_wait,
+    )
 
 
 def make_database_unpool(maxthreads=max_threads_for_database_pool):
@@ -84,6 +153,22 @@ def make_database_unpool(maxthreads=max_threads_for_database_pool):
     return ThreadUnpool(DeferredSemaphore(maxthreads), ExclusivelyConnected)
 
 
+def sample_database_pool(prometheus_metrics):
+    """Export the number of tasks waiting in the database thread-pool.
+
+    This is exported for each class of work, as "database:<class>".
+    """
+    pool = getattr(reactor, "threadpoolForDatabase", None)
+    if isinstance(pool, PrioritisedThreadPool):
+        for priority, queued in pool.queued.items():
+            prometheus_metrics.update(
+                "maas_thread_pool_queue_depth",
+                "set",
+                value=queued,
+                labels={"pool": "database:%s" % priority},
+            )
+
+
 @asynchronous(timeout=FOREVER)
 def install_default_pool(maxthreads=max_threads_for_default_pool):
     """Install a custom pool as Twisted's global/reactor thread-pool.
@@ -151,12 +236,39 @@ def install_database_unpool(maxthreads=max_threads_for_database_pool):
         )
 
 
+def get_database_pool(priority):
+    """Return the database thread-pool for the given class of work.
+
+    The returned object can be used anywhere a Twisted thread-pool can. When
+    the database pool does not prioritise work, as is the case when testing,
+    the pool itself is returned.
+    """
+    pool = reactor.threadpoolForDatabase
+    if isinstance(pool, PrioritisedThreadPool):
+        return pool.forPriority(priority)
+    else:
+        return pool
+
+
 def deferToDatabase(func, *args, **kwargs):
-    """Call `func` in a thread where database activity is permitted."""
+    """Call `func` in a thread where database activity is permitted.
+
+    This is background work; see `deferToDatabaseWithPriority`.
+    """
+    return deferToDatabaseWithPriority(
+        DATABASE_PRIORITY.BACKGROUND, func, *args, **kwargs
+    )
+
+
+def deferToDatabaseWithPriority(priority, func, *args, **kwargs):
+    """Call `func` in a thread where database activity is permitted.
+
+    :param priority: One of the `DATABASE_PRIORITY` classes.
+    """
     if settings.DEBUG and getattr(settings, "DEBUG_QUERIES", False):
         func = count_queries(log.debug)(func)
     return threads.deferToThreadPool(
-        reactor, reactor.threadpoolForDatabase, func, *args, **kwargs
+        reactor, get_database_pool(priority), func, *args, **kwargs
     )
 
 
@@ -23,7 +23,12 @@ from twisted.web.util import Redirect
 from twisted.web.wsgi import WSGIResource
 
 from maasserver import concurrency
-from maasserver.utils.threads import deferToDatabase
+from maasserver.rbac import rbac
+from maasserver.utils.threads import (
+    DATABASE_PRIORITY,
+    deferToDatabase,
+    get_database_pool,
+)
 from maasserver.utils.views import WebApplicationHandler
 from maasserver.websockets.protocol import WebSocketFactory
 from maasserver.websockets.websockets import (
@@ -212,9 +217,10 @@ class WebApplicationService(StreamServerEndpointService):
         # `endpoint` is set in `privilegedStartService`, at this point the
         # `endpoint` is None.
         super().__init__(None, self.site)
+        self.listener = listener
         self.websocket = WebSocketFactory(listener)
         self.threadpool = ThreadPoolLimiter(
-            reactor.threadpoolForDatabase, concurrency.webapp
+            get_database_pool(DATABASE_PRIORITY.API), concurrency.webapp
         )
         self.status_worker = status_worker
 
@@ -296,6 +302,16 @@ class WebApplicationService(StreamServerEndpointService):
         """Start the Django application, and install it."""
         application = yield deferToDatabase(self.prepareApplication)
         self.startWebsocket()
+        # Permissions cached across requests are stale once RBAC is synced.
+        self.listener.register("sys_rbac", rbac.mark_changed)
+        # So is the external authentication information once configuration
+        # changes, or after notifications may have been missed.
+        from maasserver.middleware import external_auth_info_cache
+
+        self.listener.register("config", external_auth_info_cache.clear)
+        self.listener.events.connected.registerHandler(
+            external_auth_info_cache.clear
+        )
         self.installApplication(application)
 
     def _makeEndpoint(self):
@@ -343,10 +359,22 @@ class WebApplicationService(StreamServerEndpointService):
 
     @asynchronous(timeout=30)
     def stopService(self):
+        def _unregisterExternalAuth(_):
+            from maasserver.middleware import external_auth_info_cache
+
+            self.listener.unregister("config", external_auth_info_cache.clear)
+            self.listener.events.connected.unregisterHandler(
+                external_auth_info_cache.clear
+            )
+
         def _cleanup(_):
             self.starting = False
 
         d = super().stopService()
         d.addCallback(lambda _: self.websocket.stopFactory())
+        d.addCallback(
+            lambda _: self.listener.unregister("sys_rbac", rbac.mark_changed)
+        )
+        d.addCallback(_unregisterExternalAuth)
         d.addCallback(_cleanup)
         return d
@@ -10,7 +10,7 @@ __all__ = [
     "Handler",
 ]
 
-from functools import wraps
+from functools import partial, wraps
 from operator import attrgetter
 
 from django.contrib.postgres.fields import ArrayField
@@ -24,10 +24,17 @@ from maasserver.prometheus.middleware import wrap_query_counter_cursor
 from maasserver.rbac import rbac
 from maasserver.utils.forms import get_QueryDict
 from maasserver.utils.orm import transactional
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_PRIORITY,
+    deferToDatabaseWithPriority,
+)
 from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.twisted import asynchronous, IAsynchronous
 
+deferToDatabase = partial(
+    deferToDatabaseWithPriority, DATABASE_PRIORITY.WEBSOCKET
+)
+
 DATETIME_FORMAT = "%a, %d %b. %Y %H:%M:%S"
 
 
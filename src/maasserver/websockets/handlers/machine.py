@@ -10,6 +10,7 @@ from operator import itemgetter
 
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db.models import Count, Exists, OuterRef, Subquery
+from twisted.internet.defer import DeferredList
 
 from maasserver.enum import (
     BMC_TYPE,
@@ -63,14 +64,17 @@ from maasserver.models import (
     Subnet,
     VolumeGroup,
 )
-from maasserver.node_action import compile_node_actions
+from maasserver.node_action import (
+    compile_node_actions,
+    execute_node_actions,
+)
 from maasserver.permissions import NodePermission
 from maasserver.storage_layouts import (
     StorageLayoutError,
     StorageLayoutForm,
     StorageLayoutMissingBootDiskError,
 )
-from maasserver.utils.orm import transactional
+from maasserver.utils.orm import post_commit, transactional
 from maasserver.utils.threads import deferToDatabase
 from maasserver.websockets.base import (
     HandlerDoesNotExistError,
@@ -162,6 +166,7 @@ class MachineHandler(NodeHandler):
             "create",
             "update",
             "action",
+            "bulk_action",
             "set_active",
             "check_power",
             "create_physical",
@@ -948,6 +953,45 @@ class MachineHandler(NodeHandler):
         extra_params = params.get("extra", {})
         return action.execute(**extra_params)
 
+    def bulk_action(self, params):
+        """Perform the action on many objects.
+
+        Unlike `action`, the action not being available for a node, or
+        failing, doesn't fail the call. The result maps the system_id of each
+        node to a message saying why the action failed for it, or to `None`.
+        The power commands for the nodes are sent together to each rack
+        controller, and are waited for before returning.
+        """
+        # `execute_node_actions` checks the permission each action requires,
+        # so the view permission of the queryset is enough here.
+        system_ids = params.get("system_ids", [])
+        nodes = self.get_queryset().filter(
+            **{"%s__in" % self._meta.pk: system_ids}
+        )
+        errors, powering = execute_node_actions(
+            nodes,
+            self.user,
+            params.get("action"),
+            request=self.request,
+            extra=params.get("extra", {}),
+        )
+        for system_id in system_ids:
+            if system_id not in errors:
+                errors[system_id] = "Node does not exist."
+        if len(powering) > 0:
+
+            def cb_update_errors(results):
+                errors.update(
+                    zip(powering, (message for _, message in results))
+                )
+
+            post_commit(
+                lambda _: DeferredList(powering.values()).addCallback(
+                    cb_update_errors
+                )
+            )
+        return errors
+
     def _create_link_on_interface(self, interface, params):
         """Create a link on a new interface."""
         mode = params.get("mode", None)
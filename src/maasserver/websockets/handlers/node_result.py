@@ -7,18 +7,21 @@
 from operator import attrgetter
 
 from django.core.exceptions import ValidationError
+from formencode.validators import Int, Invalid
 
 from maasserver.models.node import Node
 from maasserver.websockets.base import (
     dehydrate_datetime,
     HandlerDoesNotExistError,
     HandlerPKError,
+    HandlerValidationError,
 )
 from maasserver.websockets.handlers.timestampedmodel import (
     TimestampedModelHandler,
 )
 from metadataserver.enum import HARDWARE_TYPE
 from metadataserver.models import ScriptResult
+from metadataserver.models.scriptresult import OUTPUT_FIELDS
 
 
 class NodeResultHandler(TimestampedModelHandler):
@@ -39,7 +42,16 @@ class NodeResultHandler(TimestampedModelHandler):
             "list",
         ]
         listen_channels = ["scriptresult"]
-        exclude = ["script_set", "script_name", "output", "stdout", "stderr"]
+        exclude = [
+            "script_set",
+            "script_name",
+            "output",
+            "stdout",
+            "stderr",
+            "output_file",
+            "stdout_file",
+            "stderr_file",
+        ]
         list_fields = [
             "id",
             "updated",
@@ -200,22 +212,35 @@ class NodeResultHandler(TimestampedModelHandler):
         return [self.full_dehydrate(obj, for_list=True) for obj in objs]
 
     def get_result_data(self, params):
-        """Return the raw script result data."""
+        """Return the raw script result data.
+
+        If `tail` is given only the last `tail` bytes of an output are
+        returned, so pages showing long outputs load quickly.
+        """
         id = params.get("id")
+        try:
+            tail = Int(min=0).to_python(params.get("tail"))
+        except Invalid as error:
+            raise HandlerValidationError({"tail": [str(error)]})
         data_type = params.get("data_type", "combined")
         if data_type not in {"combined", "stdout", "stderr", "result"}:
             return "Unknown data_type %s" % data_type
         if data_type == "combined":
             data_type = "output"
+        if data_type in OUTPUT_FIELDS:
+            fields = ("status", data_type, "%s_file" % data_type)
+        else:
+            fields = ("status", data_type)
         script_result = (
-            ScriptResult.objects.filter(id=id)
-            .only("status", data_type)
-            .first()
+            ScriptResult.objects.filter(id=id).only(*fields).first()
         )
         if script_result is None:
             return "Unknown ScriptResult id %s" % id
-        data = getattr(script_result, data_type)
-        return data.decode().strip()
+        if data_type in OUTPUT_FIELDS:
+            data = script_result.get_output(data_type, tail)
+        else:
+            data = getattr(script_result, data_type)
+        return data.decode(errors="replace").strip()
 
     def get_history(self, params):
         """Return a list of historic results."""
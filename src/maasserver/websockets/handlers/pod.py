@@ -71,7 +71,7 @@ class PodHandler(TimestampedModelHandler):
         """Return `QuerySet` for devices only viewable by `user`."""
         return Pod.objects.get_pods(
             self.user, PodPermission.view
-        ).select_related("hints")
+        ).select_related("hints", "usage")
 
     def preprocess_form(self, action, params):
         """Process the `params` before passing the data to the form."""
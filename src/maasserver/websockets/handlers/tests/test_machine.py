@@ -28,7 +28,7 @@ from testtools.matchers import (
     Raises,
     StartsWith,
 )
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, succeed
 
 from maasserver.enum import (
     BMC_TYPE,
@@ -86,7 +86,12 @@ from maasserver.utils.converters import (
     round_size_to_nearest_block,
     XMLToYAML,
 )
-from maasserver.utils.orm import get_one, reload_object, transactional
+from maasserver.utils.orm import (
+    get_one,
+    post_commit_hooks,
+    reload_object,
+    transactional,
+)
 from maasserver.utils.osystems import make_hwe_kernel_ui_text
 from maasserver.utils.threads import deferToDatabase
 from maasserver.websockets.base import (
@@ -3585,6 +3590,56 @@ class TestMachineHandler(MAASServerTestCase):
             node.distro_series, Equals(osystem["releases"][0]["name"])
         )
 
+    def test_bulk_action_performs_action_on_each_node(self):
+        user = factory.make_User()
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.DEPLOYED, owner=user)
+            for _ in range(2)
+        ]
+        ready = factory.make_Node(status=NODE_STATUS.READY, owner=user)
+        unknown = factory.make_name("system_id")
+        handler = MachineHandler(user, {}, None)
+        result = handler.bulk_action(
+            {
+                "action": "lock",
+                "system_ids": [node.system_id for node in nodes]
+                + [ready.system_id, unknown],
+            }
+        )
+        self.assertEqual(
+            {
+                nodes[0].system_id: None,
+                nodes[1].system_id: None,
+                ready.system_id: "lock action is not available for this node.",
+                unknown: "Node does not exist.",
+            },
+            result,
+        )
+        for node in nodes:
+            self.assertTrue(reload_object(node).locked)
+
+    def test_bulk_action_returns_power_results(self):
+        user = factory.make_User()
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.DEPLOYED, owner=user)
+            for _ in range(2)
+        ]
+        self.patch(machine_module, "execute_node_actions").return_value = (
+            {node.system_id: None for node in nodes},
+            {nodes[1].system_id: succeed("Problem.")},
+        )
+        handler = MachineHandler(user, {}, None)
+        with post_commit_hooks:
+            result = handler.bulk_action(
+                {
+                    "action": "on",
+                    "system_ids": [node.system_id for node in nodes],
+                }
+            )
+        self.assertEqual(
+            {nodes[0].system_id: None, nodes[1].system_id: "Problem."}, result
+        )
+
     def test_create_physical_creates_interface(self):
         user = factory.make_admin()
         node = factory.make_Node(interface=False)
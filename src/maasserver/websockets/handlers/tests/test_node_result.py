@@ -14,6 +14,7 @@ from maasserver.websockets.base import (
     dehydrate_datetime,
     HandlerDoesNotExistError,
     HandlerPKError,
+    HandlerValidationError,
 )
 from maasserver.websockets.handlers.node_result import NodeResultHandler
 from maastesting.djangotestcase import CountQueries
@@ -24,6 +25,7 @@ from metadataserver.enum import (
     RESULT_TYPE_CHOICES,
     SCRIPT_STATUS,
 )
+from metadataserver.models.scriptresult import OUTPUT_INLINE_MAX_SIZE
 
 
 class TestNodeResultHandler(MAASServerTestCase):
@@ -440,6 +442,75 @@ class TestNodeResultHandler(MAASServerTestCase):
             ),
         )
 
+    def test_get_result_data_gets_tail(self):
+        user = factory.make_User()
+        handler = NodeResultHandler(user, {}, None)
+        node = factory.make_Node()
+        stdout = factory.make_string(size=100).encode("utf-8")
+        script_result = factory.make_ScriptResult(
+            status=SCRIPT_STATUS.PASSED,
+            stdout=stdout,
+            script_set=factory.make_ScriptSet(node=node),
+        )
+        self.assertEquals(
+            stdout[-10:].decode(),
+            handler.get_result_data(
+                {"id": script_result.id, "data_type": "stdout", "tail": 10}
+            ),
+        )
+
+    def test_get_result_data_gets_output_stored_in_largefile(self):
+        user = factory.make_User()
+        handler = NodeResultHandler(user, {}, None)
+        node = factory.make_Node()
+        stdout = factory.make_string(size=OUTPUT_INLINE_MAX_SIZE + 1)
+        script_result = factory.make_ScriptResult(
+            status=SCRIPT_STATUS.RUNNING,
+            script_set=factory.make_ScriptSet(
+                node=node, result_type=RESULT_TYPE.TESTING
+            ),
+        )
+        script_result.store_result(0, stdout=stdout.encode("utf-8"))
+        self.assertEquals(
+            stdout,
+            handler.get_result_data(
+                {"id": script_result.id, "data_type": "stdout"}
+            ),
+        )
+
+    def test_get_result_data_rejects_invalid_tail(self):
+        user = factory.make_User()
+        handler = NodeResultHandler(user, {}, None)
+        script_result = factory.make_ScriptResult(
+            status=SCRIPT_STATUS.PASSED,
+            stdout=factory.make_bytes(),
+            script_set=factory.make_ScriptSet(node=factory.make_Node()),
+        )
+        for tail in ("ten", -1):
+            self.assertRaises(
+                HandlerValidationError,
+                handler.get_result_data,
+                {"id": script_result.id, "data_type": "stdout", "tail": tail},
+            )
+
+    def test_dehydrate_excludes_output_files(self):
+        user = factory.make_User()
+        handler = NodeResultHandler(user, {}, None)
+        script_result = factory.make_ScriptResult(
+            status=SCRIPT_STATUS.RUNNING,
+            script_set=factory.make_ScriptSet(
+                node=factory.make_Node(), result_type=RESULT_TYPE.TESTING
+            ),
+        )
+        script_result.store_result(
+            0, stdout=factory.make_bytes(size=OUTPUT_INLINE_MAX_SIZE + 1)
+        )
+        data = handler.full_dehydrate(
+            handler.get_queryset().get(id=script_result.id)
+        )
+        for field in ("output_file", "stdout_file", "stderr_file"):
+            self.assertNotIn(field, data)
+
     def test_get_result_data_unknown_id(self):
         user = factory.make_User()
         handler = NodeResultHandler(user, {}, None)
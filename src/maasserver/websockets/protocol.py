@@ -24,7 +24,10 @@ from twisted.web.server import NOT_DONE_YET
 
 from maasserver.eventloop import services
 from maasserver.utils.orm import transactional
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_PRIORITY,
+    deferToDatabaseWithPriority,
+)
 from maasserver.websockets import handlers
 from maasserver.websockets.websockets import STATUSES
 from provisioningserver.logger import LegacyLogger
@@ -34,6 +37,10 @@ from provisioningserver.utils.url import splithost
 
 log = LegacyLogger()
 
+deferToDatabase = partial(
+    deferToDatabaseWithPriority, DATABASE_PRIORITY.WEBSOCKET
+)
+
 
 class MSG_TYPE:
     #: Request made from client.
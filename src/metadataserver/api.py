@@ -15,21 +15,17 @@ __all__ = [
     "VersionIndexHandler",
 ]
 
-import base64
 from datetime import datetime
-from functools import partial
 import http.client
-from io import BytesIO
 import json
 from operator import itemgetter
 import os
-import tarfile
 import time
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.db.models import Q
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from formencode.validators import Int, Number, String
 from piston3.utils import rc
@@ -94,6 +90,11 @@ from metadataserver.models import (
     ScriptResult,
     ScriptSet,
 )
+from metadataserver.script_archive import (
+    get_script_binary_content,
+    get_script_content,
+    TarStream,
+)
 from metadataserver.user_data import (
     generate_user_data_for_poweroff,
     generate_user_data_for_status,
@@ -1090,18 +1091,6 @@ class CurtinUserDataHandler(MetadataViewHandler):
         return HttpResponse(user_data, content_type="application/octet-stream")
 
 
-def add_file_to_tar(tar, path, content, mtime, permission=0o755):
-    """Add a script to a tar."""
-    assert isinstance(content, bytes), "Script content must be binary."
-    tarinfo = tarfile.TarInfo(name=path)
-    tarinfo.size = len(content)
-    tarinfo.mode = permission
-    # Modification time defaults to Epoch, which elicits annoying
-    # warnings when decompressing.
-    tarinfo.mtime = mtime
-    tar.addfile(tarinfo, BytesIO(content))
-
-
 class CommissioningScriptsHandler(MetadataViewHandler):
     """Return a tar archive containing the commissioning scripts.
 
@@ -1109,33 +1098,25 @@ class CommissioningScriptsHandler(MetadataViewHandler):
     """
 
     def _iter_scripts(self):
-        for script in Script.objects.filter(
-            script_type=SCRIPT_TYPE.COMMISSIONING
-        ):
-            try:
-                # Check if the script is a base64 encoded binary.
-                content = base64.b64decode(script.script.data)
-            except Exception:
-                # If it isn't encode the text as binary data.
-                content = script.script.data.encode()
-            yield script.name, content
+        qs = Script.objects.filter(script_type=SCRIPT_TYPE.COMMISSIONING)
+        # Script contents are served from the payload cache.
+        for script in qs.defer("script__data").select_related("script"):
+            yield script.name, get_script_binary_content(script)
 
     def _get_archive(self):
         """Produce a tar archive of all commissionig scripts.
 
         Each of the scripts will be in the `ARCHIVE_PREFIX` directory.
         """
-        binary = BytesIO()
-        scripts = sorted(self._iter_scripts())
-        with tarfile.open(mode="w", fileobj=binary) as tarball:
-            add_script = partial(add_file_to_tar, tarball, mtime=time.time())
-            for name, content in scripts:
-                add_script(os.path.join("commissioning.d", name), content)
-        return binary.getvalue()
+        tar = TarStream()
+        mtime = time.time()
+        for name, content in sorted(self._iter_scripts()):
+            tar.add(os.path.join("commissioning.d", name), content, mtime)
+        return tar
 
     def read(self, request, version, mac=None):
         check_version(version)
-        return HttpResponse(
+        return StreamingHttpResponse(
             self._get_archive(), content_type="application/tar"
         )
 
@@ -1152,7 +1133,7 @@ class AnonMAASScriptsHandler(AnonymousOperationsHandler):
 
     def read(self, request, version, mac=None):
         # Administrator has turned off commissioning during enlistment.
-        binary = BytesIO()
+        tar = TarStream()
         mtime = time.time()
         tar_meta_data = {"commissioning_scripts": []}
         qs = Script.objects.filter(
@@ -1169,55 +1150,51 @@ class AnonMAASScriptsHandler(AnonymousOperationsHandler):
         else:
             qs = qs.filter(tags__overlap=["bmc-config"])
         qs = qs.order_by("name").select_related("script")
+        qs = qs.defer("script__data")
         # Responses are currently gzip compressed using
         # django.middleware.gzip.GZipMiddleware.
-        with tarfile.open(mode="w", fileobj=binary) as tar:
-            for script in qs:
-                # Return the default parameter fields for any commissioning
-                # script. An empty Node() is passed so the form knows its
-                # validating input and returning defaults. The form only
-                # uses the Node object to fill in storage or interface
-                # parameters. When none are found "all" is used which is
-                # handled elsewhere.
-                form = ParametersForm(data={}, script=script, node=Node())
-                # The form isn't valid if there is a required field with no
-                # default value.
-                if not form.is_valid():
-                    logger.error(
-                        "Unable to send commissioning script to enlisting "
-                        f"machine - {form.errors}"
-                    )
-                    continue
-                path = os.path.join("commissioning", script.name)
-                content = script.script.data.encode()
-                add_file_to_tar(tar, path, content, mtime)
-                for parameters in form.cleaned_data["input"]:
-                    tar_meta_data["commissioning_scripts"].append(
-                        {
-                            "name": script.name,
-                            "path": path,
-                            "script_version_id": script.script.id,
-                            "timeout_seconds": script.timeout.seconds,
-                            "parallel": script.parallel,
-                            "hardware_type": script.hardware_type,
-                            "parameters": parameters,
-                            "packages": script.packages,
-                            "for_hardware": script.for_hardware,
-                            "apply_configured_networking": (
-                                script.apply_configured_networking
-                            ),
-                        }
-                    )
-            add_file_to_tar(
-                tar,
-                "index.json",
-                json.dumps({"1.0": tar_meta_data}).encode(),
-                mtime,
-                0o644,
-            )
-        return HttpResponse(
-            binary.getvalue(), content_type="application/x-tar"
+        for script in qs:
+            # Return the default parameter fields for any commissioning
+            # script. An empty Node() is passed so the form knows its
+            # validating input and returning defaults. The form only
+            # uses the Node object to fill in storage or interface
+            # parameters. When none are found "all" is used which is
+            # handled elsewhere.
+            form = ParametersForm(data={}, script=script, node=Node())
+            # The form isn't valid if there is a required field with no
+            # default value.
+            if not form.is_valid():
+                logger.error(
+                    "Unable to send commissioning script to enlisting "
+                    f"machine - {form.errors}"
+                )
+                continue
+            path = os.path.join("commissioning", script.name)
+            tar.add(path, get_script_content(script), mtime)
+            for parameters in form.cleaned_data["input"]:
+                tar_meta_data["commissioning_scripts"].append(
+                    {
+                        "name": script.name,
+                        "path": path,
+                        "script_version_id": script.script_id,
+                        "timeout_seconds": script.timeout.seconds,
+                        "parallel": script.parallel,
+                        "hardware_type": script.hardware_type,
+                        "parameters": parameters,
+                        "packages": script.packages,
+                        "for_hardware": script.for_hardware,
+                        "apply_configured_networking": (
+                            script.apply_configured_networking
+                        ),
+                    }
+                )
+        tar.add(
+            "index.json",
+            json.dumps({"1.0": tar_meta_data}).encode(),
+            mtime,
+            0o644,
         )
+        return StreamingHttpResponse(tar, content_type="application/x-tar")
 
 
 class MAASScriptsHandler(OperationsHandler):
@@ -1241,21 +1218,21 @@ class MAASScriptsHandler(OperationsHandler):
                 script_result.delete()
                 continue
             else:
-                content = script_result.script.script.data.encode()
-                add_file_to_tar(tar, path, content, mtime)
+                script = script_result.script
+                tar.add(path, get_script_content(script), mtime)
                 md_item = {
                     "name": script_result.name,
                     "path": path,
                     "script_result_id": script_result.id,
-                    "script_version_id": script_result.script.script.id,
-                    "timeout_seconds": script_result.script.timeout.seconds,
-                    "parallel": script_result.script.parallel,
-                    "hardware_type": script_result.script.hardware_type,
+                    "script_version_id": script.script_id,
+                    "timeout_seconds": script.timeout.seconds,
+                    "parallel": script.parallel,
+                    "hardware_type": script.hardware_type,
                     "parameters": script_result.parameters,
-                    "packages": script_result.script.packages,
-                    "for_hardware": script_result.script.for_hardware,
+                    "packages": script.packages,
+                    "for_hardware": script.for_hardware,
                     "apply_configured_networking": (
-                        script_result.script.apply_configured_networking
+                        script.apply_configured_networking
                     ),
                 }
             if script_result.status == SCRIPT_STATUS.PENDING:
@@ -1268,22 +1245,24 @@ class MAASScriptsHandler(OperationsHandler):
                 out_path = os.path.join(
                     "out", "%s.%s" % (script_result.name, script_result.id)
                 )
-                add_file_to_tar(tar, out_path, script_result.output, mtime)
-                add_file_to_tar(
-                    tar, "%s.out" % out_path, script_result.stdout, mtime
-                )
-                add_file_to_tar(
-                    tar, "%s.err" % out_path, script_result.stderr, mtime
+                tar.add(out_path, script_result.get_output("output"), mtime)
+                tar.add(
+                    "%s.out" % out_path,
+                    script_result.get_output("stdout"),
+                    mtime,
                 )
-                add_file_to_tar(
-                    tar, "%s.yaml" % out_path, script_result.result, mtime
+                tar.add(
+                    "%s.err" % out_path,
+                    script_result.get_output("stderr"),
+                    mtime,
                 )
+                tar.add("%s.yaml" % out_path, script_result.result, mtime)
 
             # Only generate and add network configuration if the Script needs
             # it and it hasn't already been added.
             if (
                 md_item["apply_configured_networking"]
-                and NETPLAN_TAR_PATH not in tar.getnames()
+                and NETPLAN_TAR_PATH not in tar
             ):
                 node = script_result.script_set.node
                 # Testing is always done in the commissioning environment.
@@ -1302,8 +1281,7 @@ class MAASScriptsHandler(OperationsHandler):
                 network_config_yaml = yaml.safe_dump(
                     network_config.config, default_flow_style=False
                 )
-                add_file_to_tar(
-                    tar,
+                tar.add(
                     NETPLAN_TAR_PATH,
                     network_config_yaml.encode(),
                     mtime,
@@ -1314,6 +1292,16 @@ class MAASScriptsHandler(OperationsHandler):
 
         return meta_data
 
+    def _get_script_results(self, script_set):
+        """Return `script_set`'s results, prefetching all the data we need.
+
+        Script contents are served from the payload cache so are deferred.
+        """
+        qs = script_set.scriptresult_set.select_related(
+            "script", "script__script"
+        )
+        return qs.defer("script__script__data")
+
     def read(self, request, version, mac=None):
         """Returns a tar containing user and status selected scripts.
 
@@ -1323,80 +1311,75 @@ class MAASScriptsHandler(OperationsHandler):
         so auto-decompress is suggested. If the node returns a script status
         and calls this request again only the scripts which havn't been run
         will be returned.
+
+        The tar is streamed; shared script payloads come from a cache and
+        only the per-node index and results are generated per request.
         """
         node = get_queried_node(request)
-        binary = BytesIO()
+        tar = TarStream()
         mtime = time.time()
         tar_meta_data = {}
         # Responses are currently gzip compressed using
         # django.middleware.gzip.GZipMiddleware.
-        with tarfile.open(mode="w", fileobj=binary) as tar:
-            # Commissioning scripts should only be run during commissioning or
-            # in rescue mode.
-            if (
-                node.status
-                in (
-                    NODE_STATUS.COMMISSIONING,
-                    NODE_STATUS.ENTERING_RESCUE_MODE,
-                    NODE_STATUS.RESCUE_MODE,
-                )
-                and node.current_commissioning_script_set is not None
-            ):
-                # Prefetch all the data we need.
-                qs = node.current_commissioning_script_set.scriptresult_set
-                qs = qs.select_related("script", "script__script")
-                # After the script runner finishes sending all commissioning
-                # results it redownloads the script tar. It does this in-case
-                # a commissioning script discovers hardware associated with
-                # hardware identified in the for_hardware field of a script.
-                # select_for_hardware_scripts() processes the output of the
-                # builtin commissioning scripts and adds any associated script.
-                # This does not need to happen the first time the script runner
-                # downloads the tar as the region has not yet received new
-                # data.
-                for script_result in qs:
-                    if script_result.status != SCRIPT_STATUS.PENDING:
-                        script_set = node.current_commissioning_script_set
-                        script_set.select_for_hardware_scripts()
-                        break
-                meta_data = self._add_script_set_to_tar(
-                    node.current_commissioning_script_set,
-                    tar,
-                    "commissioning",
-                    mtime,
-                )
-                if meta_data != []:
-                    tar_meta_data["commissioning_scripts"] = sorted(
-                        meta_data, key=itemgetter("name", "script_result_id")
-                    )
-
-            # Always send testing scripts.
-            if node.current_testing_script_set is not None:
-                # prefetch all the data we need
-                qs = node.current_testing_script_set.scriptresult_set
-                qs = qs.select_related("script", "script__script")
-                meta_data = self._add_script_set_to_tar(
-                    qs, tar, "testing", mtime
+        # Commissioning scripts should only be run during commissioning or
+        # in rescue mode.
+        if (
+            node.status
+            in (
+                NODE_STATUS.COMMISSIONING,
+                NODE_STATUS.ENTERING_RESCUE_MODE,
+                NODE_STATUS.RESCUE_MODE,
+            )
+            and node.current_commissioning_script_set is not None
+        ):
+            script_set = node.current_commissioning_script_set
+            # After the script runner finishes sending all commissioning
+            # results it redownloads the script tar. It does this in-case
+            # a commissioning script discovers hardware associated with
+            # hardware identified in the for_hardware field of a script.
+            # select_for_hardware_scripts() processes the output of the
+            # builtin commissioning scripts and adds any associated script.
+            # This does not need to happen the first time the script runner
+            # downloads the tar as the region has not yet received new
+            # data.
+            if script_set.scriptresult_set.exclude(
+                status=SCRIPT_STATUS.PENDING
+            ).exists():
+                script_set.select_for_hardware_scripts()
+            meta_data = self._add_script_set_to_tar(
+                self._get_script_results(script_set),
+                tar,
+                "commissioning",
+                mtime,
+            )
+            if meta_data != []:
+                tar_meta_data["commissioning_scripts"] = sorted(
+                    meta_data, key=itemgetter("name", "script_result_id")
                 )
-                if meta_data != []:
-                    tar_meta_data["testing_scripts"] = sorted(
-                        meta_data, key=itemgetter("name", "script_result_id")
-                    )
 
-            if not tar_meta_data:
-                return HttpResponse(status=int(http.client.NO_CONTENT))
-
-            add_file_to_tar(
+        # Always send testing scripts.
+        if node.current_testing_script_set is not None:
+            meta_data = self._add_script_set_to_tar(
+                self._get_script_results(node.current_testing_script_set),
                 tar,
-                "index.json",
-                json.dumps({"1.0": tar_meta_data}).encode(),
+                "testing",
                 mtime,
-                0o644,
             )
+            if meta_data != []:
+                tar_meta_data["testing_scripts"] = sorted(
+                    meta_data, key=itemgetter("name", "script_result_id")
+                )
 
-        return HttpResponse(
-            binary.getvalue(), content_type="application/x-tar"
+        if not tar_meta_data:
+            return HttpResponse(status=int(http.client.NO_CONTENT))
+
+        tar.add(
+            "index.json",
+            json.dumps({"1.0": tar_meta_data}).encode(),
+            mtime,
+            0o644,
         )
+        return StreamingHttpResponse(tar, content_type="application/x-tar")
 
 
 class AnonMetaDataHandler(VersionIndexHandler):
@@ -4,10 +4,12 @@
 """Builtin scripts commited to Script model."""
 
 
+from hashlib import md5
 import os
 
 import attr
 from attr.validators import instance_of, optional
+from django.db.models import CharField, F, Func
 import tempita
 from zope.interface import Attribute, implementer, Interface
 from zope.interface.verify import verifyObject
@@ -198,17 +200,58 @@ for script in BUILTIN_SCRIPTS:
     verifyObject(IBuiltinScript, script)
 
 
+def _render_builtin_script(script):
+    """Return the content of `script` as it is stored in the database."""
+    if script.inject_file:
+        with open(script.inject_path, "r") as f:
+            script.substitutes["inject_file"] = f.read()
+    script_content = tempita.Template.from_filename(
+        script.script_path, encoding="utf-8"
+    )
+    return script_content.substitute(
+        {"name": script.name, **script.substitutes}
+    )
+
+
+def _hash_script(content):
+    """Return the hash of a script's content, as PostgreSQL's `md5` does.
+
+    This is only used to detect changes, not for security.
+    """
+    return md5(content.encode("utf-8")).hexdigest()
+
+
+def _get_stored_script_hashes(names):
+    """Return the hashes of the stored content of the named scripts.
+
+    The hashes are computed by the database, so only they are fetched.
+
+    :return: A dict mapping the names of the scripts that exist to hashes.
+    """
+    return dict(
+        Script.objects.filter(name__in=names)
+        .annotate(
+            data_md5=Func(
+                F("script__data"), function="md5", output_field=CharField()
+            )
+        )
+        .values_list("name", "data_md5")
+    )
+
+
 def load_builtin_scripts():
+    # A manifest of the content of each builtin script with its hash, which
+    # is compared with the content in the database in a single query; only
+    # the scripts that are missing or differ are looked at further.
+    manifest = {}
     for script in BUILTIN_SCRIPTS:
-        if script.inject_file:
-            with open(script.inject_path, "r") as f:
-                script.substitutes["inject_file"] = f.read()
-        script_content = tempita.Template.from_filename(
-            script.script_path, encoding="utf-8"
-        )
-        script_content = script_content.substitute(
-            {"name": script.name, **script.substitutes}
-        )
+        script_content = _render_builtin_script(script)
+        manifest[script.name] = script_content, _hash_script(script_content)
+    stored_hashes = _get_stored_script_hashes(manifest)
+    for script in BUILTIN_SCRIPTS:
+        script_content, script_hash = manifest[script.name]
+        if stored_hashes.get(script.name) == script_hash:
+            continue
         try:
             script_in_db = Script.objects.get(name=script.name)
         except Script.DoesNotExist:
@@ -12,6 +12,7 @@ from maasserver.models import VersionedTextFile
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 from metadataserver.builtin_scripts import (
     BUILTIN_SCRIPTS,
     load_builtin_scripts,
@@ -45,6 +46,11 @@ class TestBuiltinScripts(MAASServerTestCase):
             )
             self.assertTrue(script_in_db.default, script.name)
 
+    def test_skips_unchanged_scripts_in_one_query(self):
+        load_builtin_scripts()
+        queries, _ = count_queries(load_builtin_scripts)
+        self.assertEqual(1, queries)
+
     def test_update_script(self):
         load_builtin_scripts()
         update_script_values = random.choice(BUILTIN_SCRIPTS)
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.12 on 2020-10-28 09:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maasserver", "0221_podusage"),
+        ("metadataserver", "0024_reorder_commissioning_scripts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scriptresult",
+            name="output_file",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="output_script_results",
+                to="maasserver.LargeFile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scriptresult",
+            name="stdout_file",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="stdout_script_results",
+                to="maasserver.LargeFile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scriptresult",
+            name="stderr_file",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="stderr_script_results",
+                to="maasserver.LargeFile",
+            ),
+        ),
+    ]
@@ -3,6 +3,9 @@
 
 
 from datetime import datetime, timedelta
+from functools import partial
+import gzip
+from io import BytesIO
 
 from django.core.exceptions import ValidationError
 from django.db.models import (
@@ -21,6 +24,7 @@ from maasserver.fields import JSONObjectField
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.event import Event
 from maasserver.models.interface import Interface
+from maasserver.models.largefile import LargeFile
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.timestampedmodel import now, TimestampedModel
 from maasserver.models.versionedtextfile import VersionedTextFile
@@ -38,6 +42,17 @@ from metadataserver.models.script import Script
 from metadataserver.models.scriptset import ScriptSet
 from provisioningserver.events import EVENT_TYPES
 
+# The outputs of a script that can be stored outside of its result's row.
+OUTPUT_FIELDS = ("output", "stdout", "stderr")
+
+# Outputs larger than this, in bytes, are stored compressed in a `LargeFile`
+# rather than in the result's row. Commissioning outputs are always kept in
+# the row, as MAAS parses them.
+OUTPUT_INLINE_MAX_SIZE = 64 * 1024
+
+# Size of the chunks outputs stored in a `LargeFile` are read in.
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
 
 class ScriptResult(CleanSave, TimestampedModel):
 
@@ -99,6 +114,36 @@ class ScriptResult(CleanSave, TimestampedModel):
 
     result = BinaryField(max_length=1024 * 1024, blank=True, default=b"")
 
+    # Large outputs are gzipped and stored in a `LargeFile` instead of the
+    # fields above, see `set_output`. Results with the same output share the
+    # same `LargeFile`.
+    output_file = ForeignKey(
+        LargeFile,
+        editable=False,
+        blank=True,
+        null=True,
+        on_delete=SET_NULL,
+        related_name="output_script_results",
+    )
+
+    stdout_file = ForeignKey(
+        LargeFile,
+        editable=False,
+        blank=True,
+        null=True,
+        on_delete=SET_NULL,
+        related_name="stdout_script_results",
+    )
+
+    stderr_file = ForeignKey(
+        LargeFile,
+        editable=False,
+        blank=True,
+        null=True,
+        on_delete=SET_NULL,
+        related_name="stderr_script_results",
+    )
+
     # When the script started to run
     started = DateTimeField(editable=False, null=True, blank=True)
 
@@ -192,6 +237,53 @@ class ScriptResult(CleanSave, TimestampedModel):
     def __str__(self):
         return "%s/%s" % (self.script_set.node.system_id, self.name)
 
+    def set_output(self, name, data):
+        """Set the output `name`, one of `OUTPUT_FIELDS`, to `data`.
+
+        Outputs over `OUTPUT_INLINE_MAX_SIZE` are gzipped and stored in a
+        `LargeFile`, unless this is a commissioning result.
+        """
+        if (
+            len(data) > OUTPUT_INLINE_MAX_SIZE
+            and self.script_set.result_type != RESULT_TYPE.COMMISSIONING
+        ):
+            # No timestamp is written so the same output always compresses to
+            # the same `LargeFile`.
+            content = BytesIO(gzip.compress(data, mtime=0))
+            setattr(self, name, Bin(b""))
+            setattr(
+                self,
+                "%s_file" % name,
+                LargeFile.objects.get_or_create_file_from_content(content),
+            )
+        else:
+            setattr(self, name, Bin(data))
+            setattr(self, "%s_file" % name, None)
+
+    def get_output(self, name, tail=None):
+        """Return the output `name`, one of `OUTPUT_FIELDS`.
+
+        :param tail: Return only the last `tail` bytes of the output. Outputs
+            stored in a `LargeFile` are decompressed while being read, so no
+            more than this is held in memory.
+        """
+        if getattr(self, "%s_file_id" % name) is None:
+            data = getattr(self, name)
+            if tail is not None:
+                data = Bin(data[max(len(data) - tail, 0) :])
+            return data
+        largefile = getattr(self, "%s_file" % name)
+        data = bytearray()
+        with largefile.content.open("rb") as stream:
+            with gzip.GzipFile(fileobj=stream, mode="rb") as output:
+                for chunk in iter(
+                    partial(output.read, OUTPUT_CHUNK_SIZE), b""
+                ):
+                    data += chunk
+                    if tail is not None and len(data) > tail:
+                        del data[: len(data) - tail]
+        return Bin(bytes(data))
+
     def read_results(self):
         """Read the results YAML file and validate it."""
         try:
@@ -289,12 +381,11 @@ class ScriptResult(CleanSave, TimestampedModel):
             else:
                 self.status = SCRIPT_STATUS.FAILED
 
-        if output is not None:
-            self.output = Bin(output)
-        if stdout is not None:
-            self.stdout = Bin(stdout)
-        if stderr is not None:
-            self.stderr = Bin(stderr)
+        replaced_files = set()
+        for name, data in zip(OUTPUT_FIELDS, (output, stdout, stderr)):
+            if data is not None:
+                replaced_files.add(getattr(self, "%s_file_id" % name))
+                self.set_output(name, data)
         if result is not None:
             self.result = Bin(result)
             try:
@@ -414,6 +505,12 @@ class ScriptResult(CleanSave, TimestampedModel):
 
         self.save(runtime=runtime)
 
+        # Delete the outputs replaced, unless other results share them.
+        replaced_files.discard(None)
+        if len(replaced_files) > 0:
+            for largefile in LargeFile.objects.filter(id__in=replaced_files):
+                largefile.delete()
+
     @property
     def history(self):
         qs = ScriptResult.objects.filter(
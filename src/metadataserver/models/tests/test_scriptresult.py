@@ -10,12 +10,16 @@ from django.core.exceptions import ValidationError
 import yaml
 
 from maasserver.enum import NODE_TYPE
-from maasserver.models import Event, EventType
+from maasserver.models import Event, EventType, LargeFile, signals
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maasserver.utils.orm import reload_object
+from maasserver.utils.orm import post_commit_hooks, reload_object
 from maastesting.djangotestcase import CountQueries
-from maastesting.matchers import DocTestMatches, MockCalledOnceWith
+from maastesting.matchers import (
+    DocTestMatches,
+    MockCalledOnce,
+    MockCalledOnceWith,
+)
 from metadataserver.builtin_scripts.hooks import NODE_INFO_SCRIPTS
 from metadataserver.enum import (
     RESULT_TYPE,
@@ -26,6 +30,10 @@ from metadataserver.enum import (
 )
 from metadataserver.models import ScriptResult
 from metadataserver.models import scriptresult as scriptresult_module
+from metadataserver.models.scriptresult import (
+    OUTPUT_FIELDS,
+    OUTPUT_INLINE_MAX_SIZE,
+)
 from provisioningserver.events import EVENT_TYPES
 
 
@@ -954,3 +962,116 @@ class TestScriptResult(MAASServerTestCase):
     def test_suppressed(self):
         script_result = factory.make_ScriptResult(suppressed=True)
         self.assertTrue(script_result.suppressed)
+
+
+class TestScriptResultOutput(MAASServerTestCase):
+    """Tests for storing large outputs outside of `ScriptResult` rows."""
+
+    def make_script_result(self, result_type=RESULT_TYPE.TESTING):
+        script_set = factory.make_ScriptSet(result_type=result_type)
+        return factory.make_ScriptResult(
+            script_set=script_set, status=SCRIPT_STATUS.RUNNING
+        )
+
+    def make_output(self):
+        return factory.make_bytes(OUTPUT_INLINE_MAX_SIZE + 1)
+
+    def test_stores_small_output_in_row(self):
+        script_result = self.make_script_result()
+        stdout = factory.make_bytes()
+        script_result.store_result(0, stdout=stdout)
+        script_result = reload_object(script_result)
+        self.assertEqual(stdout, script_result.stdout)
+        self.assertIsNone(script_result.stdout_file)
+        self.assertEqual(stdout, script_result.get_output("stdout"))
+
+    def test_stores_large_output_in_largefile(self):
+        script_result = self.make_script_result()
+        output, stdout, stderr = (self.make_output() for _ in range(3))
+        script_result.store_result(
+            0, output=output, stdout=stdout, stderr=stderr
+        )
+        script_result = reload_object(script_result)
+        for name, data in zip(OUTPUT_FIELDS, (output, stdout, stderr)):
+            self.assertEqual(b"", getattr(script_result, name))
+            self.assertIsNotNone(getattr(script_result, "%s_file" % name))
+            self.assertEqual(data, script_result.get_output(name))
+
+    def test_compresses_large_output(self):
+        script_result = self.make_script_result()
+        stdout = b"\n".join([factory.make_name("line").encode()] * 10000)
+        script_result.store_result(0, stdout=stdout)
+        self.assertLess(script_result.stdout_file.size, len(stdout) / 10)
+
+    def test_keeps_large_commissioning_output_in_row(self):
+        script_result = self.make_script_result(RESULT_TYPE.COMMISSIONING)
+        stdout = self.make_output()
+        script_result.set_output("stdout", stdout)
+        self.assertEqual(stdout, script_result.stdout)
+        self.assertIsNone(script_result.stdout_file)
+
+    def test_shares_largefile_between_results_with_same_output(self):
+        script_results = [self.make_script_result() for _ in range(2)]
+        stdout = self.make_output()
+        for script_result in script_results:
+            script_result.store_result(0, stdout=stdout)
+        self.assertEqual(
+            script_results[0].stdout_file_id, script_results[1].stdout_file_id
+        )
+        self.assertEqual(1, LargeFile.objects.count())
+
+    def test_get_output_tail(self):
+        script_result = self.make_script_result()
+        stdout = self.make_output()
+        script_result.store_result(0, stdout=stdout)
+        script_result = reload_object(script_result)
+        self.assertEqual(
+            stdout[-1000:], script_result.get_output("stdout", tail=1000)
+        )
+        self.assertEqual(
+            stdout, script_result.get_output("stdout", tail=len(stdout) * 2)
+        )
+
+    def test_get_output_tail_of_output_in_row(self):
+        script_result = self.make_script_result()
+        stdout = factory.make_bytes(100)
+        script_result.store_result(0, stdout=stdout)
+        self.assertEqual(stdout[-10:], script_result.get_output("stdout", 10))
+        self.assertEqual(b"", script_result.get_output("stdout", 0))
+
+    def test_store_result_deletes_replaced_largefile(self):
+        node = factory.make_RackController()
+        script_set = factory.make_ScriptSet(
+            node=node, result_type=RESULT_TYPE.TESTING
+        )
+        script_result = factory.make_ScriptResult(script_set=script_set)
+        self.patch(signals.largefiles, "delete_large_object_content_later")
+        script_result.store_result(0, stdout=self.make_output())
+        with post_commit_hooks:
+            script_result.store_result(0, stdout=self.make_output())
+        self.assertItemsEqual(
+            [script_result.stdout_file_id],
+            LargeFile.objects.values_list("id", flat=True),
+        )
+
+    def test_deleting_result_deletes_largefile(self):
+        script_result = self.make_script_result()
+        script_result.store_result(0, stdout=self.make_output())
+        self.patch(signals.largefiles, "delete_large_object_content_later")
+        with post_commit_hooks:
+            script_result.delete()
+        self.assertFalse(LargeFile.objects.exists())
+        self.assertThat(
+            signals.largefiles.delete_large_object_content_later,
+            MockCalledOnce(),
+        )
+
+    def test_deleting_result_keeps_shared_largefile(self):
+        script_results = [self.make_script_result() for _ in range(2)]
+        stdout = self.make_output()
+        for script_result in script_results:
+            script_result.store_result(0, stdout=stdout)
+        script_results[0].delete()
+        self.assertEqual(
+            stdout, reload_object(script_results[1]).get_output("stdout")
+        )
@@ -0,0 +1,193 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Streaming generation of the script tar archives sent to nodes.
+
+Every booting node downloads a tar of the scripts it should run. Most of
+that archive is identical between nodes, so script payloads are kept in a
+process-wide cache keyed by the id of the immutable `VersionedTextFile`
+holding them. The archive itself is never assembled in memory; members are
+serialised lazily while the response is being written.
+"""
+
+__all__ = [
+    "get_script_binary_content",
+    "get_script_content",
+    "ScriptPayloadCache",
+    "TarStream",
+]
+
+import base64
+from collections import OrderedDict
+import tarfile
+from threading import Lock
+
+# Size of the chunks yielded by `TarStream`.
+CHUNK_SIZE = 64 * 1024
+
+# Upper bound on the memory used by cached script payloads. The builtin
+# scripts are well under a megabyte together; this leaves plenty of space
+# for user supplied scripts.
+CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+
+class ScriptPayloadCache:
+    """A bounded, least-recently-used cache of script payloads.
+
+    `VersionedTextFile` rows are never modified, updating a script creates a
+    new version with a new id, so a payload never has to be invalidated.
+
+    Requests are handled in the database thread pool so access is serialised
+    with a lock.
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE):
+        super().__init__()
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._payloads = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, load):
+        """Return the payload for `key`, calling `load` to produce it.
+
+        :param key: A hashable key; its first element must be the id of the
+            `VersionedTextFile` the payload is derived from.
+        :param load: A no-argument callable returning the payload as bytes.
+        """
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+                self.hits += 1
+                return payload
+            self.misses += 1
+        # Load outside of the lock; this may hit the database.
+        payload = load()
+        if len(payload) > self.max_size:
+            return payload
+        with self._lock:
+            if key not in self._payloads:
+                self._payloads[key] = payload
+                self.size += len(payload)
+                while self.size > self.max_size:
+                    _, evicted = self._payloads.popitem(last=False)
+                    self.size -= len(evicted)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+            self.size = 0
+
+
+script_payloads = ScriptPayloadCache()
+
+
+def get_script_content(script):
+    """Return the content of `script` as bytes.
+
+    Querysets should defer `script__data` so that a cache hit never loads
+    the script text from the database.
+    """
+    return script_payloads.get(
+        (script.script_id, "text"), lambda: script.script.data.encode()
+    )
+
+
+def get_script_binary_content(script):
+    """Return the content of `script`, base64 decoding it if possible."""
+
+    def load():
+        try:
+            # Check if the script is a base64 encoded binary.
+            return base64.b64decode(script.script.data)
+        except Exception:
+            # If it isn't encode the text as binary data.
+            return script.script.data.encode()
+
+    return script_payloads.get((script.script_id, "binary"), load)
+
+
+class TarStream:
+    """An uncompressed tar archive produced while it is being iterated.
+
+    Members are recorded with `add`; nothing is serialised until the stream
+    is iterated, at which point headers, payloads and padding are yielded in
+    chunks of roughly `chunk_size` bytes. The payloads themselves are
+    referenced rather than copied, so a member taken from the
+    `ScriptPayloadCache` costs nothing per request.
+
+    All content must be collected before the response is returned, as the
+    iteration happens outside of the request's transaction.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self._members = []
+        self._names = set()
+
+    def add(self, path, content, mtime, permission=0o755):
+        """Add a file to the archive."""
+        assert isinstance(
+            content, (bytes, memoryview)
+        ), "Script content must be binary."
+        tarinfo = tarfile.TarInfo(name=path)
+        tarinfo.size = len(content)
+        tarinfo.mode = permission
+        # Modification time defaults to Epoch, which elicits annoying
+        # warnings when decompressing.
+        tarinfo.mtime = mtime
+        self._members.append((tarinfo, content))
+        self._names.add(path)
+
+    def __contains__(self, path):
+        return path in self._names
+
+    def __bool__(self):
+        return len(self._members) != 0
+
+    def getnames(self):
+        """Return the member names in the order they were added."""
+        return [tarinfo.name for tarinfo, _ in self._members]
+
+    def _iter_blocks(self):
+        offset = 0
+        for tarinfo, content in self._members:
+            header = tarinfo.tobuf(
+                tarfile.DEFAULT_FORMAT, tarfile.ENCODING, "surrogateescape"
+            )
+            yield header
+            offset += len(header)
+            view = memoryview(content)
+            for start in range(0, len(view), self.chunk_size):
+                yield view[start : start + self.chunk_size]
+            _, remainder = divmod(len(view), tarfile.BLOCKSIZE)
+            if remainder > 0:
+                yield tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+                offset += tarfile.BLOCKSIZE - remainder
+            offset += len(view)
+        # End of archive marker, padded to a full record like
+        # `TarFile.close` does.
+        trailer = tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+        offset += len(trailer)
+        _, remainder = divmod(offset, tarfile.RECORDSIZE)
+        if remainder > 0:
+            trailer += tarfile.NUL * (tarfile.RECORDSIZE - remainder)
+        yield trailer
+
+    def __iter__(self):
+        buf = bytearray()
+        for block in self._iter_blocks():
+            if len(block) >= self.chunk_size and not buf:
+                yield bytes(block)
+                continue
+            buf += block
+            if len(buf) >= self.chunk_size:
+                yield bytes(buf)
+                buf.clear()
+        if buf:
+            yield bytes(buf)
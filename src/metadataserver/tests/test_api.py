@@ -1547,14 +1547,14 @@ class TestMAASScripts(MAASServerTestCase):
         factory.make_Script(script_type=SCRIPT_TYPE.COMMISSIONING)
         start_time = floor(time.time())
         response = self.client.get(reverse("maas-scripts", args=["latest"]))
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEqual("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # The + 1 is for the index.json file.
         self.assertEqual(len(NODE_INFO_SCRIPTS) + 1, len(tar.getmembers()))
@@ -1611,13 +1611,13 @@ class TestMAASScripts(MAASServerTestCase):
         Config.objects.set_config("enlist_commissioning", False)
         start_time = floor(time.time())
         response = self.client.get(reverse("maas-scripts", args=["latest"]))
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         self.assertEqual(2, len(tar.getmembers()))
         commissioning_meta_data = []
@@ -1674,14 +1674,14 @@ class TestMAASScripts(MAASServerTestCase):
         )
         start_time = floor(time.time())
         response = self.client.get(reverse("maas-scripts", args=["latest"]))
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEqual("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # The + 2 is for the index.json file and the custom enlistment script.
         self.assertEqual(len(NODE_INFO_SCRIPTS) + 2, len(tar.getmembers()))
@@ -1741,14 +1741,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # The + 1 is for the index.json file.
         self.assertEquals(
@@ -1821,14 +1821,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         # The + 2 is for the index.json file and the for_hardware script.
         self.assertEquals(orig_script_count + 2, len(tar.getmembers()))
         self.assertEquals(
@@ -1847,14 +1847,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # The + 1 is for the index.json file.
         self.assertEquals(
@@ -1894,14 +1894,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # The + 1 is for the index.json file.
         self.assertEquals(
@@ -1953,14 +1953,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # The + 1 is for the index.json file.
         self.assertEquals(
@@ -2021,14 +2021,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         self.assertEquals(2, len(tar.getmembers()))
 
         self.assertEquals(
@@ -2088,14 +2088,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # We have two scripts which have been run but the tar always includes
         # an index.json file so subtract one.
@@ -2161,14 +2161,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # index.json + one script + combined, stdout, stderr, and result
         # output.
@@ -2215,14 +2215,14 @@ class TestMAASScripts(MAASServerTestCase):
         response = make_node_client(node=node).get(
             reverse("maas-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertEquals("application/x-tar", response["Content-Type"])
-        tar = tarfile.open(mode="r", fileobj=BytesIO(response.content))
+        tar = tarfile.open(mode="r", fileobj=BytesIO(content))
         end_time = ceil(time.time())
         # index.json + one script + netplan.yaml
         self.assertEquals(3, len(tar.getmembers()))
@@ -2287,11 +2287,11 @@ class TestCommissioningAPI(MAASServerTestCase):
         response = make_node_client().get(
             reverse("commissioning-scripts", args=["latest"])
         )
+        content = b"".join(response.streaming_content)
         self.assertEqual(
             http.client.OK,
             response.status_code,
-            "Unexpected response %d: %s"
-            % (response.status_code, response.content),
+            "Unexpected response %d: %s" % (response.status_code, content),
         )
         self.assertIn(
             response["Content-Type"],
@@ -2302,7 +2302,7 @@ class TestCommissioningAPI(MAASServerTestCase):
                 "application/x-tgz",
             },
         )
-        archive = tarfile.open(fileobj=BytesIO(response.content))
+        archive = tarfile.open(fileobj=BytesIO(content))
         end_time = ceil(time.time())
 
         # Validate all builtin scripts are included
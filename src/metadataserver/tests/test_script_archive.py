@@ -0,0 +1,134 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for streaming script archives."""
+
+
+import base64
+from io import BytesIO
+import random
+import tarfile
+from unittest.mock import Mock
+
+from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
+from metadataserver import script_archive
+from metadataserver.script_archive import (
+    get_script_binary_content,
+    get_script_content,
+    ScriptPayloadCache,
+    TarStream,
+)
+
+
+class TestScriptPayloadCache(MAASTestCase):
+    def test_get_loads_once(self):
+        cache = ScriptPayloadCache()
+        payload = factory.make_bytes()
+        load = Mock(return_value=payload)
+        self.assertEqual(payload, cache.get((1, "text"), load))
+        self.assertIs(payload, cache.get((1, "text"), load))
+        load.assert_called_once_with()
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_get_evicts_least_recently_used(self):
+        cache = ScriptPayloadCache(max_size=10)
+        cache.get((1, "text"), lambda: b"x" * 4)
+        cache.get((2, "text"), lambda: b"y" * 4)
+        cache.get((1, "text"), lambda: b"z")
+        cache.get((3, "text"), lambda: b"w" * 4)
+        self.assertEqual(b"x" * 4, cache.get((1, "text"), lambda: b"z"))
+        self.assertEqual(b"new", cache.get((2, "text"), lambda: b"new"))
+        self.assertLessEqual(cache.size, cache.max_size)
+
+    def test_get_does_not_store_oversized_payloads(self):
+        cache = ScriptPayloadCache(max_size=2)
+        self.assertEqual(b"abc", cache.get((1, "text"), lambda: b"abc"))
+        self.assertEqual(0, cache.size)
+
+    def test_clear(self):
+        cache = ScriptPayloadCache()
+        cache.get((1, "text"), lambda: b"abc")
+        cache.clear()
+        self.assertEqual(0, cache.size)
+        self.assertEqual(b"def", cache.get((1, "text"), lambda: b"def"))
+
+
+class TestGetScriptContent(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(script_archive, "script_payloads", ScriptPayloadCache())
+
+    def make_script(self, data):
+        script = Mock(script_id=random.randint(0, 1000))
+        script.script.data = data
+        return script
+
+    def test_get_script_content(self):
+        data = factory.make_string()
+        script = self.make_script(data)
+        self.assertEqual(data.encode(), get_script_content(script))
+
+    def test_get_script_content_is_cached_by_version(self):
+        script = self.make_script("foo")
+        get_script_content(script)
+        script.script.data = "bar"
+        self.assertEqual(b"foo", get_script_content(script))
+
+    def test_get_script_binary_content_decodes_base64(self):
+        data = factory.make_bytes()
+        script = self.make_script(base64.b64encode(data).decode())
+        self.assertEqual(data, get_script_binary_content(script))
+
+    def test_get_script_binary_content_falls_back_to_text(self):
+        script = self.make_script("#!/bin/bash\n")
+        self.assertEqual(b"#!/bin/bash\n", get_script_binary_content(script))
+
+
+class TestTarStream(MAASTestCase):
+    def make_reference(self, members):
+        binary = BytesIO()
+        with tarfile.open(mode="w", fileobj=binary) as tar:
+            for path, content, mtime, mode in members:
+                tarinfo = tarfile.TarInfo(name=path)
+                tarinfo.size = len(content)
+                tarinfo.mode = mode
+                tarinfo.mtime = mtime
+                tar.addfile(tarinfo, BytesIO(content))
+        return binary.getvalue()
+
+    def test_matches_tarfile_output(self):
+        mtime = random.randint(0, 2 ** 31)
+        members = [
+            (factory.make_name("path"), factory.make_bytes(size), mtime, mode)
+            for size, mode in ((0, 0o755), (1, 0o644), (5000, 0o755))
+        ]
+        tar = TarStream(chunk_size=1024)
+        for path, content, mtime, mode in members:
+            tar.add(path, memoryview(content), mtime, mode)
+        self.assertEqual(self.make_reference(members), b"".join(tar))
+
+    def test_empty(self):
+        self.assertFalse(TarStream())
+        self.assertEqual(self.make_reference([]), b"".join(TarStream()))
+
+    def test_contains_and_getnames(self):
+        tar = TarStream()
+        tar.add("b", b"", 0)
+        tar.add("a", b"", 0)
+        self.assertIn("a", tar)
+        self.assertNotIn("c", tar)
+        self.assertEqual(["b", "a"], tar.getnames())
+
+    def test_chunks_are_bounded(self):
+        tar = TarStream(chunk_size=4096)
+        tar.add("big", factory.make_bytes(100000), 0)
+        self.assertLessEqual(
+            max(len(chunk) for chunk in tar),
+            tar.chunk_size + tarfile.RECORDSIZE,
+        )
+
+    def test_can_be_iterated_again(self):
+        tar = TarStream()
+        tar.add("a", b"abc", 0)
+        self.assertEqual(b"".join(tar), b"".join(tar))
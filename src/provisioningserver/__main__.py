@@ -19,6 +19,7 @@ import provisioningserver.utils.arp
 import provisioningserver.utils.avahi
 import provisioningserver.utils.beaconing
 import provisioningserver.utils.dhcp
+import provisioningserver.utils.observe_network
 import provisioningserver.utils.scan_network
 from provisioningserver.utils.script import MainScript
 import provisioningserver.utils.send_beacons
@@ -28,6 +29,7 @@ COMMON_COMMANDS = {
     "observe-beacons": provisioningserver.utils.beaconing,
     "observe-mdns": provisioningserver.utils.avahi,
     "observe-dhcp": provisioningserver.utils.dhcp,
+    "observe-network": provisioningserver.utils.observe_network,
     "send-beacons": provisioningserver.utils.send_beacons,
     "scan-network": provisioningserver.utils.scan_network,
     "setup-dns": provisioningserver.dns.commands.setup_dns,
@@ -4,14 +4,20 @@
 """Base pod driver."""
 
 from abc import abstractmethod
+from datetime import timedelta
 
 import attr
+from twisted.internet import reactor
+from twisted.internet.defer import maybeDeferred
 
 from provisioningserver.drivers import (
     IP_EXTRACTOR_SCHEMA,
     SETTING_PARAMETER_FIELD_SCHEMA,
 )
 from provisioningserver.drivers.power import PowerDriver, PowerDriverBase
+from provisioningserver.logger import LegacyLogger
+
+log = LegacyLogger()
 
 # JSON schema for what a pod driver definition should look like.
 JSON_POD_DRIVER_SCHEMA = {
@@ -446,6 +452,28 @@ class PodDriverBase(PowerDriverBase):
         """
         raise NotImplementedError()
 
+    def get_pod_key(self, context):
+        """Return a key for the pod hosting the machine in `context`.
+
+        Machines with equal keys are hosted by the same pod, and their power
+        states can be queried together with `power_query_many`.
+
+        :param context: Machine's power settings.
+        :returns: A hashable key, or `None` if the driver can't query
+            machines together.
+        """
+        return None
+
+    def power_query_many(self, contexts):
+        """Query the power states of machines hosted by the same pod.
+
+        :param contexts: Dictionary mapping system IDs to the power settings
+            of machines with the same key from `get_pod_key`.
+        :returns: `Deferred` returning a dictionary mapping system IDs to
+            power states. Machines that weren't found are left out.
+        """
+        raise NotImplementedError()
+
     def get_schema(self, detect_missing_packages=True):
         """Returns the JSON schema for the driver.
 
@@ -470,6 +498,53 @@ def get_error_message(err):
         return "Failed talking to pod: %s" % err
 
 
+class PodClientCache:
+    """Clients connected to pods, kept for as long as they're in use.
+
+    A client is dropped once it hasn't been used for `idle` seconds, calling
+    `close` with it if given.
+    """
+
+    def __init__(
+        self,
+        close=None,
+        idle=timedelta(minutes=10).total_seconds(),
+        clock=reactor,
+    ):
+        super().__init__()
+        self.clients = {}
+        self.close = close
+        self.idle = idle
+        self.clock = clock
+
+    def get(self, key):
+        """Return the client for `key`, or `None`."""
+        entry = self.clients.get(key)
+        if entry is None:
+            return None
+        client, expiry = entry
+        expiry.reset(self.idle)
+        return client
+
+    def add(self, key, client):
+        """Keep `client` for `key`, dropping any client already kept."""
+        self.discard(key)
+        expiry = self.clock.callLater(self.idle, self.discard, key)
+        self.clients[key] = client, expiry
+        return client
+
+    def discard(self, key):
+        """Drop the client for `key`, if there is one."""
+        entry = self.clients.pop(key, None)
+        if entry is not None:
+            client, expiry = entry
+            if expiry.active():
+                expiry.cancel()
+            if self.close is not None:
+                d = maybeDeferred(self.close, client)
+                d.addErrback(log.err, "Failed to close pod client.")
+
+
 class PodDriver(PowerDriver, PodDriverBase):
     """Default pod driver."""
 
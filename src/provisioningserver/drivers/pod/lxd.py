@@ -28,6 +28,7 @@ from provisioningserver.drivers.pod import (
     DiscoveredPodHints,
     DiscoveredPodStoragePool,
     InterfaceAttachType,
+    PodClientCache,
     PodDriver,
     RequestedMachine,
 )
@@ -50,6 +51,9 @@ maaslog = get_maas_logger("drivers.pod.lxd")
 # LXD status codes
 LXD_VM_POWER_STATE = {101: "on", 102: "off", 103: "on", 110: "off"}
 
+# Clients used to query power states, shared by queries to the same server.
+power_query_clients = PodClientCache()
+
 
 # LXD byte suffixes.
 # https://lxd.readthedocs.io/en/latest/instances/#units-for-storage-and-network-limits
@@ -215,6 +219,23 @@ class LXDPodDriver(PodDriver):
             )
         return client
 
+    def get_pod_key(self, context):
+        if context.get("power_address") and context.get("instance_name"):
+            return self.get_url(context), context.get("password")
+        else:
+            return None
+
+    @typed
+    @inlineCallbacks
+    def get_cached_client(self, pod_id: str, context: dict):
+        """Return a pylxd client, reusing one connected to the same server."""
+        key = self.get_pod_key(context)
+        client = power_query_clients.get(key)
+        if client is None:
+            client = yield self.get_client(pod_id, context)
+            power_query_clients.add(key, client)
+        return client
+
     @typed
     @inlineCallbacks
     def get_machine(self, pod_id: str, context: dict):
@@ -418,6 +439,36 @@ class LXDPodDriver(PodDriver):
                 f"Pod {pod_id}: Unknown power status code: {state}"
             )
 
+    @asynchronous
+    @inlineCallbacks
+    def power_query_many(self, contexts):
+        """Power query LXD VMs hosted by the same LXD server.
+
+        Every instance is fetched with a single request.
+        """
+        context = next(iter(contexts.values()))
+        key = self.get_pod_key(context)
+        client = yield self.get_cached_client(
+            context.get("power_address"), context
+        )
+        try:
+            response = yield deferToThread(
+                client.api.instances.get, params={"recursion": 1}
+            )
+        except Exception:
+            # The connection may have gone bad; start afresh next time.
+            power_query_clients.discard(key)
+            raise
+        power_states = {
+            instance["name"]: LXD_VM_POWER_STATE.get(instance["status_code"])
+            for instance in response.json()["metadata"]
+        }
+        return {
+            system_id: power_states[context.get("instance_name")]
+            for system_id, context in contexts.items()
+            if power_states.get(context.get("instance_name")) is not None
+        }
+
     async def discover(self, pod_id, context):
         """Discover all Pod host resources."""
         # Connect to the Pod and make sure it is valid.
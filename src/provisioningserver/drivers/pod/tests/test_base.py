@@ -4,7 +4,7 @@
 """Tests for `provisioningserver.drivers.pod`."""
 
 import random
-from unittest.mock import sentinel
+from unittest.mock import Mock, sentinel
 
 from jsonschema import validate
 from testtools.matchers import (
@@ -16,6 +16,7 @@ from testtools.matchers import (
     MatchesListwise,
     MatchesStructure,
 )
+from twisted.internet.task import Clock
 
 from maastesting.factory import factory
 from maastesting.testcase import MAASTestCase
@@ -33,6 +34,7 @@ from provisioningserver.drivers.pod import (
     KnownHostInterface,
     PodActionError,
     PodAuthError,
+    PodClientCache,
     PodConnError,
     PodDriverBase,
     PodError,
@@ -1021,6 +1023,16 @@ class TestPodDriverBase(MAASTestCase):
             {},
         )
 
+    def test_get_pod_key(self):
+        fake_driver = make_pod_driver_base()
+        self.assertIsNone(fake_driver.get_pod_key({}))
+
+    def test_power_query_many(self):
+        fake_driver = make_pod_driver_base()
+        self.assertRaises(
+            NotImplementedError, fake_driver.power_query_many, {}
+        )
+
     def test_get_schema(self):
         fake_name = factory.make_name("name")
         fake_description = factory.make_name("description")
@@ -1051,6 +1063,50 @@ class TestPodDriverBase(MAASTestCase):
         validate(fake_driver.get_schema(), JSON_POD_DRIVER_SCHEMA)
 
 
+class TestPodClientCache(MAASTestCase):
+    def test_get_returns_client(self):
+        cache = PodClientCache(clock=Clock())
+        self.assertIsNone(cache.get(sentinel.key))
+        self.assertIs(
+            sentinel.client, cache.add(sentinel.key, sentinel.client)
+        )
+        self.assertIs(sentinel.client, cache.get(sentinel.key))
+
+    def test_drops_idle_clients(self):
+        clock = Clock()
+        close = Mock()
+        cache = PodClientCache(close=close, idle=10, clock=clock)
+        cache.add(sentinel.key, sentinel.client)
+        clock.advance(9)
+        self.assertIs(sentinel.client, cache.get(sentinel.key))
+        clock.advance(9)
+        self.assertIs(sentinel.client, cache.get(sentinel.key))
+        close.assert_not_called()
+        clock.advance(10)
+        self.assertIsNone(cache.get(sentinel.key))
+        close.assert_called_once_with(sentinel.client)
+
+    def test_add_replaces_client(self):
+        clock = Clock()
+        close = Mock()
+        cache = PodClientCache(close=close, clock=clock)
+        cache.add(sentinel.key, sentinel.old)
+        cache.add(sentinel.key, sentinel.new)
+        close.assert_called_once_with(sentinel.old)
+        self.assertIs(sentinel.new, cache.get(sentinel.key))
+        self.assertEqual(1, len(clock.getDelayedCalls()))
+
+    def test_discard_closes_client(self):
+        clock = Clock()
+        close = Mock()
+        cache = PodClientCache(close=close, clock=clock)
+        cache.add(sentinel.key, sentinel.client)
+        cache.discard(sentinel.key)
+        cache.discard(sentinel.key)
+        close.assert_called_once_with(sentinel.client)
+        self.assertEqual([], clock.getDelayedCalls())
+
+
 class TestGetErrorMessage(MAASTestCase):
 
     scenarios = [
@@ -10,6 +10,7 @@ from unittest.mock import Mock, PropertyMock, sentinel
 from testtools.matchers import Equals, IsInstance, MatchesAll, MatchesStructure
 from testtools.testcase import ExpectedException
 from twisted.internet.defer import ensureDeferred, inlineCallbacks
+from twisted.internet.task import Clock
 
 from maastesting.factory import factory
 from maastesting.matchers import MockCalledOnceWith
@@ -21,6 +22,7 @@ from provisioningserver.drivers.pod import (
     DiscoveredMachineInterface,
     DiscoveredPodHints,
     InterfaceAttachType,
+    PodClientCache,
 )
 from provisioningserver.drivers.pod import (
     RequestedMachine,
@@ -256,6 +258,80 @@ class TestLXDPodDriver(MAASTestCase):
         with ExpectedException(lxd_module.LXDPodError, error_msg):
             yield driver.power_query(pod_id, context)
 
+    def test_get_pod_key(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        self.assertEqual(
+            (driver.get_url(context), context["password"]),
+            driver.get_pod_key(context),
+        )
+        del context["instance_name"]
+        self.assertIsNone(driver.get_pod_key(context))
+
+    def patch_cached_client(self, driver, instances=()):
+        self.patch(
+            lxd_module, "power_query_clients", PodClientCache(clock=Clock())
+        )
+        get_client = self.patch(driver, "get_client")
+        client = get_client.return_value
+        response = client.api.instances.get.return_value
+        response.json.return_value = {"metadata": list(instances)}
+        return get_client
+
+    @inlineCallbacks
+    def test_power_query_many(self):
+        driver = lxd_module.LXDPodDriver()
+        context = self.make_parameters_context()
+        contexts = {
+            factory.make_name("system_id"): dict(
+                context, instance_name=factory.make_name("instance_name")
+            )
+            for _ in range(4)
+        }
+        names = [context["instance_name"] for context in contexts.values()]
+        instances = [
+            {"name": names[0], "status_code": 103},
+            {"name": names[1], "status_code": 102},
+            # Unknown states are left out.
+            {"name": names[2], "status_code": 106},
+            {"name": factory.make_name("other"), "status_code": 103},
+        ]
+        get_client = self.patch_cached_client(driver, instances)
+        power_states = yield driver.power_query_many(contexts)
+        system_ids = list(contexts)
+        self.assertEqual(
+            {system_ids[0]: "on", system_ids[1]: "off"}, power_states
+        )
+        client = get_client.return_value
+        self.assertThat(
+            client.api.instances.get,
+            MockCalledOnceWith(params={"recursion": 1}),
+        )
+
+    @inlineCallbacks
+    def test_power_query_many_reuses_client(self):
+        driver = lxd_module.LXDPodDriver()
+        context = self.make_parameters_context()
+        get_client = self.patch_cached_client(driver)
+        yield driver.power_query_many({"a": context})
+        yield driver.power_query_many({"b": context})
+        self.assertThat(
+            get_client, MockCalledOnceWith(context["power_address"], context)
+        )
+
+    @inlineCallbacks
+    def test_power_query_many_drops_client_on_error(self):
+        driver = lxd_module.LXDPodDriver()
+        context = self.make_parameters_context()
+        get_client = self.patch_cached_client(driver)
+        client = get_client.return_value
+        client.api.instances.get.side_effect = factory.make_exception()
+        with ExpectedException(type(client.api.instances.get.side_effect)):
+            yield driver.power_query_many({"a": context})
+        self.assertIsNone(
+            lxd_module.power_query_clients.get(driver.get_pod_key(context))
+        )
+
     @inlineCallbacks
     def test_discover_requires_client_to_have_vm_support(self):
         context = self.make_parameters_context()
@@ -16,6 +16,7 @@ import pexpect
 from testtools.matchers import Contains, Equals
 from testtools.testcase import ExpectedException
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import Clock
 from twisted.internet.threads import deferToThread
 
 from maastesting.factory import factory
@@ -26,6 +27,7 @@ from provisioningserver.drivers.pod import (
     DiscoveredPodStoragePool,
     InterfaceAttachType,
     KnownHostInterface,
+    PodClientCache,
     RequestedMachine,
     RequestedMachineBlockDevice,
     RequestedMachineInterface,
@@ -741,6 +743,26 @@ class TestVirshSSH(MAASTestCase):
         expected = conn.get_machine_state("")
         self.assertEqual(None, expected)
 
+    def test_get_machine_states(self):
+        output = dedent(
+            """\
+            list --all
+             Id   Name        State
+            ----------------------------
+             1    machine-a   running
+             -    machine-b   shut off
+            """
+        )
+        conn = self.configure_virshssh(output)
+        self.assertEqual(
+            {"machine-a": "running", "machine-b": "shut off"},
+            conn.get_machine_states(),
+        )
+
+    def test_get_machine_states_error(self):
+        conn = self.configure_virshssh("error:")
+        self.assertIsNone(conn.get_machine_states())
+
     def test_machine_mac_addresses_returns_list(self):
         macs = [factory.make_mac_address() for _ in range(2)]
         output = SAMPLE_IFLIST % (macs[0], macs[1])
@@ -2826,6 +2848,78 @@ class TestVirshPodDriver(MAASTestCase):
         with ExpectedException(virsh.VirshError):
             yield driver.power_state_virsh(power_address, power_id)
 
+    def test_get_pod_key(self):
+        driver = VirshPodDriver()
+        context = self.make_context()
+        self.assertEqual(
+            (context["power_address"], context["power_pass"]),
+            driver.get_pod_key(context),
+        )
+        context["power_pass"] = ""
+        self.assertEqual(
+            (context["power_address"], None), driver.get_pod_key(context)
+        )
+        del context["power_id"]
+        self.assertIsNone(driver.get_pod_key(context))
+
+    def patch_sessions(self, states):
+        self.patch(
+            virsh, "power_query_sessions", PodClientCache(clock=Clock())
+        )
+        self.patch(virsh.VirshSSH, "isalive").return_value = True
+        mock_login = self.patch(virsh.VirshSSH, "login")
+        mock_login.return_value = True
+        self.patch(virsh.VirshSSH, "get_machine_states").return_value = states
+        return mock_login
+
+    @inlineCallbacks
+    def test_power_query_many(self):
+        driver = VirshPodDriver()
+        contexts = {
+            factory.make_name("system_id"): self.make_context()
+            for _ in range(4)
+        }
+        power_ids = [context["power_id"] for context in contexts.values()]
+        self.patch_sessions(
+            {
+                power_ids[0]: virsh.VirshVMState.ON,
+                power_ids[1]: virsh.VirshVMState.OFF,
+                # Unknown states are left out.
+                power_ids[2]: "unknown",
+            }
+        )
+        power_states = yield driver.power_query_many(contexts)
+        system_ids = list(contexts)
+        self.assertEqual(
+            {system_ids[0]: "on", system_ids[1]: "off"}, power_states
+        )
+
+    @inlineCallbacks
+    def test_power_query_many_reuses_session(self):
+        driver = VirshPodDriver()
+        context = self.make_context()
+        mock_login = self.patch_sessions({})
+        yield driver.power_query_many({"a": context})
+        yield driver.power_query_many({"b": context})
+        self.assertThat(
+            mock_login,
+            MockCalledOnceWith(
+                context["power_address"], context["power_pass"]
+            ),
+        )
+
+    @inlineCallbacks
+    def test_power_query_many_drops_session_on_error(self):
+        driver = VirshPodDriver()
+        context = self.make_context()
+        self.patch_sessions(None)
+        self.patch(virsh.VirshSSH, "logout")
+        with ExpectedException(virsh.VirshError):
+            yield driver.power_query_many({"a": context})
+        self.assertIsNone(
+            virsh.power_query_sessions.get(driver.get_pod_key(context))
+        )
+
     @inlineCallbacks
     def test_discover_errors_on_failed_login(self):
         driver = VirshPodDriver()
@@ -15,7 +15,7 @@ from uuid import uuid4
 
 from lxml import etree
 import pexpect
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import DeferredLock, inlineCallbacks
 from twisted.internet.threads import deferToThread
 
 from provisioningserver.drivers import (
@@ -33,6 +33,7 @@ from provisioningserver.drivers.pod import (
     DiscoveredPodHints,
     DiscoveredPodStoragePool,
     InterfaceAttachType,
+    PodClientCache,
     PodDriver,
 )
 from provisioningserver.enum import LIBVIRT_NETWORK
@@ -270,6 +271,17 @@ VM_STATE_TO_POWER_STATE = {
 }
 
 
+def logout_session(session):
+    """Log out of a power query session dropped from the cache."""
+    conn, lock = session
+    return lock.run(deferToThread, conn.logout)
+
+
+# Logged in sessions, with locks to serialise their use, used to query power
+# states. They're shared by queries to the same host.
+power_query_sessions = PodClientCache(close=logout_session)
+
+
 class VirshError(Exception):
     """Failure communicating to virsh. """
 
@@ -480,6 +492,29 @@ class VirshSSH(pexpect.spawn):
             return None
         return state
 
+    def get_machine_states(self):
+        """Gets the states of all VMs, keyed by name."""
+        output = self.run(["list", "--all"]).strip()
+        if output.startswith("error:"):
+            return None
+        # Parse the `virsh list --all` output, which will look something
+        # like the following:
+        #
+        #  Id   Name     State
+        # -------------------------
+        #  1    vm-one   running
+        #  -    vm-two   shut off
+        #
+        # That is, skip the two lines of header, and then extract the name
+        # and the state, which can contain spaces.
+        states = {}
+        for line in output.splitlines()[2:]:
+            columns = line.split(None, 2)
+            if len(columns) == 3:
+                _, name, state = columns
+                states[name] = state.strip()
+        return states
+
     def get_machine_interface_info(self, machine):
         """Gets list of mac addressess assigned to the VM."""
         output = self.run(["domiflist", machine]).strip()
@@ -1386,6 +1421,53 @@ class VirshPodDriver(PodDriver):
         """Power query Virsh node."""
         return self.power_state_virsh(**context)
 
+    def get_pod_key(self, context):
+        if context.get("power_address") and context.get("power_id"):
+            # Blank passwords are sent as None; see `power_state_virsh`.
+            power_pass = context.get("power_pass") or None
+            return context["power_address"], power_pass
+        else:
+            return None
+
+    @asynchronous
+    @inlineCallbacks
+    def power_query_many(self, contexts):
+        """Power query Virsh nodes hosted by the same host.
+
+        The states of every VM are listed with a single command, using a
+        session that's kept logged in between queries.
+        """
+        key = power_address, power_pass = self.get_pod_key(
+            next(iter(contexts.values()))
+        )
+        session = power_query_sessions.get(key)
+        if session is None or not session[0].isalive():
+            conn = yield self.get_virsh_connection(
+                {"power_address": power_address, "power_pass": power_pass}
+            )
+            session = power_query_sessions.add(key, (conn, DeferredLock()))
+        conn, lock = session
+        try:
+            states = yield lock.run(deferToThread, conn.get_machine_states)
+        except Exception:
+            # The session may have gone bad; start afresh next time.
+            power_query_sessions.discard(key)
+            raise
+        if states is None:
+            power_query_sessions.discard(key)
+            raise VirshError("Failed to list VMs on %s" % power_address)
+        power_states = {
+            system_id: VM_STATE_TO_POWER_STATE.get(
+                states.get(context.get("power_id"))
+            )
+            for system_id, context in contexts.items()
+        }
+        return {
+            system_id: power_state
+            for system_id, power_state in power_states.items()
+            if power_state is not None
+        }
+
     @inlineCallbacks
     def get_virsh_connection(self, context):
         """Connect and return the virsh connection."""
@@ -6,7 +6,16 @@
 from collections import namedtuple
 from logging import DEBUG, ERROR, INFO, WARN
 
-from twisted.internet.defer import maybeDeferred, succeed
+from twisted.internet import reactor
+from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
+    inlineCallbacks,
+    maybeDeferred,
+    succeed,
+)
+from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
 from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.rpc import getRegionClient
@@ -16,6 +25,7 @@ from provisioningserver.rpc.region import (
     SendEvent,
     SendEventIPAddress,
     SendEventMACAddress,
+    SendEvents,
 )
 from provisioningserver.utils.env import get_maas_id
 from provisioningserver.utils.twisted import (
@@ -32,6 +42,12 @@ log = LegacyLogger()
 # AUDIT event logging level
 AUDIT = 0
 
+# Node events logged by MAC or IP address are held back for this many
+# seconds, or until this many distinct events are waiting, and then sent to
+# the region together.
+EVENT_BATCH_DELAY = 0.5
+EVENT_BATCH_SIZE = 100
+
 
 class EVENT_TYPES:
     # Power-related events.
@@ -417,12 +433,22 @@ class NodeEventHub:
 
     This automatically ensures that the event type is registered before
     sending logs to the region.
+
+    Events logged by MAC or IP address, like those for each file a booting
+    node requests, are batched. Repeats of an event within a batch are sent
+    once, with a count.
     """
 
-    def __init__(self):
+    def __init__(self, clock=reactor):
         super().__init__()
         self._types_registering = dict()
         self._types_registered = set()
+        self.clock = clock
+        # Maps (event_type, address_kind, address, description) to the
+        # Deferreds of each call that logged that event, in the order they
+        # were first logged.
+        self._batch = {}
+        self._batchCall = None
 
     @asynchronous
     def registerEventType(self, event_type):
@@ -530,7 +556,8 @@ class NodeEventHub:
     def logByMAC(self, event_type, mac_address, description=""):
         """Send the given node event to the region.
 
-        The node is specified by its MAC address.
+        The node is specified by its MAC address. The event is sent with
+        others in a batch.
 
         :param event_type: The type of the event.
         :type event_type: unicode
@@ -538,34 +565,18 @@ class NodeEventHub:
         :type mac_address: unicode
         :param description: An optional description of the event.
         :type description: unicode
+        :return: :class:`Deferred` that fires once the batch has been sent.
         """
-
-        def send(_):
-            client = getRegionClient()
-            return client(
-                SendEventMACAddress,
-                mac_address=mac_address,
-                type_name=event_type,
-                description=description,
-            )
-
-        d = self.ensureEventTypeRegistered(event_type).addCallback(send)
-        d.addErrback(self._checkEventTypeRegistered, event_type)
-
-        # Suppress NoSuchNode. This happens during enlistment because the
-        # region does not yet know of the node; it's quite normal. Logging
-        # tracebacks telling us about it is not useful. Perhaps the region
-        # should store these logs anyway. Then, if and when the node is
-        # enlisted, logs prior to enlistment can be seen.
-        d.addErrback(suppress, NoSuchNode)
-
-        return d
+        return self._addToBatch(
+            event_type, "mac_address", mac_address, description
+        )
 
     @asynchronous
     def logByIP(self, event_type, ip_address, description=""):
         """Send the given node event to the region.
 
-        The node is specified by its MAC address.
+        The node is specified by its IP address. The event is sent with others
+        in a batch.
 
         :param event_type: The type of the event.
         :type event_type: unicode
@@ -573,28 +584,115 @@ class NodeEventHub:
         :type ip_address: unicode
         :param description: An optional description of the event.
         :type description: unicode
+        :return: :class:`Deferred` that fires once the batch has been sent.
+        """
+        return self._addToBatch(
+            event_type, "ip_address", ip_address, description
+        )
+
+    def _addToBatch(self, event_type, kind, address, description):
+        d = Deferred()
+        key = event_type, kind, address, description
+        self._batch.setdefault(key, []).append(d)
+        if len(self._batch) >= EVENT_BATCH_SIZE:
+            self.flush()
+        elif self._batchCall is None:
+            self._batchCall = self.clock.callLater(
+                EVENT_BATCH_DELAY, self.flush
+            )
+        return d
+
+    @asynchronous
+    def flush(self):
+        """Send the events batched so far to the region now.
+
+        :return: :class:`Deferred` that fires once the batch has been sent.
+        """
+        if self._batchCall is not None:
+            if self._batchCall.active():
+                self._batchCall.cancel()
+            self._batchCall = None
+        batch, self._batch = self._batch, {}
+        if len(batch) == 0:
+            return succeed(None)
+        else:
+            return self._sendBatch(batch)
+
+    @inlineCallbacks
+    def _sendBatch(self, batch):
+        """Send `batch` to the region, then fire the Deferreds waiting on it.
+
+        Regions that predate `SendEvents` are sent each event separately,
+        once for each time it was logged.
         """
+        try:
+            for event_type in {key[0] for key in batch}:
+                yield self.ensureEventTypeRegistered(event_type)
+            client = getRegionClient()
+            yield client(
+                SendEvents,
+                node_events=[
+                    {
+                        "type_name": event_type,
+                        "description": description,
+                        "count": len(waiting),
+                        kind: address,
+                    }
+                    for (
+                        (event_type, kind, address, description),
+                        waiting,
+                    ) in batch.items()
+                ],
+            )
+        except UnhandledCommand:
+            yield DeferredList(
+                [
+                    self._sendEach(key, waiting)
+                    for key, waiting in batch.items()
+                ]
+            )
+        except Exception:
+            failure = Failure()
+            for waiting in batch.values():
+                for d in waiting:
+                    d.errback(failure)
+        else:
+            for waiting in batch.values():
+                for d in waiting:
+                    d.callback(None)
+
+    def _sendEach(self, key, waiting):
+        """Send the event `key` once for each of the Deferreds `waiting`."""
+        event_type, kind, address, description = key
+        if kind == "mac_address":
+            command = SendEventMACAddress
+        else:
+            command = SendEventIPAddress
 
         def send(_):
             client = getRegionClient()
             return client(
-                SendEventIPAddress,
-                ip_address=ip_address,
+                command,
                 type_name=event_type,
                 description=description,
+                **{kind: address}
             )
 
-        d = self.ensureEventTypeRegistered(event_type).addCallback(send)
-        d.addErrback(self._checkEventTypeRegistered, event_type)
-
-        # Suppress NoSuchNode. This happens during enlistment because the
-        # region does not yet know of the node; it's quite normal. Logging
-        # tracebacks telling us about it is not useful. Perhaps the region
-        # should store these logs anyway. Then, if and when the node is
-        # enlisted, logs prior to enlistment can be seen.
-        d.addErrback(suppress, NoSuchNode)
-
-        return d
+        sent = []
+        for waiting_d in waiting:
+            d = self.ensureEventTypeRegistered(event_type).addCallback(send)
+            d.addErrback(self._checkEventTypeRegistered, event_type)
+
+            # Suppress NoSuchNode. This happens during enlistment because the
+            # region does not yet know of the node; it's quite normal. Logging
+            # tracebacks telling us about it is not useful. Perhaps the region
+            # should store these logs anyway. Then, if and when the node is
+            # enlisted, logs prior to enlistment can be seen.
+            d.addErrback(suppress, NoSuchNode)
+
+            d.chainDeferred(waiting_d)
+            sent.append(d)
+        return DeferredList(sent, consumeErrors=True)
 
 
 # Singleton.
@@ -194,6 +194,15 @@ class ProvisioningServiceMaker:
         external_service.setName("external")
         return external_service
 
+    def _makeRuntimeMetricsService(self):
+        from provisioningserver.prometheus.runtime import (
+            RuntimeMetricsService,
+        )
+
+        runtime_metrics = RuntimeMetricsService(reactor)
+        runtime_metrics.setName("runtime_metrics")
+        return runtime_metrics
+
     def _makeServices(self, tftp_root, tftp_port, clock=reactor):
         # Several services need to make use of the RPC service.
         rpc_service = self._makeRPCService()
@@ -208,6 +217,7 @@ class ProvisioningServiceMaker:
         yield self._makeImageDownloadService(rpc_service, tftp_root)
         yield self._makeRackHTTPService(tftp_root, rpc_service)
         yield self._makeExternalService(rpc_service)
+        yield self._makeRuntimeMetricsService()
         # The following are network-accessible services.
         yield self._makeHTTPService()
         yield self._makeTFTPService(tftp_root, tftp_port, rpc_service)
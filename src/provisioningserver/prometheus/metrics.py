@@ -64,6 +64,62 @@ METRICS_DEFINITIONS = [
         "Latency of Region-Rack RPC call",
         ["call"],
     ),
+    MetricDefinition(
+        "Histogram",
+        "maas_database_pool_wait_time",
+        "Time spent waiting for a database thread, by class of work",
+        ["priority"],
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_database_tasks_queue_depth",
+        "Number of database tasks waiting to run",
+        multiprocess_mode="liveall",
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_listener_pending_notifications",
+        "Number of database notifications waiting to be handled",
+        multiprocess_mode="liveall",
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_listener_handler_latency",
+        "Time taken to handle a database notification",
+        ["channel"],
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_dns_reloads",
+        "Number of times the DNS server was reloaded",
+        ["result"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_dns_publication_latency",
+        "Time from a DNS change being published to the DNS server being "
+        "reloaded with it",
+        buckets=[0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_dns_reload_publications",
+        "Number of DNS publications included in a reload",
+        buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500],
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_rbac_permission_cache_lookups",
+        "Number of RBAC permission lookups, by whether the shared cache "
+        "answered them and whether access was allowed",
+        ["result", "access"],
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_region_startup_phase_duration",
+        "Time taken by each phase of the region start-up, in seconds",
+        ["phase"],
+    ),
     MetricDefinition(
         "Histogram",
         "maas_websocket_call_latency",
@@ -84,6 +140,37 @@ METRICS_DEFINITIONS = [
         _WEBSOCKET_CALL_LABELS,
     ),
     # Common metrics
+    MetricDefinition(
+        "Histogram",
+        "maas_reactor_lag",
+        "Time by which the reactor was late to make a call that was due",
+        buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_thread_pool_queue_depth",
+        "Number of calls waiting for a thread in a thread-pool",
+        ["pool"],
+        multiprocess_mode="liveall",
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_thread_pool_wait_time",
+        "Time spent waiting for a thread in a thread-pool",
+        ["pool"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_service_monitor_cycle_latency",
+        "Time taken to ensure that all services are in their expected state",
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_service_monitor_cycle_commands",
+        "Number of commands executed to ensure that all services are in "
+        "their expected state",
+        buckets=[0, 1, 2, 5, 10, 20, 50],
+    ),
     *node_metrics_definitions(),
 ]
 
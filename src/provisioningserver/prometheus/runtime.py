@@ -0,0 +1,83 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Metrics about the event loop of a process and the work queued in it."""
+
+__all__ = ["RuntimeMetricsService", "sample_reactor_thread_pool"]
+
+from twisted.application.service import Service
+from twisted.internet import reactor
+from twisted.python import threadpool
+
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
+
+log = LegacyLogger()
+
+
+def sample_reactor_thread_pool(prometheus_metrics):
+    """Export the number of calls waiting for the reactor's thread-pool."""
+    pool = reactor.threadpool
+    if isinstance(pool, threadpool.ThreadPool):
+        prometheus_metrics.update(
+            "maas_thread_pool_queue_depth",
+            "set",
+            value=pool.q.qsize(),
+            labels={"pool": pool.name},
+        )
+
+
+class RuntimeMetricsService(Service):
+    """Measure the lag of the reactor and sample queues of work.
+
+    Every `interval` seconds, the time by which the reactor was late to make
+    a call that was due is observed, then each sampler is called with the
+    `PrometheusMetrics` to update gauges, such as the depth of a queue, for
+    this process.
+    """
+
+    def __init__(
+        self,
+        clock=reactor,
+        samplers=(),
+        interval=1.0,
+        prometheus_metrics=PROMETHEUS_METRICS,
+    ):
+        """Initialise a new `RuntimeMetricsService`.
+
+        :param samplers: Callables to be called with `prometheus_metrics`
+            as well as `sample_reactor_thread_pool`.
+        """
+        super().__init__()
+        self.clock = clock
+        self.samplers = [sample_reactor_thread_pool, *samplers]
+        self.interval = interval
+        self.prometheus_metrics = prometheus_metrics
+        self._call = None
+        self._due = None
+
+    def startService(self):
+        super().startService()
+        self._schedule()
+
+    def stopService(self):
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+        return super().stopService()
+
+    def _schedule(self):
+        self._due = self.clock.seconds() + self.interval
+        self._call = self.clock.callLater(self.interval, self._probe)
+
+    def _probe(self):
+        lag = max(0.0, self.clock.seconds() - self._due)
+        self.prometheus_metrics.update(
+            "maas_reactor_lag", "observe", value=lag
+        )
+        for sampler in self.samplers:
+            try:
+                sampler(self.prometheus_metrics)
+            except Exception:
+                log.err(None, "Failure sampling runtime metrics.")
+        self._schedule()
@@ -0,0 +1,126 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `provisioningserver.prometheus.runtime`."""
+
+
+from unittest.mock import ANY, call, Mock
+
+from twisted.internet.task import Clock
+from twisted.python.threadpool import ThreadPool
+
+from maastesting.factory import factory
+from maastesting.matchers import (
+    DocTestMatches,
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
+from provisioningserver.prometheus import runtime
+from provisioningserver.prometheus.runtime import (
+    RuntimeMetricsService,
+    sample_reactor_thread_pool,
+)
+
+
+class TestSampleReactorThreadPool(MAASTestCase):
+    def test_exports_queue_depth(self):
+        pool = ThreadPool(name="sodor")
+        pool.callInThread(lambda: None)  # Queued; the pool isn't started.
+        self.patch(runtime, "reactor").threadpool = pool
+        prometheus_metrics = Mock()
+        sample_reactor_thread_pool(prometheus_metrics)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCalledOnceWith(
+                "maas_thread_pool_queue_depth",
+                "set",
+                value=1,
+                labels={"pool": "sodor"},
+            ),
+        )
+
+    def test_does_nothing_without_thread_pool(self):
+        self.patch(runtime, "reactor").threadpool = None
+        prometheus_metrics = Mock()
+        sample_reactor_thread_pool(prometheus_metrics)
+        self.assertThat(prometheus_metrics.update, MockNotCalled())
+
+
+class TestRuntimeMetricsService(MAASTestCase):
+    def make_service(self, samplers=()):
+        self.patch(runtime, "sample_reactor_thread_pool")
+        clock = Clock()
+        prometheus_metrics = Mock()
+        service = RuntimeMetricsService(
+            clock,
+            samplers,
+            interval=1.0,
+            prometheus_metrics=prometheus_metrics,
+        )
+        return service, clock, prometheus_metrics
+
+    def test_samples_reactor_thread_pool(self):
+        service, _, _ = self.make_service()
+        self.assertEqual(
+            [runtime.sample_reactor_thread_pool], service.samplers
+        )
+
+    def test_observes_reactor_lag(self):
+        service, clock, prometheus_metrics = self.make_service()
+        service.startService()
+        self.addCleanup(service.stopService)
+        clock.advance(1.25)
+        clock.advance(1.0)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCallsMatch(
+                call("maas_reactor_lag", "observe", value=0.25),
+                call("maas_reactor_lag", "observe", value=0.0),
+            ),
+        )
+
+    def test_calls_samplers(self):
+        sampler = Mock()
+        service, clock, prometheus_metrics = self.make_service([sampler])
+        service.startService()
+        self.addCleanup(service.stopService)
+        clock.advance(1.0)
+        self.assertThat(sampler, MockCalledOnceWith(prometheus_metrics))
+        self.assertThat(
+            runtime.sample_reactor_thread_pool,
+            MockCalledOnceWith(prometheus_metrics),
+        )
+
+    def test_logs_sampler_failures_and_carries_on(self):
+        broken = Mock(side_effect=factory.make_exception())
+        sampler = Mock()
+        service, clock, _ = self.make_service([broken, sampler])
+        service.startService()
+        self.addCleanup(service.stopService)
+        with TwistedLoggerFixture() as logger:
+            clock.advance(1.0)
+        self.assertThat(sampler, MockCalledOnceWith(ANY))
+        self.assertThat(
+            logger.output,
+            DocTestMatches(
+                """\
+                Failure sampling runtime metrics.
+                Traceback (most recent call last):
+                ...
+                maastesting.factory.TestException#...
+                """
+            ),
+        )
+        clock.advance(1.0)
+        self.assertEqual(2, sampler.call_count)
+
+    def test_stop_cancels_probe(self):
+        service, clock, prometheus_metrics = self.make_service()
+        service.startService()
+        service.stopService()
+        self.assertEqual([], clock.getDelayedCalls())
+        clock.advance(1.0)
+        self.assertThat(prometheus_metrics.update, MockNotCalled())
@@ -58,7 +58,7 @@ def run():
 
         users = ["root"]
         # Allow dhcpd user to call dhcp-notify, and maas user to call
-        # observe-arp.
+        # observe-arp, observe-beacons and observe-network.
         if not is_snap and len(sys.argv) > 1:
             if sys.argv[1] == "dhcp-notify":
                 users.append("dhcpd")
@@ -66,6 +66,8 @@ def run():
                 users.append("maas")
             if sys.argv[1] == "observe-beacons":
                 users.append("maas")
+            if sys.argv[1] == "observe-network":
+                users.append("maas")
             if sys.argv[1] == "observe-mdns":
                 # Any user can call this. (It might be necessary for a normal
                 # user to call this for support/debugging purposes.)
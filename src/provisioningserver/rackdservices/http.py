@@ -30,6 +30,7 @@ from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.prometheus.resource import PrometheusMetricsResource
 from provisioningserver.service_monitor import service_monitor
 from provisioningserver.utils import load_template, snappy
+from provisioningserver.utils.debug import ProfilerResource
 from provisioningserver.utils.fs import atomic_write
 from provisioningserver.utils.twisted import callOut
 
@@ -345,3 +346,4 @@ class HTTPResource(resource.Resource):
         self.putChild(
             b"metrics", PrometheusMetricsResource(PROMETHEUS_METRICS)
         )
+        self.putChild(b"profile", ProfilerResource())
@@ -7,8 +7,9 @@
 from datetime import timedelta
 
 from twisted.application.internet import TimerService
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, returnValue
 from twisted.internet.error import ConnectionDone
+from twisted.protocols.amp import UnhandledCommand
 
 from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.rpc import getRegionClient
@@ -17,7 +18,10 @@ from provisioningserver.rpc.exceptions import (
     NoSuchCluster,
 )
 from provisioningserver.rpc.power import query_all_nodes
-from provisioningserver.rpc.region import ListNodePowerParameters
+from provisioningserver.rpc.region import (
+    ListDueNodePowerParameters,
+    ListNodePowerParameters,
+)
 
 maaslog = get_maas_logger("power_monitor_service")
 log = LegacyLogger()
@@ -56,10 +60,7 @@ class NodePowerMonitorService(TimerService, object):
         # Get the nodes' power parameters from the region. Keep getting more
         # power parameters until the region returns an empty list.
         while True:
-            response = yield client(
-                ListNodePowerParameters, uuid=client.localIdent
-            )
-            power_parameters = response["nodes"]
+            power_parameters = yield self.get_power_parameters(client)
             if len(power_parameters) > 0:
                 yield query_all_nodes(
                     power_parameters,
@@ -69,6 +70,23 @@ class NodePowerMonitorService(TimerService, object):
             else:
                 break
 
+    @inlineCallbacks
+    def get_power_parameters(self, client):
+        """Get power parameters for the nodes that are due a check.
+
+        All of them are requested at once, falling back to a page at a time
+        from regions that predate `ListDueNodePowerParameters`.
+        """
+        try:
+            response = yield client(
+                ListDueNodePowerParameters, system_id=client.localIdent
+            )
+        except UnhandledCommand:
+            response = yield client(
+                ListNodePowerParameters, uuid=client.localIdent
+            )
+        returnValue(response["nodes"])
+
     def query_nodes_failed(self, failure, localIdent):
         if failure.check(NoSuchCluster):
             maaslog.error(
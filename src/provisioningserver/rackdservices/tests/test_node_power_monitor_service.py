@@ -62,6 +62,50 @@ class TestNodePowerMonitorService(MAASTestCase):
             MockCalledOnceWith(ANY, uuid=client.localIdent),
         )
 
+    def test_query_nodes_requests_all_due_nodes(self):
+        service = self.make_monitor_service()
+        service.max_nodes_at_once = sentinel.max_nodes_at_once
+
+        example_power_parameters = [
+            {
+                "system_id": factory.make_name("system_id"),
+                "hostname": factory.make_hostname(),
+                "power_state": factory.make_name("power_state"),
+                "power_type": factory.make_name("power_type"),
+                "context": {},
+            }
+            for _ in range(3)
+        ]
+
+        rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        proto_region, io = rpc_fixture.makeEventLoop(
+            region.ListDueNodePowerParameters, region.ListNodePowerParameters
+        )
+        proto_region.ListDueNodePowerParameters.side_effect = [
+            succeed({"nodes": example_power_parameters}),
+            succeed({"nodes": []}),
+        ]
+
+        query_all_nodes = self.patch(npms, "query_all_nodes")
+
+        client = getRegionClient()
+        d = service.query_nodes(client)
+        io.flush()
+
+        self.assertEqual(None, extract_result(d))
+        self.assertThat(
+            query_all_nodes,
+            MockCalledOnceWith(
+                example_power_parameters,
+                max_concurrency=sentinel.max_nodes_at_once,
+                clock=service.clock,
+            ),
+        )
+        proto_region.ListDueNodePowerParameters.assert_called_with(
+            ANY, system_id=client.localIdent
+        )
+        proto_region.ListNodePowerParameters.assert_not_called()
+
     def test_query_nodes_calls_query_all_nodes(self):
         service = self.make_monitor_service()
         service.max_nodes_at_once = sentinel.max_nodes_at_once
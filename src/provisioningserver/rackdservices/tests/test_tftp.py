@@ -27,10 +27,17 @@ from testtools.matchers import (
     MatchesStructure,
 )
 from tftp.backend import IReader
-from tftp.datagram import RQDatagram
+from tftp.datagram import (
+    ACKDatagram,
+    ERRORDatagram,
+    RQDatagram,
+    split_opcode,
+    TFTPDatagramFactory,
+)
 from tftp.errors import BackendError, FileNotFound
 import tftp.protocol
 from tftp.protocol import TFTP
+from tftp.session import ReadSession
 from twisted.application import internet
 from twisted.application.service import MultiService
 from twisted.internet import reactor
@@ -39,6 +46,7 @@ from twisted.internet.defer import fail, inlineCallbacks, succeed
 from twisted.internet.protocol import Protocol
 from twisted.internet.task import Clock
 from twisted.python import context
+from twisted.python.filepath import FilePath
 from zope.interface.verify import verifyObject
 
 from maastesting.factory import factory
@@ -54,7 +62,9 @@ from provisioningserver.prometheus.metrics import METRICS_DEFINITIONS
 from provisioningserver.prometheus.utils import create_metrics
 from provisioningserver.rackdservices import tftp as tftp_module
 from provisioningserver.rackdservices.tftp import (
+    BootloaderCache,
     get_boot_image,
+    get_bootloader_filenames,
     log_request,
     Port,
     TFTPBackend,
@@ -62,6 +72,8 @@ from provisioningserver.rackdservices.tftp import (
     track_tftp_latency,
     TransferTimeTrackingTFTP,
     UDPServer,
+    WindowedReadSession,
+    WindowedRemoteOriginReadSession,
 )
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import GetBootConfig
@@ -193,6 +205,94 @@ class TestBytesReader(MAASTestCase):
         self.assertRaises(ValueError, reader.read, 1)
 
 
+class TestGetBootloaderFilenames(MAASTestCase):
+    """Tests for `get_bootloader_filenames`."""
+
+    def test_includes_bootloaders_of_each_boot_method(self):
+        self.assertTrue(
+            {
+                "bootx64.efi",
+                "grubx64.efi",
+                "grubaa64.efi",
+                "lpxelinux.0",
+                "pxelinux.0",
+                "ldlinux.c32",
+            }.issubset(get_bootloader_filenames())
+        )
+
+
+class TestBootloaderCache(MAASTestCase):
+    """Tests for `BootloaderCache`."""
+
+    def make_bootloader(self, name="bootx64.efi", data=None):
+        if data is None:
+            data = factory.make_bytes()
+        path = self.make_file(name=name, contents=data)
+        return FilePath(os.path.dirname(path)), data
+
+    def test_returns_reader_for_bootloader(self):
+        base_path, data = self.make_bootloader()
+        cache = BootloaderCache(["bootx64.efi"])
+        reader = cache.get_reader(base_path, b"bootx64.efi")
+        self.addCleanup(reader.finish)
+        verifyObject(IReader, reader)
+        self.assertEqual(len(data), reader.size)
+        self.assertEqual(data, reader.read(len(data) + 1))
+
+    def test_returns_reader_for_bootloader_in_subdirectory(self):
+        base_path, data = self.make_bootloader()
+        os.mkdir(base_path.child("grub").path)
+        os.rename(
+            base_path.child("bootx64.efi").path,
+            base_path.child("grub").child("bootx64.efi").path,
+        )
+        cache = BootloaderCache(["bootx64.efi"])
+        reader = cache.get_reader(base_path, b"grub/bootx64.efi")
+        self.addCleanup(reader.finish)
+        self.assertEqual(data, reader.read(len(data)))
+
+    def test_reads_bootloader_once(self):
+        base_path, data = self.make_bootloader()
+        cache = BootloaderCache(["bootx64.efi"])
+        cache.get_reader(base_path, b"bootx64.efi")
+        mock_open = self.patch(tftp_module, "open")
+        reader = cache.get_reader(base_path, b"bootx64.efi")
+        self.addCleanup(reader.finish)
+        self.assertThat(mock_open, MockNotCalled())
+        self.assertEqual(data, reader.read(len(data)))
+
+    def test_rereads_bootloader_with_new_inode(self):
+        base_path, _ = self.make_bootloader()
+        cache = BootloaderCache(["bootx64.efi"])
+        cache.get_reader(base_path, b"bootx64.efi")
+        data = factory.make_bytes()
+        new_path = self.make_file(contents=data)
+        os.rename(new_path, base_path.child("bootx64.efi").path)
+        reader = cache.get_reader(base_path, b"bootx64.efi")
+        self.addCleanup(reader.finish)
+        self.assertEqual(data, reader.read(len(data)))
+        self.assertThat(cache.files, HasLength(1))
+
+    def test_returns_None_for_other_files(self):
+        base_path, _ = self.make_bootloader(name="initrd")
+        cache = BootloaderCache(["bootx64.efi"])
+        self.assertIsNone(cache.get_reader(base_path, b"initrd"))
+        self.assertThat(cache.files, HasLength(0))
+
+    def test_returns_None_for_missing_bootloader(self):
+        cache = BootloaderCache(["bootx64.efi"])
+        self.assertIsNone(
+            cache.get_reader(FilePath(self.make_dir()), b"bootx64.efi")
+        )
+
+    def test_returns_None_for_insecure_path(self):
+        base_path, _ = self.make_bootloader()
+        cache = BootloaderCache(["bootx64.efi"])
+        self.assertIsNone(
+            cache.get_reader(base_path.child("sub"), b"../bootx64.efi")
+        )
+
+
 class TestTFTPBackend(MAASTestCase):
     """Tests for `TFTPBackend`."""
 
@@ -229,6 +329,17 @@ class TestTFTPBackend(MAASTestCase):
         self.assertEqual(data, reader.read(len(data)))
         self.assertEqual(b"", reader.read(1))
 
+    @inlineCallbacks
+    def test_get_reader_bootloader_from_cache(self):
+        data = factory.make_bytes()
+        temp_file = self.make_file(name="bootx64.efi", contents=data)
+        backend = TFTPBackend(os.path.dirname(temp_file), Mock())
+        reader = yield backend.get_reader(b"bootx64.efi")
+        self.addCleanup(reader.finish)
+        self.assertThat(reader, IsInstance(BytesReader))
+        self.assertEqual(data, reader.read(len(data)))
+        self.assertThat(backend.bootloaders.files, HasLength(1))
+
     @inlineCallbacks
     def test_get_reader_handles_backslashes_in_path(self):
         data = factory.make_string().encode("ascii")
@@ -1121,6 +1232,148 @@ class TestTrackTFTPLatency(MAASTestCase):
         )
 
 
+class FakeSessionTransport:
+    def __init__(self):
+        self.written = []
+        self.listening = True
+
+    def write(self, data, addr=None):
+        self.written.append(TFTPDatagramFactory(*split_opcode(data)))
+
+    def stopListening(self):
+        self.listening = False
+
+    def pop(self):
+        written, self.written = self.written, []
+        return [(datagram.blocknum, datagram.data) for datagram in written]
+
+
+class TestWindowedReadSession(MAASTestCase):
+    """Tests for `WindowedReadSession`."""
+
+    def make_session(self, blocks, window_size=4, block_size=8):
+        data = factory.make_bytes(size=blocks * block_size - 1)
+        clock = Clock()
+        session = WindowedReadSession(BytesReader(data), _clock=clock)
+        session.block_size = block_size
+        session.window_size = window_size
+        session.transport = FakeSessionTransport()
+        blocks = [
+            (number + 1, data[offset : offset + block_size])
+            for number, offset in enumerate(range(0, len(data), block_size))
+        ]
+        return session, clock, blocks
+
+    def test_sends_window_of_blocks(self):
+        session, _, blocks = self.make_session(blocks=10)
+        session.startProtocol()
+        self.assertEqual(blocks[:4], session.transport.pop())
+
+    def test_sends_next_window_on_ack_of_last_block(self):
+        session, _, blocks = self.make_session(blocks=10)
+        session.startProtocol()
+        session.transport.pop()
+        session.datagramReceived(ACKDatagram(4))
+        self.assertEqual(blocks[4:8], session.transport.pop())
+
+    def test_resends_from_block_after_partial_ack(self):
+        session, _, blocks = self.make_session(blocks=10)
+        session.startProtocol()
+        session.transport.pop()
+        session.datagramReceived(ACKDatagram(2))
+        self.assertEqual(blocks[2:6], session.transport.pop())
+
+    def test_ignores_duplicate_ack(self):
+        session, _, blocks = self.make_session(blocks=10)
+        session.startProtocol()
+        session.datagramReceived(ACKDatagram(4))
+        session.transport.pop()
+        session.datagramReceived(ACKDatagram(4))
+        self.assertEqual([], session.transport.pop())
+
+    def test_completes_on_ack_of_last_block(self):
+        session, _, blocks = self.make_session(blocks=6)
+        session.startProtocol()
+        session.datagramReceived(ACKDatagram(4))
+        self.assertEqual(blocks[4:], session.transport.pop())
+        self.assertTrue(session.transport.listening)
+        session.datagramReceived(ACKDatagram(6))
+        self.assertFalse(session.transport.listening)
+
+    def test_resends_window_until_timed_out(self):
+        session, clock, blocks = self.make_session(blocks=10)
+        session.timeout = (1, 3, 7)
+        session.startProtocol()
+        clock.advance(1)
+        clock.advance(3)
+        self.assertEqual(blocks[:4] * 3, session.transport.pop())
+        self.assertTrue(session.transport.listening)
+        clock.advance(7)
+        self.assertEqual([], session.transport.pop())
+        self.assertFalse(session.transport.listening)
+
+    def test_wraps_block_numbers(self):
+        session, _, _ = self.make_session(blocks=10)
+        session.blocknum = 65534
+        session.startProtocol()
+        self.assertEqual(
+            [65535, 0, 1, 2],
+            [number for number, _ in session.transport.pop()],
+        )
+        session.datagramReceived(ACKDatagram(0))
+        self.assertEqual(
+            [1, 2, 3, 4], [number for number, _ in session.transport.pop()]
+        )
+
+    def test_cancels_on_error(self):
+        session, clock, _ = self.make_session(blocks=10)
+        session.startProtocol()
+        session.datagramReceived(ERRORDatagram.from_code(0, b"error"))
+        self.assertFalse(session.transport.listening)
+        self.assertThat(clock.getDelayedCalls(), HasLength(0))
+
+
+class TestWindowedRemoteOriginReadSession(MAASTestCase):
+    """Tests for `WindowedRemoteOriginReadSession`."""
+
+    def make_session(self, options):
+        return WindowedRemoteOriginReadSession(
+            ("192.168.1.1", 69), BytesReader(b""), options, _clock=Clock()
+        )
+
+    def test_negotiates_window_size(self):
+        session = self.make_session({b"windowsize": b"16"})
+        self.assertEqual({b"windowsize": 16}, dict(session.options))
+        self.assertThat(session.session, IsInstance(WindowedReadSession))
+        session.applyOptions(session.session, session.options)
+        self.assertEqual(16, session.session.window_size)
+
+    def test_limits_window_size(self):
+        session = self.make_session({b"WindowSize": b"1000"})
+        self.assertEqual(
+            {b"WindowSize": WindowedRemoteOriginReadSession.max_window_size},
+            dict(session.options),
+        )
+
+    def test_ignores_invalid_window_size(self):
+        for window_size in (b"0", b"65536", b"many"):
+            session = self.make_session({b"windowsize": window_size})
+            self.assertEqual({}, dict(session.options))
+            self.assertNotIsInstance(session.session, WindowedReadSession)
+
+    def test_uses_lock_step_session_without_window(self):
+        session = self.make_session({b"blksize": b"1428"})
+        self.assertEqual({b"blksize": 1428}, dict(session.options))
+        self.assertThat(session.session, IsInstance(ReadSession))
+        self.assertNotIsInstance(session.session, WindowedReadSession)
+
+    def test_tracking_tftp_uses_windowed_sessions(self):
+        self.assertIs(
+            WindowedRemoteOriginReadSession,
+            TransferTimeTrackingTFTP.read_session_class,
+        )
+
+
 class DummyProtocol(Protocol):
     def doStop(self):
         pass
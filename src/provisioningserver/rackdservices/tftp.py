@@ -5,13 +5,23 @@
 
 
 from functools import partial
+import os
 from socket import AF_INET, AF_INET6
 from time import time
 
 from netaddr import IPAddress
 from tftp.backend import FilesystemSynchronousBackend
+from tftp.bootstrap import RemoteOriginReadSession
+from tftp.datagram import (
+    DATADatagram,
+    ERR_NOT_DEFINED,
+    ERRORDatagram,
+    OP_ACK,
+    OP_ERROR,
+)
 from tftp.errors import BackendError, FileNotFound
 from tftp.protocol import TFTP
+from tftp.session import ReadSession
 from twisted.application import internet
 from twisted.application.service import MultiService
 from twisted.internet import reactor, udp
@@ -24,9 +34,9 @@ from twisted.internet.defer import (
     succeed,
 )
 from twisted.internet.task import deferLater
-from twisted.python.filepath import FilePath
+from twisted.python.filepath import FilePath, InsecurePath
 
-from provisioningserver.boot import BootMethodRegistry
+from provisioningserver.boot import BootMethodRegistry, BytesReader
 from provisioningserver.drivers import ArchitectureRegistry
 from provisioningserver.drivers.osystem import OperatingSystemRegistry
 from provisioningserver.events import EVENT_TYPES, send_node_event_ip_address
@@ -44,6 +54,9 @@ from provisioningserver.utils.twisted import deferred, RPCFetcher
 maaslog = get_maas_logger("tftp")
 log = LegacyLogger()
 
+# The largest window (RFC 7440) granted to a client, in blocks.
+MAX_WINDOW_SIZE = 64
+
 
 def get_boot_image(params):
     """Get the boot image for the params on this rack controller."""
@@ -112,6 +125,64 @@ def log_request(file_name, clock=reactor):
     d.addErrback(log.err, "Logging TFTP request failed.")
 
 
+def get_bootloader_filenames():
+    """Return the names of the bootloaders installed by the boot methods."""
+    # `PXEBootMethod` links pxelinux.0 to lpxelinux.0 for older DHCP configs.
+    filenames = {"pxelinux.0"}
+    for _, method in BootMethodRegistry:
+        filenames.update(method.bootloader_files)
+    return frozenset(filenames)
+
+
+class BootloaderCache:
+    """Shared read-only copies of bootloaders, held in memory.
+
+    Every machine that PXE boots fetches the same few bootloaders. They are
+    never modified in place -- new boot resources are written to a new
+    snapshot -- so each is read from disk once and served to every session
+    from memory. Copies are keyed by path and inode, so a new snapshot's
+    bootloader replaces the previous one's.
+    """
+
+    def __init__(self, filenames):
+        """
+        :param filenames: The names of the files to cache, wherever they are
+            in the TFTP root.
+        """
+        self.filenames = frozenset(
+            filename.encode("ascii") for filename in filenames
+        )
+        self.files = {}
+
+    @typed
+    def get_reader(self, base_path: FilePath, file_name: TFTPPath):
+        """Return an `IReader` for a cached copy of `file_name`.
+
+        :return: `None` if `file_name` is not a bootloader, or cannot be
+            read; the filesystem backend deals with it instead.
+        """
+        segments = file_name.split(b"/")
+        if segments[-1] not in self.filenames:
+            return None
+        try:
+            path = base_path.descendant(segments).path
+            stat = os.stat(path)
+        except (InsecurePath, OSError):
+            return None
+        key = stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+        cached = self.files.get(path)
+        if cached is None or cached[0] != key:
+            try:
+                with open(path, "rb") as fd:
+                    data = fd.read()
+            except OSError:
+                return None
+            self.files[path] = key, data
+        else:
+            _, data = cached
+        return BytesReader(data)
+
+
 class TFTPBackend(FilesystemSynchronousBackend):
     """A partially dynamic read-only TFTP server.
 
@@ -144,6 +215,7 @@ class TFTPBackend(FilesystemSynchronousBackend):
         self.client_to_remote = {}
         self.client_service = client_service
         self.fetcher = RPCFetcher()
+        self.bootloaders = BootloaderCache(get_bootloader_filenames())
 
     def _get_new_client_for_remote(self, remote_ip):
         """Return a new client for the `remote_ip`.
@@ -327,7 +399,10 @@ class TFTPBackend(FilesystemSynchronousBackend):
     def handle_boot_method(self, file_name: TFTPPath, result):
         boot_method, params = result
         if boot_method is None:
-            return super().get_reader(file_name)
+            reader = self.bootloaders.get_reader(self.base, file_name)
+            if reader is None:
+                return super().get_reader(file_name)
+            return reader
 
         # Map pxe namespace architecture names to MAAS's.
         arch = params.get("arch")
@@ -413,6 +488,160 @@ class UDPServer(internet.UDPServer):
         return p
 
 
+class WindowedReadSession(ReadSession):
+    """A `ReadSession` that sends a window of blocks per ACK (RFC 7440).
+
+    Up to `window_size` blocks are sent before waiting for an ACK. The
+    client acknowledges the last block of each window, or, if some went
+    missing, the last block it received in order; the session continues
+    from the block after the one acknowledged.
+    """
+
+    window_size = 1
+
+    def __init__(self, reader, _clock=None):
+        super().__init__(reader, _clock=_clock)
+        # The (number, datagram) of each block sent but not acknowledged.
+        # Numbers count from 1 without wrapping; those on the wire do wrap.
+        self.window = []
+        self.filling = False
+        self.timeout_watchdog = None
+
+    def startProtocol(self):
+        self.started = True
+        return self.sendWindow()
+
+    def datagramReceived(self, datagram):
+        if datagram.opcode == OP_ACK:
+            return self.tftp_ACK(datagram.blocknum)
+        elif datagram.opcode == OP_ERROR:
+            log.msg(
+                "Got error from client: %r" % (datagram.errmsg,),
+                system="tftp",
+            )
+            self.cancel()
+
+    def tftp_ACK(self, blocknum):
+        for index, (number, _) in enumerate(self.window):
+            if number % 65536 == blocknum:
+                break
+        else:
+            # A duplicate ACK for an earlier window; the client is waiting
+            # for this one, which is sent again if it times out.
+            return None
+        if self.timeout_watchdog is not None:
+            if self.timeout_watchdog.active():
+                self.timeout_watchdog.cancel()
+        del self.window[: index + 1]
+        if self.completed and len(self.window) == 0:
+            self.cancel()
+        elif not self.filling:
+            return self.sendWindow()
+
+    @inlineCallbacks
+    def sendWindow(self):
+        """Fill the window with blocks from the reader, and send it."""
+        self.filling = True
+        try:
+            while not self.completed and len(self.window) < self.window_size:
+                data = yield maybeDeferred(self.reader.read, self.block_size)
+                if len(data) < self.block_size:
+                    self.completed = True
+                self.blocknum += 1
+                self.window.append(
+                    (self.blocknum, DATADatagram(self.blocknum % 65536, data))
+                )
+        except Exception:
+            log.err(None, "TFTP read failed.")
+            self.transport.write(
+                ERRORDatagram.from_code(
+                    ERR_NOT_DEFINED, b"Read failed"
+                ).to_wire()
+            )
+            self.cancel()
+        else:
+            self.sendBlocks(0)
+        finally:
+            self.filling = False
+
+    def sendBlocks(self, attempt):
+        """Send each block in the window, then wait for an ACK.
+
+        The window is sent again after each of `timeout` but the last, after
+        which the session times out.
+        """
+        for _, datagram in self.window:
+            self.transport.write(datagram.to_wire())
+        if attempt < len(self.timeout) - 1:
+            self.timeout_watchdog = self._clock.callLater(
+                self.timeout[attempt], self.sendBlocks, attempt + 1
+            )
+        else:
+            self.timeout_watchdog = self._clock.callLater(
+                self.timeout[-1], self.timedOut
+            )
+
+    def timedOut(self):
+        log.msg(
+            "TFTP session timed out, last wait was %s seconds long"
+            % (self.timeout[-1],),
+            system="tftp",
+        )
+        self.cancel()
+
+
+class WindowedRemoteOriginReadSession(RemoteOriginReadSession):
+    """A `RemoteOriginReadSession` that negotiates windowsize (RFC 7440).
+
+    Clients that do not ask for a window, or ask for a window of one block,
+    get the lock-step `ReadSession`. Others get a `WindowedReadSession`
+    with the window they asked for, up to `max_window_size` blocks.
+    """
+
+    max_window_size = MAX_WINDOW_SIZE
+
+    def __init__(self, remote, reader, options=None, _clock=None):
+        super().__init__(remote, reader, options=options, _clock=_clock)
+        if self.get_window_size(self.options) > 1:
+            self.session = WindowedReadSession(reader, self._clock)
+
+    @staticmethod
+    def get_window_size(options):
+        for name, value in options.items():
+            if name.lower() == b"windowsize":
+                return value
+        return 1
+
+    def option_windowsize(self, value):
+        try:
+            window_size = int(value)
+        except ValueError:
+            return None
+        if window_size < 1 or window_size > 65535:
+            return None
+        return min(window_size, self.max_window_size)
+
+    def tftp_ACK(self, datagram):
+        if self.session.started:
+            # Block numbers wrap, so block 0 can be acknowledged mid-session.
+            return self.session.datagramReceived(datagram)
+        return super().tftp_ACK(datagram)
+
+    def processOptions(self, options):
+        accepted_options = super().processOptions(options)
+        for name, value in options.items():
+            if name.lower() == b"windowsize":
+                window_size = self.option_windowsize(value)
+                if window_size is not None:
+                    accepted_options[name] = window_size
+        return accepted_options
+
+    def applyOptions(self, session, options):
+        super().applyOptions(session, options)
+        if isinstance(session, WindowedReadSession):
+            session.window_size = self.get_window_size(options)
+
+
 def track_tftp_latency(
     func, start_time, filename, prometheus_metrics=PROMETHEUS_METRICS
 ):
@@ -433,6 +662,10 @@ def track_tftp_latency(
 
 
 class TransferTimeTrackingTFTP(TFTP):
+
+    # Used by `provisioningserver.monkey.fix_tftp_requests`.
+    read_session_class = WindowedRemoteOriginReadSession
+
     @inlineCallbacks
     def _startSession(
         self, datagram, addr, mode, prometheus_metrics=PROMETHEUS_METRICS
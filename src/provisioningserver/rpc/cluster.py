@@ -23,10 +23,13 @@ __all__ = [
     "ListSupportedArchitectures",
     "PowerCycle",
     "PowerDriverCheck",
+    "PowerNodes",
     "PowerOff",
     "PowerOn",
     "PowerQuery",
     "ScanNetworks",
+    "UpdateDHCPv4Hosts",
+    "UpdateDHCPv6Hosts",
     "ValidateDHCPv4Config",
     "ValidateDHCPv4Config_V2",
     "ValidateDHCPv6Config",
@@ -309,6 +312,47 @@ class PowerCycle(_Power):
     """
 
 
+class PowerNodes(amp.Command):
+    """Change the power state of several nodes.
+
+    Each node's power is changed as `PowerOn`, `PowerOff`, or `PowerCycle`
+    would change it, according to its `power_change`. An error for one node
+    does not fail the whole call: it is returned in that node's result, as
+    the name of the error (one of the names in `_Power.errors`, or
+    ``UnknownRemoteError``) and its message.
+
+    :since: 2.9
+    """
+
+    arguments = [
+        (
+            b"nodes",
+            CompressedAmpList(
+                [
+                    (b"system_id", amp.Unicode()),
+                    (b"hostname", amp.Unicode()),
+                    (b"power_type", amp.Unicode()),
+                    (b"power_change", amp.Unicode()),
+                    (b"context", StructureAsJSON()),
+                ]
+            ),
+        )
+    ]
+    response = [
+        (
+            b"results",
+            AmpList(
+                [
+                    (b"system_id", amp.Unicode()),
+                    (b"error", amp.Unicode(optional=True)),
+                    (b"message", amp.Unicode(optional=True)),
+                ]
+            ),
+        )
+    ]
+    errors = {}
+
+
 class _ConfigureDHCP(amp.Command):
     """Configure a DHCP server.
 
@@ -535,6 +579,9 @@ class _ConfigureDHCP_V2(amp.Command):
                 optional=True,
             ),
         ),
+        # The region's version of this configuration, against which it
+        # computes host map updates. Since 2.9.
+        (b"version", amp.Integer(optional=True)),
     ]
     response = []
     errors = {exceptions.CannotConfigureDHCP: b"CannotConfigureDHCP"}
@@ -640,6 +687,65 @@ class ValidateDHCPv6Config_V2(_ValidateDHCPConfig_V2):
     """
 
 
+# Host maps, as sent in updates to a DHCP server's host maps.
+_dhcp_hosts = CompressedAmpList(
+    [
+        (b"host", amp.Unicode()),
+        (b"mac", amp.Unicode()),
+        (b"ip", amp.Unicode()),
+        (
+            b"dhcp_snippets",
+            AmpList(
+                [
+                    (b"name", amp.Unicode()),
+                    (b"description", amp.Unicode(optional=True)),
+                    (b"value", amp.Unicode()),
+                ],
+                optional=True,
+            ),
+        ),
+    ]
+)
+
+
+class _UpdateDHCPHosts(amp.Command):
+    """Update the host maps of a DHCP server.
+
+    Only the host maps that changed since the server was configured at
+    `base_version` are sent.
+
+    :since: 2.9
+    """
+
+    arguments = [
+        (b"omapi_key", amp.Unicode()),
+        (b"base_version", amp.Integer()),
+        (b"version", amp.Integer()),
+        (b"remove", _dhcp_hosts),
+        (b"add", _dhcp_hosts),
+        (b"modify", _dhcp_hosts),
+    ]
+    response = []
+    errors = {
+        exceptions.CannotConfigureDHCP: b"CannotConfigureDHCP",
+        exceptions.DHCPHostsOutOfDate: b"DHCPHostsOutOfDate",
+    }
+
+
+class UpdateDHCPv4Hosts(_UpdateDHCPHosts):
+    """Update the host maps of the DHCPv4 server.
+
+    :since: 2.9
+    """
+
+
+class UpdateDHCPv6Hosts(_UpdateDHCPHosts):
+    """Update the host maps of the DHCPv6 server.
+
+    :since: 2.9
+    """
+
+
 class ImportBootImages(amp.Command):
     """Import boot images and report the final
     boot images that exist on the cluster.
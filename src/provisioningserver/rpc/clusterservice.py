@@ -458,6 +458,51 @@ class Cluster(RPCProtocol):
         d.addCallback(lambda _: {})
         return d
 
+    @cluster.PowerNodes.responder
+    def power_nodes(self, nodes):
+        """Change the power state of several nodes.
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.cluster.PowerNodes`.
+        """
+
+        def make_result(node, success, result):
+            if success:
+                return {"system_id": node["system_id"]}
+            for error_type, error_name in cluster.PowerOn.errors.items():
+                if result.check(error_type):
+                    break
+            else:
+                error_name = b"UnknownRemoteError"
+            return {
+                "system_id": node["system_id"],
+                "error": error_name.decode("ascii"),
+                "message": result.getErrorMessage(),
+            }
+
+        d = DeferredList(
+            [
+                maybe_change_power_state(
+                    node["system_id"],
+                    node["hostname"],
+                    node["power_type"],
+                    power_change=node["power_change"],
+                    context=node["context"],
+                )
+                for node in nodes
+            ],
+            consumeErrors=True,
+        )
+        d.addCallback(
+            lambda results: {
+                "results": [
+                    make_result(node, success, result)
+                    for node, (success, result) in zip(nodes, results)
+                ]
+            }
+        )
+        return d
+
     @cluster.PowerQuery.responder
     def power_query(self, system_id, hostname, power_type, context):
         d = get_power_state(system_id, hostname, power_type, context=context)
@@ -506,6 +551,7 @@ class Cluster(RPCProtocol):
         hosts,
         interfaces,
         global_dhcp_snippets=[],
+        version=None,
     ):
         server = dhcp.DHCPv4Server(omapi_key)
         if concurrency.dhcpv4.locked:
@@ -529,6 +575,7 @@ class Cluster(RPCProtocol):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version=version,
         )
         d.addCallback(lambda _: {})
 
@@ -542,6 +589,36 @@ class Cluster(RPCProtocol):
 
         return d
 
+    @cluster.UpdateDHCPv4Hosts.responder
+    def update_dhcpv4_hosts(
+        self, omapi_key, base_version, version, remove, add, modify
+    ):
+        server = dhcp.DHCPv4Server(omapi_key)
+        # Host map updates are serialised with configuration, and limited
+        # in time, in the same way.
+        d = concurrency.dhcpv4.run(
+            deferWithTimeout,
+            DHCP_TIMEOUT,
+            dhcp.update_hosts,
+            server,
+            base_version,
+            version,
+            remove,
+            add,
+            modify,
+        )
+        d.addCallback(lambda _: {})
+
+        # Catch the cancelled error, which means the work timed out.
+        def _timeoutEb(failure):
+            failure.trap(CancelledError)
+            log.err(failure, "DHCPv4 host map update timed out")
+            raise CannotConfigureDHCP("timed out") from failure.value
+
+        d.addErrback(_timeoutEb)
+
+        return d
+
     @cluster.ValidateDHCPv4Config.responder
     def validate_dhcpv4_config(
         self,
@@ -614,6 +691,7 @@ class Cluster(RPCProtocol):
         hosts,
         interfaces,
         global_dhcp_snippets=[],
+        version=None,
     ):
         server = dhcp.DHCPv6Server(omapi_key)
         if concurrency.dhcpv6.locked:
@@ -637,6 +715,7 @@ class Cluster(RPCProtocol):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version=version,
         )
         d.addCallback(lambda _: {})
 
@@ -650,6 +729,36 @@ class Cluster(RPCProtocol):
 
         return d
 
+    @cluster.UpdateDHCPv6Hosts.responder
+    def update_dhcpv6_hosts(
+        self, omapi_key, base_version, version, remove, add, modify
+    ):
+        server = dhcp.DHCPv6Server(omapi_key)
+        # Host map updates are serialised with configuration, and limited
+        # in time, in the same way.
+        d = concurrency.dhcpv6.run(
+            deferWithTimeout,
+            DHCP_TIMEOUT,
+            dhcp.update_hosts,
+            server,
+            base_version,
+            version,
+            remove,
+            add,
+            modify,
+        )
+        d.addCallback(lambda _: {})
+
+        # Catch the cancelled error, which means the work timed out.
+        def _timeoutEb(failure):
+            failure.trap(CancelledError)
+            log.err(failure, "DHCPv6 host map update timed out")
+            raise CannotConfigureDHCP("timed out") from failure.value
+
+        d.addErrback(_timeoutEb)
+
+        return d
+
     @cluster.ValidateDHCPv6Config.responder
     def validate_dhcpv6_config(
         self,
@@ -8,10 +8,12 @@ __all__ = [
     "DHCPv4Server",
     "DHCPv6Server",
     "downgrade_shared_networks",
+    "update_hosts",
     "upgrade_shared_networks",
 ]
 
 from collections import namedtuple
+from itertools import chain
 from operator import itemgetter
 import os
 import re
@@ -30,6 +32,7 @@ from provisioningserver.rpc.exceptions import (
     CannotCreateHostMap,
     CannotModifyHostMap,
     CannotRemoveHostMap,
+    DHCPHostsOutOfDate,
 )
 from provisioningserver.service_monitor import service_monitor
 from provisioningserver.utils.fs import sudo_delete_file, sudo_write_file
@@ -48,6 +51,11 @@ log = LegacyLogger()
 # Holds the current state of DHCPv4 and DHCPv6.
 _current_server_state = {}
 
+# Holds the region's version of the current state of DHCPv4 and DHCPv6, when
+# the region gave one. Host map updates are only applied to the version they
+# were computed against.
+_current_server_version = {}
+
 
 DHCPStateBase = namedtuple(
     "DHCPStateBase",
@@ -270,6 +278,7 @@ def configure(
     hosts,
     interfaces,
     global_dhcp_snippets=None,
+    version=None,
 ):
     """Configure the DHCPv6/DHCPv4 server, and restart it as appropriate.
 
@@ -286,12 +295,17 @@ def configure(
         contain a list of hosts the DHCP should statically.
     :param interfaces: List of interfaces that DHCP should use.
     :param global_dhcp_snippets: List of all global DHCP snippets
+    :param version: The region's version of this configuration, against
+        which it computes later host map updates; see `update_hosts`.
     """
     stopping = len(shared_networks) == 0
 
     if global_dhcp_snippets is None:
         global_dhcp_snippets = []
 
+    # Host map updates cannot be applied until this configuration is.
+    _current_server_version.pop(server.dhcp_service, None)
+
     if stopping:
         log.debug(
             "Deleting configuration and stopping the {name} service.",
@@ -432,6 +446,54 @@ def configure(
 
         # Update the current state to the new state.
         _current_server_state[server.dhcp_service] = new_state
+        if version is not None:
+            _current_server_version[server.dhcp_service] = version
+
+
+@asynchronous
+def update_hosts(server, base_version, version, remove, add, modify):
+    """Update the host maps of the DHCPv6/DHCPv4 server.
+
+    The region sends only the host maps that changed since the server was
+    configured at `base_version`. They are applied to the current state, and
+    the server is reconfigured as `configure` would; usually that means
+    updating the host maps over the OMAPI without a restart.
+
+    This method is not safe to call concurrently. The clusterserver ensures
+    that this method is not called concurrently, nor with `configure`.
+
+    :param server: A `DHCPServer` instance.
+    :param base_version: The version of the configuration that the changes
+        were computed against.
+    :param version: The version of the configuration once the changes are
+        applied.
+    :param remove: List of dicts with parameters of hosts to remove.
+    :param add: List of dicts with parameters of hosts to add.
+    :param modify: List of dicts with parameters of hosts to modify.
+    :raise DHCPHostsOutOfDate: If the server is not configured at
+        `base_version`; it must be configured in full instead.
+    """
+    current_state = _current_server_state.get(server.dhcp_service, None)
+    current_version = _current_server_version.get(server.dhcp_service, None)
+    if current_state is None or current_version != base_version:
+        raise DHCPHostsOutOfDate(
+            "%s server is not configured at version %d."
+            % (server.descriptive_name, base_version)
+        )
+    hosts = dict(current_state.hosts)
+    for host in remove:
+        hosts.pop(host["mac"], None)
+    for host in chain(add, modify):
+        hosts[host["mac"]] = host
+    return configure(
+        server,
+        current_state.failover_peers,
+        current_state.shared_networks,
+        list(hosts.values()),
+        [{"name": name} for name in current_state.interfaces],
+        current_state.global_dhcp_snippets,
+        version=version,
+    )
 
 
 def _parse_dhcpd_errors(error_str):
@@ -60,6 +60,11 @@ class CannotConfigureDHCP(Exception):
     """Failure while configuring a DHCP server."""
 
 
+class DHCPHostsOutOfDate(Exception):
+    """The DHCP server was not configured with the host maps an update is
+    based on; it must be configured in full."""
+
+
 class CannotCreateHostMap(Exception):
     """The host map could not be created."""
 
@@ -13,11 +13,13 @@ from twisted.internet.defer import (
     DeferredList,
     DeferredSemaphore,
     inlineCallbacks,
+    maybeDeferred,
     returnValue,
     succeed,
 )
 from twisted.internet.task import deferLater
 
+from provisioningserver.drivers.pod import PodDriverBase
 from provisioningserver.drivers.power import get_error_message, PowerError
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.events import EVENT_TYPES, send_node_event
@@ -450,17 +452,37 @@ def maaslog_report_failure(node, failure):
         # log.err(failure, "Failed to refresh power state.")
 
 
-def query_node(node, clock):
-    """Calls `get_power_state` on the given node.
+def report_node_query(d, node):
+    """Report the result of a power query for `node`.
 
-    Logs to maaslog as errors and power states change.
+    :param d: A `Deferred` that will fire with the node's power state.
     """
+    d = report_power_state(d, node["system_id"], node["hostname"])
+    d.addCallbacks(
+        partial(maaslog_report_success, node),
+        partial(maaslog_report_failure, node),
+    )
+    return d
+
+
+def is_power_action_in_progress(node):
     if node["system_id"] in power_action_registry:
         log.debug(
             "{hostname}: Skipping query power status, "
             "power action already in progress.",
             hostname=node["hostname"],
         )
+        return True
+    else:
+        return False
+
+
+def query_node(node, clock):
+    """Calls `get_power_state` on the given node.
+
+    Logs to maaslog as errors and power states change.
+    """
+    if is_power_action_in_progress(node):
         return succeed(None)
     else:
         d = get_power_state(
@@ -470,26 +492,84 @@ def query_node(node, clock):
             node["context"],
             clock=clock,
         )
-        d = report_power_state(d, node["system_id"], node["hostname"])
-        d.addCallbacks(
-            partial(maaslog_report_success, node),
-            partial(maaslog_report_failure, node),
+        return report_node_query(d, node)
+
+
+@inlineCallbacks
+def query_pod_nodes(nodes, clock):
+    """Query the power states of nodes hosted by the same pod together.
+
+    The pod's driver is asked for every node's power state at once. Nodes
+    that it can't answer for, or all of them if the pod can't be queried,
+    are queried one at a time with `query_node`, which reports failures.
+
+    Logs to maaslog as errors and power states change.
+    """
+    nodes = [node for node in nodes if not is_power_action_in_progress(node)]
+    if len(nodes) == 0:
+        return
+    power_driver = PowerDriverRegistry[nodes[0]["power_type"]]
+    try:
+        if len(power_driver.detect_missing_packages()) != 0:
+            raise PowerActionFail("Missing packages.")
+        power_states = yield maybeDeferred(
+            power_driver.power_query_many,
+            {node["system_id"]: node["context"] for node in nodes},
         )
-        return d
+    except Exception as error:
+        log.debug(
+            "Falling back to querying {count} nodes one at a time: {error}",
+            count=len(nodes),
+            error=error,
+        )
+        power_states = {}
+    queries = []
+    for node in nodes:
+        power_state = power_states.get(node["system_id"])
+        if power_state is None:
+            queries.append(query_node(node, clock))
+        else:
+            queries.append(report_node_query(succeed(power_state), node))
+    yield DeferredList(queries, consumeErrors=True)
+
+
+def group_nodes_by_pod(nodes):
+    """Group nodes that can have their power states queried together.
+
+    Nodes whose pod drivers give them the same pod key are grouped. Every
+    other node is in a group of its own. Nodes with unknown power types are
+    left out.
+    """
+    groups = {}
+    for node in nodes:
+        power_driver = PowerDriverRegistry.get_item(node["power_type"])
+        if power_driver is None:
+            continue
+        key = None
+        if isinstance(power_driver, PodDriverBase):
+            key = power_driver.get_pod_key(node["context"])
+        if key is None:
+            key = node["system_id"]
+        else:
+            key = node["power_type"], key
+        groups.setdefault(key, []).append(node)
+    return groups.values()
 
 
 def query_all_nodes(nodes, max_concurrency=5, clock=reactor):
     """Queries the given nodes for their power state.
 
-    Nodes' states are reported back to the region.
+    Nodes hosted by the same pod are queried together where their pod's
+    driver allows it. Nodes' states are reported back to the region.
 
     :return: A deferred, which fires once all nodes have been queried,
         successfully or not.
     """
     semaphore = DeferredSemaphore(tokens=max_concurrency)
     queries = (
-        semaphore.run(query_node, node, clock)
-        for node in nodes
-        if node["power_type"] in PowerDriverRegistry
+        semaphore.run(query_node, group[0], clock)
+        if len(group) == 1
+        else semaphore.run(query_pod_nodes, group, clock)
+        for group in group_nodes_by_pod(nodes)
     )
     return DeferredList(queries, consumeErrors=True)
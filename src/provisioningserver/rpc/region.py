@@ -20,6 +20,7 @@ __all__ = [
     "GetProxies",
     "GetTimeConfiguration",
     "Identify",
+    "ListDueNodePowerParameters",
     "ListNodePowerParameters",
     "MarkNodeFailed",
     "RegisterEventType",
@@ -31,6 +32,7 @@ __all__ = [
     "RequestNodeInfoByMACAddress",
     "SendEvent",
     "SendEventMACAddress",
+    "SendEvents",
     "UpdateInterfaces",
     "UpdateLastImageSync",
     "UpdateNodePowerState",
@@ -41,6 +43,7 @@ from twisted.protocols import amp
 from provisioningserver.rpc.arguments import (
     AmpList,
     Bytes,
+    CompressedAmpList,
     ParsedURL,
     StructureAsJSON,
 )
@@ -314,6 +317,32 @@ class ListNodePowerParameters(amp.Command):
     errors = {NoSuchCluster: b"NoSuchCluster"}
 
 
+class ListDueNodePowerParameters(amp.Command):
+    """Return power parameters for every node the rack should check now.
+
+    This is like :py:class:`ListNodePowerParameters` except that, rather
+    than a page at a time, the details of all nodes that are due a check are
+    returned at once, as a single compressed structure. When there are too
+    many to fit, those left out will be returned by the next call.
+
+    It may return an empty list. This means that all nodes have been recently
+    queried. Take a break before asking again.
+
+    :since: 2.9
+    """
+
+    arguments = [
+        # The rack controller's system_id.
+        (b"system_id", amp.Unicode())
+    ]
+    response = [
+        # A list of dicts with the same keys as the items returned by
+        # ListNodePowerParameters.
+        (b"nodes", StructureAsJSON())
+    ]
+    errors = {NoSuchCluster: b"NoSuchCluster"}
+
+
 class UpdateLastImageSync(amp.Command):
     """Update Rack Controller's Last Image Sync.
 
@@ -416,6 +445,35 @@ class SendEventIPAddress(amp.Command):
     errors = {NoSuchNode: b"NoSuchNode", NoSuchEventType: b"NoSuchEventType"}
 
 
+class SendEvents(amp.Command):
+    """Send a batch of events, each for a node found by MAC or IP address.
+
+    Events that were logged several times while the batch was gathered are
+    sent once, with a count. Events for unknown nodes or event types are
+    discarded by the region.
+
+    :since: 2.9
+    """
+
+    arguments = [
+        (
+            b"node_events",
+            CompressedAmpList(
+                [
+                    (b"type_name", amp.Unicode()),
+                    (b"description", amp.Unicode()),
+                    (b"count", amp.Integer()),
+                    # One of the following.
+                    (b"mac_address", amp.Unicode(optional=True)),
+                    (b"ip_address", amp.Unicode(optional=True)),
+                ]
+            ),
+        )
+    ]
+    response = []
+    errors = []
+
+
 class ReportForeignDHCPServer(amp.Command):
     """Report a foreign DHCP server on a rack controller's interface.
 
@@ -2472,6 +2472,95 @@ class TestClusterProtocol_PowerOn_PowerOff_PowerCycle(MAASTestCase):
         return d.addErrback(check)
 
 
+class TestClusterProtocol_PowerNodes(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def make_node(self, power_change="on"):
+        return {
+            "system_id": factory.make_name("system_id"),
+            "hostname": factory.make_name("hostname"),
+            "power_type": factory.make_name("power_type"),
+            "power_change": power_change,
+            "context": {factory.make_name("name"): factory.make_name("value")},
+        }
+
+    def test_is_registered(self):
+        protocol = Cluster()
+        responder = protocol.locateResponder(cluster.PowerNodes.commandName)
+        self.assertIsNotNone(responder)
+
+    @inlineCallbacks
+    def test_executes_maybe_change_power_state_for_each_node(self):
+        maybe_change_power_state = self.patch(
+            clusterservice, "maybe_change_power_state"
+        )
+        maybe_change_power_state.return_value = succeed(None)
+        nodes = [self.make_node("on"), self.make_node("cycle")]
+
+        response = yield call_responder(
+            Cluster(), cluster.PowerNodes, {"nodes": nodes}
+        )
+
+        self.assertThat(
+            maybe_change_power_state.call_args_list,
+            Equals(
+                [
+                    call(
+                        node["system_id"],
+                        node["hostname"],
+                        node["power_type"],
+                        power_change=node["power_change"],
+                        context=node["context"],
+                    )
+                    for node in nodes
+                ]
+            ),
+        )
+        self.assertThat(
+            response,
+            Equals(
+                {
+                    "results": [
+                        {
+                            "system_id": node["system_id"],
+                            "error": None,
+                            "message": None,
+                        }
+                        for node in nodes
+                    ]
+                }
+            ),
+        )
+
+    @inlineCallbacks
+    def test_returns_error_for_each_failed_node(self):
+        self.patch(clusterservice, "maybe_change_power_state").side_effect = [
+            fail(exceptions.PowerActionAlreadyInProgress("in progress")),
+            succeed(None),
+            fail(ZeroDivisionError("oops")),
+        ]
+        nodes = [self.make_node(), self.make_node(), self.make_node()]
+
+        response = yield call_responder(
+            Cluster(), cluster.PowerNodes, {"nodes": nodes}
+        )
+
+        self.assertThat(
+            [
+                (result["error"], result["message"])
+                for result in response["results"]
+            ],
+            Equals(
+                [
+                    ("PowerActionAlreadyInProgress", "in progress"),
+                    (None, None),
+                    ("UnknownRemoteError", "oops"),
+                ]
+            ),
+        )
+
+
 class TestClusterProtocol_PowerQuery(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
@@ -2652,6 +2741,7 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
                 hosts,
                 interfaces,
                 None,
+                version=None,
             ),
         )
 
@@ -2666,6 +2756,7 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version=None,
         ):
             self.assertTrue(self.concurrency_lock.locked)
             # While we're here, check this is the IO thread.
@@ -2727,6 +2818,7 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version=None,
         ):
             # Pause longer than the timeout.
             return pause(5)
@@ -2746,6 +2838,127 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
                 },
             )
 
+    @inlineCallbacks
+    def test_passes_version(self):
+        if self.command not in (
+            cluster.ConfigureDHCPv4_V2,
+            cluster.ConfigureDHCPv6_V2,
+        ):
+            self.skipTest("Versions are only sent with the V2 commands.")
+        self.patch_autospec(*self.dhcp_server)
+        configure = self.patch_autospec(dhcp, "configure")
+        version = random.randint(1, 100)
+
+        yield call_responder(
+            Cluster(),
+            self.command,
+            {
+                "omapi_key": factory.make_name("key"),
+                "failover_peers": [],
+                "shared_networks": [],
+                "hosts": [],
+                "interfaces": [],
+                "version": version,
+            },
+        )
+
+        self.assertThat(configure.call_args[1], Equals({"version": version}))
+
+
+class TestClusterProtocol_UpdateDHCPHosts(MAASTestCase):
+
+    scenarios = (
+        (
+            "DHCPv4",
+            {
+                "dhcp_server": (dhcp, "DHCPv4Server"),
+                "command": cluster.UpdateDHCPv4Hosts,
+                "concurrency_lock": concurrency.dhcpv4,
+            },
+        ),
+        (
+            "DHCPv6",
+            {
+                "dhcp_server": (dhcp, "DHCPv6Server"),
+                "command": cluster.UpdateDHCPv6Hosts,
+                "concurrency_lock": concurrency.dhcpv6,
+            },
+        ),
+    )
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def make_arguments(self):
+        return {
+            "omapi_key": factory.make_name("key"),
+            "base_version": 1,
+            "version": 2,
+            "remove": [make_host()],
+            "add": [make_host()],
+            "modify": [make_host()],
+        }
+
+    def test_is_registered(self):
+        self.assertIsNotNone(
+            Cluster().locateResponder(self.command.commandName)
+        )
+
+    @inlineCallbacks
+    def test_executes_update_hosts(self):
+        DHCPServer = self.patch_autospec(*self.dhcp_server)
+        update_hosts = self.patch_autospec(dhcp, "update_hosts")
+        arguments = self.make_arguments()
+
+        yield call_responder(Cluster(), self.command, arguments)
+
+        self.assertThat(DHCPServer, MockCalledOnceWith(arguments["omapi_key"]))
+        self.assertThat(
+            update_hosts,
+            MockCalledOnceWith(
+                DHCPServer.return_value,
+                1,
+                2,
+                arguments["remove"],
+                arguments["add"],
+                arguments["modify"],
+            ),
+        )
+
+    @inlineCallbacks
+    def test_limits_concurrency(self):
+        self.patch_autospec(*self.dhcp_server)
+
+        def check_dhcp_locked(server, *args):
+            self.assertTrue(self.concurrency_lock.locked)
+
+        self.patch(dhcp, "update_hosts", check_dhcp_locked)
+
+        self.assertFalse(self.concurrency_lock.locked)
+        yield call_responder(Cluster(), self.command, self.make_arguments())
+        self.assertFalse(self.concurrency_lock.locked)
+
+    @inlineCallbacks
+    def test_propagates_DHCPHostsOutOfDate(self):
+        self.patch_autospec(*self.dhcp_server)
+        update_hosts = self.patch_autospec(dhcp, "update_hosts")
+        update_hosts.side_effect = exceptions.DHCPHostsOutOfDate()
+
+        with ExpectedException(exceptions.DHCPHostsOutOfDate):
+            yield call_responder(
+                Cluster(), self.command, self.make_arguments()
+            )
+
+    @inlineCallbacks
+    def test_times_out(self):
+        self.patch_autospec(*self.dhcp_server)
+        self.patch(clusterservice, "DHCP_TIMEOUT", 1)
+        self.patch(dhcp, "update_hosts", lambda *args: pause(5))
+
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield call_responder(
+                Cluster(), self.command, self.make_arguments()
+            )
+
 
 class TestClusterProtocol_ValidateDHCP(MAASTestCase):
 
@@ -1232,6 +1232,170 @@ class TestConfigureDHCP(MAASTestCase):
         )
 
 
+class TestUpdateHostsAtVersion(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    scenarios = (
+        ("DHCPv4", {"server": dhcp.DHCPv4Server}),
+        ("DHCPv6", {"server": dhcp.DHCPv6Server}),
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(dhcp.service_monitor.getServiceByName("dhcpd").off)
+        self.addCleanup(dhcp.service_monitor.getServiceByName("dhcpd6").off)
+        self.addCleanup(dhcp._current_server_state.clear)
+        self.addCleanup(dhcp._current_server_version.clear)
+        self.useFixture(DHCPConfigNameResolutionDisabled())
+        self.patch_autospec(dhcp, "sudo_write_file")
+        self.patch_autospec(dhcp, "get_config").return_value = "config"
+        self.restart_service = self.patch(
+            dhcp.service_monitor, "restartService"
+        )
+        self.patch(dhcp.service_monitor, "ensureService")
+        self.patch(
+            dhcp.service_monitor, "getServiceState"
+        ).return_value = ServiceState(SERVICE_STATE.ON, "running")
+        self.update_hosts = self.patch(dhcp, "_update_hosts")
+        self.omapi_key = factory.make_name("omapi_key")
+        self.failover_peers = make_failover_peer_config()
+        self.shared_network = make_shared_network()
+        [self.shared_network] = fix_shared_networks_failover(
+            [self.shared_network], [self.failover_peers]
+        )
+        self.interface = make_interface()
+        self.global_dhcp_snippets = make_global_dhcp_snippets()
+
+    def configure(self, hosts, version=None):
+        return dhcp.configure(
+            self.server(self.omapi_key),
+            [self.failover_peers],
+            [self.shared_network],
+            hosts,
+            [self.interface],
+            self.global_dhcp_snippets,
+            version=version,
+        )
+
+    def make_state(self, hosts):
+        return dhcp.DHCPState(
+            self.omapi_key,
+            [self.failover_peers],
+            [self.shared_network],
+            hosts,
+            [self.interface],
+            self.global_dhcp_snippets,
+        )
+
+    @inlineCallbacks
+    def test_configure_records_version(self):
+        yield self.configure([make_host()], version=3)
+        self.assertEqual(
+            3, dhcp._current_server_version[self.server.dhcp_service]
+        )
+
+    @inlineCallbacks
+    def test_configure_without_version_forgets_version(self):
+        dhcp._current_server_version[self.server.dhcp_service] = 3
+        yield self.configure([make_host()])
+        self.assertNotIn(
+            self.server.dhcp_service, dhcp._current_server_version
+        )
+
+    @inlineCallbacks
+    def test_raises_DHCPHostsOutOfDate_when_not_configured(self):
+        with ExpectedException(exceptions.DHCPHostsOutOfDate):
+            yield dhcp.update_hosts(
+                self.server(self.omapi_key), 1, 2, [], [make_host()], []
+            )
+
+    @inlineCallbacks
+    def test_raises_DHCPHostsOutOfDate_when_at_other_version(self):
+        yield self.configure([make_host()], version=1)
+        with ExpectedException(exceptions.DHCPHostsOutOfDate):
+            yield dhcp.update_hosts(
+                self.server(self.omapi_key), 2, 3, [], [make_host()], []
+            )
+        self.assertThat(self.update_hosts, MockNotCalled())
+
+    @inlineCallbacks
+    def test_updates_hosts_using_omapi(self):
+        hosts = [make_host(dhcp_snippets=[]) for _ in range(3)]
+        yield self.configure(hosts, version=1)
+        self.restart_service.reset_mock()
+
+        removed_host = hosts[0]
+        modified_host = dict(hosts[1], ip=factory.make_ip_address())
+        added_host = make_host(dhcp_snippets=[])
+        yield dhcp.update_hosts(
+            self.server(self.omapi_key),
+            1,
+            2,
+            [removed_host],
+            [added_host],
+            [modified_host],
+        )
+
+        self.assertThat(self.restart_service, MockNotCalled())
+        self.assertThat(
+            self.update_hosts,
+            MockCalledOnceWith(
+                ANY, [removed_host], [added_host], [modified_host]
+            ),
+        )
+        self.assertEqual(
+            self.make_state([modified_host, hosts[2], added_host]),
+            dhcp._current_server_state[self.server.dhcp_service],
+        )
+        self.assertEqual(
+            2, dhcp._current_server_version[self.server.dhcp_service]
+        )
+
+    @inlineCallbacks
+    def test_restarts_when_hosts_dhcp_snippets_change(self):
+        yield self.configure([make_host(dhcp_snippets=[])], version=1)
+        self.restart_service.reset_mock()
+
+        yield dhcp.update_hosts(
+            self.server(self.omapi_key),
+            1,
+            2,
+            [],
+            [
+                make_host(
+                    dhcp_snippets=make_host_dhcp_snippets(allow_empty=False)
+                )
+            ],
+            [],
+        )
+
+        self.assertThat(
+            self.restart_service,
+            MockCalledOnceWith(self.server.dhcp_service),
+        )
+        self.assertThat(self.update_hosts, MockNotCalled())
+
+    @inlineCallbacks
+    def test_forgets_version_on_failure(self):
+        yield self.configure([make_host(dhcp_snippets=[])], version=1)
+        self.restart_service.side_effect = factory.make_exception()
+        self.update_hosts.side_effect = factory.make_exception()
+
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield dhcp.update_hosts(
+                self.server(self.omapi_key),
+                1,
+                2,
+                [],
+                [make_host(dhcp_snippets=[])],
+                [],
+            )
+        self.assertNotIn(
+            self.server.dhcp_service, dhcp._current_server_version
+        )
+
+
 class TestValidateDHCP(MAASTestCase):
 
     scenarios = (
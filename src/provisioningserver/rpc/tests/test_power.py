@@ -1288,3 +1288,123 @@ class TestPowerQueryAsync(MAASTestCase):
             [(True, node1["power_state"]), (True, node2["power_state"])],
             results,
         )
+
+    def make_pod_nodes(self, count=3):
+        nodes = [self.make_node(power_type="virsh") for _ in range(count)]
+        power_driver = PowerDriverRegistry["virsh"]
+        self.patch(power_driver, "detect_missing_packages").return_value = []
+        self.patch(power_driver, "get_pod_key").return_value = sentinel.pod
+        return nodes, self.patch(power_driver, "power_query_many")
+
+    @inlineCallbacks
+    def test_query_all_nodes_queries_pod_nodes_together(self):
+        nodes, power_query_many = self.make_pod_nodes()
+        power_query_many.return_value = succeed(
+            {node["system_id"]: node["power_state"] for node in nodes}
+        )
+        get_power_state = self.patch(power, "get_power_state")
+        suppress_reporting(self)
+
+        with FakeLogger("maas.power", level=logging.DEBUG) as maaslog:
+            yield power.query_all_nodes(nodes)
+        self.assertThat(
+            power_query_many,
+            MockCalledOnceWith(
+                {node["system_id"]: node["context"] for node in nodes}
+            ),
+        )
+        self.assertThat(get_power_state, MockNotCalled())
+        self.assertEqual("", maaslog.output)
+
+    @inlineCallbacks
+    def test_query_all_nodes_reports_pod_nodes_power_states(self):
+        nodes, power_query_many = self.make_pod_nodes()
+        new_states = {
+            node["system_id"]: self.pick_alternate_state(node["power_state"])
+            for node in nodes
+        }
+        power_query_many.return_value = succeed(new_states)
+        report_power_state = self.patch(power, "report_power_state")
+        report_power_state.side_effect = lambda d, sid, hn: d
+
+        yield power.query_all_nodes(nodes)
+        self.assertThat(
+            report_power_state,
+            MockCallsMatch(
+                *(
+                    call(ANY, node["system_id"], node["hostname"])
+                    for node in nodes
+                )
+            ),
+        )
+        for (args, _), node in zip(report_power_state.call_args_list, nodes):
+            self.assertEqual(
+                new_states[node["system_id"]], extract_result(args[0])
+            )
+
+    @inlineCallbacks
+    def test_query_all_nodes_queries_missing_pod_nodes_one_by_one(self):
+        nodes, power_query_many = self.make_pod_nodes()
+        power_query_many.return_value = succeed(
+            {node["system_id"]: node["power_state"] for node in nodes[1:]}
+        )
+        get_power_state = self.patch(power, "get_power_state")
+        get_power_state.return_value = succeed(nodes[0]["power_state"])
+        suppress_reporting(self)
+
+        yield power.query_all_nodes(nodes)
+        self.assertThat(
+            get_power_state,
+            MockCalledOnceWith(
+                nodes[0]["system_id"],
+                nodes[0]["hostname"],
+                nodes[0]["power_type"],
+                nodes[0]["context"],
+                clock=reactor,
+            ),
+        )
+
+    @inlineCallbacks
+    def test_query_all_nodes_falls_back_when_pod_query_fails(self):
+        nodes, power_query_many = self.make_pod_nodes()
+        power_query_many.return_value = fail(PowerError("Broken."))
+        get_power_state = self.patch(power, "get_power_state")
+        get_power_state.side_effect = [
+            succeed(node["power_state"]) for node in nodes
+        ]
+        suppress_reporting(self)
+
+        yield power.query_all_nodes(nodes)
+        self.assertThat(
+            get_power_state,
+            MockCallsMatch(
+                *(
+                    call(
+                        node["system_id"],
+                        node["hostname"],
+                        node["power_type"],
+                        node["context"],
+                        clock=reactor,
+                    )
+                    for node in nodes
+                )
+            ),
+        )
+
+    @inlineCallbacks
+    def test_query_all_nodes_skips_pod_nodes_in_action_registry(self):
+        nodes, power_query_many = self.make_pod_nodes()
+        power_query_many.return_value = succeed({})
+        power.power_action_registry[nodes[0]["system_id"]] = sentinel.action
+        self.addCleanup(power.power_action_registry.clear)
+        get_power_state = self.patch(power, "get_power_state")
+        get_power_state.return_value = succeed("on")
+        suppress_reporting(self)
+
+        yield power.query_all_nodes(nodes)
+        self.assertThat(
+            power_query_many,
+            MockCalledOnceWith(
+                {node["system_id"]: node["context"] for node in nodes[1:]}
+            ),
+        )
@@ -10,6 +10,7 @@ from unittest.mock import ANY, sentinel
 from testtools import ExpectedException
 from testtools.matchers import AllMatch, Equals, HasLength, Is, IsInstance
 from twisted.internet.defer import fail, inlineCallbacks, succeed
+from twisted.internet.task import Clock
 
 from maastesting.factory import factory
 from maastesting.matchers import (
@@ -18,6 +19,7 @@ from maastesting.matchers import (
     MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
+from provisioningserver import events
 from provisioningserver.events import (
     EVENT_DETAILS,
     EVENT_TYPES,
@@ -30,7 +32,11 @@ from provisioningserver.events import (
     send_rack_event,
 )
 from provisioningserver.rpc import region
-from provisioningserver.rpc.exceptions import NoSuchEventType, NoSuchNode
+from provisioningserver.rpc.exceptions import (
+    NoConnectionsAvailable,
+    NoSuchEventType,
+    NoSuchNode,
+)
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.testing import MAASIDFixture
@@ -438,3 +444,122 @@ class TestSendEventIPAddress(MAASTestCase):
             yield event_hub.logByIP(event_name, ip_address, description)
         # The event has been removed from the cache.
         self.assertThat(event_hub._types_registered, HasLength(0))
+
+
+class TestNodeEventHubBatching(MAASTestCase):
+    """Tests for batching in `NodeEventHub.logByMAC` and `logByIP`."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def patch_rpc_methods(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(
+            region.SendEvents, region.RegisterEventType
+        )
+        protocol.SendEvents.return_value = succeed({})
+        return protocol, connecting
+
+    @inlineCallbacks
+    def test_events_are_sent_together_after_delay(self):
+        protocol, connecting = self.patch_rpc_methods()
+        self.addCleanup((yield connecting))
+        clock = Clock()
+        event_hub = NodeEventHub(clock)
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        ip_address = factory.make_ip_address()
+        mac_address = factory.make_mac_address()
+
+        logged = [
+            event_hub.logByIP(event_name, ip_address, "kernel"),
+            event_hub.logByMAC(event_name, mac_address, "initrd"),
+        ]
+        self.assertThat(protocol.SendEvents, MockNotCalled())
+        clock.advance(events.EVENT_BATCH_DELAY)
+        for d in logged:
+            yield d
+
+        self.assertThat(
+            protocol.SendEvents,
+            MockCalledOnceWith(
+                ANY,
+                node_events=[
+                    {
+                        "type_name": event_name,
+                        "description": "kernel",
+                        "count": 1,
+                        "mac_address": None,
+                        "ip_address": ip_address,
+                    },
+                    {
+                        "type_name": event_name,
+                        "description": "initrd",
+                        "count": 1,
+                        "mac_address": mac_address,
+                        "ip_address": None,
+                    },
+                ],
+            ),
+        )
+
+    @inlineCallbacks
+    def test_repeated_events_are_sent_once_with_count(self):
+        protocol, connecting = self.patch_rpc_methods()
+        self.addCleanup((yield connecting))
+        event_hub = NodeEventHub(Clock())
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        ip_address = factory.make_ip_address()
+
+        logged = [
+            event_hub.logByIP(event_name, ip_address, "grubx64.efi")
+            for _ in range(3)
+        ]
+        yield event_hub.flush()
+        for d in logged:
+            yield d
+
+        [event] = protocol.SendEvents.call_args[1]["node_events"]
+        self.assertThat(event["count"], Equals(3))
+
+    @inlineCallbacks
+    def test_batch_is_sent_once_full(self):
+        protocol, connecting = self.patch_rpc_methods()
+        self.addCleanup((yield connecting))
+        self.patch(events, "EVENT_BATCH_SIZE", 2)
+        event_hub = NodeEventHub(Clock())
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        ip_address = factory.make_ip_address()
+
+        logged = [
+            event_hub.logByIP(event_name, ip_address, description)
+            for description in ("one", "two")
+        ]
+        for d in logged:
+            yield d
+
+        self.assertThat(protocol.SendEvents, MockCalledOnce())
+        self.assertThat(event_hub._batch, Equals({}))
+
+    @inlineCallbacks
+    def test_failure_is_passed_to_each_caller(self):
+        self.patch(
+            events, "getRegionClient"
+        ).side_effect = NoConnectionsAvailable()
+        event_hub = NodeEventHub(Clock())
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        ip_address = factory.make_ip_address()
+
+        logged = [
+            event_hub.logByIP(event_name, ip_address, description)
+            for description in ("one", "two")
+        ]
+        yield event_hub.flush()
+        for d in logged:
+            with ExpectedException(NoConnectionsAvailable):
+                yield d
+
+    @inlineCallbacks
+    def test_flush_without_events_sends_nothing(self):
+        protocol, connecting = self.patch_rpc_methods()
+        self.addCleanup((yield connecting))
+        yield NodeEventHub(Clock()).flush()
+        self.assertThat(protocol.SendEvents, MockNotCalled())
@@ -163,6 +163,7 @@ class TestProvisioningServiceMaker(MAASTestCase):
             "lease_socket_service",
             "node_monitor",
             "external",
+            "runtime_metrics",
             "rpc",
             "rpc-ping",
             "http",
@@ -202,6 +203,7 @@ class TestProvisioningServiceMaker(MAASTestCase):
             "lease_socket_service",
             "node_monitor",
             "external",
+            "runtime_metrics",
             "rpc",
             "rpc-ping",
             "http",
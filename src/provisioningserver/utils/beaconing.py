@@ -246,6 +246,35 @@ class BeaconingPacket:
             return None
 
 
+def decode_beacon_packet(packet_bytes, pcap_header):
+    """Decode a captured beaconing packet into JSON-serialisable form.
+
+    :param packet_bytes: The captured Ethernet frame.
+    :param pcap_header: The `PCAPPacketHeader` the frame was captured with.
+    :return: A dictionary describing the beacon, or None if the packet does
+        not contain a valid beacon.
+    :raise PacketProcessingError: If the packet could not be decoded.
+    """
+    packet = decode_ethernet_udp_packet(packet_bytes, pcap_header)
+    beacon = BeaconingPacket(packet.payload)
+    if not beacon.valid:
+        return None
+    output_json = {
+        "source_mac": format_eui(packet.l2.src_eui),
+        "destination_mac": format_eui(packet.l2.dst_eui),
+        "source_ip": str(packet.l3.src_ip),
+        "destination_ip": str(packet.l3.dst_ip),
+        "source_port": packet.l4.packet.src_port,
+        "destination_port": packet.l4.packet.dst_port,
+        "time": pcap_header.timestamp_seconds,
+    }
+    if packet.l2.vid is not None:
+        output_json["vid"] = packet.l2.vid
+    if beacon.data is not None:
+        output_json.update(beacon_to_json(beacon.data))
+    return output_json
+
+
 def observe_beaconing_packets(input=sys.stdin.buffer, out=sys.stdout):
     """Read stdin and look for tcpdump binary beaconing output.
 
@@ -263,23 +292,9 @@ def observe_beaconing_packets(input=sys.stdin.buffer, out=sys.stdout):
             return 4
         for pcap_header, packet_bytes in pcap:
             try:
-                packet = decode_ethernet_udp_packet(packet_bytes, pcap_header)
-                beacon = BeaconingPacket(packet.payload)
-                if not beacon.valid:
+                output_json = decode_beacon_packet(packet_bytes, pcap_header)
+                if output_json is None:
                     continue
-                output_json = {
-                    "source_mac": format_eui(packet.l2.src_eui),
-                    "destination_mac": format_eui(packet.l2.dst_eui),
-                    "source_ip": str(packet.l3.src_ip),
-                    "destination_ip": str(packet.l3.dst_ip),
-                    "source_port": packet.l4.packet.src_port,
-                    "destination_port": packet.l4.packet.dst_port,
-                    "time": pcap_header.timestamp_seconds,
-                }
-                if packet.l2.vid is not None:
-                    output_json["vid"] = packet.l2.vid
-                if beacon.data is not None:
-                    output_json.update(beacon_to_json(beacon.data))
                 out.write(json.dumps(output_json))
                 out.write("\n")
                 out.flush()
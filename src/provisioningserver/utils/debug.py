@@ -3,18 +3,35 @@
 
 """Utilities for debugging."""
 
+from collections import Counter
 import cProfile
 from datetime import datetime
 import functools
+import hmac
 import io
+import marshal
 import os
+import re
 import signal
 from sys import _current_frames as current_frames
 import threading
-from time import gmtime, strftime
+from time import gmtime, sleep, strftime
 import traceback
 
+from twisted.internet.threads import deferToThread
+from twisted.python import threadable
+from twisted.web.resource import Resource
+from twisted.web.server import NOT_DONE_YET
+
+from provisioningserver.logger import LegacyLogger
 from provisioningserver.path import get_maas_data_path
+from provisioningserver.security import (
+    get_shared_secret_from_filesystem,
+    to_hex,
+)
+from provisioningserver.utils.twisted import deferToNewThread
+
+log = LegacyLogger()
 
 _profile = None
 
@@ -94,3 +111,252 @@ def register_sigusr1_toggle_cprofile(process_name):
     toggle_process_cprofile = functools.partial(toggle_cprofile, process_name)
     if threading.current_thread().__class__.__name__ == "_MainThread":
         signal.signal(signal.SIGUSR1, toggle_process_cprofile)
+
+
+# Threads started by a Twisted `ThreadPool` are named after the pool.
+_pool_thread_name = re.compile(r"^PoolThread-(?P<pool>.+)-\d+$")
+
+
+def get_thread_label(ident, name):
+    """Return the label under which samples of a thread are grouped.
+
+    This is "reactor" for the reactor thread, the name of the pool for
+    threads in a `ThreadPool` (e.g. "database" or "default"), and "other"
+    for everything else.
+    """
+    if ident == threadable.ioThread:
+        return "reactor"
+    match = _pool_thread_name.match(name or "")
+    if match is None:
+        return "other"
+    return match.group("pool")
+
+
+class SamplingProfiler:
+    """Sample the stacks of all threads in the process.
+
+    A dedicated thread wakes every `interval` seconds and records the stack
+    of every other thread, so nothing is added to the code being profiled;
+    when no profile is running there is no overhead at all.
+
+    Each sample is recorded as a tuple of `(filename, firstlineno, name)`
+    code locations, outermost first, keyed by the label of the thread from
+    `get_thread_label`.
+    """
+
+    def __init__(self, duration, interval=0.01, labels=None):
+        self.duration = duration
+        self.interval = interval
+        self.labels = labels
+        self.samples = Counter()
+        self.count = 0
+
+    def sample(self):
+        """Record the stack of every thread, except the calling thread."""
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in current_frames().items():
+            if ident == own_ident:
+                continue
+            label = get_thread_label(ident, names.get(ident))
+            if self.labels and label not in self.labels:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    (code.co_filename, code.co_firstlineno, code.co_name)
+                )
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[label, tuple(stack)] += 1
+        self.count += 1
+
+    def run(self):
+        """Sample threads for `duration` seconds. Blocks."""
+        for _ in range(max(1, round(self.duration / self.interval))):
+            sleep(self.interval)
+            self.sample()
+        return self
+
+    def collapsed(self):
+        """Return the samples as collapsed stacks.
+
+        There is a line for each distinct stack, with the thread label and
+        each frame separated by semicolons and followed by the number of
+        times that stack was seen, as consumed by flame graph tools.
+        """
+        lines = []
+        for (label, stack), count in sorted(self.samples.items()):
+            frames = [label] + [
+                "%s (%s:%d)" % (name, filename, lineno)
+                for filename, lineno, name in stack
+            ]
+            lines.append("%s %d\n" % (";".join(frames), count))
+        return "".join(lines).encode("utf-8")
+
+    def pstats(self):
+        """Return the samples in the marshalled format `pstats` loads.
+
+        Times are estimated from the number of samples multiplied by the
+        sampling interval. Function names are prefixed with the thread
+        label so that the activity of each thread type stays apart.
+        """
+        stats = {}
+
+        def entry(func):
+            if func not in stats:
+                stats[func] = [0, 0, 0.0, 0.0, Counter()]
+            return stats[func]
+
+        for (label, stack), count in self.samples.items():
+            elapsed = count * self.interval
+            funcs = [
+                (filename, lineno, "[%s] %s" % (label, name))
+                for filename, lineno, name in stack
+            ]
+            if len(funcs) == 0:
+                continue
+            # Count each function once per sample, even when recursive.
+            for func in set(funcs):
+                stat = entry(func)
+                stat[0] += count
+                stat[1] += count
+                stat[3] += elapsed
+            entry(funcs[-1])[2] += elapsed
+            for caller, callee in set(zip(funcs, funcs[1:])):
+                entry(callee)[4][caller] += count
+        return marshal.dumps(
+            {
+                func: (cc, nc, tt, ct, dict(callers))
+                for func, (cc, nc, tt, ct, callers) in stats.items()
+            }
+        )
+
+
+class ProfilerResource(Resource):
+    """Profile the process on demand with a `SamplingProfiler`.
+
+    A GET request runs a profile and responds with the result. Requests
+    must carry the MAAS shared secret, hex-encoded, as a bearer token in
+    the Authorization header. The query may specify:
+
+    - `duration`: seconds to profile for, at most `MAX_DURATION`;
+    - `interval`: seconds between samples, at least `MIN_INTERVAL`;
+    - `format`: "collapsed" (the default) or "pstats";
+    - `thread`: the thread labels to sample, e.g. "reactor" or "database",
+      which may be repeated; all threads are sampled by default.
+
+    Only one profile runs at a time; other requests get a 409 response.
+    """
+
+    isLeaf = True
+
+    MAX_DURATION = 60.0
+    MIN_INTERVAL = 0.001
+
+    formats = {
+        "collapsed": b"text/plain; charset=utf-8",
+        "pstats": b"application/octet-stream",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.running = False
+
+    def render_GET(self, request):
+        token = request.getHeader(b"authorization")
+        disconnected = []
+        request.notifyFinish().addErrback(disconnected.append)
+
+        def authorize(secret):
+            if secret is None or token is None:
+                return False
+            expected = "Bearer %s" % to_hex(secret)
+            return hmac.compare_digest(expected.encode("ascii"), token)
+
+        def profile(authorized):
+            # Check the arguments, and whether a profile is running, only
+            # for authorized callers.
+            if not authorized:
+                return self._error(request, 403, "Forbidden.")
+            try:
+                duration, interval, fmt, labels = self._parseArgs(request)
+            except ValueError as error:
+                return self._error(request, 400, str(error))
+            if self.running:
+                return self._error(
+                    request, 409, "A profile is already running."
+                )
+            self.running = True
+            profiler = SamplingProfiler(duration, interval, labels)
+            d = deferToNewThread(profiler.run)
+            d.addCallback(lambda profiler: getattr(profiler, fmt)())
+            d.addCallback(respond, fmt)
+            d.addBoth(release)
+            return d
+
+        def respond(content, fmt):
+            request.setHeader(b"Content-Type", self.formats[fmt])
+            return content
+
+        def release(result):
+            self.running = False
+            return result
+
+        def failed(failure):
+            log.err(failure, "Failure profiling process.")
+            return self._error(request, 500, "Profiling failed.")
+
+        def finish(content):
+            if not disconnected:
+                request.write(content)
+                request.finish()
+
+        d = deferToThread(get_shared_secret_from_filesystem)
+        d.addCallback(authorize)
+        d.addCallback(profile)
+        d.addErrback(failed)
+        d.addCallback(finish)
+        return NOT_DONE_YET
+
+    def _parseArgs(self, request):
+        """Return the duration, interval, format and thread labels requested.
+
+        :raise ValueError: If any of them are not valid.
+        """
+        try:
+            duration = float(self._getArg(request, b"duration", "10"))
+            interval = float(self._getArg(request, b"interval", "0.01"))
+        except ValueError:
+            raise ValueError("Invalid duration or interval.")
+        if not (0 < duration <= self.MAX_DURATION):
+            raise ValueError(
+                "Duration must be up to %d seconds." % self.MAX_DURATION
+            )
+        if not (self.MIN_INTERVAL <= interval <= duration):
+            raise ValueError("Invalid interval.")
+        fmt = self._getArg(request, b"format", "collapsed")
+        if fmt not in self.formats:
+            raise ValueError("Unknown format: %s." % fmt)
+        labels = set(self._getArgs(request, b"thread"))
+        return duration, interval, fmt, labels
+
+    def _getArgs(self, request, name):
+        try:
+            return [
+                value.decode("utf-8") for value in request.args.get(name, [])
+            ]
+        except UnicodeDecodeError:
+            raise ValueError("Invalid %s." % name.decode("ascii"))
+
+    def _getArg(self, request, name, default):
+        values = self._getArgs(request, name)
+        if not values:
+            return default
+        return values[0]
+
+    def _error(self, request, code, message):
+        request.setResponseCode(code)
+        request.setHeader(b"Content-Type", b"text/plain; charset=utf-8")
+        return message.encode("utf-8")
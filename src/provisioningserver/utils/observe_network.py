@@ -0,0 +1,513 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Observe ARP and beaconing traffic on several interfaces at once.
+
+`maas-rack observe-arp` and `maas-rack observe-beacons` each decode the
+output of a single capture, one packet at a time, so a rack controller
+monitoring many interfaces used to run two Python processes per interface.
+
+This command runs the same captures (the `network-monitor` and
+`beacon-monitor` wrappers around `tcpdump`) for every interface, and decodes
+all of them in a single process. Capture output is read in large chunks, and
+the ARP packets in each chunk are decoded together with `struct.iter_unpack`.
+
+The interfaces to observe are given on the command line, and can be changed
+by writing JSON objects to stdin, one per line, such as::
+
+    {"arp": ["eth0", "eth1"], "beacons": ["eth0"]}
+
+Each object replaces the previous selection. Observations are written to
+stdout, one JSON object per line, with the `kind` of observation ("arp" or
+"beacon") and the `interface` it was made on. ARP observations are the same
+NEW, REFRESHED or MOVED binding events written by `maas-rack observe-arp`;
+beacon observations are those written by `maas-rack observe-beacons`.
+"""
+
+from collections import defaultdict
+import json
+import os
+import selectors
+import struct
+import subprocess
+import sys
+from textwrap import dedent
+import time
+
+from netaddr import IPAddress
+
+from provisioningserver.path import get_path
+from provisioningserver.utils import sudo
+from provisioningserver.utils.arp import (
+    ARP_PACKET,
+    SEEN_AGAIN_THRESHOLD,
+    SIZEOF_ARP_PACKET,
+)
+from provisioningserver.utils.beaconing import decode_beacon_packet
+from provisioningserver.utils.pcap import (
+    PCAP_HEADER_SIZE,
+    PCAP_NATIVE_BYTE_ORDER_MAGIC_NUMBER,
+    PCAP_PACKET_HEADER_SIZE,
+    PCAPError,
+    PCAPPacketHeader,
+)
+from provisioningserver.utils.tcpip import PacketProcessingError
+
+# Kinds of observation, and the capture used for each.
+OBSERVE_ARP = "arp"
+OBSERVE_BEACONS = "beacon"
+MONITOR_COMMANDS = {
+    OBSERVE_ARP: "/usr/lib/maas/network-monitor",
+    OBSERVE_BEACONS: "/usr/lib/maas/beacon-monitor",
+}
+
+# How many bytes to read from a capture at once.
+READ_SIZE = 256 * 1024
+
+# How long to wait (in seconds) before restarting a capture that ended.
+CAPTURE_RESTART_INTERVAL = 60.0
+
+PCAP_HEADER = struct.Struct("IHHiIII")
+PCAP_PACKET_HEADER = struct.Struct("IIII")
+
+ETHERTYPE_ARP = b"\x08\x06"
+ETHERTYPE_VLAN = b"\x81\x00"
+ZERO_MAC = bytes(6)
+
+# The hardware and protocol types and lengths of an ARP packet for Ethernet
+# MACs and IPv4 addresses.
+ETHERNET_IPV4_ARP = (1, 0x800, 6, 4)
+
+
+def split_pcap_records(buffer, offset=0):
+    """Split the complete PCAP records out of `buffer`.
+
+    :param buffer: PCAP output, without the global header.
+    :param offset: Where in `buffer` the first record starts.
+    :return: A tuple of (records, offset), where `records` is a list of
+        (pcap_packet_header, packet) tuples with the header as a plain tuple,
+        and `offset` is where the first incomplete record starts.
+    """
+    records = []
+    end = len(buffer)
+    unpack_from = PCAP_PACKET_HEADER.unpack_from
+    while end - offset >= PCAP_PACKET_HEADER_SIZE:
+        header = unpack_from(buffer, offset)
+        start = offset + PCAP_PACKET_HEADER_SIZE
+        stop = start + header[2]
+        if stop > end:
+            break
+        records.append((header, buffer[start:stop]))
+        offset = stop
+    return records, offset
+
+
+def get_arp_bindings(records):
+    """Yield the (time, vid, ip, mac) of each binding in ARP `records`.
+
+    This is equivalent to decoding each record with `Ethernet` and `ARP` and
+    taking their `bindings()`, but the ARP packets are unpacked all at once,
+    and addresses are left as an integer (the IP) and bytes (the MAC).
+
+    :param records: A list of PCAP records, as from `split_pcap_records`.
+    """
+    observed = []
+    packets = []
+    for header, frame in records:
+        ethertype = frame[12:14]
+        if ethertype == ETHERTYPE_VLAN:
+            vid = int.from_bytes(frame[14:16], "big") & 0xFFF
+            ethertype = frame[16:18]
+            packet = frame[18 : 18 + SIZEOF_ARP_PACKET]
+        else:
+            vid = None
+            packet = frame[14 : 14 + SIZEOF_ARP_PACKET]
+        if ethertype != ETHERTYPE_ARP or len(packet) != SIZEOF_ARP_PACKET:
+            # Ignore truncated and non-ARP packets.
+            continue
+        observed.append((header[0], vid))
+        packets.append(packet)
+    unpacked = struct.iter_unpack(ARP_PACKET, b"".join(packets))
+    for (timestamp, vid), packet in zip(observed, unpacked):
+        (
+            hardware_type,
+            protocol,
+            hardware_length,
+            protocol_length,
+            operation,
+            sender_mac,
+            sender_ip,
+            target_mac,
+            target_ip,
+        ) = packet
+        # Only (Ethernet MAC, IPv4) bindings are supported.
+        types = hardware_type, protocol, hardware_length, protocol_length
+        if types != ETHERNET_IPV4_ARP:
+            continue
+        if operation == 1 or operation == 2:
+            if sender_ip != 0 and sender_mac != ZERO_MAC:
+                yield timestamp, vid, sender_ip, sender_mac
+        if operation == 2:
+            if target_ip != 0 and target_mac != ZERO_MAC:
+                yield timestamp, vid, target_ip, target_mac
+
+
+def update_binding(bindings, vid, ip, mac, time):
+    """Update `bindings` with a binding seen in an ARP packet.
+
+    This is `update_bindings_and_get_event` for the integer IPs and bytes
+    MACs from `get_arp_bindings`; the returned event is the same.
+    """
+    binding = bindings.get((vid, ip))
+    if binding is None:
+        bindings[(vid, ip)] = [mac, time]
+        return dict(
+            ip=str(IPAddress(ip)),
+            mac=mac.hex(":"),
+            time=time,
+            event="NEW",
+            vid=vid,
+        )
+    elif binding[0] != mac:
+        previous_mac = binding[0]
+        binding[:] = mac, time
+        return dict(
+            ip=str(IPAddress(ip)),
+            mac=mac.hex(":"),
+            time=time,
+            event="MOVED",
+            previous_mac=previous_mac.hex(":"),
+            vid=vid,
+        )
+    elif time - binding[1] >= SEEN_AGAIN_THRESHOLD:
+        binding[1] = time
+        return dict(
+            ip=str(IPAddress(ip)),
+            mac=mac.hex(":"),
+            time=time,
+            event="REFRESHED",
+            vid=vid,
+        )
+    else:
+        return None
+
+
+class Capture:
+    """The output of one capture on one interface.
+
+    :ivar kind: The kind of observation, `OBSERVE_ARP` or `OBSERVE_BEACONS`.
+    :ivar ifname: The interface being captured on.
+    :ivar process: The `Popen` of the capture, if there is one.
+    """
+
+    def __init__(self, kind, ifname, process=None):
+        super().__init__()
+        self.kind = kind
+        self.ifname = ifname
+        self.process = process
+        self.data_link_type = None
+        self._buffer = b""
+
+    def feed(self, data):
+        """Return the PCAP records completed by `data`.
+
+        :raise PCAPError: If the capture isn't of Ethernet frames in native
+            PCAP format.
+        """
+        buffer = self._buffer + data if self._buffer else data
+        offset = 0
+        if self.data_link_type is None:
+            if len(buffer) < PCAP_HEADER_SIZE:
+                self._buffer = buffer
+                return []
+            header = PCAP_HEADER.unpack_from(buffer)
+            if header[0] != PCAP_NATIVE_BYTE_ORDER_MAGIC_NUMBER:
+                raise PCAPError("Stream is not in native PCAP format.")
+            if header[6] != 1:
+                # Our assumptions about the link layer header won't be
+                # correct for anything but Ethernet.
+                raise PCAPError("Stream is not an Ethernet capture.")
+            self.data_link_type = header[6]
+            offset = PCAP_HEADER_SIZE
+        records, offset = split_pcap_records(buffer, offset)
+        self._buffer = buffer[offset:]
+        return records
+
+
+class NetworkObserver:
+    """Decode captures of ARP and beaconing traffic into observations.
+
+    ARP bindings are tracked per interface, so only NEW, MOVED and
+    (throttled) REFRESHED bindings are observed, as with `observe-arp`.
+    Beacons aren't deduplicated here; seeing the same beacon on several
+    interfaces is what tells the rack controller they're connected.
+    """
+
+    def __init__(self, err=sys.stderr):
+        super().__init__()
+        self.err = err
+        self.bindings = defaultdict(dict)
+
+    def observe(self, capture, data):
+        """Return the observations made from `data` read from `capture`.
+
+        :raise PCAPError: If the capture can't be decoded.
+        """
+        records = capture.feed(data)
+        if len(records) == 0:
+            return []
+        elif capture.kind == OBSERVE_ARP:
+            return self._observeARP(capture.ifname, records)
+        else:
+            return self._observeBeacons(capture.ifname, records)
+
+    def _observeARP(self, ifname, records):
+        bindings = self.bindings[ifname]
+        observations = []
+        for timestamp, vid, ip, mac in get_arp_bindings(records):
+            event = update_binding(bindings, vid, ip, mac, timestamp)
+            if event is not None:
+                event["interface"] = ifname
+                event["kind"] = OBSERVE_ARP
+                observations.append(event)
+        return observations
+
+    def _observeBeacons(self, ifname, records):
+        observations = []
+        for header, packet in records:
+            try:
+                beacon = decode_beacon_packet(
+                    packet, PCAPPacketHeader._make(header)
+                )
+            except PacketProcessingError as e:
+                self.err.write("%s: %s\n" % (ifname, e.error))
+                self.err.flush()
+                continue
+            if beacon is not None:
+                beacon["interface"] = ifname
+                beacon["kind"] = OBSERVE_BEACONS
+                observations.append(beacon)
+        return observations
+
+    def forget(self, ifname):
+        """Forget the ARP bindings seen on `ifname`."""
+        self.bindings.pop(ifname, None)
+
+
+def start_capture(kind, ifname):
+    """Start capturing traffic of `kind` on `ifname`."""
+    cmd = sudo([get_path(MONITOR_COMMANDS[kind]), ifname])
+    process = subprocess.Popen(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE
+    )
+    return Capture(kind, ifname, process)
+
+
+def stop_capture(capture):
+    """Stop `capture`, waiting for its process to exit."""
+    capture.process.stdout.close()
+    if capture.process.poll() is None:
+        capture.process.terminate()
+    capture.process.wait()
+
+
+class ObserverLoop:
+    """Run captures for the selected interfaces and write observations.
+
+    :param output: Stream to write observations to.
+    :param control: Binary stream to read interface selections from, or
+        None to keep observing the initial selection.
+    """
+
+    def __init__(
+        self,
+        output,
+        control=None,
+        err=sys.stderr,
+        start_capture=start_capture,
+        stop_capture=stop_capture,
+        clock=time.monotonic,
+    ):
+        super().__init__()
+        self.output = output
+        self.control = control
+        self.err = err
+        self.start_capture = start_capture
+        self.stop_capture = stop_capture
+        self.clock = clock
+        self.observer = NetworkObserver(err=err)
+        self.selector = selectors.DefaultSelector()
+        self.captures = {}
+        self.selected = set()
+        # Captures that ended, and when to start them again.
+        self.restarts = {}
+        self._control_buffer = b""
+
+    def select(self, arp=(), beacons=()):
+        """Observe ARP on the `arp` interfaces and beacons on `beacons`."""
+        selected = {(OBSERVE_ARP, ifname) for ifname in arp}
+        selected.update((OBSERVE_BEACONS, ifname) for ifname in beacons)
+        for key in set(self.captures).difference(selected):
+            self._stop(key)
+        for kind, ifname in self.selected.difference(selected):
+            if kind == OBSERVE_ARP:
+                self.observer.forget(ifname)
+        for key in selected.difference(self.captures):
+            self._start(key)
+        for key in set(self.restarts).difference(selected):
+            del self.restarts[key]
+        self.selected = selected
+
+    def _error(self, message):
+        self.err.write(message)
+        self.err.write("\n")
+        self.err.flush()
+
+    def _start(self, key):
+        self.restarts.pop(key, None)
+        try:
+            capture = self.start_capture(*key)
+        except OSError as e:
+            self._error("Failed to start %s capture on %s: %s" % (*key, e))
+            self.restarts[key] = self.clock() + CAPTURE_RESTART_INTERVAL
+        else:
+            self.captures[key] = capture
+            self.selector.register(
+                capture.process.stdout, selectors.EVENT_READ, capture
+            )
+
+    def _stop(self, key):
+        capture = self.captures.pop(key)
+        self.selector.unregister(capture.process.stdout)
+        self.stop_capture(capture)
+
+    def _ended(self, capture, reason):
+        key = capture.kind, capture.ifname
+        self._error(
+            "%s capture on %s ended: %s"
+            % (capture.kind, capture.ifname, reason)
+        )
+        self._stop(key)
+        self.restarts[key] = self.clock() + CAPTURE_RESTART_INTERVAL
+
+    def _read(self, capture):
+        data = os.read(capture.process.stdout.fileno(), READ_SIZE)
+        if len(data) == 0:
+            self._ended(capture, "end of stream")
+            return []
+        try:
+            return self.observer.observe(capture, data)
+        except PCAPError as e:
+            self._ended(capture, e)
+            return []
+
+    def _readControl(self):
+        data = os.read(self.control.fileno(), READ_SIZE)
+        if len(data) == 0:
+            # Keep observing the current selection.
+            self.selector.unregister(self.control)
+            self.control = None
+            return
+        *lines, self._control_buffer = (self._control_buffer + data).split(
+            b"\n"
+        )
+        for line in lines:
+            if line.strip() == b"":
+                continue
+            try:
+                selection = json.loads(line.decode("utf-8"))
+                arp = selection.get("arp", [])
+                beacons = selection.get("beacons", [])
+            except (ValueError, AttributeError):
+                self._error("Invalid interface selection: %r" % line)
+            else:
+                self.select(arp=arp, beacons=beacons)
+
+    def _restartCaptures(self):
+        now = self.clock()
+        for key, when in list(self.restarts.items()):
+            if when <= now:
+                self._start(key)
+
+    def _getTimeout(self):
+        if len(self.restarts) == 0:
+            return None
+        else:
+            return max(0, min(self.restarts.values()) - self.clock())
+
+    def run_once(self):
+        """Wait for, and handle, the next batch of capture output."""
+        observations = []
+        for key, _ in self.selector.select(self._getTimeout()):
+            if key.data is None:
+                self._readControl()
+            else:
+                observations.extend(self._read(key.data))
+        for observation in observations:
+            self.output.write(json.dumps(observation))
+            self.output.write("\n")
+        if len(observations) > 0:
+            self.output.flush()
+        self._restartCaptures()
+
+    def run(self):
+        """Observe until there's nothing left to observe or control."""
+        if self.control is not None:
+            self.selector.register(self.control, selectors.EVENT_READ, None)
+        try:
+            while self.control is not None or len(self.selected) > 0:
+                self.run_once()
+        finally:
+            for key in list(self.captures):
+                self._stop(key)
+
+
+def add_arguments(parser):
+    """Add this command's options to the `ArgumentParser`.
+
+    Specified by the `ActionScript` interface.
+    """
+    parser.description = dedent(
+        """\
+        Observes ARP and beaconing traffic on the specified interfaces,
+        decoding every capture in a single process. Outputs JSON objects (one
+        per line) for each NEW, REFRESHED, or MOVED ARP binding, and for each
+        beacon.
+
+        The interfaces to observe can be changed by writing JSON objects
+        such as {"arp": ["eth0"], "beacons": ["eth0", "eth1"]} to stdin,
+        one per line.
+        """
+    )
+    parser.add_argument(
+        "--arp",
+        action="append",
+        default=[],
+        metavar="INTERFACE",
+        help="Observe ARP traffic on this interface. May be repeated.",
+    )
+    parser.add_argument(
+        "--beacons",
+        action="append",
+        default=[],
+        metavar="INTERFACE",
+        help="Observe beaconing traffic on this interface. May be repeated.",
+    )
+    parser.add_argument(
+        "--no-control",
+        action="store_true",
+        help="Don't read interface selections from stdin.",
+    )
+
+
+def run(args, output=sys.stdout, stdin=sys.stdin):
+    """Observe Ethernet interfaces and print ARP bindings and beacons."""
+
+    # First, become a progress group leader, so that signals can be directed
+    # to this process and its children; see p.u.twisted.terminateProcess.
+    os.setpgrp()
+
+    control = None if args.no_control else stdin.buffer
+    loop = ObserverLoop(output, control=control)
+    loop.select(arp=args.arp, beacons=args.beacons)
+    loop.run()
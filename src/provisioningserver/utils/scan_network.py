@@ -23,6 +23,11 @@ from provisioningserver.utils.shell import (
     get_env_with_locale,
     has_command_available,
 )
+from provisioningserver.utils.sweep import (
+    DEFAULT_RATE,
+    NetworkSweeper,
+    SLOW_RATE,
+)
 
 PingParameters = namedtuple("PingParameters", ("interface", "ip"))
 
@@ -47,9 +52,11 @@ def add_arguments(parser):
         If no arguments are provided, checks all IPv4 addresses on all
         configured CIDRs on each interface.
 
-        If nmap is not installed, this command could take a very long time if
-        there are a large amount of hosts connected directly to any attached
-        networks.
+        If nmap is not installed (or --ping is specified), neighbours are
+        probed with ICMP echo and ARP requests sent from this process, at a
+        limited rate. If that is not permitted, `ping` is run for each
+        address instead, which could take a very long time if there are a
+        large amount of hosts connected directly to any attached networks.
 
         This command only considers IPv4 CIDRs. (IPv6 CIDRs are excluded.)
         """
@@ -59,7 +66,16 @@ def add_arguments(parser):
         "--slow",
         action="store_true",
         required=False,
-        help="Scan slower. Only applies to nmap scans; ping is slow already.",
+        help="Scan slower. Limits nmap scans, and ping scans (unless a rate "
+        "is specified), to %d packets per second." % SLOW_RATE,
+    )
+    parser.add_argument(
+        "-r",
+        "--rate",
+        required=False,
+        type=int,
+        help="Number of addresses to probe per second during a ping scan. "
+        "Default is %d." % DEFAULT_RATE,
     )
     parser.add_argument(
         "-t",
@@ -358,6 +374,27 @@ def ping_scan(to_scan: dict, threads=None, threads_per_cpu=4):
             yield from pool.imap(run_ping, jobs)
 
 
+def open_sweeper(targets, args, stderr):
+    """Returns a `NetworkSweeper` for the interfaces of `targets`.
+
+    Returns None (after writing a warning to `stderr`) if the sweeper's
+    sockets cannot be opened, in which case `ping` must be run instead.
+    """
+    if args.rate is not None:
+        rate = args.rate
+    elif args.slow:
+        rate = SLOW_RATE
+    else:
+        rate = DEFAULT_RATE
+    ifnames = {target.interface for target in targets}
+    try:
+        return NetworkSweeper.open(ifnames, rate=rate)
+    except OSError as error:
+        stderr.write("Unable to sweep networks (%s); using ping.\n" % error)
+        stderr.flush()
+        return None
+
+
 def write_event(event, output=sys.stdout):
     """Writes an event dictionary to the specified stream in JSON format.
 
@@ -451,11 +488,25 @@ def scan_networks(args, to_scan, stderr, stdout):
         # stderr for informational purposes.
         count = 0
         hosts = 0
-        for event in ping_scan(to_scan, threads=args.threads):
+
+        def report(event):
+            nonlocal count, hosts
             count += 1
             if event["result"] is True:
                 hosts += 1
             write_event(event, stdout)
+
+        to_scan = {ifname: list(cidrs) for ifname, cidrs in to_scan.items()}
+        targets = list(yield_ping_parameters(to_scan))
+        sweeper = open_sweeper(targets, args, stderr)
+        if sweeper is None:
+            for event in ping_scan(to_scan, threads=args.threads):
+                report(event)
+        else:
+            try:
+                sweeper.sweep(targets, report)
+            finally:
+                sweeper.close()
         clock_diff = time.monotonic() - clock
         if count > 0:
             stderr.write(
@@ -7,6 +7,7 @@ from abc import ABCMeta, abstractmethod, abstractproperty
 from collections import defaultdict, namedtuple
 import enum
 import os
+import time
 
 from twisted.internet.defer import (
     CancelledError,
@@ -18,6 +19,7 @@ from twisted.internet.defer import (
 )
 
 from provisioningserver.logger import get_maas_logger, LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils import snappy, typed
 from provisioningserver.utils.shell import get_env_with_bytes_locale
 from provisioningserver.utils.twisted import (
@@ -246,12 +248,22 @@ class ServiceMonitor:
         SERVICE_STATE.DEAD: "Result: exit-code",
     }
 
-    def __init__(self, *services):
+    # The properties `systemctl show` is asked for when loading states.
+    SYSTEMD_PROPERTIES = ("LoadState", "ActiveState", "SubState", "Result")
+
+    def __init__(self, *services, prometheus_metrics=PROMETHEUS_METRICS):
         for service in services:
             assert isinstance(service, Service)
         self._services = {service.name: service for service in services}
         self._serviceStates = defaultdict(ServiceState)
         self._serviceLocks = defaultdict(DeferredLock)
+        # States of services loaded together at the start of a call to
+        # `ensureServices`, keyed by service name. Each is used at most once,
+        # and is discarded when an action is performed on its service.
+        self._loadedStates = {}
+        # The number of commands executed, for reporting per cycle.
+        self._commandCount = 0
+        self._prometheus_metrics = prometheus_metrics
 
     def _getServiceLock(self, name):
         """Return the lock for the named service."""
@@ -276,11 +288,16 @@ class ServiceMonitor:
     def getServiceState(self, name, now=False):
         """Get the current service state.
 
-        :param now: True will query systemd before returning the result.
+        :param now: True will query systemd before returning the result,
+            unless its state was loaded at the start of this monitoring cycle
+            and has not been used yet.
         """
         service = self.getServiceByName(name)
         if now:
-            active_state, process_state = yield self._loadServiceState(service)
+            loaded_state = self._loadedStates.pop(name, None)
+            if loaded_state is None:
+                loaded_state = yield self._loadServiceState(service)
+            active_state, process_state = loaded_state
             _check_service_state_observed(active_state)
             state = self._updateServiceState(name, active_state, process_state)
         else:
@@ -291,9 +308,22 @@ class ServiceMonitor:
     def ensureServices(self):
         """Ensures that services are in their desired state.
 
+        The states of all services are loaded together first, with a single
+        command, rather than with a command per service.
+
         :return: A mapping of service names to their current known state.
         """
 
+        def cb_loadedStates(states):
+            self._loadedStates = states
+
+        def eb_loadedStates(failure):
+            # Each service's state will be loaded by itself instead.
+            maaslog.warning(
+                "Unable to load the state of all services at once: %s",
+                failure.getErrorMessage(),
+            )
+
         def eb_ensureService(failure, service_name):
             # Only log if it's not the ServiceActionError;
             # ServiceActionError is already logged.
@@ -322,8 +352,29 @@ class ServiceMonitor:
         def cb_buildResult(results):
             return dict(result for _, result in results)
 
-        d = DeferredList(map(ensureService, self._services))
+        def ensureEachService(_):
+            return DeferredList(map(ensureService, self._services))
+
+        def cb_endCycle(result, started, command_count):
+            self._loadedStates = {}
+            self._prometheus_metrics.update(
+                "maas_service_monitor_cycle_latency",
+                "observe",
+                value=time.monotonic() - started,
+            )
+            self._prometheus_metrics.update(
+                "maas_service_monitor_cycle_commands",
+                "observe",
+                value=self._commandCount - command_count,
+            )
+            return result
+
+        started, command_count = time.monotonic(), self._commandCount
+        d = maybeDeferred(self._loadServiceStates)
+        d.addCallbacks(cb_loadedStates, eb_loadedStates)
+        d.addCallback(ensureEachService)
         d.addCallback(cb_buildResult)
+        d.addBoth(cb_endCycle, started, command_count)
         return d
 
     @asynchronous
@@ -458,6 +509,7 @@ class ServiceMonitor:
                 cmd=lambda: " ".join(cmd),
             )
 
+            self._commandCount += 1
             d = deferWithTimeout(
                 timeout, getProcessOutputAndValue, cmd[0], cmd[1:], env=env
             )
@@ -540,6 +592,8 @@ class ServiceMonitor:
     @inlineCallbacks
     def _performServiceAction(self, service, action):
         """Start or stop the service."""
+        # The service's state may change, so it must be loaded again.
+        self._loadedStates.pop(service.name, None)
         lock = self._getServiceLock(service.name)
         if snappy.running_in_snap():
             exec_action = self._execSupervisorServiceAction
@@ -567,6 +621,106 @@ class ServiceMonitor:
         else:
             return self._loadSystemDServiceState(service)
 
+    def _loadServiceStates(self):
+        """Return the states of all services that could be loaded.
+
+        :return: dict of service names to (active state, process state)
+            tuples. Services whose state could not be determined are left
+            out; their states can be loaded individually.
+        """
+        if snappy.running_in_snap():
+            return self._loadSupervisorServiceStates(self._services.values())
+        else:
+            return self._loadSystemDServiceStates(self._services.values())
+
+    @inlineCallbacks
+    def _loadSystemDServiceStates(self, services):
+        """Return the states of `services` from systemd, with one command."""
+        services = list(services)
+        if len(services) == 0:
+            return {}
+        cmd = [
+            "systemctl",
+            "show",
+            "--property=%s" % ",".join(self.SYSTEMD_PROPERTIES),
+            "--",
+        ]
+        cmd.extend(service.service_name for service in services)
+        exit_code, output, error = yield self._execCmd(
+            cmd, get_env_with_bytes_locale()
+        )
+        if exit_code != 0:
+            raise ServiceParsingError(
+                "systemctl exited '%d': %s" % (exit_code, error)
+            )
+        # The properties of each unit are written in the order the units were
+        # given, separated by blank lines. Units are matched up by position
+        # because a unit's Id can differ from the name used for it, e.g. when
+        # the name is an alias.
+        blocks = output.strip().split("\n\n")
+        if len(blocks) != len(services):
+            raise ServiceParsingError(
+                "systemctl returned the properties of %d units instead of %d."
+                % (len(blocks), len(services))
+            )
+        states = {}
+        for service, block in zip(services, blocks):
+            properties = dict(
+                line.split("=", 1)
+                for line in block.splitlines()
+                if "=" in line
+            )
+            if properties.get("LoadState") != "loaded":
+                continue
+            active_state = properties.get("ActiveState")
+            active_state_enum = self.SYSTEMD_TO_STATE.get(active_state)
+            if active_state_enum is None:
+                continue
+            # This is what `systemctl status` shows in parentheses after the
+            # active state, e.g. "active (running)" or "failed (Result:
+            # exit-code)".
+            if active_state == "failed":
+                process_state = "Result: %s" % properties.get("Result")
+            else:
+                process_state = properties.get("SubState")
+            states[service.name] = (active_state_enum, process_state)
+        return states
+
+    @inlineCallbacks
+    def _loadSupervisorServiceStates(self, services):
+        """Return the states of `services` from supervisor, with one command."""
+        services = list(services)
+        if len(services) == 0:
+            return {}
+        cmd = (
+            os.path.join(snappy.get_snap_path(), "bin", "run-supervisorctl"),
+            "status",
+            *(service.snap_service_name for service in services),
+        )
+        exit_code, output, error = yield self._execCmd(
+            cmd, get_env_with_bytes_locale()
+        )
+        # See `_loadSupervisorServiceState` for the meaning of exit codes.
+        if exit_code > 3:
+            raise ServiceParsingError(
+                "supervisorctl exited '%d': %s" % (exit_code, output)
+            )
+        statuses = {}
+        for line in output.splitlines():
+            line_split = line.split()
+            if len(line_split) >= 2:
+                statuses[line_split[0]] = line_split[1]
+        states = {}
+        for service in services:
+            status = statuses.get(service.snap_service_name)
+            active_state_enum = self.SUPERVISOR_TO_STATE.get(status)
+            if active_state_enum is not None:
+                states[service.name] = (
+                    active_state_enum,
+                    self.PROCESS_STATE[active_state_enum],
+                )
+        return states
+
     @inlineCallbacks
     def _loadSystemDServiceState(self, service):
         """Return service status from systemd."""
@@ -125,47 +125,28 @@ class JSONPerLineProtocol(ProcessProtocol):
             self.done.errback(reason)
 
 
-class ProtocolForObserveARP(JSONPerLineProtocol):
-    """Protocol used when spawning `maas-rack observe-arp`.
-
-    The difference between `JSONPerLineProtocol` and `ProtocolForObserveARP`
-    is that the neighbour observation protocol needs to insert the interface
-    metadata into the resultant object before the callback.
-    """
-
-    def __init__(self, interface, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.interface = interface
-
-    def objectReceived(self, obj):
-        obj["interface"] = self.interface
-        super().objectReceived(obj)
-
-    def errLineReceived(self, line):
-        line = line.decode("utf-8").rstrip()
-        log.msg("observe-arp[%s]:" % self.interface, line)
-
-
-class ProtocolForObserveBeacons(JSONPerLineProtocol):
-    """Protocol used when spawning `maas-rack observe-beacons`.
+class ProtocolForObserveNetwork(JSONPerLineProtocol):
+    """Protocol used when spawning `maas-rack observe-network`.
 
     The difference between `JSONPerLineProtocol` and
-    `ProtocolForObserveBeacons` is that the beacon observation protocol needs
-    to insert the interface metadata into the resultant object before the
-    callback.
+    `ProtocolForObserveNetwork` is that the objects received together are
+    passed to the callback in a single call, rather than one at a time.
     """
 
-    def __init__(self, interface, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.interface = interface
+    def outReceived(self, data):
+        lines, self._outbuf = self.splitLines(self._outbuf + data)
+        self._received = []
+        for line in lines:
+            self.outLineReceived(line)
+        if len(self._received) > 0:
+            self._callback(self._received)
 
     def objectReceived(self, obj):
-        obj["interface"] = self.interface
-        super().objectReceived(obj)
+        self._received.append(obj)
 
     def errLineReceived(self, line):
         line = line.decode("utf-8").rstrip()
-        log.msg("observe-beacons[%s]:" % self.interface, line)
+        log.msg("observe-network:", line)
 
 
 class ProtocolForObserveMDNS(JSONPerLineProtocol):
@@ -262,42 +243,62 @@ class ProcessProtocolService(TimerService, metaclass=ABCMeta):
         return super().stopService()
 
 
-class NeighbourDiscoveryService(ProcessProtocolService):
-    """Service to spawn the per-interface device discovery subprocess."""
+class NetworkObserverService(ProcessProtocolService):
+    """Service to spawn the ARP and beacon observation subprocess.
 
-    def __init__(self, ifname: str, callback: callable):
-        self.ifname = ifname
-        self.callback = callback
+    A single process observes every interface; the interfaces it observes
+    are written to its stdin whenever they change, or it's restarted.
+    """
+
+    def __init__(self, neighbours_callback, beacons_callback):
+        self.neighbours_callback = neighbours_callback
+        self.beacons_callback = beacons_callback
+        self.arp_interfaces = frozenset()
+        self.beacon_interfaces = frozenset()
         super().__init__()
 
     def getDescription(self) -> str:
-        return "Neighbour observation process for %s" % self.ifname
+        return "Network observation process"
 
     def getProcessParameters(self):
         maas_rack_cmd = get_maas_common_command().encode("utf-8")
-        return [maas_rack_cmd, b"observe-arp", self.ifname.encode("utf-8")]
+        return [maas_rack_cmd, b"observe-network"]
 
     def createProcessProtocol(self):
-        return ProtocolForObserveARP(self.ifname, callback=self.callback)
-
-
-class BeaconingService(ProcessProtocolService):
-    """Service to spawn the per-interface device discovery subprocess."""
-
-    def __init__(self, ifname: str, callback: callable):
-        self.ifname = ifname
-        self.callback = callback
-        super().__init__()
+        return ProtocolForObserveNetwork(callback=self.observationsReceived)
 
-    def getDescription(self) -> str:
-        return "Beaconing process for %s" % self.ifname
+    def startProcess(self):
+        d = super().startProcess()
+        self._writeInterfaces()
+        return d
 
-    def getProcessParameters(self):
-        maas_rack_cmd = get_maas_common_command().encode("utf-8")
-        return [maas_rack_cmd, b"observe-beacons", self.ifname.encode("utf-8")]
+    def setInterfaces(self, arp, beacons):
+        """Observe ARP on the `arp` interfaces, and beacons on `beacons`."""
+        self.arp_interfaces = frozenset(arp)
+        self.beacon_interfaces = frozenset(beacons)
+        self._writeInterfaces()
 
-    def createProcessProtocol(self):
-        return ProtocolForObserveBeacons(self.ifname, callback=self.callback)
+    def _writeInterfaces(self):
+        if self._process is not None and self._process.pid is not None:
+            selection = {
+                "arp": sorted(self.arp_interfaces),
+                "beacons": sorted(self.beacon_interfaces),
+            }
+            self._process.write(json.dumps(selection).encode("utf-8") + b"\n")
+
+    def observationsReceived(self, observations):
+        neighbours = []
+        beacons = []
+        for observation in observations:
+            kind = observation.pop("kind", None)
+            if kind == "arp":
+                neighbours.append(observation)
+            elif kind == "beacon":
+                beacons.append(observation)
+        if len(neighbours) > 0:
+            self.neighbours_callback(neighbours)
+        if len(beacons) > 0:
+            self.beacons_callback(beacons)
 
 
 class MDNSResolverService(ProcessProtocolService):
@@ -983,6 +984,7 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
         self._recorded = None
         self._monitored = frozenset()
         self._beaconing = frozenset()
+        self._network_observer = None
         self._monitoring_state = {}
         self._monitoring_mdns = False
         self._locked = False
@@ -1181,20 +1183,6 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
         }
         return monitored_interfaces
 
-    def _startNeighbourDiscovery(self, ifname):
-        """"Start neighbour discovery service on the specified interface."""
-        service = NeighbourDiscoveryService(ifname, self.reportNeighbours)
-        service.clock = self.clock
-        service.setName("neighbour_discovery:" + ifname)
-        service.setServiceParent(self)
-
-    def _startBeaconing(self, ifname):
-        """"Start neighbour discovery service on the specified interface."""
-        service = BeaconingService(ifname, self.reportBeacons)
-        service.clock = self.clock
-        service.setName("beaconing:" + ifname)
-        service.setServiceParent(self)
-
     def _startMDNSDiscoveryService(self):
         """Start resolving mDNS entries on attached networks."""
         try:
@@ -1218,53 +1206,30 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
             service.disownServiceParent()
             maaslog.info("Stopped mDNS resolver service.")
 
-    def _startNeighbourDiscoveryServices(self, new_interfaces):
-        """Start monitoring services for the specified set of interfaces."""
-        for ifname in new_interfaces:
-            # Sanity check to ensure the service isn't already started.
-            try:
-                self.getServiceNamed("neighbour_discovery:" + ifname)
-            except KeyError:
-                # This is an expected exception. (The call inside the `try`
-                # is only necessary to ensure the service doesn't exist.)
-                self._startNeighbourDiscovery(ifname)
-
-    def _stopNeighbourDiscoveryServices(self, deleted_interfaces):
-        """Stop monitoring services for the specified set of interfaces."""
-        for ifname in deleted_interfaces:
-            try:
-                service = self.getServiceNamed("neighbour_discovery:" + ifname)
-            except KeyError:
-                # Service doesn't exist, so no need to stop it.
-                pass
-            else:
-                service.disownServiceParent()
-                maaslog.info(
-                    "Stopped neighbour observation service for %s." % ifname
-                )
+    def _configureNetworkObserver(self):
+        """Observe ARP and beacons on the interfaces selected for each.
 
-    def _startBeaconingServices(self, new_interfaces):
-        """Start monitoring services for the specified set of interfaces."""
-        for ifname in new_interfaces:
-            # Sanity check to ensure the service isn't already started.
-            try:
-                self.getServiceNamed("beaconing:" + ifname)
-            except KeyError:
-                # This is an expected exception. (The call inside the `try`
-                # is only necessary to ensure the service doesn't exist.)
-                self._startBeaconing(ifname)
-
-    def _stopBeaconingServices(self, deleted_interfaces):
-        """Stop monitoring services for the specified set of interfaces."""
-        for ifname in deleted_interfaces:
-            try:
-                service = self.getServiceNamed("beaconing:" + ifname)
-            except KeyError:
-                # Service doesn't exist, so no need to stop it.
-                pass
-            else:
-                service.disownServiceParent()
-                maaslog.info("Stopped beaconing service for %s." % ifname)
+        The observation service is started when the first interface is
+        selected, and stopped once none are.
+        """
+        if len(self._monitored) == 0 and len(self._beaconing) == 0:
+            if self._network_observer is not None:
+                self._network_observer.disownServiceParent()
+                self._network_observer = None
+                maaslog.info("Stopped network observation service.")
+        elif self._network_observer is None:
+            service = NetworkObserverService(
+                self.reportNeighbours, self.reportBeacons
+            )
+            service.setInterfaces(self._monitored, self._beaconing)
+            service.clock = self.clock
+            service.setName("network_observer")
+            service.setServiceParent(self)
+            self._network_observer = service
+        else:
+            self._network_observer.setInterfaces(
+                self._monitored, self._beaconing
+            )
 
     def _shouldMonitorMDNS(self, monitoring_state):
         # If any interface is configured for mDNS, we must start the monitoring
@@ -1333,13 +1298,13 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
         deleted_interfaces = self._beaconing.difference(beaconing_interfaces)
         if len(new_interfaces) > 0:
             log.msg("Starting beaconing for interfaces: %r" % new_interfaces)
-            self._startBeaconingServices(new_interfaces)
         if len(deleted_interfaces) > 0:
             log.msg(
                 "Stopping beaconing for interfaces: %r" % deleted_interfaces
             )
-            self._stopBeaconingServices(deleted_interfaces)
-        self._beaconing = beaconing_interfaces
+        if beaconing_interfaces != self._beaconing:
+            self._beaconing = frozenset(beaconing_interfaces)
+            self._configureNetworkObserver()
         if self.beaconing_protocol is None:
             self.beaconing_protocol = BeaconingSocketProtocol(
                 self.clock, interfaces=interfaces
@@ -1366,14 +1331,14 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
                 "Starting neighbour discovery for interfaces: %r"
                 % new_interfaces
             )
-            self._startNeighbourDiscoveryServices(new_interfaces)
         if len(deleted_interfaces) > 0:
             log.msg(
                 "Stopping neighbour discovery for interfaces: %r"
                 % deleted_interfaces
             )
-            self._stopNeighbourDiscoveryServices(deleted_interfaces)
-        self._monitored = monitored_interfaces
+        if monitored_interfaces != self._monitored:
+            self._monitored = frozenset(monitored_interfaces)
+            self._configureNetworkObserver()
 
     def _interfacesRecorded(self, interfaces):
         """The given `interfaces` were recorded successfully."""
@@ -0,0 +1,344 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Sweep attached networks for neighbours from a single process.
+
+Rather than running `ping` once for each address, the sweeper sends ICMP
+echo requests and ARP requests itself, from one socket of each kind per
+interface, at a limited rate. Replies are collected asynchronously by an
+`asyncio` event loop as they arrive.
+
+ICMP echo requests are sent from unprivileged datagram ICMP sockets where
+the kernel permits it (see `net.ipv4.ping_group_range`), or from raw
+sockets otherwise. ARP requests are sent as probes (with a sender address
+of 0.0.0.0, so that neighbours' caches are left alone) when a packet socket
+can be opened, and find neighbours which ignore ICMP.
+
+Events are the same as those produced by `ping_scan()`.
+"""
+
+import asyncio
+import itertools
+import os
+import socket
+import struct
+
+from netaddr import IPAddress
+
+# Rates (in addresses per second) at which to probe neighbours. The slow rate
+# matches the rate `nmap` is limited to when scanning slowly.
+DEFAULT_RATE = 250
+SLOW_RATE = 9
+
+# Like `ping -c 3 -i 0.2 -w 1`: probe each address up to three times, at
+# least 0.2 seconds apart, and wait a second for replies to the last probes.
+DEFAULT_ATTEMPTS = 3
+PROBE_INTERVAL = 0.2
+REPLY_TIMEOUT = 1.0
+
+# This reads: http://maas.io/ (as sent by `ping -p`).
+ICMP_PAYLOAD = b"http://maas.io/ "
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_HEADER = struct.Struct("!BBHHH")
+
+ETH_P_ARP = 0x0806
+ETHERNET_BROADCAST = b"\xff" * 6
+ARP_REQUEST = 1
+ARP_REPLY = 2
+ARP_HEADER = struct.Struct("!HHBBH")
+
+# Identifiers for raw ICMP sockets, which the kernel does not assign.
+_identifiers = itertools.count(os.getpid())
+
+
+def get_icmp_checksum(data):
+    """Returns the internet checksum (RFC 1071) of `data`."""
+    if len(data) % 2 == 1:
+        data += b"\x00"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    while total > 0xFFFF:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+class ICMPTransport:
+    """Sends ICMP echo requests on an interface, and receives the replies."""
+
+    def __init__(self, ifname):
+        self.ifname = ifname
+        self.sequence = 0
+        try:
+            self.socket = socket.socket(
+                socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP
+            )
+        except PermissionError:
+            # Datagram ICMP sockets are not permitted for this group; a raw
+            # socket needs privileges, but receives all ICMP traffic.
+            self.socket = socket.socket(
+                socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP
+            )
+            self.raw = True
+            self.identifier = next(_identifiers) & 0xFFFF
+        else:
+            # The kernel assigns (and matches replies to) the identifier.
+            self.raw = False
+            self.identifier = 0
+        try:
+            self.socket.setblocking(False)
+            # Bypass the routing table, like `ping -r`.
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_DONTROUTE, 1)
+            try:
+                self.socket.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_BINDTODEVICE,
+                    ifname.encode("utf-8"),
+                )
+            except PermissionError:
+                # Older kernels require privileges to bind to a device, but
+                # requests for on-link addresses leave by the right one.
+                pass
+        except Exception:
+            self.socket.close()
+            raise
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def send(self, ip):
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        header = ICMP_HEADER.pack(
+            ICMP_ECHO_REQUEST, 0, 0, self.identifier, self.sequence
+        )
+        checksum = get_icmp_checksum(header + ICMP_PAYLOAD)
+        header = ICMP_HEADER.pack(
+            ICMP_ECHO_REQUEST, 0, checksum, self.identifier, self.sequence
+        )
+        self.socket.sendto(header + ICMP_PAYLOAD, (ip, 0))
+
+    def receive(self):
+        """Yields the address of each neighbour which replied."""
+        while True:
+            try:
+                data, (ip, _) = self.socket.recvfrom(2048)
+            except BlockingIOError:
+                return
+            if self.raw:
+                # Raw sockets receive the IP header too.
+                data = data[(data[0] & 0x0F) * 4 :]
+            if len(data) < ICMP_HEADER.size:
+                continue
+            icmp_type, _, _, identifier, _ = ICMP_HEADER.unpack_from(data)
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+            if self.raw and identifier != self.identifier:
+                continue
+            yield ip
+
+    def close(self):
+        self.socket.close()
+
+
+class ARPTransport:
+    """Sends ARP probes on an interface, and receives the replies."""
+
+    def __init__(self, ifname):
+        self.ifname = ifname
+        self.socket = socket.socket(
+            socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP)
+        )
+        try:
+            self.socket.bind((ifname, ETH_P_ARP))
+            self.socket.setblocking(False)
+            self.mac = self.socket.getsockname()[4]
+        except Exception:
+            self.socket.close()
+            raise
+        self.header = (
+            ETHERNET_BROADCAST
+            + self.mac
+            + struct.pack("!H", ETH_P_ARP)
+            + ARP_HEADER.pack(1, 0x800, 6, 4, ARP_REQUEST)
+            + self.mac
+            + bytes(4)
+            + bytes(6)
+        )
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def send(self, ip):
+        self.socket.send(self.header + IPAddress(ip).packed)
+
+    def receive(self):
+        """Yields the address of each neighbour which replied."""
+        while True:
+            try:
+                frame = self.socket.recv(2048)
+            except BlockingIOError:
+                return
+            # Ethernet header (14 bytes), ARP header (8 bytes), sender MAC.
+            if len(frame) < 42:
+                continue
+            if ARP_HEADER.unpack_from(frame, 14)[4] != ARP_REPLY:
+                continue
+            yield socket.inet_ntoa(frame[28:32])
+
+    def close(self):
+        self.socket.close()
+
+
+def open_transports(ifname):
+    """Opens each transport the sweeper can use on `ifname`.
+
+    ARP probes are only sent if a packet socket can be opened; ICMP alone is
+    enough to sweep an interface.
+
+    :raise OSError: If no transport can be opened on `ifname`.
+    """
+    transports = []
+    try:
+        transports.append(ICMPTransport(ifname))
+    except OSError as error:
+        icmp_error = error
+    else:
+        icmp_error = None
+    try:
+        transports.append(ARPTransport(ifname))
+    except OSError:
+        if icmp_error is not None:
+            raise icmp_error
+    return transports
+
+
+class NetworkSweeper:
+    """Probes addresses on several interfaces, and reports which replied.
+
+    :param transports: dict of {<interface-name>: <list-of-transports>}. A
+        transport has `fileno()`, `send(ip)`, `receive()` (which yields the
+        address of each neighbour which replied since it was last called)
+        and `close()` methods.
+    :param rate: The maximum number of addresses to probe per second.
+    :param attempts: The number of times to probe an address which has not
+        replied.
+    """
+
+    def __init__(
+        self,
+        transports,
+        rate=DEFAULT_RATE,
+        attempts=DEFAULT_ATTEMPTS,
+        interval=PROBE_INTERVAL,
+        timeout=REPLY_TIMEOUT,
+    ):
+        self.transports = transports
+        self.rate = rate
+        self.attempts = attempts
+        self.interval = interval
+        self.timeout = timeout
+
+    @classmethod
+    def open(cls, ifnames, **kwargs):
+        """Opens transports on each of `ifnames` and returns a sweeper.
+
+        :raise OSError: If an interface cannot be swept.
+        """
+        transports = {}
+        try:
+            for ifname in ifnames:
+                transports[ifname] = open_transports(ifname)
+        except Exception:
+            cls(transports).close()
+            raise
+        return cls(transports, **kwargs)
+
+    def close(self):
+        for transports in self.transports.values():
+            for transport in transports:
+                transport.close()
+
+    def sweep(self, targets, callback):
+        """Probes each target, and calls `callback` with an event for each.
+
+        Events for neighbours which replied are reported as soon as they
+        arrive; those for neighbours which did not are reported at the end.
+
+        :param targets: iterable of `PingParameters` namedtuples.
+        :param callback: called with the event for each target.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._sweep(loop, targets, callback))
+        finally:
+            loop.close()
+
+    async def _sweep(self, loop, targets, callback):
+        # An ordered set of the (interface, ip) pairs yet to reply.
+        pending = dict.fromkeys(
+            (target.interface, target.ip) for target in targets
+        )
+        finished = asyncio.Event()
+
+        def received(ifname, transport):
+            for ip in transport.receive():
+                if (ifname, ip) in pending:
+                    del pending[ifname, ip]
+                    callback(make_event(ifname, ip, True))
+            if len(pending) == 0:
+                finished.set()
+
+        fds = []
+        for ifname, transports in self.transports.items():
+            for transport in transports:
+                loop.add_reader(
+                    transport.fileno(), received, ifname, transport
+                )
+                fds.append(transport.fileno())
+        try:
+            for _ in range(self.attempts):
+                if len(pending) == 0:
+                    break
+                started = loop.time()
+                await self._probe(loop, list(pending), pending)
+                elapsed = loop.time() - started
+                if elapsed < self.interval:
+                    await asyncio.sleep(self.interval - elapsed)
+            if len(pending) > 0:
+                try:
+                    await asyncio.wait_for(finished.wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for fd in fds:
+                loop.remove_reader(fd)
+        for ifname, ip in pending:
+            callback(make_event(ifname, ip, False))
+
+    async def _probe(self, loop, targets, pending):
+        started = loop.time()
+        sent = 0
+        for ifname, ip in targets:
+            delay = started + sent / self.rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if (ifname, ip) not in pending:
+                # Replied to an earlier probe while we waited.
+                continue
+            sent += 1
+            for transport in self.transports.get(ifname, ()):
+                try:
+                    transport.send(ip)
+                except OSError:
+                    # For example, ENETUNREACH because the address is not
+                    # on-link, or ENOBUFS; the neighbour is reported down
+                    # unless a later probe succeeds.
+                    pass
+
+
+def make_event(ifname, ip, result):
+    return {
+        "scan_type": "ping",
+        "interface": ifname,
+        "ip": ip,
+        "result": result,
+    }
@@ -3,6 +3,7 @@
 
 """Testing helpers for provisioningserver.utils."""
 
+import socket
 
 from fixtures import Fixture
 from twisted.internet import defer
@@ -47,3 +48,40 @@ def callWithServiceRunning(service, f, *args, **kwargs):
     d.addCallback(call, f, *args, **kwargs)
     d.addBoth(callOut, service.stopService)
     return d
+
+
+class FakeSweepTransport:
+    """A transport for `NetworkSweeper` backed by a socket pair.
+
+    Probes sent to addresses in `neighbours` are answered through the socket
+    pair, so replies arrive asynchronously, as they would from the network.
+
+    :ivar sent: list of the address of each probe sent.
+    """
+
+    def __init__(self, neighbours=()):
+        self.neighbours = set(neighbours)
+        self.sent = []
+        self.socket, self.peer = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_DGRAM
+        )
+        self.socket.setblocking(False)
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def send(self, ip):
+        self.sent.append(ip)
+        if ip in self.neighbours:
+            self.peer.send(ip.encode("ascii"))
+
+    def receive(self):
+        while True:
+            try:
+                yield self.socket.recv(64).decode("ascii")
+            except BlockingIOError:
+                return
+
+    def close(self):
+        self.socket.close()
+        self.peer.close()
@@ -1,13 +1,26 @@
 from datetime import datetime
 import io
+import marshal
 import os
 from pathlib import Path
 import pstats
+import sys
+import threading
 
+from twisted.internet.defer import maybeDeferred
+from twisted.python import threadable
+from twisted.web.server import NOT_DONE_YET
+from twisted.web.test.test_web import DummyRequest
+
+from maastesting.factory import factory
 from maastesting.testcase import MAASTestCase
+from provisioningserver.security import to_hex
 from provisioningserver.utils import debug
 from provisioningserver.utils.debug import (
+    get_thread_label,
+    ProfilerResource,
     register_sigusr1_toggle_cprofile,
+    SamplingProfiler,
     toggle_cprofile,
 )
 
@@ -55,3 +68,229 @@ class TestToggleCprofile(MAASTestCase):
         func()
         func()
         self.assertTrue(self._get_prof_path("my-process").exists())
+
+
+class TestGetThreadLabel(MAASTestCase):
+    def test_reactor_thread(self):
+        self.patch(threadable, "ioThread", 1234)
+        self.assertEqual("reactor", get_thread_label(1234, "MainThread"))
+
+    def test_pool_threads(self):
+        self.assertEqual(
+            "database", get_thread_label(1, "PoolThread-database-3")
+        )
+        self.assertEqual(
+            "twisted.internet.reactor",
+            get_thread_label(1, "PoolThread-twisted.internet.reactor-0"),
+        )
+
+    def test_other_threads(self):
+        self.assertEqual("other", get_thread_label(1, "Thread-1"))
+        self.assertEqual("other", get_thread_label(1, None))
+
+
+class TestSamplingProfiler(MAASTestCase):
+    def run_in_pool_thread(self, profiler):
+        started, done = threading.Event(), threading.Event()
+
+        def busy_function():
+            started.set()
+            done.wait(10)
+
+        thread = threading.Thread(
+            target=busy_function, name="PoolThread-default-1"
+        )
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(done.set)
+        started.wait(10)
+        profiler.sample()
+        profiler.sample()
+
+    def test_sample_records_stacks_of_other_threads(self):
+        profiler = SamplingProfiler(1, labels={"default"})
+        self.run_in_pool_thread(profiler)
+        self.assertEqual(2, profiler.count)
+        [((label, stack), count)] = profiler.samples.items()
+        self.assertEqual("default", label)
+        self.assertEqual(2, count)
+        self.assertIn("busy_function", [name for _, _, name in stack])
+
+    def test_sample_skips_calling_thread(self):
+        profiler = SamplingProfiler(1)
+        profiler.sample()
+        own_frames = [
+            stack
+            for (label, stack) in profiler.samples
+            if any(
+                name == "test_sample_skips_calling_thread"
+                for _, _, name in stack
+            )
+        ]
+        self.assertEqual([], own_frames)
+
+    def test_run_samples_for_duration(self):
+        self.patch(debug, "sleep")
+        profiler = SamplingProfiler(1, interval=0.1)
+        self.assertIs(profiler, profiler.run())
+        self.assertEqual(10, profiler.count)
+
+    def test_collapsed(self):
+        profiler = SamplingProfiler(1)
+        profiler.samples["reactor", (("a.py", 1, "f"), ("b.py", 2, "g"))] = 3
+        self.assertEqual(
+            b"reactor;f (a.py:1);g (b.py:2) 3\n", profiler.collapsed()
+        )
+
+    def test_pstats_loads(self):
+        profiler = SamplingProfiler(1, labels={"default"})
+        self.run_in_pool_thread(profiler)
+        stats_path = self.make_file(contents=profiler.pstats())
+        output = io.StringIO()
+        stats = pstats.Stats(stats_path, stream=output)
+        stats.print_callers()
+        self.assertIn("[default] busy_function", output.getvalue())
+
+    def test_pstats_times(self):
+        profiler = SamplingProfiler(1, interval=0.5)
+        f, g = ("a.py", 1, "f"), ("b.py", 2, "g")
+        profiler.samples["reactor", (f, g)] = 3
+        profiler.samples["reactor", (f,)] = 1
+        stats = marshal.loads(profiler.pstats())
+        rf, rg = ("a.py", 1, "[reactor] f"), ("b.py", 2, "[reactor] g")
+        self.assertEqual((4, 4, 0.5, 2.0, {}), stats[rf])
+        self.assertEqual((3, 3, 1.5, 1.5, {rf: 3}), stats[rg])
+
+
+class TestProfilerResource(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.secret = factory.make_bytes()
+        self.patch(
+            debug, "get_shared_secret_from_filesystem"
+        ).return_value = self.secret
+        self.patch(debug, "deferToThread", maybeDeferred)
+        self.patch(debug, "deferToNewThread", maybeDeferred)
+        self.patch(debug, "sleep")
+        # Profiles run in the test's thread, which the profiler skips, so
+        # present its stack as another thread's.
+        self.patch(debug, "current_frames").side_effect = lambda: {
+            0: sys._getframe()
+        }
+
+    def make_request(self, token=None, **args):
+        request = DummyRequest([])
+        request.args = {
+            name.encode("ascii"): [value.encode("ascii")]
+            for name, value in args.items()
+        }
+        if token is None:
+            token = b"Bearer %s" % to_hex(self.secret).encode("ascii")
+        request.requestHeaders.setRawHeaders(b"authorization", [token])
+        return request
+
+    def render(self, resource, request):
+        result = resource.render_GET(request)
+        if result is not NOT_DONE_YET:
+            request.write(result)
+            request.finish()
+        return request.responseCode or 200, b"".join(request.written)
+
+    def test_profiles_in_collapsed_format(self):
+        request = self.make_request(duration="0.1", interval="0.05")
+        code, content = self.render(ProfilerResource(), request)
+        self.assertEqual(200, code)
+        self.assertEqual(
+            [b"text/plain; charset=utf-8"],
+            request.responseHeaders.getRawHeaders(b"content-type"),
+        )
+        self.assertIn(b"other;", content)
+        self.assertIn(b"test_profiles_in_collapsed_format", content)
+
+    def test_profiles_in_pstats_format(self):
+        request = self.make_request(duration="0.1", format="pstats")
+        code, content = self.render(ProfilerResource(), request)
+        self.assertEqual(200, code)
+        self.assertIn(
+            "[other] test_profiles_in_pstats_format",
+            [name for _, _, name in marshal.loads(content)],
+        )
+
+    def test_filters_threads(self):
+        request = self.make_request(duration="0.1", thread="database")
+        code, content = self.render(ProfilerResource(), request)
+        self.assertEqual(200, code)
+        self.assertEqual(b"", content)
+
+    def test_forbidden_with_wrong_token(self):
+        request = self.make_request(token=b"Bearer 0123", duration="0.1")
+        resource = ProfilerResource()
+        code, content = self.render(resource, request)
+        self.assertEqual(403, code)
+        self.assertFalse(resource.running)
+
+    def test_forbidden_without_authorization(self):
+        request = self.make_request(duration="0.1")
+        request.requestHeaders.removeHeader(b"authorization")
+        code, content = self.render(ProfilerResource(), request)
+        self.assertEqual(403, code)
+
+    def test_forbidden_before_checking_arguments(self):
+        request = self.make_request(token=b"Bearer 0123", duration="forever")
+        code, content = self.render(ProfilerResource(), request)
+        self.assertEqual(403, code)
+
+    def test_forbidden_while_running(self):
+        resource = ProfilerResource()
+        resource.running = True
+        request = self.make_request(token=b"Bearer 0123")
+        code, content = self.render(resource, request)
+        self.assertEqual(403, code)
+        self.assertTrue(resource.running)
+
+    def test_forbidden_without_shared_secret(self):
+        debug.get_shared_secret_from_filesystem.return_value = None
+        request = self.make_request(duration="0.1")
+        code, content = self.render(ProfilerResource(), request)
+        self.assertEqual(403, code)
+
+    def test_rejects_invalid_arguments(self):
+        for args in (
+            {"duration": "forever"},
+            {"duration": "0"},
+            {"duration": "3600"},
+            {"duration": "1", "interval": "0"},
+            {"duration": "1", "format": "svg"},
+        ):
+            request = self.make_request(**args)
+            code, content = self.render(ProfilerResource(), request)
+            self.assertEqual(400, code, args)
+
+    def test_rejects_thread_that_is_not_utf8(self):
+        request = self.make_request(duration="0.1")
+        request.args[b"thread"] = [b"\xff"]
+        resource = ProfilerResource()
+        code, content = self.render(resource, request)
+        self.assertEqual(400, code)
+        self.assertEqual(b"Invalid thread.", content)
+        self.assertFalse(resource.running)
+
+    def test_conflict_when_already_running(self):
+        resource = ProfilerResource()
+        resource.running = True
+        code, content = self.render(resource, self.make_request())
+        self.assertEqual(409, code)
+        self.assertTrue(resource.running)
+
+    def test_logs_failures(self):
+        log = self.patch(debug, "log")
+        self.patch(
+            debug.SamplingProfiler, "run"
+        ).side_effect = ZeroDivisionError()
+        resource = ProfilerResource()
+        code, content = self.render(resource, self.make_request())
+        self.assertEqual(500, code)
+        [(failure, message)] = [call.args for call in log.err.mock_calls]
+        self.assertIsInstance(failure.value, ZeroDivisionError)
+        self.assertEqual("Failure profiling process.", message)
+        self.assertFalse(resource.running)
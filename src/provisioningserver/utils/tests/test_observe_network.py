@@ -0,0 +1,391 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for ``provisioningserver.utils.observe_network``."""
+
+
+from argparse import ArgumentParser
+import io
+import json
+import os
+import struct
+
+from netaddr import EUI, IPAddress
+from testtools.matchers import Equals
+from testtools.testcase import ExpectedException
+
+from maastesting.factory import factory
+from maastesting.matchers import MockCalledOnceWith
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils import observe_network as observe_module
+from provisioningserver.utils.arp import (
+    ARP,
+    ARP_OPERATION,
+    observe_arp_packets,
+    SEEN_AGAIN_THRESHOLD,
+    update_bindings_and_get_event,
+)
+from provisioningserver.utils.beaconing import observe_beaconing_packets
+from provisioningserver.utils.network import bytes_to_int
+from provisioningserver.utils.observe_network import (
+    add_arguments,
+    Capture,
+    CAPTURE_RESTART_INTERVAL,
+    get_arp_bindings,
+    NetworkObserver,
+    OBSERVE_ARP,
+    OBSERVE_BEACONS,
+    ObserverLoop,
+    split_pcap_records,
+    update_binding,
+)
+from provisioningserver.utils.pcap import PCAPError
+from provisioningserver.utils.tests.test_arp import (
+    make_arp_packet,
+    test_input,
+)
+from provisioningserver.utils.tests.test_beaconing import BEACON_PCAP
+
+PCAP_GLOBAL_HEADER = struct.pack("IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 64, 1)
+
+
+def make_pcap_record(frame, timestamp=0):
+    return struct.pack("IIII", timestamp, 0, len(frame), len(frame)) + frame
+
+
+def make_arp_frame(arp_packet, vid=None):
+    frame = b"\xff" * 6 + b"\x00\x16\x3e\x00\x00\x01"
+    if vid is not None:
+        frame += b"\x81\x00" + struct.pack("!H", vid)
+    return frame + b"\x08\x06" + arp_packet
+
+
+def get_arp_observations(pcap):
+    """Return the bindings `maas-rack observe-arp` prints for `pcap`."""
+    output = io.StringIO()
+    observe_arp_packets(bindings=True, input=io.BytesIO(pcap), output=output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+class TestSplitPCAPRecords(MAASTestCase):
+    def test_splits_complete_records(self):
+        frames = [factory.make_bytes(size) for size in (42, 0, 60)]
+        buffer = b"".join(
+            make_pcap_record(frame, timestamp)
+            for timestamp, frame in enumerate(frames)
+        )
+        records, offset = split_pcap_records(buffer)
+        self.assertEqual(frames, [frame for _, frame in records])
+        self.assertEqual([0, 1, 2], [header[0] for header, _ in records])
+        self.assertEqual(len(buffer), offset)
+
+    def test_stops_at_incomplete_record(self):
+        record = make_pcap_record(factory.make_bytes(42))
+        buffer = record + record[:-1]
+        records, offset = split_pcap_records(buffer)
+        self.assertEqual(1, len(records))
+        self.assertEqual(len(record), offset)
+
+
+class TestGetARPBindings(MAASTestCase):
+    def assertBindingsMatchARP(self, arp_packet, vid=None):
+        arp = ARP(arp_packet, vid=vid, time=10)
+        expected = [
+            (10, vid, int(ip), bytes.fromhex(str(mac).replace("-", "")))
+            for ip, mac in arp.bindings()
+        ]
+        records = [((10, 0, 0, 0), make_arp_frame(arp_packet, vid=vid))]
+        self.assertEqual(expected, list(get_arp_bindings(records)))
+
+    def test_finds_sender_of_request(self):
+        self.assertBindingsMatchARP(
+            make_arp_packet("192.168.0.1", "01:02:03:04:05:06", "192.168.0.2")
+        )
+
+    def test_finds_sender_and_target_of_reply(self):
+        self.assertBindingsMatchARP(
+            make_arp_packet(
+                "192.168.0.1",
+                "01:02:03:04:05:06",
+                "192.168.0.2",
+                "02:03:04:05:06:07",
+                op=ARP_OPERATION.REPLY,
+            )
+        )
+
+    def test_finds_vid(self):
+        self.assertBindingsMatchARP(
+            make_arp_packet("192.168.0.1", "01:02:03:04:05:06", "192.168.0.2"),
+            vid=100,
+        )
+
+    def test_skips_null_addresses(self):
+        self.assertBindingsMatchARP(
+            make_arp_packet(
+                "0.0.0.0",
+                "01:02:03:04:05:06",
+                "192.168.0.2",
+                "00:00:00:00:00:00",
+                op=ARP_OPERATION.REPLY,
+            )
+        )
+
+    def test_skips_non_ethernet_ipv4_packets(self):
+        self.assertBindingsMatchARP(
+            make_arp_packet(
+                "192.168.0.1",
+                "01:02:03:04:05:06",
+                "192.168.0.2",
+                protocol="0x86dd",
+            )
+        )
+
+    def test_skips_truncated_and_non_arp_frames(self):
+        arp_packet = make_arp_packet(
+            "192.168.0.1", "01:02:03:04:05:06", "192.168.0.2"
+        )
+        frame = make_arp_frame(arp_packet)
+        records = [
+            ((0, 0, 0, 0), frame[:-1]),
+            ((0, 0, 0, 0), frame[:12] + b"\x08\x00" + frame[14:]),
+            ((0, 0, 0, 0), b""),
+        ]
+        self.assertEqual([], list(get_arp_bindings(records)))
+
+
+class TestUpdateBinding(MAASTestCase):
+    def assertEventsMatch(self, observations):
+        bindings = {}
+        expected_bindings = {}
+        for vid, ip, mac, time in observations:
+            expected = update_bindings_and_get_event(
+                expected_bindings,
+                vid,
+                IPAddress(ip),
+                EUI(bytes_to_int(mac)),
+                time,
+            )
+            self.assertEqual(
+                expected, update_binding(bindings, vid, ip, mac, time)
+            )
+
+    def test_new_binding(self):
+        self.assertEventsMatch([(None, 0xC0A80001, b"\x01" * 6, 0)])
+
+    def test_new_binding_with_vid(self):
+        self.assertEventsMatch(
+            [
+                (None, 0xC0A80001, b"\x01" * 6, 0),
+                (1, 0xC0A80001, b"\x01" * 6, 0),
+            ]
+        )
+
+    def test_refreshed_binding(self):
+        self.assertEventsMatch(
+            [
+                (None, 0xC0A80001, b"\x01" * 6, 0),
+                (None, 0xC0A80001, b"\x01" * 6, 1),
+                (None, 0xC0A80001, b"\x01" * 6, SEEN_AGAIN_THRESHOLD),
+            ]
+        )
+
+    def test_moved_binding(self):
+        self.assertEventsMatch(
+            [
+                (None, 0xC0A80001, b"\x01" * 6, 0),
+                (None, 0xC0A80001, b"\x02" * 6, 1),
+            ]
+        )
+
+
+class TestCapture(MAASTestCase):
+    def test_feed_returns_records_completed(self):
+        capture = Capture(OBSERVE_ARP, "eth0")
+        record = make_pcap_record(factory.make_bytes(42))
+        data = PCAP_GLOBAL_HEADER + record + record
+        records = []
+        for index in range(0, len(data), 5):
+            records.extend(capture.feed(data[index : index + 5]))
+        self.assertEqual(2, len(records))
+        self.assertEqual(1, capture.data_link_type)
+
+    def test_feed_rejects_non_native_captures(self):
+        capture = Capture(OBSERVE_ARP, "eth0")
+        header = struct.pack(">IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 64, 1)
+        with ExpectedException(PCAPError, ".*not in native PCAP format.*"):
+            capture.feed(header)
+
+    def test_feed_rejects_non_ethernet_captures(self):
+        capture = Capture(OBSERVE_ARP, "eth0")
+        header = struct.pack("IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 64, 101)
+        with ExpectedException(PCAPError, ".*not an Ethernet capture.*"):
+            capture.feed(header)
+
+
+class TestNetworkObserver(MAASTestCase):
+    def observe(self, observer, kind, ifname, pcap, chunk_size=7):
+        capture = Capture(kind, ifname)
+        observations = []
+        for index in range(0, len(pcap), chunk_size):
+            observations.extend(
+                observer.observe(capture, pcap[index : index + chunk_size])
+            )
+        return observations
+
+    def test_observes_arp_bindings_as_observe_arp_does(self):
+        observations = self.observe(
+            NetworkObserver(), OBSERVE_ARP, "eth0", test_input
+        )
+        expected = [
+            dict(event, interface="eth0", kind="arp")
+            for event in get_arp_observations(test_input)
+        ]
+        self.assertEqual(expected, json.loads(json.dumps(observations)))
+
+    def test_deduplicates_arp_bindings_per_interface(self):
+        observer = NetworkObserver()
+        eth0 = self.observe(observer, OBSERVE_ARP, "eth0", test_input)
+        eth0_again = self.observe(observer, OBSERVE_ARP, "eth0", test_input)
+        eth1 = self.observe(observer, OBSERVE_ARP, "eth1", test_input)
+        self.assertEqual(2, len(eth0))
+        self.assertEqual([], eth0_again)
+        self.assertEqual(2, len(eth1))
+
+    def test_forget_forgets_bindings(self):
+        observer = NetworkObserver()
+        self.observe(observer, OBSERVE_ARP, "eth0", test_input)
+        observer.forget("eth0")
+        observations = self.observe(observer, OBSERVE_ARP, "eth0", test_input)
+        self.assertEqual(2, len(observations))
+
+    def test_observes_beacons_as_observe_beacons_does(self):
+        observations = self.observe(
+            NetworkObserver(), OBSERVE_BEACONS, "eth0", BEACON_PCAP
+        )
+        output = io.StringIO()
+        observe_beaconing_packets(input=io.BytesIO(BEACON_PCAP), out=output)
+        expected = [
+            dict(json.loads(line), interface="eth0", kind="beacon")
+            for line in output.getvalue().splitlines()
+        ]
+        self.assertEqual(expected, json.loads(json.dumps(observations)))
+
+
+class FakeProcess:
+    def __init__(self):
+        read_fd, self.write_fd = os.pipe()
+        self.stdout = os.fdopen(read_fd, "rb")
+
+    def write(self, data):
+        os.write(self.write_fd, data)
+
+    def close(self):
+        os.close(self.write_fd)
+
+
+class TestObserverLoop(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.processes = {}
+        self.stopped = []
+        self.now = 0
+
+    def start_capture(self, kind, ifname):
+        process = self.processes[(kind, ifname)] = FakeProcess()
+        self.addCleanup(process.stdout.close)
+        return Capture(kind, ifname, process)
+
+    def stop_capture(self, capture):
+        self.stopped.append((capture.kind, capture.ifname))
+        capture.process.stdout.close()
+
+    def make_loop(self, control=None):
+        output = io.StringIO()
+        loop = ObserverLoop(
+            output,
+            control=control,
+            err=io.StringIO(),
+            start_capture=self.start_capture,
+            stop_capture=self.stop_capture,
+            clock=lambda: self.now,
+        )
+        self.addCleanup(loop.selector.close)
+        return loop
+
+    def get_output(self, loop):
+        return [
+            json.loads(line) for line in loop.output.getvalue().splitlines()
+        ]
+
+    def test_select_starts_and_stops_captures(self):
+        loop = self.make_loop()
+        loop.select(arp=["eth0", "eth1"], beacons=["eth0"])
+        self.assertEqual(
+            {("arp", "eth0"), ("arp", "eth1"), ("beacon", "eth0")},
+            set(loop.captures),
+        )
+        loop.select(arp=["eth1"])
+        self.assertEqual({("arp", "eth1")}, set(loop.captures))
+        self.assertItemsEqual(
+            [("arp", "eth0"), ("beacon", "eth0")], self.stopped
+        )
+
+    def test_writes_observations_from_every_capture(self):
+        loop = self.make_loop()
+        loop.select(arp=["eth0", "eth1"])
+        self.processes[("arp", "eth0")].write(test_input)
+        self.processes[("arp", "eth1")].write(test_input)
+        while len(loop.output.getvalue().splitlines()) < 4:
+            loop.run_once()
+        observations = self.get_output(loop)
+        self.assertEqual(
+            ["eth0", "eth0", "eth1", "eth1"],
+            sorted(observation["interface"] for observation in observations),
+        )
+
+    def test_restarts_ended_captures(self):
+        loop = self.make_loop()
+        loop.select(arp=["eth0"])
+        self.processes[("arp", "eth0")].close()
+        loop.run_once()
+        self.assertEqual({}, loop.captures)
+        self.assertThat(loop._getTimeout(), Equals(CAPTURE_RESTART_INTERVAL))
+        self.now += CAPTURE_RESTART_INTERVAL
+        loop._restartCaptures()
+        self.assertEqual({("arp", "eth0")}, set(loop.captures))
+
+    def test_reads_selection_from_control(self):
+        read_fd, write_fd = os.pipe()
+        control = os.fdopen(read_fd, "rb")
+        self.addCleanup(control.close)
+        loop = self.make_loop(control=control)
+        loop.selector.register(control, observe_module.selectors.EVENT_READ)
+        os.write(write_fd, b'{"arp": ["eth0"], "beacons": ["eth1"]}\n')
+        loop.run_once()
+        self.assertEqual(
+            {("arp", "eth0"), ("beacon", "eth1")}, set(loop.captures)
+        )
+        os.close(write_fd)
+        loop.run_once()
+        self.assertIsNone(loop.control)
+
+
+class TestObserveNetworkCommand(MAASTestCase):
+    """Tests for `maas-rack observe-network`."""
+
+    def test_parses_interfaces(self):
+        parser = ArgumentParser()
+        add_arguments(parser)
+        args = parser.parse_args(
+            ["--arp", "eth0", "--arp", "eth1", "--beacons", "eth0"]
+        )
+        self.assertEqual(["eth0", "eth1"], args.arp)
+        self.assertEqual(["eth0"], args.beacons)
+        self.assertFalse(args.no_control)
+
+    def test_sets_self_as_process_group_leader(self):
+        exception_type = factory.make_exception_type()
+        os = self.patch(observe_module, "os")
+        os.setpgrp.side_effect = exception_type
+        self.assertRaises(exception_type, observe_module.run, [])
+        self.assertThat(os.setpgrp, MockCalledOnceWith())
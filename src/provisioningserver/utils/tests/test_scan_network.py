@@ -6,10 +6,11 @@
 
 from argparse import ArgumentParser
 import io
+import json
 import os
 import random
 import subprocess
-from unittest.mock import ANY, Mock
+from unittest.mock import ANY, call, Mock
 
 from netaddr import IPNetwork
 from testtools import ExpectedException
@@ -21,9 +22,16 @@ from testtools.matchers import (
 )
 
 from maastesting.factory import factory
-from maastesting.matchers import DocTestMatches, Matches, MockCalledOnceWith
+from maastesting.matchers import (
+    DocTestMatches,
+    Matches,
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
 from maastesting.testcase import MAASTestCase
 from provisioningserver.utils import scan_network as scan_network_module
+from provisioningserver.utils import sweep as sweep_module
 from provisioningserver.utils.scan_network import (
     add_arguments,
     get_nmap_arguments,
@@ -38,6 +46,8 @@ from provisioningserver.utils.scan_network import (
 )
 from provisioningserver.utils.script import ActionScriptError
 from provisioningserver.utils.shell import get_env_with_locale
+from provisioningserver.utils.sweep import DEFAULT_RATE, SLOW_RATE
+from provisioningserver.utils.testing import FakeSweepTransport
 
 
 def CIDRSet(cidrs):
@@ -203,6 +213,12 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         self.popen.return_value.poll = Mock()
         self.popen.return_value.poll.return_value = None
         self.popen.return_value.returncode = 0
+        # Sweeping is not permitted unless a test says otherwise, so `ping`
+        # is run instead.
+        self.open_transports = self.patch(sweep_module, "open_transports")
+        self.open_transports.side_effect = PermissionError(
+            1, "Operation not permitted"
+        )
         self.parser = ArgumentParser()
         add_arguments(self.parser)
 
@@ -210,6 +226,61 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         parsed_args = self.parser.parse_args([*args])
         return run(parsed_args, stdout=self.output, stderr=self.error_output)
 
+    def test_sweeps_with_ping(self):
+        transport = FakeSweepTransport({"192.168.0.2"})
+        self.open_transports.side_effect = None
+        self.open_transports.return_value = [transport]
+        self.run_command("--ping", "eth1", "192.168.0.0/30")
+        self.assertThat(self.popen, MockNotCalled())
+        self.assertThat(self.open_transports, MockCalledOnceWith("eth1"))
+        self.assertThat(
+            [json.loads(line) for line in self.output.getvalue().splitlines()],
+            Equals(
+                [
+                    {
+                        "scan_type": "ping",
+                        "interface": "eth1",
+                        "ip": "192.168.0.2",
+                        "result": True,
+                    },
+                    {
+                        "scan_type": "ping",
+                        "interface": "eth1",
+                        "ip": "192.168.0.1",
+                        "result": False,
+                    },
+                ]
+            ),
+        )
+        self.assertThat(
+            self.error_output.getvalue(),
+            DocTestMatches("...Pinged 2 hosts (1 up)..."),
+        )
+
+    def test_sweeps_at_requested_rate(self):
+        sweeper = self.patch(scan_network_module, "NetworkSweeper")
+        self.run_command("--ping", "--slow", "eth1", "192.168.0.0/30")
+        self.run_command("--ping", "--rate", "37", "eth1", "192.168.0.0/30")
+        self.run_command("--ping", "eth1", "192.168.0.0/30")
+        self.assertThat(
+            sweeper.open,
+            MockCallsMatch(
+                call({"eth1"}, rate=SLOW_RATE),
+                call({"eth1"}, rate=37),
+                call({"eth1"}, rate=DEFAULT_RATE),
+            ),
+        )
+
+    def test_runs_ping_if_sweeping_not_permitted(self):
+        self.run_command("--ping", "eth1", "192.168.0.0/30")
+        self.assertThat(self.popen.call_count, Equals(2))
+        self.assertThat(
+            self.error_output.getvalue(),
+            DocTestMatches(
+                "...Unable to sweep networks (...not permitted); using ping..."
+            ),
+        )
+
     def test_runs_ping_single_threaded(self):
         ip = factory.make_ip_address(ipv6=False)
         # Force the use of `ping` even if `nmap` is installed.
@@ -248,7 +319,7 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         self.run_command("--ping", "eth1", "192.168.0.0/24")
         self.assertThat(
             self.error_output.getvalue(),
-            DocTestMatches("Pinged...hosts...second..."),
+            DocTestMatches("...Pinged...hosts...second..."),
         )
 
     def test_runs_ping_e2e_prints_warning_for_unknown_cidr(self):
@@ -8,7 +8,7 @@ import logging
 import os
 import random
 from textwrap import dedent
-from unittest.mock import call, Mock, sentinel
+from unittest.mock import ANY, call, Mock, sentinel
 
 from fixtures import FakeLogger
 from testscenarios import multiply_scenarios
@@ -288,6 +288,7 @@ class TestServiceMonitor(MAASTestCase):
                 active_state, process_state
             )
         service_monitor = self.make_service_monitor(fake_services)
+        self.patch(service_monitor, "_loadServiceStates").return_value = {}
         self.patch(
             service_monitor, "ensureService"
         ).side_effect = lambda name: succeed(expected_states[name])
@@ -306,6 +307,7 @@ class TestServiceMonitor(MAASTestCase):
             for service in services
         }
         service_monitor._serviceStates.update(service_states)
+        self.patch(service_monitor, "_loadServiceStates").return_value = {}
 
         # Make both service monitor checks fail with a distinct error.
         self.patch(service_monitor, "ensureService")
@@ -336,6 +338,123 @@ class TestServiceMonitor(MAASTestCase):
                 ),
             )
 
+    @inlineCallbacks
+    def test_ensureServices_loads_states_together(self):
+        services = [make_fake_service(SERVICE_STATE.ON) for _ in range(3)]
+        service_monitor = self.make_service_monitor(services)
+        self.patch(service_monitor, "_loadServiceStates").return_value = {
+            service.name: (SERVICE_STATE.ON, "running") for service in services
+        }
+        mock_loadServiceState = self.patch(
+            service_monitor, "_loadServiceState"
+        )
+        observed = yield service_monitor.ensureServices()
+        self.assertThat(
+            observed,
+            Equals(
+                {
+                    service.name: ServiceState(SERVICE_STATE.ON, "running")
+                    for service in services
+                }
+            ),
+        )
+        self.assertThat(mock_loadServiceState, MockNotCalled())
+        # The loaded states are only used during the cycle.
+        self.assertThat(service_monitor._loadedStates, Equals({}))
+
+    @inlineCallbacks
+    def test_ensureServices_loads_missing_states_individually(self):
+        service = make_fake_service(SERVICE_STATE.ON)
+        service_monitor = self.make_service_monitor([service])
+        self.patch(service_monitor, "_loadServiceStates").return_value = {}
+        mock_loadServiceState = self.patch(
+            service_monitor, "_loadServiceState"
+        )
+        mock_loadServiceState.return_value = succeed(
+            (SERVICE_STATE.ON, "running")
+        )
+        yield service_monitor.ensureServices()
+        self.assertThat(mock_loadServiceState, MockCalledOnceWith(service))
+
+    @inlineCallbacks
+    def test_ensureServices_loads_states_individually_on_failure(self):
+        service = make_fake_service(SERVICE_STATE.ON)
+        service_monitor = self.make_service_monitor([service])
+        self.patch(
+            service_monitor, "_loadServiceStates"
+        ).side_effect = ServiceParsingError("systemctl broke")
+        mock_loadServiceState = self.patch(
+            service_monitor, "_loadServiceState"
+        )
+        mock_loadServiceState.return_value = succeed(
+            (SERVICE_STATE.ON, "running")
+        )
+        with FakeLogger("maas.service_monitor") as logger:
+            observed = yield service_monitor.ensureServices()
+        self.assertThat(
+            observed,
+            Equals({service.name: ServiceState(SERVICE_STATE.ON, "running")}),
+        )
+        self.assertThat(mock_loadServiceState, MockCalledOnceWith(service))
+        self.assertThat(
+            logger.output,
+            Contains(
+                "Unable to load the state of all services at once: "
+                "systemctl broke"
+            ),
+        )
+
+    @inlineCallbacks
+    def test_ensureServices_reloads_state_after_action(self):
+        service = make_fake_service(SERVICE_STATE.ON)
+        service_monitor = self.make_service_monitor([service])
+        self.patch(service_monitor, "_loadServiceStates").return_value = {
+            service.name: (SERVICE_STATE.OFF, "dead")
+        }
+        self.patch(service_monitor, "_performServiceAction")
+        mock_loadServiceState = self.patch(
+            service_monitor, "_loadServiceState"
+        )
+        mock_loadServiceState.return_value = succeed(
+            (SERVICE_STATE.ON, "running")
+        )
+        observed = yield service_monitor.ensureServices()
+        self.assertThat(
+            observed,
+            Equals({service.name: ServiceState(SERVICE_STATE.ON, "running")}),
+        )
+        self.assertThat(mock_loadServiceState, MockCalledOnceWith(service))
+
+    @inlineCallbacks
+    def test_ensureServices_records_metrics(self):
+        service = make_fake_service(SERVICE_STATE.ON)
+        prometheus_metrics = Mock()
+        service_monitor = ServiceMonitor(
+            service, prometheus_metrics=prometheus_metrics
+        )
+
+        def loadServiceStates():
+            service_monitor._commandCount += 1
+            return {service.name: (SERVICE_STATE.ON, "running")}
+
+        self.patch(
+            service_monitor, "_loadServiceStates"
+        ).side_effect = loadServiceStates
+        yield service_monitor.ensureServices()
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCallsMatch(
+                call(
+                    "maas_service_monitor_cycle_latency",
+                    "observe",
+                    value=ANY,
+                ),
+                call(
+                    "maas_service_monitor_cycle_commands", "observe", value=1
+                ),
+            ),
+        )
+
     @inlineCallbacks
     def test_ensureServices_calls__ensureService(self):
         fake_service = make_fake_service()
@@ -765,6 +884,30 @@ class TestServiceMonitor(MAASTestCase):
             ),
         )
 
+    @inlineCallbacks
+    def test_performServiceAction_discards_loaded_state(self):
+        service = make_fake_service(SERVICE_STATE.ON)
+        service_monitor = self.make_service_monitor([service])
+        service_monitor._loadedStates[service.name] = (
+            SERVICE_STATE.OFF,
+            "dead",
+        )
+        self.patch(
+            service_monitor, "_execSystemDServiceAction"
+        ).return_value = (0, "", "")
+        yield service_monitor._performServiceAction(service, "restart")
+        self.assertThat(service_monitor._loadedStates, Equals({}))
+
+    @inlineCallbacks
+    def test_execCmd_counts_commands(self):
+        service_monitor = self.make_service_monitor()
+        self.patch(
+            service_monitor_module, "getProcessOutputAndValue"
+        ).side_effect = lambda *args, **kwargs: succeed((b"", b"", 0))
+        yield service_monitor._execCmd(["true"], {})
+        yield service_monitor._execCmd(["true"], {})
+        self.assertThat(service_monitor._commandCount, Equals(2))
+
     @inlineCallbacks
     def test_performServiceAction_raises_ServiceActionError_if_fails(self):
         service = make_fake_service(SERVICE_STATE.ON)
@@ -822,6 +965,182 @@ class TestServiceMonitor(MAASTestCase):
             sentinel.result, service_monitor._loadServiceState(service)
         )
 
+    @inlineCallbacks
+    def test_loadServiceStates_uses_systemd(self):
+        service = make_fake_service()
+        service_monitor = self.make_service_monitor([service])
+        mock_loadSystemDServiceStates = self.patch(
+            service_monitor, "_loadSystemDServiceStates"
+        )
+        mock_loadSystemDServiceStates.return_value = sentinel.states
+        states = yield service_monitor._loadServiceStates()
+        self.assertThat(states, Equals(sentinel.states))
+        self.assertThat(mock_loadSystemDServiceStates, MockCalledOnceWith(ANY))
+        [services], _ = mock_loadSystemDServiceStates.call_args
+        self.assertThat(list(services), Equals([service]))
+
+    @inlineCallbacks
+    def test_loadServiceStates_uses_supervisor(self):
+        self.run_under_snappy()
+        service = make_fake_service()
+        service_monitor = self.make_service_monitor([service])
+        mock_loadSupervisorServiceStates = self.patch(
+            service_monitor, "_loadSupervisorServiceStates"
+        )
+        mock_loadSupervisorServiceStates.return_value = sentinel.states
+        states = yield service_monitor._loadServiceStates()
+        self.assertThat(states, Equals(sentinel.states))
+
+    @inlineCallbacks
+    def test_loadSystemDServiceStates_calls_systemctl_show_once(self):
+        services = [make_fake_service() for _ in range(3)]
+        service_monitor = self.make_service_monitor(services)
+        mock_execCmd = self.patch(service_monitor, "_execCmd")
+        mock_execCmd.return_value = succeed(
+            (0, "\n\n".join(["LoadState=loaded"] * 3), "")
+        )
+        yield service_monitor._loadSystemDServiceStates(services)
+        self.assertThat(
+            mock_execCmd,
+            MockCalledOnceWith(
+                [
+                    "systemctl",
+                    "show",
+                    "--property=LoadState,ActiveState,SubState,Result",
+                    "--",
+                    *(service.service_name for service in services),
+                ],
+                get_env_with_bytes_locale(),
+            ),
+        )
+
+    @inlineCallbacks
+    def test_loadSystemDServiceStates_returns_states(self):
+        services = [make_fake_service() for _ in range(5)]
+        service_monitor = self.make_service_monitor(services)
+        systemctl_show_output = dedent(
+            """\
+            LoadState=loaded
+            ActiveState=active
+            SubState=running
+            Result=success
+
+            LoadState=loaded
+            ActiveState=inactive
+            SubState=dead
+            Result=success
+
+            LoadState=loaded
+            ActiveState=failed
+            SubState=failed
+            Result=exit-code
+
+            LoadState=not-found
+            ActiveState=inactive
+            SubState=dead
+            Result=success
+
+            LoadState=loaded
+            ActiveState=unheard-of
+            SubState=dead
+            Result=success
+            """
+        )
+        self.patch(service_monitor, "_execCmd").return_value = succeed(
+            (0, systemctl_show_output, "")
+        )
+        states = yield service_monitor._loadSystemDServiceStates(services)
+        # Services that are unknown to systemd, or whose states can't be
+        # parsed, are left to be loaded (and reported) individually.
+        self.assertThat(
+            states,
+            Equals(
+                {
+                    services[0].name: (SERVICE_STATE.ON, "running"),
+                    services[1].name: (SERVICE_STATE.OFF, "dead"),
+                    services[2].name: (
+                        SERVICE_STATE.DEAD,
+                        "Result: exit-code",
+                    ),
+                }
+            ),
+        )
+
+    @inlineCallbacks
+    def test_loadSystemDServiceStates_raises_error_for_bad_output(self):
+        services = [make_fake_service() for _ in range(2)]
+        service_monitor = self.make_service_monitor(services)
+        self.patch(service_monitor, "_execCmd").return_value = succeed(
+            (0, "LoadState=loaded\nActiveState=active\n", "")
+        )
+        with ExpectedException(ServiceParsingError):
+            yield service_monitor._loadSystemDServiceStates(services)
+
+    @inlineCallbacks
+    def test_loadSystemDServiceStates_raises_error_for_failure(self):
+        services = [make_fake_service()]
+        service_monitor = self.make_service_monitor(services)
+        self.patch(service_monitor, "_execCmd").return_value = succeed(
+            (1, "", "Failed to connect to bus")
+        )
+        with ExpectedException(ServiceParsingError, ".*Failed to connect.*"):
+            yield service_monitor._loadSystemDServiceStates(services)
+
+    @inlineCallbacks
+    def test_loadSupervisorServiceStates_returns_states(self):
+        self.run_under_snappy()
+        self.patch(snappy, "get_snap_path").return_value = "/snap/maas/1"
+        services = [make_fake_service() for _ in range(4)]
+        service_monitor = self.make_service_monitor(services)
+        supervisorctl_output = dedent(
+            """\
+            %s  RUNNING   pid 123, uptime 1:00:00
+            %s  STOPPED   Not started
+            %s  FATAL     Exited too quickly
+            %s: ERROR (no such process)
+            """
+            % tuple(service.snap_service_name for service in services)
+        )
+        mock_execCmd = self.patch(service_monitor, "_execCmd")
+        mock_execCmd.return_value = succeed((3, supervisorctl_output, ""))
+        states = yield service_monitor._loadSupervisorServiceStates(services)
+        self.assertThat(
+            states,
+            Equals(
+                {
+                    services[0].name: (SERVICE_STATE.ON, "running"),
+                    services[1].name: (SERVICE_STATE.OFF, "dead"),
+                    services[2].name: (
+                        SERVICE_STATE.DEAD,
+                        "Result: exit-code",
+                    ),
+                }
+            ),
+        )
+        self.assertThat(
+            mock_execCmd,
+            MockCalledOnceWith(
+                (
+                    "/snap/maas/1/bin/run-supervisorctl",
+                    "status",
+                    *(service.snap_service_name for service in services),
+                ),
+                get_env_with_bytes_locale(),
+            ),
+        )
+
+    @inlineCallbacks
+    def test_loadSupervisorServiceStates_exit_code_greater_than_3(self):
+        self.run_under_snappy()
+        self.patch(snappy, "get_snap_path").return_value = "/snap/maas/1"
+        services = [make_fake_service()]
+        service_monitor = self.make_service_monitor(services)
+        self.patch(service_monitor, "_execCmd").return_value = succeed(
+            (4, "", "")
+        )
+        with ExpectedException(ServiceParsingError):
+            yield service_monitor._loadSupervisorServiceStates(services)
+
     @inlineCallbacks
     def test_loadSystemDServiceState_status_calls_systemctl(self):
         service = make_fake_service(SERVICE_STATE.ON)
@@ -48,16 +48,14 @@ from provisioningserver.utils.beaconing import (
     TopologyHint,
 )
 from provisioningserver.utils.services import (
-    BeaconingService,
     BeaconingSocketProtocol,
     JSONPerLineProtocol,
     MDNSResolverService,
-    NeighbourDiscoveryService,
+    NetworkObserverService,
     NetworksMonitoringLock,
     NetworksMonitoringService,
     ProcessProtocolService,
-    ProtocolForObserveARP,
-    ProtocolForObserveBeacons,
+    ProtocolForObserveNetwork,
 )
 
 
@@ -302,6 +300,33 @@ class TestNetworksMonitoringService(MAASTestCase):
         # ... interfaces ARE recorded.
         self.assertThat(service.interfaces, Not(Equals([])))
 
+    def test_configureNetworkObserver_starts_one_observer(self):
+        service = self.makeService()
+        service._monitored = frozenset({"eth0", "eth1"})
+        service._beaconing = frozenset({"eth0"})
+        service._configureNetworkObserver()
+        observer = service.getServiceNamed("network_observer")
+        self.assertIsInstance(observer, NetworkObserverService)
+        self.assertEqual(
+            ({"eth0", "eth1"}, {"eth0"}),
+            (observer.arp_interfaces, observer.beacon_interfaces),
+        )
+        service._beaconing = frozenset()
+        service._configureNetworkObserver()
+        self.assertIs(observer, service.getServiceNamed("network_observer"))
+        self.assertEqual(frozenset(), observer.beacon_interfaces)
+
+    def test_configureNetworkObserver_stops_observer_without_interfaces(self):
+        service = self.makeService()
+        service._monitored = frozenset({"eth0"})
+        service._configureNetworkObserver()
+        service._monitored = frozenset()
+        service._configureNetworkObserver()
+        self.assertRaises(
+            KeyError, service.getServiceNamed, "network_observer"
+        )
+        self.assertIsNone(service._network_observer)
+
 
 class TestJSONPerLineProtocol(MAASTestCase):
     """Tests for `JSONPerLineProtocol`."""
@@ -394,36 +419,28 @@ class TestJSONPerLineProtocol(MAASTestCase):
             yield proto.done
 
 
-class TestProtocolForObserveARP(MAASTestCase):
-    """Tests for `ProtocolForObserveARP`."""
+class TestProtocolForObserveNetwork(MAASTestCase):
+    """Tests for `ProtocolForObserveNetwork`."""
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
 
-    def test_adds_interface(self):
+    def test_passes_objects_received_together_in_one_call(self):
         callback = Mock()
-        ifname = factory.make_name("eth")
-        proto = ProtocolForObserveARP(ifname, callback=callback)
+        proto = ProtocolForObserveNetwork(callback=callback)
         proto.makeConnection(Mock(pid=None))
-        proto.outReceived(b"{}\n")
+        proto.outReceived(b'{"a": 1}\n{"b": 2}\n{"c"')
+        proto.outReceived(b": 3}\n")
         self.expectThat(
-            callback, MockCallsMatch(call([{"interface": ifname}]))
+            callback,
+            MockCallsMatch(call([{"a": 1}, {"b": 2}]), call([{"c": 3}])),
         )
 
-
-class TestProtocolForObserveBeacons(MAASTestCase):
-    """Tests for `ProtocolForObserveBeacons`."""
-
-    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
-
-    def test_adds_interface(self):
+    def test_does_not_call_back_without_objects(self):
         callback = Mock()
-        ifname = factory.make_name("eth")
-        proto = ProtocolForObserveBeacons(ifname, callback=callback)
+        proto = ProtocolForObserveNetwork(callback=callback)
         proto.makeConnection(Mock(pid=None))
-        proto.outReceived(b"{}\n")
-        self.expectThat(
-            callback, MockCallsMatch(call([{"interface": ifname}]))
-        )
+        proto.outReceived(b'{"a": 1}')
+        self.expectThat(callback, MockNotCalled())
 
 
 class MockProcessProtocolService(ProcessProtocolService):
@@ -568,81 +585,66 @@ class TestProcessProtocolService(MAASTestCase):
         self.assertThat(result, Is(None))
 
 
-class TestNeighbourDiscoveryService(MAASTestCase):
-    """Tests for `NeighbourDiscoveryService`."""
+class TestNetworkObserverService(MAASTestCase):
+    """Tests for `NetworkObserverService`."""
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
 
     def test_returns_expected_arguments(self):
-        ifname = factory.make_name("eth")
-        service = NeighbourDiscoveryService(ifname, Mock())
+        service = NetworkObserverService(Mock(), Mock())
         args = service.getProcessParameters()
-        self.assertThat(args, HasLength(3))
+        self.assertThat(args, HasLength(2))
         self.assertTrue(args[0].endswith(b"maas-common"))
-        self.assertTrue(args[1], Equals(b"observe-arp"))
-        self.assertTrue(args[2], Equals(ifname.encode("utf-8")))
+        self.assertThat(args[1], Equals(b"observe-network"))
+
+    def test_dispatches_observations_by_kind(self):
+        neighbours_callback = Mock()
+        beacons_callback = Mock()
+        service = NetworkObserverService(neighbours_callback, beacons_callback)
+        service.observationsReceived(
+            [
+                {"kind": "arp", "interface": "eth0"},
+                {"kind": "beacon", "interface": "eth1"},
+                {"kind": "arp", "interface": "eth1"},
+            ]
+        )
+        self.assertThat(
+            neighbours_callback,
+            MockCalledOnceWith([{"interface": "eth0"}, {"interface": "eth1"}]),
+        )
+        self.assertThat(
+            beacons_callback, MockCalledOnceWith([{"interface": "eth1"}])
+        )
 
     @inlineCallbacks
-    def test_restarts_process_after_finishing(self):
-        ifname = factory.make_name("eth")
-        service = NeighbourDiscoveryService(ifname, Mock())
+    def test_writes_interfaces_to_process(self):
+        service = NetworkObserverService(Mock(), Mock())
+        service.setInterfaces({"eth1", "eth0"}, {"eth0"})
         mock_process_params = self.patch(service, "getProcessParameters")
-        mock_process_params.return_value = [b"/bin/echo", b"{}"]
+        mock_process_params.return_value = [b"/bin/cat"]
+        callback = self.patch(service, "observationsReceived")
         service.clock = Clock()
         service.startService()
-        # Wait for the protocol to finish
-        service.clock.advance(0.0)
-        yield service._protocol.done
-        # Advance the clock (should start the service again)
-        interval = service.step
-        service.clock.advance(interval)
-        # The Deferred should have been recreated.
-        self.assertThat(service._protocol.done, Not(IsFiredDeferred()))
+        service.setInterfaces({"eth0"}, set())
+        service._process.closeStdin()
         yield service._protocol.done
-        service.stopService()
-
-    @inlineCallbacks
-    def test_protocol_logs_stderr(self):
-        logger = self.useFixture(TwistedLoggerFixture())
-        ifname = factory.make_name("eth")
-        service = NeighbourDiscoveryService(ifname, lambda _: None)
-        protocol = service.createProcessProtocol()
-        reactor.spawnProcess(protocol, b"sh", (b"sh", b"-c", b"exec cat >&2"))
-        protocol.transport.write(
-            b"Lines written to stderr are logged\n"
-            b"with a prefix, with no exceptions.\n"
-        )
-        protocol.transport.closeStdin()
-        yield protocol.done
-        self.assertThat(
-            logger.output,
-            Equals(
-                "observe-arp[%s]: Lines written to stderr are logged\n"
-                "---\n"
-                "observe-arp[%s]: with a prefix, with no exceptions."
-                % (ifname, ifname)
-            ),
+        written = [
+            selection
+            for (selections,), _ in callback.call_args_list
+            for selection in selections
+        ]
+        self.assertEqual(
+            [
+                {"arp": ["eth0", "eth1"], "beacons": ["eth0"]},
+                {"arp": ["eth0"], "beacons": []},
+            ],
+            written,
         )
-
-
-class TestBeaconingService(MAASTestCase):
-    """Tests for `BeaconingService`."""
-
-    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
-
-    def test_returns_expected_arguments(self):
-        ifname = factory.make_name("eth")
-        service = BeaconingService(ifname, Mock())
-        args = service.getProcessParameters()
-        self.assertThat(args, HasLength(3))
-        self.assertTrue(args[0].endswith(b"maas-common"))
-        self.assertTrue(args[1], Equals(b"observe-beacons"))
-        self.assertTrue(args[2], Equals(ifname.encode("utf-8")))
+        yield service.stopService()
 
     @inlineCallbacks
     def test_restarts_process_after_finishing(self):
-        ifname = factory.make_name("eth")
-        service = BeaconingService(ifname, Mock())
+        service = NetworkObserverService(Mock(), Mock())
         mock_process_params = self.patch(service, "getProcessParameters")
         mock_process_params.return_value = [b"/bin/echo", b"{}"]
         service.clock = Clock()
@@ -661,8 +663,7 @@ class TestBeaconingService(MAASTestCase):
     @inlineCallbacks
     def test_protocol_logs_stderr(self):
         logger = self.useFixture(TwistedLoggerFixture())
-        ifname = factory.make_name("eth")
-        service = BeaconingService(ifname, lambda _: None)
+        service = NetworkObserverService(Mock(), Mock())
         protocol = service.createProcessProtocol()
         reactor.spawnProcess(protocol, b"sh", (b"sh", b"-c", b"exec cat >&2"))
         protocol.transport.write(
@@ -674,10 +675,9 @@ class TestBeaconingService(MAASTestCase):
         self.assertThat(
             logger.output,
             Equals(
-                "observe-beacons[%s]: Lines written to stderr are logged\n"
+                "observe-network: Lines written to stderr are logged\n"
                 "---\n"
-                "observe-beacons[%s]: with a prefix, with no exceptions."
-                % (ifname, ifname)
+                "observe-network: with a prefix, with no exceptions."
             ),
         )
 
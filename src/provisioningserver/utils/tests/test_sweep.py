@@ -0,0 +1,313 @@
+# Copyright 2020 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for ``provisioningserver.utils.sweep``."""
+
+
+import socket
+import struct
+import time
+from unittest.mock import Mock
+
+from testtools.matchers import Equals, HasLength
+
+from maastesting.factory import factory
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils import sweep as sweep_module
+from provisioningserver.utils.scan_network import PingParameters
+from provisioningserver.utils.sweep import (
+    ARPTransport,
+    get_icmp_checksum,
+    ICMP_PAYLOAD,
+    ICMPTransport,
+    NetworkSweeper,
+    open_transports,
+)
+from provisioningserver.utils.testing import FakeSweepTransport
+
+
+def make_icmp(icmp_type, identifier=0, sequence=1):
+    return struct.pack("!BBHHH", icmp_type, 0, 0, identifier, sequence)
+
+
+def make_arp(operation, sender_ip):
+    mac = factory.make_mac_address().replace(":", "")
+    return (
+        b"\xff" * 6
+        + bytes.fromhex(mac)
+        + b"\x08\x06"
+        + struct.pack("!HHBBH", 1, 0x800, 6, 4, operation)
+        + bytes.fromhex(mac)
+        + socket.inet_aton(sender_ip)
+        + bytes(10)
+    )
+
+
+class TestGetICMPChecksum(MAASTestCase):
+    def test_checksums_packet(self):
+        packet = make_icmp(8) + ICMP_PAYLOAD
+        checksum = get_icmp_checksum(packet)
+        packet = packet[:2] + struct.pack("!H", checksum) + packet[4:]
+        self.assertThat(get_icmp_checksum(packet), Equals(0))
+
+    def test_pads_odd_lengths(self):
+        self.assertThat(get_icmp_checksum(b"\x01"), Equals(0xFEFF))
+
+
+class TestICMPTransport(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket = self.patch(sweep_module.socket, "socket")
+        self.sock = self.socket.return_value
+
+    def test_opens_datagram_socket_bound_to_interface(self):
+        transport = ICMPTransport("eth0")
+        self.assertThat(
+            self.socket,
+            MockCalledOnceWith(
+                socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP
+            ),
+        )
+        self.sock.setsockopt.assert_any_call(
+            socket.SOL_SOCKET, socket.SO_BINDTODEVICE, b"eth0"
+        )
+        self.sock.setsockopt.assert_any_call(
+            socket.SOL_SOCKET, socket.SO_DONTROUTE, 1
+        )
+        self.assertFalse(transport.raw)
+
+    def test_falls_back_to_raw_socket(self):
+        raw = Mock()
+        self.socket.side_effect = [PermissionError(), raw]
+        transport = ICMPTransport("eth0")
+        self.assertTrue(transport.raw)
+        self.assertIs(raw, transport.socket)
+
+    def test_tolerates_not_binding_to_interface(self):
+        self.sock.setsockopt.side_effect = [None, PermissionError()]
+        ICMPTransport("eth0")
+        self.assertThat(self.sock.close, MockNotCalled())
+
+    def test_sends_echo_request_with_payload(self):
+        transport = ICMPTransport("eth0")
+        transport.send("192.168.0.1")
+        packet, address = self.sock.sendto.call_args[0]
+        self.assertThat(address, Equals(("192.168.0.1", 0)))
+        self.assertThat(packet[0], Equals(8))
+        self.assertThat(packet[8:], Equals(ICMP_PAYLOAD))
+        self.assertThat(get_icmp_checksum(packet), Equals(0))
+
+    def test_receives_echo_replies(self):
+        self.sock.recvfrom.side_effect = [
+            (make_icmp(0), ("192.168.0.1", 0)),
+            (make_icmp(3), ("192.168.0.2", 0)),
+            (b"\x00", ("192.168.0.3", 0)),
+            (make_icmp(0), ("192.168.0.4", 0)),
+            BlockingIOError(),
+        ]
+        transport = ICMPTransport("eth0")
+        self.assertThat(
+            list(transport.receive()),
+            Equals(["192.168.0.1", "192.168.0.4"]),
+        )
+
+    def test_receives_own_echo_replies_on_raw_socket(self):
+        self.socket.side_effect = [PermissionError(), self.sock]
+        transport = ICMPTransport("eth0")
+        ip_header = b"\x45" + bytes(19)
+        self.sock.recvfrom.side_effect = [
+            (ip_header + make_icmp(0, transport.identifier), ("10.0.0.1", 0)),
+            (
+                ip_header + make_icmp(0, transport.identifier + 1),
+                ("10.0.0.2", 0),
+            ),
+            BlockingIOError(),
+        ]
+        self.assertThat(list(transport.receive()), Equals(["10.0.0.1"]))
+
+
+class TestARPTransport(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket = self.patch(sweep_module.socket, "socket")
+        self.sock = self.socket.return_value
+        self.mac = b"\x00\x16\x3e\x01\x02\x03"
+        self.sock.getsockname.return_value = ("eth0", 0x806, 0, 1, self.mac)
+
+    def test_binds_packet_socket_to_interface(self):
+        ARPTransport("eth0")
+        self.assertThat(self.sock.bind, MockCalledOnceWith(("eth0", 0x806)))
+
+    def test_sends_probe(self):
+        transport = ARPTransport("eth0")
+        transport.send("192.168.0.1")
+        [packet], _ = self.sock.send.call_args
+        self.assertThat(packet, HasLength(42))
+        self.assertThat(packet[:6], Equals(b"\xff" * 6))
+        self.assertThat(packet[6:12], Equals(self.mac))
+        self.assertThat(packet[20:22], Equals(b"\x00\x01"))
+        # The sender's address is 0.0.0.0.
+        self.assertThat(packet[28:32], Equals(bytes(4)))
+        self.assertThat(packet[38:42], Equals(bytes([192, 168, 0, 1])))
+
+    def test_receives_replies(self):
+        self.sock.recv.side_effect = [
+            make_arp(2, "192.168.0.1"),
+            make_arp(1, "192.168.0.2"),
+            b"\x00",
+            make_arp(2, "192.168.0.3"),
+            BlockingIOError(),
+        ]
+        transport = ARPTransport("eth0")
+        self.assertThat(
+            list(transport.receive()),
+            Equals(["192.168.0.1", "192.168.0.3"]),
+        )
+
+    def test_closes_socket_if_binding_fails(self):
+        self.sock.bind.side_effect = OSError()
+        self.assertRaises(OSError, ARPTransport, "eth0")
+        self.assertThat(self.sock.close, MockCalledOnceWith())
+
+
+class TestOpenTransports(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.icmp = self.patch(sweep_module, "ICMPTransport")
+        self.arp = self.patch(sweep_module, "ARPTransport")
+
+    def test_opens_icmp_and_arp(self):
+        self.assertThat(
+            open_transports("eth0"),
+            Equals([self.icmp.return_value, self.arp.return_value]),
+        )
+
+    def test_opens_icmp_only_if_arp_not_permitted(self):
+        self.arp.side_effect = PermissionError()
+        self.assertThat(
+            open_transports("eth0"), Equals([self.icmp.return_value])
+        )
+
+    def test_opens_arp_only_if_icmp_not_permitted(self):
+        self.icmp.side_effect = PermissionError()
+        self.assertThat(
+            open_transports("eth0"), Equals([self.arp.return_value])
+        )
+
+    def test_raises_if_nothing_permitted(self):
+        self.icmp.side_effect = PermissionError()
+        self.arp.side_effect = PermissionError()
+        self.assertRaises(PermissionError, open_transports, "eth0")
+
+
+class TestNetworkSweeper(MAASTestCase):
+    def make_sweeper(self, transports, **kwargs):
+        kwargs.setdefault("interval", 0.01)
+        kwargs.setdefault("timeout", 0.05)
+        kwargs.setdefault("rate", 10000)
+        sweeper = NetworkSweeper(transports, **kwargs)
+        self.addCleanup(sweeper.close)
+        return sweeper
+
+    def sweep(self, sweeper, targets):
+        events = []
+        sweeper.sweep(
+            [PingParameters(ifname, ip) for ifname, ip in targets],
+            events.append,
+        )
+        return events
+
+    def test_reports_neighbours_up_then_down(self):
+        eth0 = FakeSweepTransport({"10.0.0.2"})
+        eth1 = FakeSweepTransport({"10.0.1.1"})
+        sweeper = self.make_sweeper({"eth0": [eth0], "eth1": [eth1]})
+        events = self.sweep(
+            sweeper,
+            [("eth0", "10.0.0.1"), ("eth0", "10.0.0.2"), ("eth1", "10.0.1.1")],
+        )
+        self.assertThat(
+            events,
+            Equals(
+                [
+                    {
+                        "scan_type": "ping",
+                        "interface": "eth0",
+                        "ip": "10.0.0.2",
+                        "result": True,
+                    },
+                    {
+                        "scan_type": "ping",
+                        "interface": "eth1",
+                        "ip": "10.0.1.1",
+                        "result": True,
+                    },
+                    {
+                        "scan_type": "ping",
+                        "interface": "eth0",
+                        "ip": "10.0.0.1",
+                        "result": False,
+                    },
+                ]
+            ),
+        )
+
+    def test_probes_until_neighbour_replies(self):
+        eth0 = FakeSweepTransport({"10.0.0.2"})
+        sweeper = self.make_sweeper({"eth0": [eth0]}, attempts=3)
+        self.sweep(sweeper, [("eth0", "10.0.0.1"), ("eth0", "10.0.0.2")])
+        self.assertThat(eth0.sent.count("10.0.0.1"), Equals(3))
+        self.assertThat(eth0.sent.count("10.0.0.2"), Equals(1))
+
+    def test_sends_on_each_transport_of_interface(self):
+        icmp = FakeSweepTransport()
+        arp = FakeSweepTransport({"10.0.0.1"})
+        sweeper = self.make_sweeper({"eth0": [icmp, arp]}, attempts=2)
+        events = self.sweep(sweeper, [("eth0", "10.0.0.1")])
+        self.assertThat(icmp.sent, Equals(["10.0.0.1"]))
+        self.assertThat([event["result"] for event in events], Equals([True]))
+
+    def test_ignores_replies_from_unknown_addresses(self):
+        eth0 = FakeSweepTransport()
+        eth0.peer.send(b"10.0.0.99")
+        sweeper = self.make_sweeper({"eth0": [eth0]}, attempts=1)
+        events = self.sweep(sweeper, [("eth0", "10.0.0.1")])
+        self.assertThat(
+            [event["ip"] for event in events], Equals(["10.0.0.1"])
+        )
+
+    def test_ignores_send_errors(self):
+        eth0 = FakeSweepTransport()
+        eth0.send = Mock(side_effect=OSError())
+        sweeper = self.make_sweeper({"eth0": [eth0]}, attempts=2)
+        events = self.sweep(sweeper, [("eth0", "10.0.0.1")])
+        self.assertThat([event["result"] for event in events], Equals([False]))
+
+    def test_limits_rate(self):
+        eth0 = FakeSweepTransport()
+        sweeper = self.make_sweeper({"eth0": [eth0]}, rate=100, attempts=1)
+        started = time.monotonic()
+        self.sweep(sweeper, [("eth0", "10.0.0.%d" % i) for i in range(1, 11)])
+        # Ten probes at 100 per second take at least 0.09 seconds.
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        self.assertThat(eth0.sent, HasLength(10))
+
+    def test_open_opens_transports_for_each_interface(self):
+        transports = {"eth0": [Mock()], "eth1": [Mock()]}
+        self.patch(
+            sweep_module, "open_transports"
+        ).side_effect = lambda ifname: transports[ifname]
+        sweeper = NetworkSweeper.open(["eth0", "eth1"], rate=10)
+        self.assertThat(sweeper.transports, Equals(transports))
+        self.assertThat(sweeper.rate, Equals(10))
+
+    def test_open_closes_transports_if_one_fails(self):
+        transport = Mock()
+        self.patch(sweep_module, "open_transports").side_effect = [
+            [transport],
+            PermissionError(),
+        ]
+        self.assertRaises(
+            PermissionError, NetworkSweeper.open, ["eth0", "eth1"]
+        )
+        self.assertThat(transport.close, MockCalledOnceWith())
@@ -85,6 +85,7 @@ from provisioningserver.utils.twisted import (
     LONGTIME,
     makeDeferredWithProcessProtocol,
     pause,
+    PrioritisedThreadPool,
     reducedWebLogFormatter,
     retries,
     RPCFetcher,
@@ -1611,6 +1612,46 @@ class TestThreadPool(MAASTestCase):
             ),
         )
 
+    @inlineCallbacks
+    def test_observes_time_waited_for_a_worker(self):
+        observe = Mock()
+        pool = ThreadPool(
+            minthreads=1, maxthreads=1, name="sodor", observe=observe
+        )
+        self.addCleanup(stop_pool_if_running, pool)
+        pool.start()
+
+        result = yield deferToThreadPool(reactor, pool, lambda: sentinel.foo)
+        self.assertThat(result, Is(sentinel.foo))
+        self.assertThat(observe, MockCalledOnceWith("sodor", ANY))
+        [_, wait], _ = observe.call_args
+        self.assertGreaterEqual(wait, 0)
+
+    @inlineCallbacks
+    def test_observe_failures_are_logged(self):
+        observe = Mock(side_effect=factory.make_exception())
+        pool = ThreadPool(minthreads=1, maxthreads=1, observe=observe)
+        self.addCleanup(stop_pool_if_running, pool)
+        pool.start()
+
+        with TwistedLoggerFixture() as logger:
+            result = yield deferToThreadPool(
+                reactor, pool, lambda: sentinel.foo
+            )
+
+        self.assertThat(result, Is(sentinel.foo))
+        self.assertThat(
+            logger.output,
+            DocTestMatches(
+                """\
+            Failure observing thread-pool wait.
+            Traceback (most recent call last):
+            ...
+            maastesting.factory.TestException#...
+            """
+            ),
+        )
+
 
 def stop_pool_if_running(pool):
     """Stop the given thread-pool if it's running."""
@@ -1845,6 +1886,221 @@ class TestThreadPoolLimiter(MAASTestCase):
         self.assertThat(pool.lock.tokens, Equals(1))
 
 
+class QueueingThreadPool(DummyThreadPool):
+    """A thread-pool that queues work until told to run it."""
+
+    def __init__(self):
+        self.min, self.max = 0, 0
+        self.calls = []
+
+    def adjustPoolsize(self, minthreads, maxthreads):
+        self.min, self.max = minthreads, maxthreads
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kwargs):
+        self.calls.append((onResult, func, args, kwargs))
+
+    def run(self, index=0):
+        onResult, func, args, kwargs = self.calls.pop(index)
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            onResult(False, Failure())
+        else:
+            onResult(True, result)
+
+
+class TestPrioritisedThreadPool(MAASTestCase):
+    """Tests for `PrioritisedThreadPool`."""
+
+    def make_pool(self, priorities=(("high", 1), ("low", 1)), maximum=4):
+        clock = Clock()
+        pool_beneath = QueueingThreadPool()
+        pool = PrioritisedThreadPool(
+            pool_beneath, priorities, maximum, idle=10, clock=clock
+        )
+        return pool, pool_beneath, clock
+
+    def test_init(self):
+        pool, pool_beneath, clock = self.make_pool()
+        self.assertThat(
+            pool,
+            MatchesStructure(
+                pool=Is(pool_beneath),
+                default=Equals("low"),
+                minimum=Equals(2),
+                maximum=Equals(4),
+                limit=Equals(2),
+                start=Equals(pool_beneath.start),
+                started=Equals(pool_beneath.started),
+                stop=Equals(pool_beneath.stop),
+            ),
+        )
+        # The pool beneath starts with the reserved slots.
+        self.assertEqual(2, pool_beneath.max)
+
+    def test_callInThread_uses_default_priority(self):
+        pool, pool_beneath, clock = self.make_pool()
+        pool.callInThread(noop)
+        self.assertEqual({"high": 0, "low": 1}, pool.running)
+        pool_beneath.run()
+        self.assertEqual({"high": 0, "low": 0}, pool.running)
+
+    def test_calls_onResult(self):
+        pool, pool_beneath, clock = self.make_pool()
+        callback = Mock()
+        pool.callInThreadWithPriority(
+            "high", callback, return_args, sentinel.arg, kw=sentinel.kw
+        )
+        pool_beneath.run()
+        self.assertThat(
+            callback,
+            MockCalledOnceWith(True, ((sentinel.arg,), {"kw": sentinel.kw})),
+        )
+
+    def test_logs_failures_without_onResult(self):
+        pool, pool_beneath, clock = self.make_pool()
+        pool.callInThread(lambda: 0 / 0)
+        with TwistedLoggerFixture() as logger:
+            pool_beneath.run()
+        self.assertIn("Failure when calling out to thread.", logger.output)
+        self.assertIn("ZeroDivisionError", logger.output)
+        self.assertEqual({"high": 0, "low": 0}, pool.running)
+
+    def test_releases_slot_when_underlying_pool_breaks(self):
+        pool, pool_beneath, clock = self.make_pool()
+        self.patch(
+            pool_beneath, "callInThreadWithCallback"
+        ).side_effect = factory.make_exception_type()
+        callback = Mock()
+        pool.callInThreadWithCallback(callback, noop)
+        self.assertThat(callback, MockCalledOnceWith(False, ANY))
+        self.assertEqual({"high": 0, "low": 0}, pool.running)
+
+    def test_rejects_unknown_priority(self):
+        pool, pool_beneath, clock = self.make_pool()
+        self.assertRaises(
+            ValueError, pool.callInThreadWithPriority, "middle", None, noop
+        )
+        self.assertRaises(ValueError, pool.forPriority, "middle")
+
+    def test_reserves_slots(self):
+        pool, pool_beneath, clock = self.make_pool(maximum=2)
+        # Low priority work can only use its reserved slot.
+        pool.callInThreadWithPriority("low", None, noop)
+        pool.callInThreadWithPriority("low", None, noop)
+        self.assertEqual({"high": 0, "low": 1}, pool.queued)
+        self.assertEqual(1, len(pool_beneath.calls))
+        # High priority work uses the slot reserved for it.
+        pool.callInThreadWithPriority("high", None, noop)
+        self.assertEqual({"high": 0, "low": 1}, pool.queued)
+        self.assertEqual(2, len(pool_beneath.calls))
+
+    def test_free_slots_go_to_highest_priority(self):
+        pool, pool_beneath, clock = self.make_pool(maximum=2)
+        pool.callInThreadWithPriority("high", None, noop)
+        pool.callInThreadWithPriority("low", None, noop)
+        pool.callInThreadWithPriority("low", None, noop)
+        pool.callInThreadWithPriority("high", None, noop)
+        self.assertEqual({"high": 1, "low": 1}, pool.queued)
+        # When the high priority work completes the next high priority
+        # work takes its slot, even though low priority work has been
+        # waiting longer.
+        pool_beneath.run(0)
+        self.assertEqual({"high": 0, "low": 1}, pool.queued)
+        self.assertEqual({"high": 1, "low": 1}, pool.running)
+
+    def test_grows_when_work_waits(self):
+        pool, pool_beneath, clock = self.make_pool(maximum=3)
+        for _ in range(4):
+            pool.callInThreadWithPriority("high", None, noop)
+        self.assertEqual(3, pool.limit)
+        self.assertEqual(3, pool_beneath.max)
+        self.assertEqual({"high": 2, "low": 0}, pool.running)
+        self.assertEqual({"high": 2, "low": 0}, pool.queued)
+
+    def test_shrinks_when_idle(self):
+        pool, pool_beneath, clock = self.make_pool(maximum=3)
+        for _ in range(3):
+            pool.callInThreadWithPriority("high", None, noop)
+        self.assertEqual(3, pool.limit)
+        pool_beneath.run()
+        # Work waited recently.
+        self.assertEqual(3, pool.limit)
+        clock.advance(10)
+        pool_beneath.run()
+        self.assertEqual(2, pool.limit)
+        self.assertEqual(2, pool_beneath.max)
+        # Never below the reserved slots.
+        clock.advance(10)
+        pool_beneath.run()
+        self.assertEqual(2, pool.limit)
+
+    def test_setMaximum(self):
+        pool, pool_beneath, clock = self.make_pool(maximum=3)
+        for _ in range(3):
+            pool.callInThreadWithPriority("high", None, noop)
+        pool.setMaximum(1)
+        self.assertEqual(2, pool.maximum)
+        self.assertEqual(2, pool.limit)
+        self.assertEqual(2, pool_beneath.max)
+
+    def test_observes_wait(self):
+        observe = Mock()
+        clock = Clock()
+        pool_beneath = QueueingThreadPool()
+        pool = PrioritisedThreadPool(
+            pool_beneath, [("only", 1)], 1, observe=observe, clock=clock
+        )
+        pool.callInThread(noop)
+        pool.callInThread(noop)
+        clock.advance(3)
+        pool_beneath.run()
+        clock.advance(2)
+        pool_beneath.run()
+        # The second call waited for the first to finish.
+        self.assertThat(
+            observe, MockCallsMatch(mock.call("only", 3), mock.call("only", 5))
+        )
+
+    def test_forPriority(self):
+        pool, pool_beneath, clock = self.make_pool()
+        view = pool.forPriority("high")
+        self.assertThat(
+            view,
+            MatchesStructure(
+                pool=Is(pool),
+                priority=Equals("high"),
+                start=Equals(pool_beneath.start),
+                started=Equals(pool_beneath.started),
+                stop=Equals(pool_beneath.stop),
+            ),
+        )
+        view.callInThread(noop)
+        self.assertEqual({"high": 1, "low": 0}, pool.running)
+
+    def test_with_a_real_thread_pool(self):
+        pool_beneath = ThreadPool(0, 1, "test")
+        pool = PrioritisedThreadPool(pool_beneath, [("only", 1)], 2)
+        pool.start()
+        self.addCleanup(pool.stop)
+        lock = threading.Lock()
+        lock.acquire()
+        results = []
+        done = threading.Event()
+
+        def record(success, result):
+            results.append(result)
+            if len(results) == 3:
+                done.set()
+
+        pool.callInThreadWithCallback(record, lock.acquire)
+        pool.callInThreadWithCallback(record, lambda: sentinel.two)
+        pool.callInThreadWithCallback(record, lambda: sentinel.three)
+        lock.release()
+        self.assertTrue(done.wait(5))
+        self.assertItemsEqual([True, sentinel.two, sentinel.three], results)
+
+
 class TestMakeDeferredWithProcessProtocol(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
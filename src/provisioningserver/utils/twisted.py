@@ -3,7 +3,7 @@
 
 """Utilities related to the Twisted/Crochet execution environment."""
 
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 from collections.abc import Iterable
 from functools import partial, wraps
 from http import HTTPStatus
@@ -14,6 +14,7 @@ from os import kill as _os_kill
 from os import killpg as _os_killpg
 import signal
 import threading
+import time
 
 from crochet import run_in_reactor
 from netaddr import AddrFormatError, IPAddress
@@ -804,12 +805,24 @@ class ThreadPool(threadpool.ThreadPool, object):
     log = Logger()
 
     def __init__(
-        self, minthreads=5, maxthreads=20, name=None, contextFactory=None
+        self,
+        minthreads=5,
+        maxthreads=20,
+        name=None,
+        contextFactory=None,
+        observe=None,
     ):
+        """Initialise a new thread-pool.
+
+        :param observe: A callable called with the name of this pool and the
+            time spent waiting for a worker, in the thread the work is run
+            in.
+        """
         super().__init__(minthreads, maxthreads, name)
         self.context = ThreadWorkerContext(
             NullContext if contextFactory is None else contextFactory
         )
+        self.observe = observe
 
     def threadFactory(self, target, name):
         """Spawn a thread for use as a worker.
@@ -855,8 +868,15 @@ class ThreadPool(threadpool.ThreadPool, object):
         the pool (which assumes that creating a thread will always succeed).
         """
 
+        queued = time.monotonic()
+
         def callInContext(context, func, *args, **kwargs):
             context.enter()  # Delayed until now.
+            if self.observe is not None:
+                try:
+                    self.observe(self.name, time.monotonic() - queued)
+                except Exception:
+                    log.err(None, "Failure observing thread-pool wait.")
             return func(*args, **kwargs)
 
         return super().callInThreadWithCallback(
@@ -987,6 +1007,229 @@ class ThreadPoolLimiter:
         )
 
 
+class PrioritisedThreadPool:
+    """Share a thread-pool between prioritised classes of work.
+
+    Work is queued per class and handed to the underlying pool, which must
+    be a `ThreadPool`, as slots become free. Each class has a number of
+    slots reserved for it so that it can always make progress; the rest
+    are given to the highest priority class with work waiting.
+
+    The number of slots in use, the limit, adapts to demand: it grows by
+    one each time work has to wait, up to `maximum`, and shrinks by one
+    each time work completes after no work has waited for `idle` seconds,
+    down to the number of reserved slots. The underlying pool is resized to
+    match, so idle workers, and whatever resources their context holds,
+    are released.
+
+    Unlike `ThreadPoolLimiter`, this can be called from any thread.
+
+    :ivar priorities: An ordered mapping of class names to the number of
+        slots reserved for each, highest priority first.
+    """
+
+    def __init__(
+        self,
+        pool,
+        priorities,
+        maximum,
+        default=None,
+        idle=30.0,
+        observe=None,
+        clock=None,
+    ):
+        """Initialise a new prioritised thread-pool.
+
+        :param pool: A `ThreadPool`.
+        :param priorities: A sequence of ``(name, reserved)`` tuples,
+            highest priority first.
+        :param maximum: The maximum number of concurrent slots.
+        :param default: The class of work given to `callInThread` and
+            `callInThreadWithCallback`. Defaults to the lowest priority.
+        :param idle: Seconds after work last waited before shrinking.
+        :param observe: A callable called with the class name and the time
+            spent waiting, in the thread the work is run in.
+        """
+        super().__init__()
+        self.pool = pool
+        self.priorities = OrderedDict(priorities)
+        self.default = (
+            next(reversed(self.priorities)) if default is None else default
+        )
+        self.minimum = max(1, sum(self.priorities.values()))
+        self.maximum = max(self.minimum, maximum)
+        self.limit = self.minimum
+        self.idle = idle
+        self.observe = observe
+        self.clock = clock
+        if self.clock is None:
+            from twisted.internet import reactor
+
+            self.clock = reactor
+        self.queues = {name: deque() for name in self.priorities}
+        self.running = dict.fromkeys(self.priorities, 0)
+        self._lock = threading.Lock()
+        self._waited = self.clock.seconds()
+        self._resize(self.limit)
+
+    start = property(attrgetter("pool.start"))
+    started = property(attrgetter("pool.started"))
+    stop = property(attrgetter("pool.stop"))
+
+    def callInThread(self, func, *args, **kwargs):
+        """Call `func` in the default class of work."""
+        return self.callInThreadWithCallback(None, func, *args, **kwargs)
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kwargs):
+        """Call `func` in the default class of work.
+
+        See :class:`twisted.python.threadpool.ThreadPool`.
+        """
+        return self.callInThreadWithPriority(
+            self.default, onResult, func, *args, **kwargs
+        )
+
+    def callInThreadWithPriority(
+        self, priority, onResult, func, *args, **kwargs
+    ):
+        """Call `func` in the given class of work.
+
+        See :class:`twisted.python.threadpool.ThreadPool`. As there,
+        `onResult` is called in the thread that ran `func`.
+        """
+        if priority not in self.queues:
+            raise ValueError("Unknown class of work: %r" % (priority,))
+        work = (onResult, func, args, kwargs, self.clock.seconds())
+        with self._lock:
+            self.queues[priority].append(work)
+            dispatch = self._take()
+            if len(self.queues[priority]) != 0:
+                # There was no slot; make one if the budget allows.
+                self._waited = work[-1]
+                if self.limit < self.maximum:
+                    self.limit += 1
+                    self._resize(self.limit)
+                    dispatch.extend(self._take())
+        self._dispatch(dispatch)
+
+    def forPriority(self, priority):
+        """Return a thread-pool-like view for the given class of work."""
+        if priority not in self.queues:
+            raise ValueError("Unknown class of work: %r" % (priority,))
+        return _PrioritisedThreadPoolView(self, priority)
+
+    def setMaximum(self, maximum):
+        """Change the maximum number of concurrent slots.
+
+        This is never lower than the number of reserved slots.
+        """
+        with self._lock:
+            self.maximum = max(self.minimum, maximum)
+            if self.limit > self.maximum:
+                self.limit = self.maximum
+                self._resize(self.limit)
+
+    @property
+    def queued(self):
+        """A mapping of class names to the number of items waiting."""
+        with self._lock:
+            return {name: len(queue) for name, queue in self.queues.items()}
+
+    def _resize(self, limit):
+        self.pool.adjustPoolsize(self.pool.min, limit)
+
+    def _take(self):
+        """Dequeue the work that can be run now. Hold the lock."""
+        taken = []
+        for name, queue in self.queues.items():
+            while len(queue) != 0 and self._hasSlotFor(name):
+                self.running[name] += 1
+                taken.append((name, queue.popleft()))
+        return taken
+
+    def _hasSlotFor(self, name):
+        """Return true if work of class `name` can run now. Hold the lock."""
+        free = self.limit - sum(self.running.values())
+        if free <= 0:
+            return False
+        elif self.running[name] < self.priorities[name]:
+            # Use a slot reserved for this class.
+            return True
+        else:
+            # Use a slot that's not reserved for another class.
+            reserved = sum(
+                max(0, self.priorities[other] - self.running[other])
+                for other in self.priorities
+                if other != name
+            )
+            return free > reserved
+
+    def _release(self, name):
+        with self._lock:
+            self.running[name] -= 1
+            idle = self.clock.seconds() - self._waited >= self.idle
+            if idle and self.limit > self.minimum:
+                self.limit -= 1
+                self._resize(self.limit)
+                self._waited = self.clock.seconds()
+            dispatch = self._take()
+        self._dispatch(dispatch)
+
+    def _dispatch(self, dispatch):
+        for name, (onResult, func, args, kwargs, queued) in dispatch:
+            self._callInPool(name, queued, onResult, func, args, kwargs)
+
+    def _callInPool(self, name, queued, onResult, func, args, kwargs):
+        def observe(*args, **kwargs):
+            if self.observe is not None:
+                try:
+                    self.observe(name, self.clock.seconds() - queued)
+                except Exception:
+                    log.err(None, "Failure observing thread-pool wait.")
+            return func(*args, **kwargs)
+
+        def callback(success, result):
+            try:
+                if onResult is not None:
+                    onResult(success, result)
+                elif not success:
+                    log.err(result, "Failure when calling out to thread.")
+            finally:
+                self._release(name)
+
+        try:
+            self.pool.callInThreadWithCallback(
+                callback, observe, *args, **kwargs
+            )
+        except Exception:
+            callback(False, Failure())
+
+
+class _PrioritisedThreadPoolView:
+    """A view of a `PrioritisedThreadPool` for one class of work.
+
+    This can be used wherever a Twisted thread-pool is expected, e.g. with
+    `deferToThreadPool` or `ThreadPoolLimiter`.
+    """
+
+    def __init__(self, pool, priority):
+        super().__init__()
+        self.pool = pool
+        self.priority = priority
+
+    start = property(attrgetter("pool.start"))
+    started = property(attrgetter("pool.started"))
+    stop = property(attrgetter("pool.stop"))
+
+    def callInThread(self, func, *args, **kwargs):
+        return self.callInThreadWithCallback(None, func, *args, **kwargs)
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kwargs):
+        return self.pool.callInThreadWithPriority(
+            self.priority, onResult, func, *args, **kwargs
+        )
+
+
 def makeDeferredWithProcessProtocol():
     """Returns a (`Deferred`, `ProcessProtocol`) tuple.
 